@@ -1,11 +1,19 @@
 """Main entrypoint for AdLook CLI."""
 
+import asyncio
 import sys
 from pathlib import Path
 
+from backend.app.instrumentation import get_summary
+from backend.app.services.analysis_export import ExportDataset, ExportError
+
 from .cli import parse_args
 from .config import Config
-from .utils import setup_logging, get_logger, create_timestamped_dir, RuntimeStats
+from .journal import CheckpointJournal
+from .pipeline import AnalysisRunner, canonicalize_urls, load_urls
+from .utils import setup_logging, get_logger, create_timestamped_dir, ensure_output_dir, write_json_file, RuntimeStats
+
+STATS_FILENAME = "stats.json"
 
 
 def main() -> int:
@@ -20,39 +28,102 @@ def main() -> int:
     setup_logging(verbose=args.verbose)
     logger = get_logger(__name__)
     
-    logger.info(f"AdLook CLI - Analyzing {args.url}")
-    
     try:
+        dataset = None
+        if args.export and not args.dry_run:
+            from .export import export_results
+            
+            # Opened first so a format mismatch fails before any analysis
+            dataset = ExportDataset(args.export, args.export_format)
+            logger.info(f"Exporting to {dataset.directory} ({dataset.format})")
+            if not args.urls and not args.input:
+                export_results(ensure_output_dir(args.output), dataset)
+                return 0
+        
+        urls = load_urls(args.urls, args.input)
+        if not urls:
+            raise ValueError("No URLs to analyze")
+        
         require_api_key = not args.dry_run
         config = Config.from_env(require_api_key=require_api_key)
         
+        output_base = ensure_output_dir(args.output)
+        journal = CheckpointJournal(output_base)
+        
+        # Resumed runs reuse the canonical URLs journalled before, so checkpoints stay keyed by
+        # the same URLs; dry runs reuse them too and only normalize the rest (no network)
+        known = journal.canonical_urls() if args.resume or args.dry_run else {}
+        inputs = urls
+        urls, canonical, invalid = asyncio.run(canonicalize_urls(urls, resolve=not args.dry_run, known=known))
+        if not args.dry_run:
+            journal.record_canonical(canonical)
+        if not urls:
+            raise ValueError("No valid URLs to analyze")
+        
+        logger.info(f"AdLook CLI - Analyzing {len(urls)} URL(s)" if len(urls) > 1
+                    else f"AdLook CLI - Analyzing {urls[0]}")
+        
         logger.debug(f"Configuration loaded: timeout={config.timeout}s, "
                     f"viewport={config.viewport_width}x{config.viewport_height}")
         
-        output_dir = create_timestamped_dir(args.output, args.url)
-        logger.info(f"Output directory: {output_dir}")
-        
         if args.dry_run:
             logger.info("Dry run mode - skipping analysis")
             logger.info("Configuration validated successfully")
-            logger.info(f"Would analyze: {args.url}")
-            logger.info(f"Would save results to: {output_dir}")
+            unresolved = [url for url in inputs if url not in known and url not in invalid]
+            if unresolved:
+                logger.info(f"Redirects not followed for {len(unresolved)} URL(s) not seen in {journal.path}")
+            for url in urls:
+                output_dir = create_timestamped_dir(args.output, url)
+                logger.info(f"Would analyze: {url}")
+                logger.info(f"Would save results to: {output_dir}")
             return 0
         
+        logger.info(f"Checkpoint journal: {journal.path}")
+        if args.resume:
+            logger.info("Resuming previous run - completed stages will be skipped")
+        
         stats = RuntimeStats()
         
         logger.info("Starting analysis...")
         stats.start_phase("analysis")
         
-        logger.warning(
-            "Analysis functionality not yet implemented. "
-            "This is a placeholder that confirms:"
-        )
-        logger.info("  ✓ Argument parsing works")
-        logger.info("  ✓ Configuration validation passed")
-        logger.info(f"  ✓ OpenAI API key is set: {'Yes' if config.openai_api_key else 'No'}")
-        logger.info(f"  ✓ Output directory created: {output_dir}")
-        logger.info("  ✗ Downstream implementation pending")
+        from backend.app.services.complete_parser import CompleteWebsiteParser
+        
+        parser = CompleteWebsiteParser()
+        if args.deferred:
+            from backend.app.services.llm_batch import BatchProcessor
+            from .deferred import DeferredAnalysisRunner
+            
+            if args.profile:
+                logger.warning("--profile is not supported with --deferred and will be ignored")
+            logger.info("Deferred mode - LLM calls are submitted through the Batch API")
+            runner = DeferredAnalysisRunner(
+                parser=parser,
+                journal=journal,
+                output_base=str(output_base),
+                resume=args.resume,
+                processor=BatchProcessor(parser.openai_client),
+            )
+        else:
+            runner = AnalysisRunner(
+                parser=parser,
+                journal=journal,
+                output_base=str(output_base),
+                resume=args.resume,
+                profile=args.profile,
+            )
+        if args.monitor:
+            from .monitor import SiteMonitor
+            
+            monitor = SiteMonitor(runner, output_base)
+            logger.info(f"Monitoring mode - state in {monitor.state_path}")
+            after_pass = (lambda _: export_results(output_base, dataset)) if dataset is not None else None
+            statuses = asyncio.run(monitor.run(urls, interval=args.monitor_interval, after_pass=after_pass))
+            results = {url: not status.endswith("failed") for url, status in statuses.items()}
+        else:
+            results = asyncio.run(runner.run(urls))
+            if dataset is not None:
+                export_results(output_base, dataset)
         
         duration = stats.end_phase("analysis")
         logger.debug(f"Analysis phase duration: {duration:.2f}s")
@@ -60,14 +131,28 @@ def main() -> int:
         total_duration = stats.finish()
         logger.info(f"Total execution time: {total_duration:.2f}s")
         
-        logger.info("CLI execution completed successfully (with placeholder)")
-        return 0
+        from backend.app.services.vision_cascade import tier_summary
         
-    except ValueError as e:
+        stats_path = output_base / STATS_FILENAME
+        write_json_file(stats_path, {"runtime": stats.get_summary(), "stages": get_summary(), "vision_tiers": tier_summary()})
+        logger.info(f"Stage statistics written to {stats_path}")
+        
+        # Invalid URLs fail on their own; the rest of the batch still runs
+        results.update({url: False for url in invalid})
+        failed = [url for url, ok in results.items() if not ok]
+        logger.info(f"Completed {len(results) - len(failed)}/{len(results)} URL(s)")
+        if failed:
+            logger.warning(f"{len(failed)} URL(s) failed; rerun with --resume to retry them")
+            return 1
+        
+        return 0
+    
+    except (ValueError, ExportError) as e:
         logger.error(f"Configuration error: {e}")
         return 1
     except KeyboardInterrupt:
         logger.warning("Operation cancelled by user")
+        logger.info("Progress is saved in the checkpoint journal; rerun with --resume to continue")
         return 130
     except Exception as e:
         logger.error(f"Unexpected error: {e}", exc_info=args.verbose)
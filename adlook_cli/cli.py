@@ -24,6 +24,12 @@ Examples:
   python -m adlook_cli https://example.com
   python -m adlook_cli https://example.com --output ./results --verbose
   python -m adlook_cli https://example.com --dry-run
+  python -m adlook_cli --input urls.txt --output ./results
+  python -m adlook_cli --input urls.txt --output ./results --resume
+  python -m adlook_cli --input urls.txt --output ./results --deferred
+  python -m adlook_cli --input urls.txt --output ./results --monitor --monitor-interval 3600
+  python -m adlook_cli --input urls.txt --output ./results --export ./results/export
+  python -m adlook_cli --output ./results --export ./results/export --export-format csv
 
 Environment Variables:
   OPENAI_API_KEY       OpenAI API key (required for analysis)
@@ -31,6 +37,13 @@ Environment Variables:
   ADLOOK_VIEWPORT_WIDTH   Viewport width for browser (default: 1920)
   ADLOOK_VIEWPORT_HEIGHT  Viewport height for browser (default: 1080)
   ADLOOK_MAX_RETRIES   Maximum retry attempts (default: 3)
+  ADLOOK_BATCH_POLL_SECONDS  Batch status poll interval with --deferred (default: 30)
+  ADLOOK_MONITOR_IMAGE_THRESHOLD  Screenshot hash bits that may differ with --monitor (default: 8)
+  ADLOOK_MONITOR_DOM_THRESHOLD    Layout hash bits that may differ with --monitor (default: 6)
+  ADLOOK_RESOURCE_CACHE  Shared page resource cache; empty disables (default: /tmp/adlook_resources.db)
+  ADLOOK_RESOURCE_CACHE_MB  Resource cache size limit (default: 512)
+  ADLOOK_NAVIGATION_HISTORY  Per-domain page load timings; empty disables (default: /tmp/adlook_navigation.db)
+  ADLOOK_NAVIGATION_TIMEOUT  Longest page load wait in seconds (default: 30)
 
 Note:
   After installing dependencies, run: python -m playwright install chromium
@@ -38,9 +51,18 @@ Note:
     )
     
     parser.add_argument(
-        "url",
+        "urls",
         type=str,
-        help="Target URL to analyze for ad placement opportunities"
+        nargs="*",
+        metavar="url",
+        help="Target URL(s) to analyze for ad placement opportunities"
+    )
+    
+    parser.add_argument(
+        "-i", "--input",
+        type=str,
+        default=None,
+        help="File with one URL per line to analyze as a batch"
     )
     
     parser.add_argument(
@@ -62,6 +84,54 @@ Note:
         help="Validate configuration and arguments without running analysis"
     )
     
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume a previous run in the output directory, skipping completed stages"
+    )
+    
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Save a cProfile/speedscope profile and stage timeline next to each URL's results"
+    )
+    
+    parser.add_argument(
+        "--deferred",
+        action="store_true",
+        help="Submit LLM calls through the OpenAI Batch API (half the cost, results within 24h)"
+    )
+    
+    parser.add_argument(
+        "--monitor",
+        action="store_true",
+        help="Re-check previously analyzed URLs and re-analyze only pages that changed"
+    )
+    
+    parser.add_argument(
+        "--monitor-interval",
+        type=float,
+        default=0,
+        metavar="SECONDS",
+        help="With --monitor, repeat the check every SECONDS until interrupted (default: one pass)"
+    )
+    
+    parser.add_argument(
+        "--export",
+        type=str,
+        default=None,
+        metavar="DIR",
+        help="Append the analyses in the output directory to a columnar export dataset in DIR "
+             "after the run (or each monitoring pass); without URLs, only export"
+    )
+    
+    parser.add_argument(
+        "--export-format",
+        choices=("auto", "parquet", "arrow", "csv"),
+        default="auto",
+        help="Format of a new export dataset; auto is parquet with pyarrow installed, else csv (default: auto)"
+    )
+    
     parser.add_argument(
         "--version",
         action="version",
@@ -77,9 +147,18 @@ def parse_args(args: Optional[list] = None) -> argparse.Namespace:
     
     Args:
         args: List of arguments to parse (defaults to sys.argv[1:])
-        
+    
     Returns:
         Parsed arguments namespace
     """
     parser = create_parser()
-    return parser.parse_args(args)
+    parsed = parser.parse_args(args)
+    
+    if not parsed.urls and not parsed.input and not parsed.export:
+        parser.error("at least one URL or --input file is required")
+    if parsed.monitor and (parsed.deferred or parsed.resume):
+        parser.error("--monitor cannot be combined with --deferred or --resume")
+    if parsed.monitor_interval and not parsed.monitor:
+        parser.error("--monitor-interval requires --monitor")
+    
+    return parsed
@@ -0,0 +1,224 @@
+"""
+Deferred (batch API) mode for AdLook CLI.
+
+Overnight sweeps do not need an answer per URL within seconds, so instead of
+making real-time chat completion calls this runner does the browser and
+scraping work for every URL first and then submits the LLM work through the
+OpenAI Batch API in two rounds:
+
+1. vision requests (only for pages the DOM zone detector is unsure about)
+   and company research requests (registry record summaries when a company
+   registry is configured);
+2. the personalized proposal segments, which need the zones and research.
+
+Results are fanned back into the same per-URL artifacts and checkpoint
+journal as the real-time pipeline. Submitted batch ids are saved in the
+output directory, so ``--resume`` picks up polling instead of paying for the
+same requests twice.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, List
+
+from backend.app.config import settings
+from backend.app.instrumentation import span
+from backend.app.services.complete_parser import build_vision_request, research_result
+from backend.app.services.llm_batch import BatchOutcome, BatchProcessor, BatchRequest
+from backend.app.services.proposal_generator import build_segment_requests, render_proposal
+from backend.app.services.vision_cascade import parse_tiers
+
+from .pipeline import AnalysisRunner, STAGES, LAYOUT_FILENAME, _load_artifact
+from .utils import get_logger, write_json_file
+
+logger = get_logger(__name__)
+
+# Batch ids per round, so a resumed run polls the batches it already paid for
+BATCHES_FILENAME = "batches.json"
+
+
+def _url_key(url: str) -> str:
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+
+
+class DeferredAnalysisRunner(AnalysisRunner):
+    """Run the pipeline with every LLM call submitted through the Batch API."""
+    
+    def __init__(self, *args: Any, processor: BatchProcessor, **kwargs: Any):
+        """
+        Args:
+            processor: Batch processor bound to the OpenAI client
+            *args, **kwargs: Passed to AnalysisRunner
+        """
+        super().__init__(*args, **kwargs)
+        self.processor = processor
+        self.batches_path = self.journal.path.parent / BATCHES_FILENAME
+    
+    async def run(self, urls: List[str]) -> Dict[str, bool]:
+        """
+        Analyze all URLs, deferring LLM calls to batches.
+        
+        Args:
+            urls: URLs to analyze
+        
+        Returns:
+            Mapping of URL to whether its analysis succeeded
+        """
+        self.journal.start_run(urls, resume=self.resume)
+        results = {url: False for url in urls}
+        contexts: Dict[str, Dict[str, Any]] = {}
+        
+        for index, url in enumerate(urls, 1):
+            if self.resume and self.journal.get_state(url).done:
+                logger.info(f"Skipping {url}: already completed")
+                results[url] = True
+                continue
+            
+            logger.info(f"[{index}/{len(urls)}] {url}")
+            run_dir = self._resolve_run_dir(url)
+            self.journal.start_url(url, run_dir)
+            context: Dict[str, Any] = {"run_dir": run_dir}
+            if await self._run_local_stages(url, context):
+                contexts[url] = context
+        
+        await self._zones_and_research_round(contexts)
+        await self._proposal_round(contexts)
+        
+        for url, context in contexts.items():
+            if all(stage in context for stage in STAGES):
+                try:
+                    self._finish_url(url, context)
+                except Exception as e:
+                    self._fail_stage(url, "result", f"{type(e).__name__}: {e}")
+                    continue
+                results[url] = True
+        
+        return results
+    
+    async def _run_local_stages(self, url: str, context: Dict[str, Any]) -> bool:
+        """Screenshot, scrape and DOM zone detection; no LLM calls."""
+        for stage in ("screenshot", "scrape"):
+            if not await self._run_stage(url, stage, context):
+                return False
+        
+        if not self._restore_stage(url, "vision", context):
+            layout_path = context["run_dir"] / LAYOUT_FILENAME
+            layout = _load_artifact(layout_path, "layout") if layout_path.exists() else None
+            result = self.parser.detect_zones_from_layout(layout)[0] if layout else None
+            if result is not None:
+                self._complete_stage(url, "vision", context, result)
+        
+        self._restore_stage(url, "research", context)
+        self._restore_stage(url, "proposal", context)
+        return True
+    
+    def _load_batches(self) -> Dict[str, Any]:
+        try:
+            with open(self.batches_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    async def _submit_round(self, name: str, requests: Dict[str, Dict[str, Any]]) -> Dict[str, BatchOutcome]:
+        """
+        Submit one round of requests (or reattach to its batches on resume)
+        and wait for the results.
+        
+        Args:
+            name: Round name, used as batch metadata and in the batches file
+            requests: Mapping of custom_id to chat completion request body
+        
+        Returns:
+            Mapping of custom_id to outcome
+        """
+        if not requests:
+            return {}
+        
+        key = hashlib.sha1("\n".join(sorted(requests)).encode("utf-8")).hexdigest()
+        saved = self._load_batches()
+        entry = saved.get(name)
+        
+        with span("batch.round", round=name, requests=len(requests)):
+            if self.resume and entry and entry.get("key") == key:
+                batch_ids = entry["batch_ids"]
+                logger.info(f"Resuming {len(batch_ids)} submitted batch(es) for {name}")
+            else:
+                batch_ids = await self.processor.submit(
+                    [BatchRequest(custom_id, body) for custom_id, body in requests.items()],
+                    metadata={"adlook_round": name},
+                )
+                saved[name] = {"key": key, "batch_ids": batch_ids}
+                write_json_file(self.batches_path, saved)
+            
+            logger.info(f"Waiting for {name} batch results ({len(requests)} requests)...")
+            return await self.processor.wait(batch_ids, list(requests))
+    
+    async def _zones_and_research_round(self, contexts: Dict[str, Dict[str, Any]]) -> None:
+        # A batch cannot escalate within the round, so ask the most capable tier directly
+        tier = parse_tiers(settings.ADLOOK_VISION_TIERS)[-1]
+        requests: Dict[str, Dict[str, Any]] = {}
+        planned_research: Dict[str, Dict[str, Any]] = {}
+        for url, context in contexts.items():
+            key = _url_key(url)
+            if "vision" not in context:
+                layout_path = context["run_dir"] / LAYOUT_FILENAME
+                layout = _load_artifact(layout_path, "layout") if layout_path.exists() else None
+                requests[f"{key}:vision"] = build_vision_request(
+                    url, context["screenshot"], tier.model, tier.detail, layout
+                )
+            if "research" not in context:
+                scraped = context["scrape"]
+                request, research = self.parser.research_request(
+                    scraped.get("company_name"), url, inn=scraped.get("inn"), ogrn=scraped.get("ogrn")
+                )
+                if request is None:
+                    self._complete_stage(url, "research", context, research)
+                else:
+                    requests[f"{key}:research"] = request
+                    planned_research[url] = research
+        
+        outcomes = await self._submit_round("zones_research", requests)
+        
+        for url, context in list(contexts.items()):
+            key = _url_key(url)
+            research = outcomes.get(f"{key}:research")
+            if research is not None:
+                self._complete_stage(url, "research", context, research_result(
+                    planned_research[url], content=research.content if research.ok else None, error=research.error
+                ))
+            
+            vision = outcomes.get(f"{key}:vision")
+            if vision is None:
+                continue
+            try:
+                if not vision.ok:
+                    raise ValueError(vision.error)
+                result = json.loads(vision.content)
+            except ValueError as e:
+                self._fail_stage(url, "vision", f"OpenAI Vision API error: {e}")
+                del contexts[url]
+                continue
+            result["source"] = "vision"
+            result["vision_tier"] = tier.name
+            self._complete_stage(url, "vision", context, result)
+    
+    async def _proposal_round(self, contexts: Dict[str, Dict[str, Any]]) -> None:
+        requests: Dict[str, Dict[str, Any]] = {}
+        proposal_data: Dict[str, Dict[str, Any]] = {}
+        for url, context in contexts.items():
+            if "proposal" in context:
+                continue
+            proposal_data[url] = self._proposal_data(url, context)
+            for segment, body in build_segment_requests(proposal_data[url]).items():
+                requests[f"{_url_key(url)}:proposal.{segment}"] = body
+        
+        outcomes = await self._submit_round("proposal", requests)
+        
+        for url, data in proposal_data.items():
+            prefix = f"{_url_key(url)}:proposal."
+            segments = {
+                custom_id[len(prefix):]: outcome.content
+                for custom_id, outcome in outcomes.items()
+                if custom_id.startswith(prefix) and outcome.ok
+            }
+            self._complete_stage(url, "proposal", contexts[url], render_proposal(data, segments))
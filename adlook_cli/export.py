@@ -0,0 +1,69 @@
+"""
+Columnar export of CLI results (``--export``).
+
+Every ``analysis.json`` under the output directory becomes one row of an
+export dataset (see ``backend.app.services.analysis_export``): Parquet part
+files with pyarrow installed, CSV otherwise. The result directories already
+exported are recorded in the dataset's manifest, so each export, after a
+batch or a monitoring pass, only appends the analyses finished since.
+"""
+
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Set
+
+from backend.app.services.analysis_export import ExportDataset, flatten
+
+from .pipeline import RESULT_FILENAME
+from .utils import get_logger
+
+logger = get_logger(__name__)
+
+RUN_DIR_FORMAT = "%Y-%m-%d_%H-%M-%S"
+
+
+def result_dirs(output_base: Path) -> List[str]:
+    """``domain/timestamp`` keys of the result directories with a finished analysis, oldest first."""
+    keys = []
+    for result_path in Path(output_base).glob(f"*/*/{RESULT_FILENAME}"):
+        run_dir = result_path.parent
+        keys.append(f"{run_dir.parent.name}/{run_dir.name}")
+    return sorted(keys, key=lambda key: key.split("/")[1])
+
+
+def _analyzed_at(run_dir_name: str) -> Any:
+    try:
+        # Run directories are named in local time
+        return datetime.strptime(run_dir_name, RUN_DIR_FORMAT).astimezone()
+    except ValueError:
+        return None
+
+
+def _rows(output_base: Path, keys: List[str], exported: Set[str]) -> Iterator[Dict[str, Any]]:
+    for key in keys:
+        try:
+            with open(Path(output_base) / key / RESULT_FILENAME, encoding="utf-8") as f:
+                result = json.load(f)
+        except (OSError, ValueError) as e:
+            # Left out of ``exported`` so the next export tries it again
+            logger.warning(f"Skipping {key} in the export: {e}")
+            continue
+        yield flatten(key, result, analyzed_at=_analyzed_at(key.split("/")[1]))
+        exported.add(key)
+
+
+def export_results(output_base: Path, dataset: ExportDataset) -> int:
+    """
+    Append the analyses under ``output_base`` that are not in ``dataset`` yet.
+    
+    Returns:
+        Number of analyses exported
+    """
+    source = f"cli:{Path(output_base).resolve()}"
+    exported: Set[str] = set(dataset.state(source) or [])
+    new = [key for key in result_dirs(output_base) if key not in exported]
+    if not new:
+        logger.info(f"Export {dataset.directory} is up to date ({dataset.rows} analyses)")
+        return 0
+    return dataset.append(_rows(output_base, new, exported), source, lambda: sorted(exported))
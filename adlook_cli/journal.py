@@ -0,0 +1,160 @@
+"""
+Checkpoint journal for AdLook CLI runs.
+
+The journal is an append-only JSONL file stored in the output directory.
+Every completed or failed pipeline stage is recorded as a single line, so a
+run interrupted by a crash, Ctrl-C or an API outage can be resumed with
+``--resume`` without repeating work that already finished. The canonical
+URL each input URL was resolved to is journalled too, so a resumed run keys
+its checkpoints by the same URLs even if a redirect changed or cannot be
+followed in the meantime.
+"""
+
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+JOURNAL_FILENAME = "journal.jsonl"
+
+
+@dataclass
+class UrlState:
+    """Replayed checkpoint state for a single URL."""
+    
+    url: str
+    run_dir: Optional[str] = None
+    completed: Dict[str, Optional[str]] = field(default_factory=dict)
+    failed: Dict[str, str] = field(default_factory=dict)
+    done: bool = False
+    
+    def is_stage_complete(self, stage: str) -> bool:
+        """Return True if the stage finished in a previous run."""
+        return stage in self.completed
+
+
+class CheckpointJournal:
+    """Append-only JSONL journal recording per-URL stage completion."""
+    
+    def __init__(self, output_dir: Path):
+        self.path = Path(output_dir) / JOURNAL_FILENAME
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.states: Dict[str, UrlState] = {}
+        self.canonical: Dict[str, str] = {}
+    
+    def load(self) -> Dict[str, UrlState]:
+        """
+        Replay the journal into per-URL state.
+        
+        Replay restarts at the most recent non-resumed ``run_started`` entry,
+        so a fresh run never inherits checkpoints from an older one. A
+        truncated trailing line (e.g. from a crash mid-write) is ignored.
+        Canonical URLs are replayed across runs, the latest one winning.
+        
+        Returns:
+            Mapping of URL to its replayed state
+        """
+        self.states = {}
+        self.canonical = {}
+        
+        if not self.path.exists():
+            return self.states
+        
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self._apply(entry)
+        
+        return self.states
+    
+    def _apply(self, entry: Dict[str, Any]) -> None:
+        event = entry.get("event")
+        
+        if event == "run_started":
+            if not entry.get("resume"):
+                self.states = {}
+            return
+        if event == "urls_canonicalized":
+            self.canonical.update(entry.get("canonical") or {})
+            return
+        
+        url = entry.get("url")
+        if not url:
+            return
+        
+        state = self.states.setdefault(url, UrlState(url=url))
+        
+        if event == "url_started":
+            state.run_dir = entry.get("run_dir") or state.run_dir
+        elif event == "stage_completed":
+            stage = entry["stage"]
+            state.completed[stage] = entry.get("artifact")
+            state.failed.pop(stage, None)
+        elif event == "stage_failed":
+            stage = entry["stage"]
+            state.failed[stage] = entry.get("error", "")
+            state.completed.pop(stage, None)
+            state.done = False
+        elif event == "url_completed":
+            state.done = True
+    
+    def _append(self, entry: Dict[str, Any]) -> None:
+        entry = {"ts": time.time(), **entry}
+        self._apply(entry)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def start_run(self, urls: List[str], resume: bool) -> None:
+        """
+        Record the start of a run.
+        
+        Args:
+            urls: URLs scheduled for this run
+            resume: Whether previous checkpoints should be honoured
+        """
+        if resume:
+            self.load()
+        else:
+            self.states = {}
+        self._append({"event": "run_started", "resume": resume, "urls": len(urls)})
+    
+    def canonical_urls(self) -> Dict[str, str]:
+        """Replay the journal and return the canonical URL recorded for each input URL."""
+        self.load()
+        return dict(self.canonical)
+    
+    def record_canonical(self, canonical: Dict[str, str]) -> None:
+        """Record the canonical URL of each input URL, skipping the ones already journalled."""
+        changed = {url: target for url, target in canonical.items() if self.canonical.get(url) != target}
+        if changed:
+            self._append({"event": "urls_canonicalized", "canonical": changed})
+    
+    def get_state(self, url: str) -> UrlState:
+        """Return the state for a URL, creating an empty one if needed."""
+        return self.states.setdefault(url, UrlState(url=url))
+    
+    def start_url(self, url: str, run_dir: Path) -> None:
+        """Record the directory holding the artifacts for a URL."""
+        self._append({"event": "url_started", "url": url, "run_dir": str(run_dir)})
+    
+    def complete_stage(self, url: str, stage: str, artifact: Optional[str] = None) -> None:
+        """Record a finished stage and the artifact file it produced."""
+        self._append({"event": "stage_completed", "url": url, "stage": stage, "artifact": artifact})
+    
+    def fail_stage(self, url: str, stage: str, error: str) -> None:
+        """Record a failed stage so it is retried on resume."""
+        self._append({"event": "stage_failed", "url": url, "stage": stage, "error": error})
+    
+    def complete_url(self, url: str) -> None:
+        """Record that every stage for a URL has finished."""
+        self._append({"event": "url_completed", "url": url})
@@ -0,0 +1,184 @@
+"""
+Monitoring mode for AdLook CLI.
+
+Re-checking prospects used to mean rerunning the whole pipeline. In
+monitoring mode every URL first gets a cheap check: the page is loaded in a
+browser shared by all checks and fingerprinted (dHash of the viewport
+screenshot and SimHash of the DOM layout, see
+``backend.app.services.page_fingerprint``). Only pages whose fingerprint
+moved past ``ADLOOK_MONITOR_IMAGE_THRESHOLD`` / ``ADLOOK_MONITOR_DOM_THRESHOLD``
+since their last analysis, and pages seen for the first time, go through the
+full pipeline. Unchanged pages keep their stored analysis.
+
+The baseline per URL (fingerprint and run directory) is kept in
+``monitor.json`` in the output directory; every check is appended to
+``monitor.jsonl``.
+"""
+
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.app.config import settings
+from backend.app.instrumentation import span
+from backend.app.services.browser import browser_session
+from backend.app.services.page_fingerprint import PageFingerprint
+
+from .pipeline import AnalysisRunner, RESULT_FILENAME
+from .utils import get_logger, write_json_file
+
+logger = get_logger(__name__)
+
+STATE_FILENAME = "monitor.json"
+LOG_FILENAME = "monitor.jsonl"
+
+# Pages fingerprinted at the same time in the shared browser
+CHECK_CONCURRENCY = 4
+
+NEW = "new"
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+CHECK_FAILED = "check_failed"
+
+
+class SiteMonitor:
+    """Re-check URLs cheaply and re-analyze only the ones that changed."""
+    
+    def __init__(self, runner: AnalysisRunner, output_base: Path):
+        """
+        Args:
+            runner: Runner used for full analyses
+            output_base: Output directory holding the monitor state and log
+        """
+        self.runner = runner
+        self.state_path = Path(output_base) / STATE_FILENAME
+        self.log_path = Path(output_base) / LOG_FILENAME
+        self.image_threshold = settings.ADLOOK_MONITOR_IMAGE_THRESHOLD
+        self.dom_threshold = settings.ADLOOK_MONITOR_DOM_THRESHOLD
+    
+    def _load_state(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _log(self, entry: Dict[str, Any]) -> None:
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"ts": time.time(), **entry}, ensure_ascii=False) + "\n")
+    
+    def _baseline(self, entry: Optional[Dict[str, Any]]) -> Optional[PageFingerprint]:
+        # A baseline is only usable while the analysis it vouches for still exists
+        if not entry or not entry.get("fingerprint"):
+            return None
+        if not (Path(entry.get("run_dir", "")) / RESULT_FILENAME).exists():
+            return None
+        return PageFingerprint.from_dict(entry["fingerprint"])
+    
+    async def _fingerprint_all(self, urls: List[str]) -> Dict[str, Optional[PageFingerprint]]:
+        semaphore = asyncio.Semaphore(CHECK_CONCURRENCY)
+        
+        async with browser_session(args=["--no-sandbox", "--disable-setuid-sandbox"]) as browser:
+            async def one(url: str) -> Optional[PageFingerprint]:
+                async with semaphore:
+                    fingerprint, _, _ = await self.runner.parser.capture_fingerprint(browser, url)
+                    return fingerprint
+            
+            fingerprints = await asyncio.gather(*(one(url) for url in urls))
+        return dict(zip(urls, fingerprints))
+    
+    async def check(self, urls: List[str]) -> Dict[str, str]:
+        """
+        Run one monitoring pass.
+        
+        Args:
+            urls: URLs to monitor
+        
+        Returns:
+            Mapping of URL to its status: new, changed or unchanged, or
+            check_failed (the full analysis ran instead); with "failed"
+            appended when that analysis did not complete
+        """
+        state = self._load_state()
+        statuses: Dict[str, str] = {}
+        
+        start = time.perf_counter()
+        with span("monitor.check", urls=len(urls)):
+            fingerprints = await self._fingerprint_all(urls)
+        check_seconds = time.perf_counter() - start
+        
+        to_analyze = []
+        for url in urls:
+            entry = state.get(url)
+            baseline = self._baseline(entry)
+            fingerprint = fingerprints[url]
+            record: Dict[str, Any] = {"url": url}
+            
+            if fingerprint is None:
+                statuses[url] = CHECK_FAILED
+            elif baseline is None:
+                statuses[url] = NEW
+            else:
+                diff = baseline.compare(fingerprint, self.image_threshold, self.dom_threshold)
+                record.update(diff.to_dict())
+                statuses[url] = CHANGED if diff.changed else UNCHANGED
+            
+            record["status"] = statuses[url]
+            if statuses[url] == UNCHANGED:
+                record["run_dir"] = entry["run_dir"]
+                entry["checked_at"] = time.time()
+                logger.info(f"{url}: unchanged, reusing {entry['run_dir']}")
+            else:
+                to_analyze.append(url)
+                logger.info(f"{url}: {statuses[url]}, analyzing")
+            self._log(record)
+        
+        if to_analyze:
+            results = await self.runner.run(to_analyze)
+            for url, ok in results.items():
+                if not ok:
+                    statuses[url] = f"{statuses[url]}_failed"
+                    continue
+                now = time.time()
+                fingerprint = fingerprints[url]
+                state[url] = {
+                    "run_dir": self.runner.journal.get_state(url).run_dir,
+                    # Without a fingerprint the URL stays "new" and is checked again next pass
+                    "fingerprint": fingerprint.to_dict() if fingerprint else None,
+                    "analyzed_at": now,
+                    "checked_at": now,
+                }
+        
+        write_json_file(self.state_path, state)
+        unchanged = sum(1 for status in statuses.values() if status == UNCHANGED)
+        logger.info(
+            f"Monitoring pass: {unchanged}/{len(urls)} unchanged (checked in {check_seconds:.1f}s), "
+            f"{len(to_analyze)} re-analyzed"
+        )
+        return statuses
+    
+    async def run(
+        self, urls: List[str], interval: float = 0, after_pass: Optional[Callable[[Dict[str, str]], None]] = None
+    ) -> Dict[str, str]:
+        """
+        Run monitoring passes.
+        
+        Args:
+            urls: URLs to monitor
+            interval: Seconds between pass starts; 0 runs a single pass,
+                      otherwise passes repeat until interrupted
+            after_pass: Called with the statuses after every pass (e.g. to export new results)
+        
+        Returns:
+            Statuses of the last pass (see ``check``)
+        """
+        while True:
+            started = time.monotonic()
+            statuses = await self.check(urls)
+            if after_pass is not None:
+                after_pass(statuses)
+            if not interval:
+                return statuses
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
@@ -0,0 +1,356 @@
+"""
+Batch analysis pipeline for AdLook CLI.
+
+Runs the complete parser workflow stage by stage for each URL, saving every
+intermediate artifact to the URL's output directory and recording progress in
+the checkpoint journal so interrupted runs can be resumed.
+"""
+
+import json
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.app.instrumentation import span
+from backend.app.profiling import AnalysisProfiler
+from backend.app.services.adtech import fingerprint
+from backend.app.services.screenshot import Screenshot
+from backend.app.services.url_canon import dedupe, normalize_url, site_key
+
+from .journal import CheckpointJournal
+from .utils import get_logger, create_timestamped_dir, write_json_file, write_text_file
+
+logger = get_logger(__name__)
+
+STAGES = ("screenshot", "vision", "scrape", "research", "proposal")
+
+ARTIFACTS = {
+    "screenshot": "screenshot.png",
+    "vision": "vision.json",
+    "scrape": "scraped.json",
+    "research": "research.json",
+    "proposal": "proposal.txt",
+}
+
+RESULT_FILENAME = "analysis.json"
+
+# Written next to the screenshot; lets the vision stage use DOM zone detection on resume
+LAYOUT_FILENAME = "layout.json"
+
+# Ad networks matched in the requests made while the screenshot page loaded
+ADTECH_FILENAME = "adtech.json"
+
+# Rendered HTML of the screenshot page; the scrape stage parses it instead of loading the page again
+PAGE_HTML_FILENAME = "page.html"
+
+
+class StageError(Exception):
+    """Raised when a pipeline stage fails and the URL cannot continue."""
+
+
+def _save_artifact(path: Path, stage: str, value: Any) -> None:
+    if stage == "screenshot":
+        value.save(path)
+    elif stage == "proposal":
+        write_text_file(path, value)
+    else:
+        write_json_file(path, value)
+
+
+def _load_artifact(path: Path, stage: str) -> Any:
+    if stage == "screenshot":
+        return Screenshot.from_file(path)
+    if stage == "proposal":
+        return path.read_text(encoding="utf-8")
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class AnalysisRunner:
+    """Run the analysis pipeline over a batch of URLs with checkpointing."""
+    
+    def __init__(
+        self,
+        parser: Any,
+        journal: CheckpointJournal,
+        output_base: str,
+        resume: bool = False,
+        profile: bool = False,
+    ):
+        """
+        Args:
+            parser: CompleteWebsiteParser instance providing the stage methods
+            journal: Checkpoint journal for the output directory
+            output_base: Base output directory for per-URL artifacts
+            resume: If True, skip stages completed in a previous run
+            profile: If True, save a profile of each URL's stages next to its results
+        """
+        self.parser = parser
+        self.journal = journal
+        self.output_base = output_base
+        self.resume = resume
+        self.profile = profile
+        self._stage_funcs: Dict[str, Callable] = {
+            "screenshot": self._stage_screenshot,
+            "vision": self._stage_vision,
+            "scrape": self._stage_scrape,
+            "research": self._stage_research,
+            "proposal": self._stage_proposal,
+        }
+    
+    async def run(self, urls: List[str]) -> Dict[str, bool]:
+        """
+        Analyze all URLs sequentially.
+        
+        Args:
+            urls: URLs to analyze
+        
+        Returns:
+            Mapping of URL to whether its analysis succeeded
+        """
+        self.journal.start_run(urls, resume=self.resume)
+        results = {}
+        
+        for index, url in enumerate(urls, 1):
+            logger.info(f"[{index}/{len(urls)}] {url}")
+            with span("analysis"):
+                results[url] = await self.analyze_url(url)
+        
+        return results
+    
+    def _resolve_run_dir(self, url: str) -> Path:
+        state = self.journal.get_state(url)
+        if self.resume and state.run_dir and Path(state.run_dir).is_dir():
+            return Path(state.run_dir)
+        return create_timestamped_dir(self.output_base, url)
+    
+    async def analyze_url(self, url: str) -> bool:
+        """
+        Run every pipeline stage for one URL.
+        
+        Args:
+            url: URL to analyze
+        
+        Returns:
+            True if all stages completed, False otherwise
+        """
+        state = self.journal.get_state(url)
+        
+        if self.resume and state.done:
+            logger.info(f"Skipping {url}: already completed")
+            return True
+        
+        run_dir = self._resolve_run_dir(url)
+        self.journal.start_url(url, run_dir)
+        
+        with AnalysisProfiler(run_dir, name=url) if self.profile else nullcontext():
+            return await self._run_stages(url, run_dir)
+    
+    def _restore_stage(self, url: str, stage: str, context: Dict[str, Any]) -> bool:
+        """
+        Load a stage's artifact from a previous run; False if it must run.
+        
+        Once a stage has run again, the stages after it are not restored
+        either: their artifacts were built from the old output.
+        """
+        if not (self.resume and self.journal.get_state(url).is_stage_complete(stage)):
+            return False
+        if any(earlier in context.get("rerun", ()) for earlier in STAGES[:STAGES.index(stage)]):
+            return False
+        try:
+            context[stage] = _load_artifact(context["run_dir"] / ARTIFACTS[stage], stage)
+            logger.debug(f"Reusing {stage} checkpoint for {url}")
+            return True
+        except (OSError, ValueError) as e:
+            logger.warning(f"Checkpoint for {stage} is unreadable, redoing: {e}")
+            return False
+    
+    def _complete_stage(self, url: str, stage: str, context: Dict[str, Any], value: Any) -> None:
+        _save_artifact(context["run_dir"] / ARTIFACTS[stage], stage, value)
+        self.journal.complete_stage(url, stage, ARTIFACTS[stage])
+        context[stage] = value
+        context.setdefault("rerun", set()).add(stage)
+    
+    def _fail_stage(self, url: str, stage: str, error: str) -> None:
+        logger.error(f"Stage '{stage}' failed for {url}: {error}")
+        self.journal.fail_stage(url, stage, error)
+    
+    async def _run_stage(self, url: str, stage: str, context: Dict[str, Any]) -> bool:
+        """Restore or run one stage; False if it failed."""
+        if self._restore_stage(url, stage, context):
+            return True
+        try:
+            value = await self._stage_funcs[stage](url, context)
+            self._complete_stage(url, stage, context, value)
+        except StageError as e:
+            self._fail_stage(url, stage, str(e))
+            return False
+        except Exception as e:
+            # A bug or an unwritable artifact fails this URL, not the whole batch
+            logger.debug(f"Stage '{stage}' raised for {url}", exc_info=True)
+            self._fail_stage(url, stage, f"{type(e).__name__}: {e}")
+            return False
+        return True
+    
+    def _finish_url(self, url: str, context: Dict[str, Any]) -> None:
+        run_dir = context["run_dir"]
+        write_json_file(run_dir / RESULT_FILENAME, self._build_result(url, context))
+        self.journal.complete_url(url)
+        logger.info(f"Analysis saved to {run_dir}")
+    
+    async def _run_stages(self, url: str, run_dir: Path) -> bool:
+        context: Dict[str, Any] = {"run_dir": run_dir}
+        
+        for stage in STAGES:
+            if not await self._run_stage(url, stage, context):
+                return False
+        
+        try:
+            self._finish_url(url, context)
+        except Exception as e:
+            logger.debug(f"Writing the result failed for {url}", exc_info=True)
+            self._fail_stage(url, "result", f"{type(e).__name__}: {e}")
+            return False
+        return True
+    
+    def _language(self, context: Dict[str, Any]) -> str:
+        # Detected locally by the scrape stage; older runs only have the vision answer
+        return context["scrape"].get("language") or context["vision"].get("language", "en")
+    
+    def _build_result(self, url: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        vision = context["vision"]
+        scraped = context["scrape"]
+        adtech_path = context["run_dir"] / ADTECH_FILENAME
+        return {
+            "url": url,
+            "screenshot": ARTIFACTS["screenshot"],
+            "zones": vision.get("zones", []),
+            "zones_source": vision.get("source", "vision"),
+            "adtech": _load_artifact(adtech_path, "adtech") if adtech_path.exists() else None,
+            "language": self._language(context),
+            "emails": scraped.get("emails", []),
+            "company_name": scraped.get("company_name"),
+            "title": scraped.get("title"),
+            "description": scraped.get("description"),
+            "owner_info": context["research"].get("insights"),
+            "proposal": context["proposal"],
+        }
+    
+    async def _stage_screenshot(self, url: str, context: Dict[str, Any]) -> Screenshot:
+        capture, success, error = await self.parser.capture_page(url)
+        if not success:
+            raise StageError(error)
+        if capture.layout:
+            write_json_file(context["run_dir"] / LAYOUT_FILENAME, capture.layout)
+        if capture.html is not None:
+            write_text_file(context["run_dir"] / PAGE_HTML_FILENAME, capture.html)
+        with span("adtech.match", requests=len(capture.requests)):
+            write_json_file(context["run_dir"] / ADTECH_FILENAME, fingerprint(capture.requests))
+        return capture.screenshot
+    
+    async def _stage_vision(self, url: str, context: Dict[str, Any]) -> Dict:
+        layout_path = context["run_dir"] / LAYOUT_FILENAME
+        layout = _load_artifact(layout_path, "layout") if layout_path.exists() else None
+        result, success, error = await self.parser.analyze_zones(url, context["screenshot"], layout)
+        if not success:
+            raise StageError(error)
+        return result
+    
+    async def _stage_scrape(self, url: str, context: Dict[str, Any]) -> Dict:
+        html_path = context["run_dir"] / PAGE_HTML_FILENAME
+        html = html_path.read_text(encoding="utf-8") if html_path.exists() else None
+        return await self.parser.scrape_website_data(url, html=html)
+    
+    async def _stage_research(self, url: str, context: Dict[str, Any]) -> Dict:
+        scraped = context["scrape"]
+        return await self.parser.research_company_owner(
+            scraped.get("company_name"), url, inn=scraped.get("inn"), ogrn=scraped.get("ogrn")
+        )
+    
+    def _proposal_data(self, url: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        vision = context["vision"]
+        scraped = context["scrape"]
+        adtech_path = context["run_dir"] / ADTECH_FILENAME
+        return {
+            "website_url": url,
+            "zones": vision.get("zones", []),
+            "language": self._language(context),
+            "company_name": scraped.get("company_name"),
+            "owner_info": context["research"],
+            "emails": scraped.get("emails", []),
+            "title": scraped.get("title"),
+            "description": scraped.get("description"),
+            "adtech": _load_artifact(adtech_path, "adtech") if adtech_path.exists() else None,
+        }
+    
+    async def _stage_proposal(self, url: str, context: Dict[str, Any]) -> str:
+        return await self.parser.generate_personalized_proposal(self._proposal_data(url, context))
+
+
+def load_urls(urls: List[str], input_file: Optional[str] = None) -> List[str]:
+    """
+    Combine URLs from the command line and an optional input file.
+    
+    Blank lines and lines starting with '#' in the input file are ignored.
+    Duplicates are dropped while preserving order.
+    
+    Args:
+        urls: URLs given as positional arguments
+        input_file: Path to a file with one URL per line
+    
+    Returns:
+        Ordered list of unique URLs
+    """
+    combined = list(urls)
+    
+    if input_file:
+        with open(input_file, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    combined.append(line)
+    
+    return list(dict.fromkeys(combined))
+
+
+async def canonicalize_urls(
+    urls: List[str], resolve: bool = True, known: Optional[Dict[str, str]] = None
+) -> Tuple[List[str], Dict[str, str], Dict[str, str]]:
+    """
+    Normalize URLs, follow their redirects and drop the ones that point to the same page.
+    
+    Args:
+        urls: URLs in input order
+        resolve: Follow redirects (network access); otherwise only normalize
+        known: Canonical URL per input URL from an earlier run (see
+               ``CheckpointJournal.canonical_urls``); reused as is, so only
+               the other URLs are resolved
+    
+    Returns:
+        Tuple of (ordered list of canonical URLs to analyze, mapping of each
+        input URL to its canonical URL, error per URL that is not a valid URL)
+    """
+    invalid: Dict[str, str] = {}
+    for url in urls:
+        try:
+            normalize_url(url)
+        except ValueError as e:
+            logger.error(f"Invalid URL {url}: {e}")
+            invalid[url] = str(e)
+    urls = [url for url in urls if url not in invalid]
+    
+    resolved = {url: known[url] for url in urls if known and url in known}
+    pending = [url for url in urls if url not in resolved]
+    if resolve and pending:
+        from backend.app.services.url_canon import RedirectResolver
+        
+        with span("urls.resolve", urls=len(pending)):
+            resolved.update(await RedirectResolver().resolve_many(pending))
+    
+    unique, canonical = dedupe(urls, resolved)
+    for url, target in canonical.items():
+        if site_key(url) != site_key(target):
+            logger.info(f"{url} -> {target}")
+    if len(unique) < len(urls):
+        logger.info(f"Collapsed {len(urls) - len(unique)} duplicate URL(s); {len(unique)} left to analyze")
+    return unique, canonical, invalid
@@ -1,7 +1,7 @@
 """Utility modules for AdLook CLI."""
 
 from .logging_utils import setup_logging, get_logger
-from .file_utils import ensure_output_dir, create_timestamped_dir, write_json_file
+from .file_utils import ensure_output_dir, create_timestamped_dir, write_json_file, write_text_file
 from .stats_utils import RuntimeStats
 
 __all__ = [
@@ -10,5 +10,6 @@ __all__ = [
     "ensure_output_dir",
     "create_timestamped_dir",
     "write_json_file",
+    "write_text_file",
     "RuntimeStats",
 ]
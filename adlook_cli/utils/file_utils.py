@@ -5,7 +5,20 @@ import json
 from pathlib import Path
 from datetime import datetime
 from typing import Any, Dict
-import tldextract
+
+_domain_extractor = None
+
+
+def _get_domain_extractor():
+    """
+    Return a tldextract instance that only uses the public suffix snapshot
+    bundled with the package: no download on first use, no cache writes.
+    """
+    global _domain_extractor
+    if _domain_extractor is None:
+        import tldextract
+        _domain_extractor = tldextract.TLDExtract(suffix_list_urls=(), cache_dir=None)
+    return _domain_extractor
 
 
 def ensure_output_dir(path: str) -> Path:
@@ -14,7 +27,7 @@ def ensure_output_dir(path: str) -> Path:
     
     Args:
         path: Directory path to create
-        
+    
     Returns:
         Path object for the directory
     """
@@ -33,11 +46,11 @@ def create_timestamped_dir(base_dir: str, url: str) -> Path:
     Args:
         base_dir: Base output directory
         url: URL being analyzed
-        
+    
     Returns:
         Path object for the created directory
     """
-    extracted = tldextract.extract(url)
+    extracted = _get_domain_extractor()(url)
     domain = f"{extracted.domain}.{extracted.suffix}" if extracted.suffix else extracted.domain
     
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
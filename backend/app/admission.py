@@ -0,0 +1,225 @@
+"""
+Admission control for the interactive analysis endpoints.
+
+Every analysis launches Chromium, so only ``ADLOOK_MAX_CONCURRENT_ANALYSES``
+run at once. Further requests wait in a bounded queue per priority lane and
+are rejected with ``429 Too Many Requests`` when their lane's queue is full
+or when their estimated wait would outlast their deadline. ``Retry-After``
+is estimated from the recent p50 latency of the ``analysis`` stage.
+
+Lanes:
+
+- ``interactive``: people using the web interface. Waiting interactive
+  requests are always admitted first, and ``ADLOOK_ADMISSION_INTERACTIVE_RESERVE``
+  slots are kept free for them.
+- ``batch``: scripts and other API clients.
+
+Requests are batch unless they carry a secret the server configured: the
+proxy in front of the web interface sends ``ADLOOK_INTERACTIVE_TOKEN`` in
+the ``X-Adlook-Interactive-Token`` header, and admins send
+``ADLOOK_ADMIN_TOKEN`` in ``X-Adlook-Profile``. Headers or User-Agents that
+clients choose themselves cannot claim the reserved slots.
+"""
+
+import asyncio
+import hmac
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from .instrumentation import get_summary
+from .metrics import registry
+from .services.deadline import current_deadline
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+# In priority order
+LANES = (INTERACTIVE, BATCH)
+
+INTERACTIVE_TOKEN_HEADER = "X-Adlook-Interactive-Token"
+ADMIN_TOKEN_HEADER = "X-Adlook-Profile"
+
+# Assumed analysis latency until the first analyses have finished
+DEFAULT_LATENCY = 30.0
+LATENCY_STAGE = "analysis"
+
+ADMISSION_WAITING = registry.gauge(
+    "adlook_admission_waiting", "Analysis requests waiting for a slot, by lane.")
+ADMISSION_RUNNING = registry.gauge(
+    "adlook_admission_running", "Analysis requests holding a slot, by lane.")
+ADMISSION_REJECTED = registry.counter(
+    "adlook_admission_rejected_total", "Analysis requests rejected with 429, by lane and reason.")
+ADMISSION_WAIT = registry.histogram(
+    "adlook_admission_wait_seconds", "Time analysis requests waited for a slot, by lane.")
+
+
+class AdmissionRejected(Exception):
+    """No slot is available soon enough; the client should retry after ``retry_after`` seconds."""
+    
+    def __init__(self, lane: str, reason: str, retry_after: int):
+        super().__init__(f"Server is busy ({reason}), retry in {retry_after}s")
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def request_lane(request: Any) -> str:
+    """Priority lane of a Starlette request: interactive only with a configured token, batch otherwise."""
+    from .config import settings
+    
+    for header, token in (
+        (INTERACTIVE_TOKEN_HEADER, settings.ADLOOK_INTERACTIVE_TOKEN),
+        (ADMIN_TOKEN_HEADER, settings.ADLOOK_ADMIN_TOKEN),
+    ):
+        provided = request.headers.get(header)
+        if token and provided and hmac.compare_digest(provided, token):
+            return INTERACTIVE
+    return BATCH
+
+
+class AdmissionController:
+    """Concurrency limit with bounded, prioritized wait queues."""
+    
+    def __init__(self, limit: int, queue_size: int, interactive_reserve: int = 0):
+        """
+        Args:
+            limit: Analyses running at once
+            queue_size: Requests waiting per lane before new ones are rejected
+            interactive_reserve: Slots batch requests may not take
+        """
+        self.limit = max(1, limit)
+        self.queue_size = queue_size
+        self.batch_limit = max(1, self.limit - interactive_reserve)
+        self._running: Dict[str, int] = {lane: 0 for lane in LANES}
+        self._waiting: Dict[str, Deque[asyncio.Future]] = {lane: deque() for lane in LANES}
+    
+    def _can_start(self, lane: str) -> bool:
+        if sum(self._running.values()) >= self.limit:
+            return False
+        return lane == INTERACTIVE or self._running[BATCH] < self.batch_limit
+    
+    def _start(self, lane: str) -> None:
+        self._running[lane] += 1
+        ADMISSION_RUNNING.set(self._running[lane], lane=lane)
+    
+    def _dispatch(self) -> None:
+        """Hand free slots to waiting requests, interactive first."""
+        for lane in LANES:
+            queue = self._waiting[lane]
+            while queue and self._can_start(lane):
+                waiter = queue.popleft()
+                if not waiter.done():
+                    self._start(lane)
+                    waiter.set_result(None)
+            ADMISSION_WAITING.set(len(queue), lane=lane)
+    
+    def _release(self, lane: str) -> None:
+        self._running[lane] -= 1
+        ADMISSION_RUNNING.set(self._running[lane], lane=lane)
+        self._dispatch()
+    
+    def _queued_ahead(self, lane: str) -> int:
+        """Waiting requests that would be admitted before a new one in ``lane``."""
+        return len(self._waiting[INTERACTIVE]) + (len(self._waiting[BATCH]) if lane == BATCH else 0)
+    
+    def estimate_wait(self, lane: str) -> float:
+        """Seconds until a new request in ``lane`` would get a slot."""
+        ahead = self._queued_ahead(lane)
+        slots = self.limit if lane == INTERACTIVE else self.batch_limit
+        latency = get_summary().get(LATENCY_STAGE, {}).get("p50_s") or DEFAULT_LATENCY
+        return latency * (ahead // slots + 1)
+    
+    def _reject(self, lane: str, reason: str) -> AdmissionRejected:
+        ADMISSION_REJECTED.inc(lane=lane, reason=reason)
+        retry_after = max(1, math.ceil(self.estimate_wait(lane)))
+        logger.warning(f"🚦 Rejecting {lane} analysis request: {reason} (retry in {retry_after}s)")
+        return AdmissionRejected(lane, reason, retry_after)
+    
+    @asynccontextmanager
+    async def slot(self, lane: str) -> AsyncIterator[None]:
+        """
+        Hold an analysis slot for the block, waiting for one if needed.
+        
+        The wait is bounded by the current request deadline, if any.
+        
+        Raises:
+            AdmissionRejected: If the lane's queue is full or the wait
+                               would outlast the deadline
+        """
+        if not self._queued_ahead(lane) and self._can_start(lane):
+            self._start(lane)
+        else:
+            await self._wait(lane)
+        
+        try:
+            yield
+        finally:
+            self._release(lane)
+    
+    def check(self, lane: str) -> None:
+        """
+        Reject a new request in ``lane`` now if ``slot`` would reject it, without taking a slot.
+        
+        For work done before ``slot`` that is only worth doing if the
+        analysis can run.
+        
+        Raises:
+            AdmissionRejected: If the lane's queue is full or the wait
+                               would outlast the deadline
+        """
+        if not self._queued_ahead(lane) and self._can_start(lane):
+            return
+        if len(self._waiting[lane]) >= self.queue_size:
+            raise self._reject(lane, "queue_full")
+        deadline = current_deadline()
+        if deadline is not None and self.estimate_wait(lane) > deadline.remaining():
+            raise self._reject(lane, "deadline")
+    
+    async def _wait(self, lane: str) -> None:
+        self.check(lane)
+        queue = self._waiting[lane]
+        deadline = current_deadline()
+        timeout = deadline.remaining() if deadline is not None else None
+        
+        waiter = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        ADMISSION_WAITING.set(len(queue), lane=lane)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as error:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait ended; pass it on
+                self._release(lane)
+            else:
+                waiter.cancel()
+                if waiter in queue:
+                    queue.remove(waiter)
+                ADMISSION_WAITING.set(len(queue), lane=lane)
+            if isinstance(error, asyncio.TimeoutError):
+                raise self._reject(lane, "deadline") from None
+            raise
+        finally:
+            ADMISSION_WAIT.observe(time.perf_counter() - start, lane=lane)
+
+
+_admission: Optional[AdmissionController] = None
+
+
+def get_admission() -> AdmissionController:
+    """Admission controller shared by the analysis endpoints."""
+    global _admission
+    if _admission is None:
+        from .config import settings
+        
+        _admission = AdmissionController(
+            limit=settings.ADLOOK_MAX_CONCURRENT_ANALYSES,
+            queue_size=settings.ADLOOK_ADMISSION_QUEUE,
+            interactive_reserve=settings.ADLOOK_ADMISSION_INTERACTIVE_RESERVE,
+        )
+    return _admission
@@ -1,9 +1,27 @@
+import asyncio
+import hmac
 import logging
+import sqlite3
 import uuid
-from typing import Dict, Any
-from fastapi import APIRouter, HTTPException
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel, HttpUrl
+from ..admission import AdmissionRejected, get_admission, request_lane
+from ..config import settings
 from ..services.complete_parser import analyze_website_complete
+from ..services.url_canon import SingleFlight, dedupe, get_resolver, site_key
+from ..services.deadline import ClientDisconnected, deadline_scope, run_until_disconnected
+from ..services.screenshot import Screenshot
+from ..services.analysis_store import SearchError, SearchQuery, get_analysis_store, store_analysis
+from ..services.analysis_export import WRITERS, ExportError, iter_export, store_rows
+from ..metrics import register_cache, ANALYSES_IN_PROGRESS, CACHE_LOOKUPS
+from ..responses import FastJSONResponse, parse_fields, project
+from ..profiling import AnalysisProfiler, PROFILE_FORMATS
+from ..jobs.queue import get_job_queue, queue_configured, JobQueueError, DONE
 
 logger = logging.getLogger(__name__)
 
@@ -14,10 +32,16 @@ class AnalyzeRequest(BaseModel):
     url: HttpUrl
 
 
+class EnqueueRequest(BaseModel):
+    urls: List[HttpUrl]
+
+
 class AnalyzeResponse(BaseModel):
     success: bool
     screenshot: str = None
     zones: list = None
+    zones_source: str = None
+    adtech: dict = None
     language: str = None
     emails: list = None
     company_name: str = None
@@ -25,16 +49,90 @@ class AnalyzeResponse(BaseModel):
     description: str = None
     owner_info: str = None
     proposal: str = None
+    partial_capture: bool = None
     error: str = None
     analysis_id: str = None
+    profile: dict = None
 
 
 # Cache for storing analysis results
 analysis_cache: Dict[str, Dict[str, Any]] = {}
+register_cache("complete", analysis_cache)
+
+# Profile file paths per analysis ID (kept out of the result to avoid exposing local paths)
+profile_files: Dict[str, Dict[str, str]] = {}
+
+PROFILE_HEADER = "X-Adlook-Profile"
+# Seconds the caller (e.g. a proxy with its own timeout) is willing to wait; capped by ADLOOK_REQUEST_DEADLINE
+DEADLINE_HEADER = "X-Adlook-Deadline"
+
+# Concurrent requests for the same page share one analysis
+inflight_analyses = SingleFlight("analysis")
+
+
+def _is_admin_request(http_request: Request) -> bool:
+    """True if the request carries the configured admin token in the profile header."""
+    token = settings.ADLOOK_ADMIN_TOKEN
+    provided = http_request.headers.get(PROFILE_HEADER)
+    return bool(token and provided and hmac.compare_digest(provided, token))
+
+
+def _request_deadline(http_request: Request) -> Optional[float]:
+    """Time budget of a request in seconds; None for no deadline."""
+    budget = settings.ADLOOK_REQUEST_DEADLINE or None
+    try:
+        requested = float(http_request.headers.get(DEADLINE_HEADER, ""))
+    except ValueError:
+        return budget
+    if requested <= 0:
+        return budget
+    return min(requested, budget) if budget else requested
+
+
+async def _run_analysis(url: str, lane: str) -> Dict[str, Any]:
+    async with get_admission().slot(lane):
+        with ANALYSES_IN_PROGRESS.track_inprogress(pipeline="complete"):
+            return await analyze_website_complete(url)
+
+
+def _projected(data: Dict[str, Any], fields: Optional[str], exclude: Optional[str]) -> FastJSONResponse:
+    """
+    Analyze response with ``fields``/``exclude`` applied; status keys are always kept.
+    
+    Rendered directly instead of through ``AnalyzeResponse``, so the
+    screenshot is only base64-encoded while the body is serialized.
+    """
+    response = {name: None for name in AnalyzeResponse.model_fields}
+    response.update(data)
+    fields_list, exclude_list = parse_fields(fields), parse_fields(exclude)
+    if fields_list:
+        fields_list += ['success', 'error', 'analysis_id']
+    return FastJSONResponse(project(response, fields_list, exclude_list))
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    """Unix time of a query parameter date; dates without a time zone are UTC."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _profile_links(analysis_id: str, files: Dict[str, str]) -> Dict[str, str]:
+    return {
+        fmt: f"{router.prefix}/analysis/{analysis_id}/profile?format={fmt}"
+        for fmt in files
+    }
 
 
 @router.post("/analyze", response_model=AnalyzeResponse)
-async def analyze_website_complete_endpoint(request: AnalyzeRequest):
+async def analyze_website_complete_endpoint(
+    request: AnalyzeRequest,
+    http_request: Request,
+    fields: Optional[str] = None,
+    exclude: Optional[str] = None,
+):
     """
     Complete website analysis using the new parser workflow.
     
@@ -45,33 +143,76 @@ async def analyze_website_complete_endpoint(request: AnalyzeRequest):
     4. Company owner research
     5. Personalized proposal generation
     6. Auto language detection
+    
+    The analysis gets ADLOOK_REQUEST_DEADLINE seconds (less if the
+    ``X-Adlook-Deadline`` header asks for less) and is cancelled when the
+    client disconnects, unless other requests are waiting for it too.
+    
+    At most ADLOOK_MAX_CONCURRENT_ANALYSES analyses run at once; when no
+    slot frees up in time the request fails with 429 and ``Retry-After``
+    (see ``admission``).
+    
+    Sending the admin token in the ``X-Adlook-Profile`` header profiles this
+    analysis; the response then links to the pstats, speedscope and
+    timeline files. Profiles cover the whole process, so the request is
+    not profiled while other analyses are in flight.
+    
+    ``fields`` and ``exclude`` (comma-separated keys) trim the response,
+    e.g. ``?exclude=screenshot``.
     """
     url = str(request.url)
-    logger.info(f"Starting complete analysis for URL: {url}")
+    lane = request_lane(http_request)
+    
+    # Generate analysis ID
+    analysis_id = str(uuid.uuid4())
+    profiler = None
+    if _is_admin_request(http_request):
+        if len(inflight_analyses):
+            # They would run on the profiled event loop and be mixed into this profile
+            logger.warning(f"{len(inflight_analyses)} analyses in flight; running without profiling")
+        else:
+            profiler = AnalysisProfiler(Path(settings.ADLOOK_PROFILE_DIR) / analysis_id, name=url)
     
     try:
         # Run complete analysis
-        result = await analyze_website_complete(url)
+        with profiler or nullcontext(), deadline_scope(_request_deadline(http_request)):
+            # Turn the request away before following redirects if it could not get a slot anyway;
+            # resolving is bounded by the deadline
+            get_admission().check(lane)
+            url = await get_resolver().resolve(url)
+            logger.info(f"Starting complete analysis for URL: {url}")
+            
+            # Shared with concurrent requests for the same page; copied before it is updated below
+            result = dict(await run_until_disconnected(
+                http_request, inflight_analyses.run(site_key(url), lambda: _run_analysis(url, lane))
+            ))
+        
+        profile = {}
+        if profiler and profiler.files:
+            profile_files[analysis_id] = profiler.files
+            profile = {'profile': _profile_links(analysis_id, profiler.files)}
         
         if not result.get('success'):
             logger.error(f"Analysis failed: {result.get('error')}")
-            return AnalyzeResponse(
-                success=False,
-                error=result.get('error', 'Unknown error'),
-                analysis_id=None
-            )
+            return _projected({
+                'success': False,
+                'error': result.get('error', 'Unknown error'),
+                **({'analysis_id': analysis_id, **profile} if profile else {})
+            }, fields, exclude)
         
-        # Generate analysis ID
-        analysis_id = str(uuid.uuid4())
+        result.update(profile)
         
-        # Cache the result
+        # Cache the result, and keep it searchable after a restart
         analysis_cache[analysis_id] = result
+        await asyncio.to_thread(store_analysis, analysis_id, url, result)
         
         # Prepare response
         response_data = {
             'success': True,
             'screenshot': result.get('screenshot'),
             'zones': result.get('zones', []),
+            'zones_source': result.get('zones_source') or 'vision',
+            'adtech': result.get('adtech') or {},
             'language': result.get('language'),
             'emails': result.get('emails', []),
             'company_name': result.get('company_name'),
@@ -79,13 +220,21 @@ async def analyze_website_complete_endpoint(request: AnalyzeRequest):
             'description': result.get('description'),
             'owner_info': result.get('owner_info'),
             'proposal': result.get('proposal'),
-            'analysis_id': analysis_id
+            'analysis_id': analysis_id,
+            **profile
         }
         
         logger.info(f"Complete analysis successful for {url}, ID: {analysis_id}")
         
-        return AnalyzeResponse(**response_data)
-        
+        return _projected(response_data, fields, exclude)
+    
+    except AdmissionRejected as error:
+        raise HTTPException(status_code=429, detail=str(error), headers={"Retry-After": str(error.retry_after)})
+    
+    except ClientDisconnected:
+        logger.warning(f"Client disconnected during analysis of {url}")
+        return AnalyzeResponse(success=False, error="Client disconnected")
+    
     except Exception as error:
         logger.error(f"Unexpected error in complete analysis: {error}")
         return AnalyzeResponse(
@@ -96,30 +245,200 @@ async def analyze_website_complete_endpoint(request: AnalyzeRequest):
 
 
 @router.get("/analysis/{analysis_id}")
-async def get_analysis(analysis_id: str):
+async def get_analysis(analysis_id: str, fields: Optional[str] = None, exclude: Optional[str] = None):
     """
     Retrieve a previously completed analysis by ID.
+    
+    Analyses run by this process and queued jobs come back as they were
+    returned; older ones are read from the analysis store, without the
+    screenshot.
+    
+    ``fields`` keeps only the listed keys of the result and ``exclude``
+    drops keys (comma-separated, dotted for nested keys), e.g.
+    ``?fields=zones,emails`` or ``?exclude=screenshot``.
     """
-    if analysis_id not in analysis_cache:
-        raise HTTPException(status_code=404, detail="Analysis not found")
+    result = analysis_cache.get(analysis_id)
+    if result is None:
+        CACHE_LOOKUPS.inc(cache="complete", result="miss")
+        
+        # Results of queued jobs live in the shared queue, not in this process; without a
+        # configured queue there are no workers whose results could be there
+        job = None
+        if queue_configured():
+            try:
+                job = await _in_queue('get', analysis_id)
+            except JobQueueError as error:
+                logger.error(f"Job queue lookup failed: {error}")
+        if job is not None and job.status == DONE:
+            result = job.result
+            # Kept as PNG bytes like the results of analyses run in this process
+            if isinstance(result.get('screenshot'), str):
+                result['screenshot'] = Screenshot.from_data_url(result['screenshot'])
+        else:
+            result = await asyncio.to_thread(_stored_analysis, analysis_id)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Analysis not found")
+        # Not cached: the queue and the store keep these results, not this process
+    else:
+        CACHE_LOOKUPS.inc(cache="complete", result="hit")
     
-    result = analysis_cache[analysis_id]
+    return FastJSONResponse({
+        'success': True,
+        'data': project(result, parse_fields(fields), parse_fields(exclude))
+    })
+
+
+async def _in_queue(method: str, *args: Any) -> Any:
+    """Call a job queue method in a thread; opening the queue on first use touches the disk or network too."""
+    return await asyncio.to_thread(lambda: getattr(get_job_queue(), method)(*args))
+
+
+def _stored_analysis(analysis_id: str) -> Optional[Dict[str, Any]]:
+    store = get_analysis_store()
+    if store is None:
+        return None
+    try:
+        return store.get(analysis_id)
+    except sqlite3.Error as error:
+        logger.error(f"Analysis store lookup failed: {error}")
+        return None
+
+
+@router.get("/search")
+async def search_analyses(
+    q: Optional[str] = None,
+    language: Optional[str] = None,
+    domain: Optional[str] = None,
+    zone: Optional[str] = None,
+    has_emails: Optional[bool] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    sort: str = "recent",
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    facets: bool = False,
+):
+    """
+    Search past analyses.
     
-    return {
+    ``q`` is matched against the company name, title, description, emails
+    and proposal text (all words must occur; ``word*`` matches a prefix).
+    ``zone`` lists ad zones that must all be available (comma-separated:
+    header, sidebar, content, footer, popup). ``since``/``until`` are ISO
+    dates or datetimes. Results are newest first, or by relevance with
+    ``sort=relevance``; pass ``next_cursor`` back as ``cursor`` for the next
+    page. ``facets=true`` adds match counts per language and available
+    zone.
+    
+    Full analyses are available from ``/analysis/{analysis_id}``.
+    """
+    store = get_analysis_store()
+    if store is None:
+        raise HTTPException(status_code=503, detail="Analysis store is disabled")
+    
+    query = SearchQuery(
+        q=q,
+        language=language,
+        domain=domain,
+        zones=parse_fields(zone) or [],
+        has_emails=has_emails,
+        since=_timestamp(since),
+        until=_timestamp(until),
+        sort=sort,
+        limit=limit,
+        cursor=cursor,
+    )
+    try:
+        found = await asyncio.to_thread(store.search, query, facets)
+    except SearchError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    except sqlite3.Error as error:
+        logger.error(f"Analysis search failed: {error}")
+        raise HTTPException(status_code=503, detail="Analysis store unavailable")
+    
+    return FastJSONResponse({
         'success': True,
-        'data': result
-    }
+        **found
+    })
+
+
+@router.get("/export")
+async def export_analyses(format: str = "csv", after: int = 0):
+    """
+    Download stored analyses as one flat table.
+    
+    ``format`` is ``csv``, ``parquet`` or ``arrow`` (the latter two need
+    pyarrow). Each row is one analysis with a column group per ad zone
+    (``header_available``, ``header_size``, ...), the language, emails and ad
+    networks. The file is streamed as it is written, so any number of
+    analyses can be exported. For incremental exports, pass the
+    ``X-Adlook-Export-Cursor`` header of the previous response as ``after``
+    to get only the analyses stored since.
+    """
+    store = get_analysis_store()
+    if store is None:
+        raise HTTPException(status_code=503, detail="Analysis store is disabled")
+    if format not in WRITERS:
+        raise HTTPException(status_code=400, detail=f"Unknown export format: {format}")
+    
+    try:
+        until = await asyncio.to_thread(store.last_seq)
+        chunks = iter_export(store_rows(store, after=after, until=until), format)
+    except ExportError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    except sqlite3.Error as error:
+        logger.error(f"Analysis export failed: {error}")
+        raise HTTPException(status_code=503, detail="Analysis store unavailable")
+    
+    writer = WRITERS[format]
+    return StreamingResponse(
+        chunks,
+        media_type=writer.media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="adlook-analyses-{after}-{until}{writer.suffix}"',
+            "X-Adlook-Export-Cursor": str(until),
+        },
+    )
+
+
+@router.get("/analysis/{analysis_id}/profile")
+async def get_analysis_profile(analysis_id: str, http_request: Request, format: str = "speedscope"):
+    """
+    Download the profile captured for an analysis.
+    
+    Requires the admin token in the ``X-Adlook-Profile`` header. ``format``
+    is one of ``speedscope``, ``pstats`` or ``timeline``.
+    """
+    if not _is_admin_request(http_request):
+        raise HTTPException(status_code=403, detail="Profiling requires the admin token")
+    
+    if format not in PROFILE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown profile format: {format}")
+    
+    files = profile_files.get(analysis_id)
+    if not files or not Path(files[format]).exists():
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    filename, media_type = PROFILE_FORMATS[format]
+    return FileResponse(
+        path=files[format],
+        media_type=media_type,
+        filename=f"{analysis_id}.{filename}"
+    )
 
 
 @router.delete("/analysis/{analysis_id}")
 async def delete_analysis(analysis_id: str):
     """
-    Delete a cached analysis.
+    Delete an analysis from the cache and the analysis store.
     """
-    if analysis_id not in analysis_cache:
+    store = get_analysis_store()
+    stored = await asyncio.to_thread(store.delete, analysis_id) if store is not None else False
+    if analysis_id not in analysis_cache and not stored:
         raise HTTPException(status_code=404, detail="Analysis not found")
     
-    del analysis_cache[analysis_id]
+    analysis_cache.pop(analysis_id, None)
+    profile_files.pop(analysis_id, None)
     
     return {
         'success': True,
@@ -127,6 +446,80 @@ async def delete_analysis(analysis_id: str):
     }
 
 
+@router.post("/jobs")
+async def enqueue_jobs(request: EnqueueRequest):
+    """
+    Queue URLs for analysis by the workers (``python -m backend.app.jobs.worker``).
+    
+    URLs are canonicalized and followed through their redirects first; URLs
+    that end up on the same page share one job, whose ``requested`` lists
+    them. The job ID doubles as the analysis ID once the job is done.
+    """
+    if not request.urls:
+        raise HTTPException(status_code=400, detail="No URLs given")
+    
+    requested = [str(url) for url in request.urls]
+    unique, canonical = dedupe(requested, await get_resolver().resolve_many(requested))
+    
+    try:
+        jobs = await _in_queue('enqueue', unique)
+    except JobQueueError as error:
+        logger.error(f"Failed to enqueue jobs: {error}")
+        raise HTTPException(status_code=503, detail="Job queue unavailable")
+    
+    logger.info(f"Queued {len(jobs)} analysis jobs ({len(requested) - len(unique)} duplicate URLs collapsed)")
+    
+    return {
+        'success': True,
+        'jobs': [
+            {
+                'job_id': job.id,
+                'url': job.url,
+                'status': job.status,
+                'requested': [url for url in dict.fromkeys(requested) if canonical[url] == job.url]
+            }
+            for job in jobs
+        ]
+    }
+
+
+@router.get("/jobs")
+async def job_counts():
+    """
+    Number of queued, running, done and failed jobs.
+    """
+    try:
+        counts = await _in_queue('counts')
+    except JobQueueError as error:
+        logger.error(f"Failed to read job counts: {error}")
+        raise HTTPException(status_code=503, detail="Job queue unavailable")
+    
+    return {
+        'success': True,
+        'counts': counts
+    }
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Status of a queued job; the result is available from ``/analysis/{job_id}`` once done.
+    """
+    try:
+        job = await _in_queue('get', job_id)
+    except JobQueueError as error:
+        logger.error(f"Failed to read job {job_id}: {error}")
+        raise HTTPException(status_code=503, detail="Job queue unavailable")
+    
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return {
+        'success': True,
+        'job': job.to_dict(include_result=False)
+    }
+
+
 @router.get("/health")
 async def health_check():
     """
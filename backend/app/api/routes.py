@@ -1,19 +1,22 @@
 import logging
 import uuid
 from typing import Dict, Any
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import FileResponse
 from pydantic import BaseModel, HttpUrl
 from ..services.crawler import crawl_website
 from ..services.ai_analyzer import analyze_website_with_ai
 from ..services.proposal_generator import generate_proposal
 from ..services.exporter import create_docx, create_pdf, get_file_path
+from ..metrics import register_cache, ANALYSES_IN_PROGRESS
+from ..admission import AdmissionRejected, get_admission, request_lane
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api")
 
 analysis_cache: Dict[str, Dict[str, Any]] = {}
+register_cache("legacy", analysis_cache)
 
 
 class AnalyzeRequest(BaseModel):
@@ -27,14 +30,22 @@ class AnalyzeResponse(BaseModel):
 
 
 @router.post("/analyze", response_model=AnalyzeResponse)
-async def analyze_website(request: AnalyzeRequest):
+async def analyze_website(request: AnalyzeRequest, http_request: Request):
     """
     Analyze a website for ad placement opportunities.
+    
+    Shares the analysis slots of ``/api/complete/analyze``; fails with 429
+    and ``Retry-After`` when none frees up in time.
     """
     url = str(request.url)
     logger.info(f"Starting analysis for URL: {url}")
     
-    screenshot_bytes, html_content, success, error = await crawl_website(url)
+    try:
+        async with get_admission().slot(request_lane(http_request)):
+            with ANALYSES_IN_PROGRESS.track_inprogress(pipeline="legacy"):
+                screenshot_bytes, html_content, success, error = await crawl_website(url)
+    except AdmissionRejected as error:
+        raise HTTPException(status_code=429, detail=str(error), headers={"Retry-After": str(error.retry_after)})
     
     if not success:
         logger.error(f"Failed to crawl website: {error}")
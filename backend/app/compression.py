@@ -0,0 +1,129 @@
+"""
+Response compression negotiated from ``Accept-Encoding``.
+
+Brotli is used when the client accepts it and the ``brotli`` package is
+installed, gzip otherwise. Only complete (non-streaming) text and JSON
+bodies of at least ``minimum_size`` bytes are compressed; streamed files
+and responses that already have a ``Content-Encoding`` pass through
+unchanged. Bodies larger than ``THREAD_MINIMUM_SIZE`` are compressed in a
+worker thread so they do not block the event loop.
+"""
+
+import asyncio
+import gzip
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/javascript", "image/svg+xml")
+THREAD_MINIMUM_SIZE = 256 * 1024
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick ``br`` or ``gzip`` from an ``Accept-Encoding`` header.
+    
+    Returns:
+        The supported encoding with the highest quality (``br`` on a tie),
+        or None if the client accepts neither
+    """
+    qualities = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[name.strip().lower()] = quality
+    
+    best, best_quality = None, 0.0
+    for encoding in ("br", "gzip") if brotli is not None else ("gzip",):
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _compressible(content_type: str) -> bool:
+    media_type = content_type.partition(";")[0].strip().lower()
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses with brotli or gzip."""
+    
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        """
+        Args:
+            app: Wrapped application
+            minimum_size: Smaller bodies are sent uncompressed
+            gzip_level: zlib compression level
+            brotli_quality: Brotli quality (0-11); higher levels cost far more CPU for little gain
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+    
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        
+        start: Optional[Message] = None
+        
+        async def send_compressed(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether to compress
+                start = message
+                return
+            if start is None:
+                await send(message)
+                return
+            
+            initial, start = start, None
+            headers = MutableHeaders(raw=initial["headers"])
+            body = message.get("body", b"") if message["type"] == "http.response.body" else b""
+            if (
+                message["type"] != "http.response.body"
+                or message.get("more_body", False)
+                or "content-encoding" in headers
+                or not _compressible(headers.get("content-type", ""))
+            ):
+                await send(initial)
+                await send(message)
+                return
+            
+            headers.add_vary_header("Accept-Encoding")
+            if len(body) >= self.minimum_size:
+                if len(body) >= THREAD_MINIMUM_SIZE:
+                    body = await asyncio.to_thread(self.compress, body, encoding)
+                else:
+                    body = self.compress(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                message = {**message, "body": body}
+            await send(initial)
+            await send(message)
+        
+        await self.app(scope, receive, send_compressed)
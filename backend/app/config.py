@@ -1,12 +1,86 @@
+from functools import lru_cache
+from typing import Any, Optional
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
     OPENAI_API_KEY: str
-
+    # Point the OpenAI client at a compatible server (e.g. the benchmark stub)
+    OPENAI_BASE_URL: Optional[str] = None
+    # Requests carrying this value in the X-Adlook-Profile header are profiled
+    ADLOOK_ADMIN_TOKEN: Optional[str] = None
+    ADLOOK_PROFILE_DIR: str = "/tmp/adlook_profiles"
+    # Job queue shared by the API and workers: sqlite:///path or redis://host:port/db (sqlite:////tmp/...
+    # is the absolute path /tmp/..., so processes started from any directory share it)
+    ADLOOK_QUEUE_URL: str = "sqlite:////tmp/adlook_jobs.db"
+    ADLOOK_JOB_LEASE_SECONDS: int = 120
+    ADLOOK_JOB_MAX_ATTEMPTS: int = 3
+    # Skip the vision call when the DOM zone detector is at least this confident (>1 always uses vision)
+    ADLOOK_ZONE_CONFIDENCE_THRESHOLD: float = 0.75
+    # Vision cascade: model:detail tiers tried in order; the next tier is asked while an answer is
+    # invalid, below this self-reported confidence or contradicts the DOM detector
+    ADLOOK_VISION_TIERS: str = "gpt-4o-mini:low,gpt-4o:high"
+    ADLOOK_VISION_ACCEPT_CONFIDENCE: float = 0.7
+    # Send labelled crops of the header, sidebars, first content screen and footer (from the DOM
+    # landmarks) instead of the full page when they cost no more image tokens
+    ADLOOK_VISION_REGIONS: bool = True
+    # Offline batch mode (OpenAI Batch API): status poll interval and per-batch input limits
+    ADLOOK_BATCH_POLL_SECONDS: float = 30.0
+    ADLOOK_BATCH_MAX_REQUESTS: int = 50000
+    ADLOOK_BATCH_MAX_BYTES: int = 190_000_000
+    # SQLite company registry (python -m backend.app.services.company_registry ingest ...); when set,
+    # company research only summarizes records found in it instead of asking the model
+    ADLOOK_COMPANY_REGISTRY: Optional[str] = None
+    # Redirect chains of submitted URLs are resolved with HEAD requests and cached this long
+    ADLOOK_REDIRECT_CACHE_TTL: float = 86400.0
+    ADLOOK_REDIRECT_TIMEOUT: float = 5.0
+    # Monitoring: a page is re-analyzed when more screenshot dHash / DOM SimHash bits (of 64) than this differ
+    ADLOOK_MONITOR_IMAGE_THRESHOLD: int = 8
+    ADLOOK_MONITOR_DOM_THRESHOLD: int = 6
+    # Time budget of an /analyze request in seconds, shared by all stages (0 disables)
+    ADLOOK_REQUEST_DEADLINE: float = 90.0
+    # Admission control for /api/analyze and /api/complete/analyze: analyses running at once, requests
+    # waiting per priority lane before 429, and slots only interactive (web interface) requests may use
+    ADLOOK_MAX_CONCURRENT_ANALYSES: int = 4
+    ADLOOK_ADMISSION_QUEUE: int = 16
+    ADLOOK_ADMISSION_INTERACTIVE_RESERVE: int = 1
+    # Requests with this value in the X-Adlook-Interactive-Token header (sent by the proxy serving the web
+    # interface) or with the admin token are interactive; all others are batch
+    ADLOOK_INTERACTIVE_TOKEN: Optional[str] = None
+    # SQLite cache of the scripts, styles, fonts and images pages load, shared by all browsers on the
+    # host (empty disables), and its size limit; least recently used resources are evicted first
+    ADLOOK_RESOURCE_CACHE: str = "/tmp/adlook_resources.db"
+    ADLOOK_RESOURCE_CACHE_MB: int = 512
+    # SQLite store of completed analyses behind GET /api/complete/search, shared by the API and the
+    # workers on the host; on by default (empty disables)
+    ADLOOK_ANALYSIS_STORE: str = "/tmp/adlook_analyses.db"
+    # Per-domain page load timings, shared by all browsers on the host (empty disables), from which each
+    # navigation picks its wait condition (networkidle, load or domcontentloaded) and timeout; the timeout
+    # never exceeds ADLOOK_NAVIGATION_TIMEOUT seconds, which new domains get
+    ADLOOK_NAVIGATION_HISTORY: str = "/tmp/adlook_navigation.db"
+    ADLOOK_NAVIGATION_TIMEOUT: float = 30.0
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
 
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load settings from the environment on first use."""
+    return Settings()
+
+
+class _LazySettings:
+    """
+    Stand-in for the settings object that loads it on first attribute access.
+    
+    Importing the app must not fail (or read .env) before the settings are
+    needed, e.g. in serverless cold starts or when only running a CLI command.
+    """
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_settings(), name)
+
+
+settings = _LazySettings()
@@ -0,0 +1,345 @@
+"""
+Structured per-stage latency and resource instrumentation.
+
+Shared by the backend services and the CLI. Stages are wrapped in spans,
+either with the ``span()`` context manager or the ``instrument()`` decorator:
+
+    with span("page.navigation", url=url):
+        await page.goto(url)
+    
+    @instrument("stage.vision")
+    async def analyze(...): ...
+
+Spans nest through a context variable, so concurrent asyncio tasks keep
+separate parent chains. Each finished span records wall time, CPU time and
+RSS delta into a bounded per-name sample window that backs the p50/p95/p99
+summaries. When instrumentation is disabled ``span()`` yields a shared no-op
+object and records nothing.
+"""
+
+import functools
+import inspect
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SAMPLES = 1024
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):  # pragma: no cover
+    _PAGE_SIZE = 4096
+
+
+def current_rss_bytes() -> int:
+    """
+    Return the current resident set size of this process in bytes.
+    
+    Reads /proc/self/statm on Linux and falls back to the peak RSS reported
+    by getrusage elsewhere. Returns 0 when neither is available.
+    """
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        pass
+    
+    return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> int:
+    """Return the peak resident set size of this process in bytes."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    
+    Args:
+        sorted_values: Values sorted in ascending order
+        pct: Percentile between 0 and 100
+    
+    Returns:
+        The percentile value, or 0.0 for an empty list
+    """
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100.0 * len(sorted_values)) - 1
+    return sorted_values[max(0, min(rank, len(sorted_values) - 1))]
+
+
+class Span:
+    """A single timed stage."""
+    
+    __slots__ = (
+        "name", "parent", "attributes", "start", "duration",
+        "cpu_time", "rss_delta", "error", "_cpu_start", "_rss_start",
+    )
+    
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.parent = parent
+        self.attributes = attributes
+        self.start = 0.0
+        self.duration = 0.0
+        self.cpu_time = 0.0
+        self.rss_delta = 0
+        self.error: Optional[str] = None
+        self._cpu_start = 0.0
+        self._rss_start = 0
+    
+    @property
+    def path(self) -> str:
+        """Slash-separated names from the root span down to this one."""
+        names = []
+        node: Optional[Span] = self
+        while node is not None:
+            names.append(node.name)
+            node = node.parent
+        return "/".join(reversed(names))
+    
+    def set(self, **attributes: Any) -> None:
+        """Attach attributes (e.g. token counts) to the span."""
+        self.attributes.update(attributes)
+
+
+class _NullSpan:
+    """No-op span handed out while instrumentation is disabled."""
+    
+    __slots__ = ()
+    name = ""
+    parent = None
+    attributes: Dict[str, Any] = {}
+    duration = 0.0
+    
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("adlook_current_span", default=None)
+
+
+class StageStats:
+    """Aggregated statistics for every span sharing a name."""
+    
+    def __init__(self, max_samples: int = DEFAULT_MAX_SAMPLES):
+        self.count = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.cpu_time = 0.0
+        self.rss_delta = 0
+        self.samples: Deque[float] = deque(maxlen=max_samples)
+        self.totals: Dict[str, float] = {}
+    
+    def add(self, span: Span) -> None:
+        self.count += 1
+        self.total_time += span.duration
+        self.max_time = max(self.max_time, span.duration)
+        self.cpu_time += span.cpu_time
+        self.rss_delta += span.rss_delta
+        self.samples.append(span.duration)
+        if span.error:
+            self.errors += 1
+        for key, value in span.attributes.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.totals[key] = self.totals.get(key, 0) + value
+    
+    def snapshot(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total_s": round(self.total_time, 6),
+            "mean_s": round(self.total_time / self.count, 6) if self.count else 0.0,
+            "p50_s": round(percentile(ordered, 50), 6),
+            "p95_s": round(percentile(ordered, 95), 6),
+            "p99_s": round(percentile(ordered, 99), 6),
+            "max_s": round(self.max_time, 6),
+            "cpu_s": round(self.cpu_time, 6),
+            "rss_delta_bytes": self.rss_delta,
+            "totals": dict(self.totals),
+        }
+
+
+class Instrumentation:
+    """Collects spans and aggregates them per stage name."""
+    
+    def __init__(
+        self,
+        enabled: bool = True,
+        track_resources: bool = True,
+        max_samples: int = DEFAULT_MAX_SAMPLES,
+    ):
+        """
+        Args:
+            enabled: Record spans at all
+            track_resources: Measure CPU time and RSS delta per span
+            max_samples: Number of recent durations kept per stage for percentiles
+        """
+        self.enabled = enabled
+        self.track_resources = track_resources
+        self.max_samples = max_samples
+        self._stats: Dict[str, StageStats] = {}
+        self._listeners: List[Callable[[Span], None]] = []
+        self._lock = threading.Lock()
+    
+    def add_listener(self, listener: Callable[[Span], None]) -> None:
+        """Register a callback invoked with every finished span."""
+        self._listeners.append(listener)
+    
+    def remove_listener(self, listener: Callable[[Span], None]) -> None:
+        """Unregister a callback added with add_listener()."""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+    
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Any]:
+        """
+        Time a block of code as a named stage.
+        
+        Args:
+            name: Stage name, e.g. "page.navigation" or "llm.vision"
+            **attributes: Initial span attributes
+        
+        Yields:
+            The active Span (or a no-op span when disabled)
+        """
+        if not self.enabled:
+            yield NULL_SPAN
+            return
+        
+        current = Span(name, _current_span.get(), attributes)
+        token = _current_span.set(current)
+        
+        if self.track_resources:
+            current._cpu_start = time.process_time()
+            current._rss_start = current_rss_bytes()
+        current.start = time.perf_counter()
+        
+        try:
+            yield current
+        except BaseException as error:
+            current.error = type(error).__name__
+            raise
+        finally:
+            current.duration = time.perf_counter() - current.start
+            if self.track_resources:
+                current.cpu_time = time.process_time() - current._cpu_start
+                current.rss_delta = current_rss_bytes() - current._rss_start
+            _current_span.reset(token)
+            self._record(current)
+    
+    def instrument(self, name: Optional[str] = None) -> Callable:
+        """
+        Decorator that wraps a sync or async function in a span.
+        
+        Args:
+            name: Stage name (defaults to the function's qualified name)
+        """
+        def decorator(func: Callable) -> Callable:
+            span_name = name or func.__qualname__
+            
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(span_name):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+            
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        
+        return decorator
+    
+    def _record(self, finished: Span) -> None:
+        with self._lock:
+            stats = self._stats.get(finished.name)
+            if stats is None:
+                stats = self._stats[finished.name] = StageStats(self.max_samples)
+            stats.add(finished)
+        
+        for listener in self._listeners:
+            try:
+                listener(finished)
+            except Exception as error:
+                logger.debug(f"Instrumentation listener failed: {error}")
+    
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Return per-stage aggregates including p50/p95/p99 latencies."""
+        with self._lock:
+            return {name: stats.snapshot() for name, stats in sorted(self._stats.items())}
+    
+    def reset(self) -> None:
+        """Drop all aggregated statistics."""
+        with self._lock:
+            self._stats.clear()
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() not in ("0", "false", "no", "off", "")
+
+
+instrumentation = Instrumentation(
+    enabled=_env_flag("ADLOOK_INSTRUMENTATION", True),
+    track_resources=_env_flag("ADLOOK_INSTRUMENTATION_RESOURCES", True),
+)
+
+
+def span(name: str, **attributes: Any):
+    """Time a block of code with the default instrumentation."""
+    return instrumentation.span(name, **attributes)
+
+
+def instrument(name: Optional[str] = None) -> Callable:
+    """Decorate a function with a span from the default instrumentation."""
+    return instrumentation.instrument(name)
+
+
+def record_llm_usage(llm_span: Any, response: Any) -> None:
+    """
+    Copy token counts from an OpenAI response onto a span.
+    
+    Args:
+        llm_span: Span wrapping the LLM call
+        response: Chat completion response with an optional ``usage`` field
+    """
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    llm_span.set(
+        prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+        completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+    )
+
+
+def get_summary() -> Dict[str, Dict[str, Any]]:
+    """Return the default instrumentation summary."""
+    return instrumentation.summary()
@@ -0,0 +1,220 @@
+"""
+Durable job queue shared by the API and stateless workers.
+
+A job is one URL to analyze. The API enqueues jobs, workers claim them
+under a lease, renew the lease with heartbeats while the analysis runs and
+publish the result (or the error) when it finishes. A job whose lease
+expires — the worker crashed, was killed or lost its connection — goes
+back to the queue and is picked up by another worker, until it has been
+attempted ``max_attempts`` times.
+
+Backends are selected by URL:
+
+- ``sqlite:////path/to/jobs.db`` — single host, any number of processes
+  (four slashes for an absolute path; relative paths depend on the
+  working directory of each process)
+- ``redis://host:6379/0`` — multi-host, any server speaking the Redis
+  protocol (``benchmarks/resp_server.py`` is a local stand-in)
+"""
+
+import time
+import uuid
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+STATUSES = (QUEUED, RUNNING, DONE, FAILED)
+
+# Database of ``sqlite://`` URLs without a path; absolute, so the API and workers share it
+DEFAULT_SQLITE_PATH = "/tmp/adlook_jobs.db"
+
+
+class JobQueueError(Exception):
+    """Raised when the queue backend cannot be reached or returns an error."""
+
+
+@dataclass
+class Job:
+    """One URL analysis tracked by the queue."""
+    
+    id: str
+    url: str
+    status: str = QUEUED
+    attempts: int = 0
+    max_attempts: int = 3
+    worker_id: Optional[str] = None
+    lease_expires: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    
+    @classmethod
+    def new(cls, url: str, max_attempts: int) -> "Job":
+        return cls(id=str(uuid.uuid4()), url=url, max_attempts=max_attempts)
+    
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        data = asdict(self)
+        if not include_result:
+            data.pop("result")
+        return data
+
+
+class JobQueue:
+    """
+    Interface implemented by every queue backend.
+    
+    All methods are synchronous and safe to call from several processes at
+    once; async callers should run them in a thread.
+    """
+    
+    def __init__(self, max_attempts: int = 3):
+        self.max_attempts = max_attempts
+    
+    def enqueue(self, urls: List[str]) -> List[Job]:
+        """
+        Add one job per URL.
+        
+        Args:
+            urls: URLs to analyze
+        
+        Returns:
+            The created jobs, in the same order
+        """
+        raise NotImplementedError
+    
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[Job]:
+        """
+        Take the oldest queued job and lease it to a worker.
+        
+        Expired leases are requeued first, so a claim never starves behind
+        a dead worker.
+        
+        Args:
+            worker_id: Identifier of the claiming worker
+            lease_seconds: How long the job stays leased without a heartbeat
+        
+        Returns:
+            The claimed job, or None if the queue is empty
+        """
+        raise NotImplementedError
+    
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """
+        Extend a lease.
+        
+        Returns:
+            False if the worker no longer holds the job (the lease expired
+            and the job was requeued or taken by another worker)
+        """
+        raise NotImplementedError
+    
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        """
+        Publish the result of a job.
+        
+        Returns:
+            False if the worker no longer holds the job; the result is
+            still stored so the work is not lost
+        """
+        raise NotImplementedError
+    
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        """
+        Record a failed attempt. The job is requeued while it has attempts
+        left and marked failed otherwise.
+        
+        Returns:
+            False if the worker no longer holds the job
+        """
+        raise NotImplementedError
+    
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return a job by ID, or None if unknown."""
+        raise NotImplementedError
+    
+    def requeue_expired(self) -> int:
+        """
+        Requeue running jobs whose lease has expired.
+        
+        Returns:
+            Number of jobs requeued or failed for running out of attempts
+        """
+        raise NotImplementedError
+    
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        raise NotImplementedError
+    
+    def close(self) -> None:
+        pass
+
+
+def open_job_queue(url: str, max_attempts: int = 3) -> JobQueue:
+    """
+    Open the queue backend for a URL.
+    
+    Args:
+        url: ``sqlite:///path`` or ``redis://host:port/db``
+        max_attempts: Attempts per job before it is marked failed
+    
+    Returns:
+        Queue backend instance
+    
+    Raises:
+        JobQueueError: If the URL is not supported or invalid, or the
+            backend cannot be opened
+    """
+    parsed = urlparse(url)
+    
+    if parsed.scheme == "sqlite":
+        from .sqlite_backend import SQLiteJobQueue
+        path = url[len("sqlite:///"):] if url.startswith("sqlite:///") else parsed.path
+        return SQLiteJobQueue(path or DEFAULT_SQLITE_PATH, max_attempts=max_attempts)
+    
+    if parsed.scheme == "redis":
+        from .redis_backend import RedisJobQueue
+        try:
+            db = int(parsed.path.lstrip("/") or 0)
+            port = parsed.port or 6379
+        except ValueError as error:
+            raise JobQueueError(f"Invalid job queue URL {url}: {error}") from error
+        return RedisJobQueue(
+            host=parsed.hostname or "127.0.0.1",
+            port=port,
+            db=db,
+            password=parsed.password,
+            max_attempts=max_attempts,
+        )
+    
+    raise JobQueueError(f"Unsupported job queue URL: {url}")
+
+
+_queue: Optional[JobQueue] = None
+
+
+def queue_configured() -> bool:
+    """Whether ``ADLOOK_QUEUE_URL`` is set explicitly (environment or .env) rather than left at its default."""
+    from ..config import get_settings
+    return "ADLOOK_QUEUE_URL" in get_settings().model_fields_set
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Process-wide queue configured by ``ADLOOK_QUEUE_URL``.
+    
+    Opening it may touch the disk or the network; call it off the event loop.
+    
+    Raises:
+        JobQueueError: If the backend cannot be opened
+    """
+    global _queue
+    if _queue is None:
+        from ..config import settings
+        _queue = open_job_queue(settings.ADLOOK_QUEUE_URL, settings.ADLOOK_JOB_MAX_ATTEMPTS)
+    return _queue
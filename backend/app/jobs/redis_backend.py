@@ -0,0 +1,316 @@
+"""
+Redis-protocol job queue for multi-host deployments.
+
+Talks RESP directly over a socket, so no client library is needed and any
+server implementing the handful of commands below works — Redis, KeyDB,
+Valkey or the ``benchmarks/resp_server.py`` stand-in.
+
+Layout (``prefix`` defaults to ``adlook:jobs:``):
+
+- ``pending`` list: queued job IDs; new jobs are LPUSHed, claims take the
+  oldest with RPOPLPUSH into ``processing`` (atomic, so a job is handed to
+  exactly one worker)
+- ``processing`` list: leased job IDs
+- ``leases`` sorted set: job ID scored by lease expiry time
+- ``job:<id>`` hash: the job fields
+- ``done`` / ``failed`` sets: finished job IDs, for counts
+
+Requeueing uses ZREM and LREM return values as the arbiter, so several
+reapers running at once never requeue the same job twice.
+"""
+
+import json
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from ..services.screenshot import json_default
+from .queue import Job, JobQueue, JobQueueError, QUEUED, RUNNING, DONE, FAILED
+
+
+class RESPClient:
+    """Minimal blocking client for the Redis serialization protocol."""
+    
+    def __init__(self, host: str, port: int, db: int = 0, password: Optional[str] = None, timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+        self._lock = threading.Lock()
+    
+    def _connect(self) -> None:
+        try:
+            self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except OSError as error:
+            raise JobQueueError(f"Cannot connect to job queue at {self.host}:{self.port}: {error}") from error
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile("rb")
+        if self.password:
+            self._roundtrip([("AUTH", self.password)])
+        if self.db:
+            self._roundtrip([("SELECT", self.db)])
+    
+    def _disconnect(self) -> None:
+        if self._sock:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._reader = None
+    
+    @staticmethod
+    def _encode(args) -> bytes:
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+    
+    def _read_reply(self) -> Any:
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode("utf-8")
+        if kind == b"-":
+            return JobQueueError(payload.decode("utf-8"))
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2].decode("utf-8")
+        if kind == b"*":
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        raise JobQueueError(f"Unexpected reply from job queue: {line!r}")
+    
+    def _roundtrip(self, commands: List[tuple]) -> List[Any]:
+        self._sock.sendall(b"".join(self._encode(command) for command in commands))
+        return [self._read_reply() for _ in commands]
+    
+    def pipeline(self, *commands: tuple) -> List[Any]:
+        """
+        Send several commands in one round trip.
+        
+        Returns:
+            One reply per command; a server error raises JobQueueError
+        """
+        with self._lock:
+            for attempt in range(2):
+                if self._sock is None:
+                    self._connect()
+                try:
+                    replies = self._roundtrip(list(commands))
+                    break
+                except (OSError, ConnectionError) as error:
+                    self._disconnect()
+                    if attempt:
+                        raise JobQueueError(f"Lost connection to job queue: {error}") from error
+        for reply in replies:
+            if isinstance(reply, JobQueueError):
+                raise reply
+        return replies
+    
+    def execute(self, *args: Any) -> Any:
+        return self.pipeline(args)[0]
+    
+    def close(self) -> None:
+        with self._lock:
+            self._disconnect()
+
+
+class RedisJobQueue(JobQueue):
+    """Job queue stored on a Redis-protocol server."""
+    
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 6379,
+        db: int = 0,
+        password: Optional[str] = None,
+        max_attempts: int = 3,
+        prefix: str = "adlook:jobs:",
+        orphan_grace: float = 60.0,
+    ):
+        """
+        Args:
+            host: Server host
+            port: Server port
+            db: Database index
+            password: Optional AUTH password
+            max_attempts: Attempts per job before it is marked failed
+            prefix: Key prefix
+            orphan_grace: Seconds before a job claimed without a lease (the
+                worker died between claim and lease) is requeued
+        """
+        super().__init__(max_attempts)
+        self.client = RESPClient(host, port, db=db, password=password)
+        self.prefix = prefix
+        self.orphan_grace = orphan_grace
+    
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}{name}"
+    
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.prefix}job:{job_id}"
+    
+    def enqueue(self, urls: List[str]) -> List[Job]:
+        jobs = [Job.new(url, self.max_attempts) for url in urls]
+        commands = []
+        for job in jobs:
+            commands.append((
+                "HSET", self._job_key(job.id),
+                "id", job.id, "url", job.url, "status", QUEUED, "attempts", 0,
+                "max_attempts", job.max_attempts, "created_at", job.created_at, "updated_at", job.updated_at,
+            ))
+            commands.append(("LPUSH", self._key("pending"), job.id))
+        if commands:
+            self.client.pipeline(*commands)
+        return jobs
+    
+    def _release(self, job_id: str, error: Optional[str]) -> None:
+        """Requeue a job taken out of ``processing``, or fail it if it has no attempts left."""
+        now = time.time()
+        attempts, max_attempts = self.client.pipeline(
+            ("HGET", self._job_key(job_id), "attempts"),
+            ("HGET", self._job_key(job_id), "max_attempts"),
+        )
+        fields = ["worker_id", "", "lease_expires", "", "updated_at", now]
+        if error is not None:
+            fields += ["error", error]
+        
+        if int(attempts or 0) >= int(max_attempts or self.max_attempts):
+            self.client.pipeline(
+                ("HSET", self._job_key(job_id), "status", FAILED, *fields),
+                ("SADD", self._key("failed"), job_id),
+            )
+        else:
+            # RPUSH: requeued jobs are claimed before newer ones
+            self.client.pipeline(
+                ("HSET", self._job_key(job_id), "status", QUEUED, *fields),
+                ("RPUSH", self._key("pending"), job_id),
+            )
+    
+    def requeue_expired(self) -> int:
+        now = time.time()
+        released = 0
+        
+        for job_id in self.client.execute("ZRANGEBYSCORE", self._key("leases"), "-inf", now) or []:
+            # Only the reaper whose ZREM succeeds requeues the job
+            if self.client.execute("ZREM", self._key("leases"), job_id) != 1:
+                continue
+            if self.client.execute("LREM", self._key("processing"), 1, job_id) != 1:
+                continue
+            self._release(job_id, "Lease expired")
+            released += 1
+        
+        # Claimed but never leased: give them a grace lease, the next pass
+        # requeues them if no heartbeat arrives
+        processing = self.client.execute("LRANGE", self._key("processing"), 0, -1) or []
+        if processing:
+            scores = self.client.pipeline(*[("ZSCORE", self._key("leases"), job_id) for job_id in processing])
+            orphans = [job_id for job_id, score in zip(processing, scores) if score is None]
+            if orphans:
+                self.client.pipeline(*[
+                    ("ZADD", self._key("leases"), "NX", now + self.orphan_grace, job_id) for job_id in orphans
+                ])
+        
+        return released
+    
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[Job]:
+        self.requeue_expired()
+        
+        job_id = self.client.execute("RPOPLPUSH", self._key("pending"), self._key("processing"))
+        if job_id is None:
+            return None
+        
+        now = time.time()
+        self.client.pipeline(
+            ("ZADD", self._key("leases"), now + lease_seconds, job_id),
+            ("HINCRBY", self._job_key(job_id), "attempts", 1),
+            ("HSET", self._job_key(job_id), "status", RUNNING, "worker_id", worker_id,
+             "lease_expires", now + lease_seconds, "updated_at", now),
+        )
+        return self.get(job_id)
+    
+    def _holds(self, job_id: str, worker_id: str) -> bool:
+        status, holder = self.client.pipeline(
+            ("HGET", self._job_key(job_id), "status"),
+            ("HGET", self._job_key(job_id), "worker_id"),
+        )
+        return status == RUNNING and holder == worker_id
+    
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        if not self._holds(job_id, worker_id):
+            return False
+        now = time.time()
+        self.client.pipeline(
+            ("ZADD", self._key("leases"), now + lease_seconds, job_id),
+            ("HSET", self._job_key(job_id), "lease_expires", now + lease_seconds, "updated_at", now),
+        )
+        return True
+    
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        owned = self._holds(job_id, worker_id)
+        self.client.pipeline(
+            ("ZREM", self._key("leases"), job_id),
+            ("LREM", self._key("processing"), 0, job_id),
+            # A requeued copy would only redo finished work
+            ("LREM", self._key("pending"), 0, job_id),
+            ("HSET", self._job_key(job_id), "status", DONE, "result", json.dumps(result, ensure_ascii=False, default=json_default),
+             "error", "", "worker_id", "", "lease_expires", "", "updated_at", time.time()),
+            ("SREM", self._key("failed"), job_id),
+            ("SADD", self._key("done"), job_id),
+        )
+        return owned
+    
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        if not self._holds(job_id, worker_id):
+            return False
+        if self.client.execute("LREM", self._key("processing"), 1, job_id) != 1:
+            return False
+        self.client.execute("ZREM", self._key("leases"), job_id)
+        self._release(job_id, error)
+        return True
+    
+    def get(self, job_id: str) -> Optional[Job]:
+        reply = self.client.execute("HGETALL", self._job_key(job_id))
+        if not reply:
+            return None
+        data = dict(zip(reply[::2], reply[1::2]))
+        return Job(
+            id=data["id"],
+            url=data["url"],
+            status=data.get("status", QUEUED),
+            attempts=int(data.get("attempts") or 0),
+            max_attempts=int(data.get("max_attempts") or self.max_attempts),
+            worker_id=data.get("worker_id") or None,
+            lease_expires=float(data["lease_expires"]) if data.get("lease_expires") else None,
+            result=json.loads(data["result"]) if data.get("result") else None,
+            error=data.get("error") or None,
+            created_at=float(data.get("created_at") or 0),
+            updated_at=float(data.get("updated_at") or 0),
+        )
+    
+    def counts(self) -> Dict[str, int]:
+        queued, running, done, failed = self.client.pipeline(
+            ("LLEN", self._key("pending")),
+            ("LLEN", self._key("processing")),
+            ("SCARD", self._key("done")),
+            ("SCARD", self._key("failed")),
+        )
+        return {QUEUED: queued, RUNNING: running, DONE: done, FAILED: failed}
+    
+    def close(self) -> None:
+        self.client.close()
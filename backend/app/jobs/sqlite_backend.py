@@ -0,0 +1,204 @@
+"""
+SQLite job queue for single-host deployments.
+
+Every uvicorn worker and every ``python -m backend.app.jobs.worker``
+process on the host opens the same database file. Claims run inside
+``BEGIN IMMEDIATE`` transactions, so two processes never lease the same
+job; WAL mode keeps readers from blocking the writers.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..services.screenshot import json_default
+from .queue import Job, JobQueue, JobQueueError, QUEUED, RUNNING, DONE, FAILED, STATUSES
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    worker_id TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_queued ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_lease ON jobs (status, lease_expires);
+"""
+
+
+class SQLiteJobQueue(JobQueue):
+    """Job queue stored in a local SQLite database."""
+    
+    def __init__(self, path: str, max_attempts: int = 3, timeout: float = 30.0):
+        """
+        Args:
+            path: Database file, created if missing
+            max_attempts: Attempts per job before it is marked failed
+            timeout: Seconds to wait for a lock held by another process
+        
+        Raises:
+            JobQueueError: If the database cannot be opened or created
+        """
+        super().__init__(max_attempts)
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            # One connection per process; sqlite3 connections are not safe to
+            # share between threads without our own lock
+            self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            with self._lock:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                self._conn.executescript(SCHEMA)
+        except (sqlite3.Error, OSError) as error:
+            raise JobQueueError(f"Cannot open SQLite job queue {path}: {error}") from error
+    
+    def _transaction(self, fn, *args):
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    value = fn(*args)
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+                self._conn.execute("COMMIT")
+                return value
+            except sqlite3.Error as error:
+                raise JobQueueError(f"SQLite job queue error: {error}") from error
+    
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Job:
+        data = dict(row)
+        if data["result"] is not None:
+            data["result"] = json.loads(data["result"])
+        return Job(**data)
+    
+    def enqueue(self, urls: List[str]) -> List[Job]:
+        jobs = [Job.new(url, self.max_attempts) for url in urls]
+        
+        def insert():
+            self._conn.executemany(
+                "INSERT INTO jobs (id, url, status, attempts, max_attempts, created_at, updated_at)"
+                " VALUES (?, ?, ?, 0, ?, ?, ?)",
+                [(job.id, job.url, QUEUED, job.max_attempts, job.created_at, job.updated_at) for job in jobs],
+            )
+        
+        self._transaction(insert)
+        return jobs
+    
+    def _requeue_expired(self, now: float) -> int:
+        # Out of attempts: fail instead of requeueing
+        failed = self._conn.execute(
+            "UPDATE jobs SET status = ?, error = COALESCE(error, 'Lease expired'), worker_id = NULL,"
+            " lease_expires = NULL, updated_at = ?"
+            " WHERE status = ? AND lease_expires < ? AND attempts >= max_attempts",
+            (FAILED, now, RUNNING, now),
+        ).rowcount
+        requeued = self._conn.execute(
+            "UPDATE jobs SET status = ?, worker_id = NULL, lease_expires = NULL, updated_at = ?"
+            " WHERE status = ? AND lease_expires < ?",
+            (QUEUED, now, RUNNING, now),
+        ).rowcount
+        return failed + requeued
+    
+    def requeue_expired(self) -> int:
+        return self._transaction(self._requeue_expired, time.time())
+    
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[Job]:
+        def take():
+            now = time.time()
+            self._requeue_expired(now)
+            row = self._conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                (QUEUED,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, worker_id = ?, lease_expires = ?,"
+                " attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (RUNNING, worker_id, now + lease_seconds, now, row["id"]),
+            )
+            return self._row_to_job(self._conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+        
+        return self._transaction(take)
+    
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        def extend():
+            now = time.time()
+            return self._conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ?"
+                " WHERE id = ? AND worker_id = ? AND status = ?",
+                (now + lease_seconds, now, job_id, worker_id, RUNNING),
+            ).rowcount == 1
+        
+        return self._transaction(extend)
+    
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        def store():
+            now = time.time()
+            owned = self._conn.execute(
+                "SELECT 1 FROM jobs WHERE id = ? AND worker_id = ? AND status = ?",
+                (job_id, worker_id, RUNNING),
+            ).fetchone() is not None
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, worker_id = NULL,"
+                " lease_expires = NULL, updated_at = ? WHERE id = ?",
+                (DONE, json.dumps(result, ensure_ascii=False, default=json_default), now, job_id),
+            )
+            return owned
+        
+        return self._transaction(store)
+    
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        def record():
+            now = time.time()
+            row = self._conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND worker_id = ? AND status = ?",
+                (job_id, worker_id, RUNNING),
+            ).fetchone()
+            if row is None:
+                return False
+            status = FAILED if row["attempts"] >= row["max_attempts"] else QUEUED
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, worker_id = NULL, lease_expires = NULL,"
+                " updated_at = ? WHERE id = ?",
+                (status, error, now, job_id),
+            )
+            return True
+        
+        return self._transaction(record)
+    
+    def _read(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            try:
+                return self._conn.execute(sql, params).fetchall()
+            except sqlite3.Error as error:
+                raise JobQueueError(f"SQLite job queue error: {error}") from error
+    
+    def get(self, job_id: str) -> Optional[Job]:
+        rows = self._read("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return self._row_to_job(rows[0]) if rows else None
+    
+    def counts(self) -> Dict[str, int]:
+        rows = self._read("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")
+        counts = {status: 0 for status in STATUSES}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+    
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,171 @@
+"""
+Stateless analysis worker.
+
+Pulls URLs from the job queue, runs ``analyze_website_complete`` and
+publishes the result (to the queue, and to the analysis store on this
+host for ``/api/complete/search``). While an analysis runs, the lease is renewed every
+``lease_seconds / 3``; if the renewal reports the job was taken away (the
+worker stalled past its lease), the analysis is cancelled.
+
+Run as many as the hosts allow, on any machine that can reach the queue::
+
+    ADLOOK_QUEUE_URL=redis://queue-host:6379/0 python -m backend.app.jobs.worker --concurrency 2
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import sys
+import uuid
+from typing import Optional
+
+from .queue import Job, JobQueue, JobQueueError, get_job_queue
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """Claims jobs and runs them until stopped."""
+    
+    def __init__(
+        self,
+        queue: JobQueue,
+        lease_seconds: float = 120.0,
+        poll_interval: float = 1.0,
+        concurrency: int = 1,
+        worker_id: Optional[str] = None,
+    ):
+        """
+        Args:
+            queue: Job queue backend
+            lease_seconds: Lease length; a job is requeued this long after
+                its worker's last heartbeat
+            poll_interval: Seconds to wait when the queue is empty
+            concurrency: Jobs run at the same time by this process
+            worker_id: Identifier stored on leased jobs (defaults to host:pid:random)
+        """
+        self.queue = queue
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.concurrency = concurrency
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._stopping = asyncio.Event()
+    
+    def stop(self) -> None:
+        """Finish the running jobs and exit; no new jobs are claimed."""
+        logger.info(f"🛑 Worker {self.worker_id} stopping after current jobs")
+        self._stopping.set()
+    
+    async def _heartbeat(self, job: Job, task: asyncio.Task) -> None:
+        interval = max(self.lease_seconds / 3, 0.1)
+        while not task.done():
+            await asyncio.sleep(interval)
+            try:
+                held = await asyncio.to_thread(self.queue.heartbeat, job.id, self.worker_id, self.lease_seconds)
+            except JobQueueError as error:
+                # Keep working; the lease may still be valid when the queue comes back
+                logger.warning(f"⚠️ Heartbeat failed for job {job.id}: {error}")
+                continue
+            if not held:
+                logger.warning(f"⚠️ Lost lease on job {job.id}, cancelling")
+                task.cancel()
+                return
+    
+    async def run_job(self, job: Job) -> None:
+        """Run one claimed job and publish its outcome."""
+        from ..services.analysis_store import store_analysis
+        from ..services.complete_parser import analyze_website_complete
+        
+        logger.info(f"🚀 Job {job.id}: analyzing {job.url} (attempt {job.attempts}/{job.max_attempts})")
+        task = asyncio.create_task(analyze_website_complete(job.url))
+        heartbeat = asyncio.create_task(self._heartbeat(job, task))
+        
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            # Cancelled by a lost lease: another worker owns the job now
+            if heartbeat.done() and not heartbeat.cancelled():
+                return
+            raise
+        except Exception as error:
+            result = {"success": False, "error": str(error)}
+        finally:
+            heartbeat.cancel()
+        
+        if result.get("success"):
+            await asyncio.to_thread(self.queue.complete, job.id, self.worker_id, result)
+            await asyncio.to_thread(store_analysis, job.id, job.url, result)
+            logger.info(f"✅ Job {job.id} done")
+        else:
+            await asyncio.to_thread(self.queue.fail, job.id, self.worker_id, result.get("error", "Unknown error"))
+            logger.error(f"❌ Job {job.id} failed: {result.get('error')}")
+    
+    async def _slot(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                job = await asyncio.to_thread(self.queue.claim, self.worker_id, self.lease_seconds)
+            except JobQueueError as error:
+                logger.error(f"❌ Cannot claim job: {error}")
+                job = None
+            
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            try:
+                await self.run_job(job)
+            except JobQueueError as error:
+                # The lease expires and another worker retries the job
+                logger.error(f"❌ Cannot publish job {job.id}: {error}")
+    
+    async def run(self) -> None:
+        """Run ``concurrency`` claim loops until ``stop()`` is called."""
+        logger.info(f"👷 Worker {self.worker_id} started (concurrency={self.concurrency})")
+        await asyncio.gather(*(self._slot() for _ in range(self.concurrency)))
+        logger.info(f"👋 Worker {self.worker_id} stopped")
+
+
+def main(args=None) -> int:
+    from ..config import settings
+    
+    parser = argparse.ArgumentParser(prog="backend.app.jobs.worker", description="Run analysis jobs from the queue")
+    parser.add_argument("--concurrency", type=int, default=1, help="Jobs to run at the same time (default: 1)")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between polls of an empty queue")
+    parsed = parser.parse_args(args)
+    
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    
+    try:
+        queue = get_job_queue()
+    except JobQueueError as error:
+        logger.error(f"❌ {error}")
+        return 1
+    
+    worker = Worker(
+        queue,
+        lease_seconds=settings.ADLOOK_JOB_LEASE_SECONDS,
+        poll_interval=parsed.poll_interval,
+        concurrency=parsed.concurrency,
+    )
+    
+    async def serve():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, worker.stop)
+        await worker.run()
+    
+    asyncio.run(serve())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
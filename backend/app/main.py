@@ -1,10 +1,16 @@
 import logging
+import time
 from pathlib import Path
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 from .api.routes import router
 from .api.complete_routes import router as complete_router
+from .compression import CompressionMiddleware
+from .instrumentation import get_summary
+from .metrics import exporter, HTTP_REQUESTS, HTTP_IN_PROGRESS, HTTP_LATENCY
+from .responses import FastJSONResponse
+from .services.vision_cascade import tier_summary
 
 logging.basicConfig(
     level=logging.INFO,
@@ -13,7 +19,7 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Ad Placement Analyzer")
+app = FastAPI(title="Ad Placement Analyzer", default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,16 +29,53 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(CompressionMiddleware)
+
 app.include_router(router)
 app.include_router(complete_router)
 
 
+@app.on_event("startup")
+async def start_metrics_exporter():
+    exporter.ensure_started()
+
+
+@app.middleware("http")
+async def record_http_metrics(request: Request, call_next):
+    """Count and time requests per route template (not raw path, to bound label cardinality)."""
+    status = 500
+    start = time.perf_counter()
+    HTTP_IN_PROGRESS.inc()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_IN_PROGRESS.dec()
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        HTTP_LATENCY.observe(time.perf_counter() - start, path=path)
+        HTTP_REQUESTS.inc(path=path, method=request.method, status=status)
+
+
 @app.get("/health")
 async def health_check():
     logger.info("Health check endpoint called")
     return {"status": "healthy"}
 
 
+@app.get("/stats")
+async def stage_stats():
+    """Per-stage latency histograms (p50/p95/p99), CPU time and RSS deltas, and vision cascade hit rates."""
+    return {"stages": get_summary(), "vision_tiers": tier_summary()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of request, stage, browser and cache metrics."""
+    return PlainTextResponse(exporter.collect(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 async def root():
     """Serve the frontend HTML interface."""
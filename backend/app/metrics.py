@@ -0,0 +1,403 @@
+"""
+Prometheus-style metrics for the backend.
+
+Counters, gauges and histograms live in a process-local registry and are
+rendered in the Prometheus text exposition format by ``GET /metrics``.
+Recording is a dict update under a lock, so it is cheap enough to do on
+every request and every instrumentation span.
+
+Multiple uvicorn workers: set ``ADLOOK_METRICS_DIR`` to a directory shared
+by the workers. Each worker then writes its snapshot to ``<pid>.json`` in
+that directory every ``ADLOOK_METRICS_FLUSH_INTERVAL`` seconds, and the
+worker serving ``/metrics`` merges all snapshots. Counters and histograms
+of exited workers are kept so totals never go backwards; their gauges are
+dropped.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .instrumentation import instrumentation, current_rss_bytes, Span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = ""
+    
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[LabelKey, Any] = {}
+        self._lock = threading.Lock()
+    
+    def samples(self) -> Dict[LabelKey, Any]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Counter(_Metric):
+    """Monotonically increasing value."""
+    
+    type_name = "counter"
+    
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be computed when scraped."""
+    
+    type_name = "gauge"
+    
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._functions: Dict[LabelKey, Callable[[], float]] = {}
+    
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = value
+    
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+    
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+    
+    @contextmanager
+    def track_inprogress(self, **labels: Any) -> Iterator[None]:
+        """Increment the gauge for the duration of the block."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+    
+    def set_function(self, func: Callable[[], float], **labels: Any) -> None:
+        """Compute the gauge value lazily at scrape time."""
+        self._functions[_label_key(labels)] = func
+    
+    def samples(self) -> Dict[LabelKey, Any]:
+        values = super().samples()
+        for key, func in list(self._functions.items()):
+            try:
+                values[key] = float(func())
+            except Exception as error:
+                logger.debug(f"Gauge callback for {self.name} failed: {error}")
+        return values
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observed values."""
+    
+    type_name = "histogram"
+    
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+    
+    def observe(self, value: float, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["buckets"][index] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+    
+    def samples(self) -> Dict[LabelKey, Any]:
+        with self._lock:
+            return {
+                key: {"buckets": list(state["buckets"]), "sum": state["sum"], "count": state["count"]}
+                for key, state in self._values.items()
+            }
+
+
+class MetricsRegistry:
+    """Process-local collection of metrics."""
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+    
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self.register(Counter(name, documentation))
+    
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        return self.register(Gauge(name, documentation))
+    
+    def histogram(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, buckets))
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a JSON-serializable snapshot of every metric."""
+        result = {}
+        for name, metric in self._metrics.items():
+            entry = {
+                "type": metric.type_name,
+                "help": metric.documentation,
+                "samples": [[list(map(list, key)), value] for key, value in metric.samples().items()],
+            }
+            if isinstance(metric, Histogram):
+                entry["buckets"] = [b for b in metric.buckets if b != float("inf")]
+            result[name] = entry
+        return result
+
+
+def merge_snapshots(snapshots: List[Dict[str, Any]], live: List[bool]) -> Dict[str, Any]:
+    """
+    Merge per-process snapshots into one.
+    
+    Counters and histograms are summed across all processes. Gauges are
+    summed across live processes only.
+    
+    Args:
+        snapshots: Snapshots as produced by MetricsRegistry.snapshot()
+        live: Whether the process behind each snapshot is still running
+    """
+    merged: Dict[str, Any] = {}
+    
+    for snapshot, alive in zip(snapshots, live):
+        for name, entry in snapshot.items():
+            if entry["type"] == "gauge" and not alive:
+                continue
+            
+            target = merged.setdefault(name, {
+                "type": entry["type"],
+                "help": entry["help"],
+                "buckets": entry.get("buckets"),
+                "values": {},
+            })
+            
+            for raw_key, value in entry["samples"]:
+                key = tuple(tuple(pair) for pair in raw_key)
+                if entry["type"] == "histogram":
+                    current = target["values"].get(key)
+                    if current is None:
+                        target["values"][key] = {
+                            "buckets": list(value["buckets"]),
+                            "sum": value["sum"],
+                            "count": value["count"],
+                        }
+                    else:
+                        current["buckets"] = [a + b for a, b in zip(current["buckets"], value["buckets"])]
+                        current["sum"] += value["sum"]
+                        current["count"] += value["count"]
+                else:
+                    target["values"][key] = target["values"].get(key, 0.0) + value
+    
+    return merged
+
+
+def render(merged: Dict[str, Any]) -> str:
+    """Render merged metrics in the Prometheus text exposition format."""
+    lines = []
+    
+    for name in sorted(merged):
+        entry = merged[name]
+        lines.append(f"# HELP {name} {entry['help']}")
+        lines.append(f"# TYPE {name} {entry['type']}")
+        
+        for key in sorted(entry["values"]):
+            value = entry["values"][key]
+            if entry["type"] == "histogram":
+                bounds = list(entry["buckets"]) + [float("inf")]
+                cumulative = 0
+                for bound, count in zip(bounds, value["buckets"]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_value(value['sum'])}")
+                lines.append(f"{name}_count{_format_labels(key)} {value['count']}")
+            else:
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+    
+    return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MultiprocessExporter:
+    """Shares snapshots between worker processes through a directory."""
+    
+    def __init__(self, registry: MetricsRegistry, directory: Optional[str], flush_interval: float = 5.0):
+        self.registry = registry
+        self.directory = Path(directory) if directory else None
+        self.flush_interval = flush_interval
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+    
+    def _snapshot_path(self, pid: int) -> Path:
+        return self.directory / f"{pid}.json"
+    
+    def flush(self) -> None:
+        """Atomically write this process's snapshot to the shared directory."""
+        if self.directory is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        pid = os.getpid()
+        tmp_path = self.directory / f".{pid}.json.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.registry.snapshot(), f)
+        os.replace(tmp_path, self._snapshot_path(pid))
+    
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError as error:
+                logger.warning(f"Failed to flush metrics snapshot: {error}")
+    
+    def ensure_started(self) -> None:
+        """Start the background flusher once per process (fork-safe)."""
+        if self.directory is None or self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._flush_loop, name="adlook-metrics-flush", daemon=True)
+        self._thread.start()
+    
+    def collect(self) -> str:
+        """Return the Prometheus text for this process or all workers."""
+        if self.directory is None:
+            return render(merge_snapshots([self.registry.snapshot()], [True]))
+        
+        self.ensure_started()
+        self.flush()
+        
+        snapshots, live = [], []
+        for path in self.directory.glob("*.json"):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+            try:
+                live.append(_pid_alive(int(path.stem)))
+            except ValueError:
+                live.append(False)
+        
+        return render(merge_snapshots(snapshots, live))
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUESTS = registry.counter(
+    "adlook_http_requests_total", "HTTP requests handled, by route and status code.")
+HTTP_IN_PROGRESS = registry.gauge(
+    "adlook_http_requests_in_progress", "HTTP requests currently being handled.")
+HTTP_LATENCY = registry.histogram(
+    "adlook_http_request_duration_seconds", "HTTP request latency, by route.")
+STAGE_LATENCY = registry.histogram(
+    "adlook_stage_duration_seconds", "Pipeline stage latency (browser, navigation, LLM, parsing, export).")
+STAGE_ERRORS = registry.counter(
+    "adlook_stage_errors_total", "Pipeline stages that raised an exception.")
+LLM_TOKENS = registry.counter(
+    "adlook_llm_tokens_total", "LLM tokens consumed, by stage and kind (prompt/completion).")
+ANALYSES_IN_PROGRESS = registry.gauge(
+    "adlook_analyses_in_progress", "Website analyses currently running, by pipeline (queue depth).")
+BROWSERS_IN_FLIGHT = registry.gauge(
+    "adlook_browsers_in_flight", "Chromium instances currently running.")
+CACHE_LOOKUPS = registry.counter(
+    "adlook_cache_lookups_total", "Analysis cache lookups, by cache and result (hit/miss).")
+CACHE_ENTRIES = registry.gauge(
+    "adlook_cache_entries", "Entries held in an analysis cache.")
+CACHE_BYTES = registry.gauge(
+    "adlook_cache_bytes", "Approximate bytes of string and binary data held in an analysis cache.")
+INFLIGHT_SHARED = registry.counter(
+    "adlook_inflight_shared_total", "Calls that joined an identical call already in flight, by call (analysis, redirect).")
+VISION_TIER_CALLS = registry.counter(
+    "adlook_vision_tier_calls_total", "Vision cascade calls, by tier and outcome (accepted or escalation reason).")
+VISION_TIER_LATENCY = registry.histogram(
+    "adlook_vision_tier_duration_seconds", "Vision cascade call latency, by tier.")
+PROCESS_RSS = registry.gauge(
+    "adlook_process_resident_memory_bytes", "Resident memory of the worker process.")
+
+exporter = MultiprocessExporter(
+    registry,
+    os.getenv("ADLOOK_METRICS_DIR"),
+    float(os.getenv("ADLOOK_METRICS_FLUSH_INTERVAL", "5")),
+)
+
+
+def approximate_size(value: Any) -> int:
+    """Approximate payload bytes of nested dicts/lists of strings, bytes and buffers."""
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(approximate_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(approximate_size(v) for v in value)
+    # Buffer-backed values such as screenshots
+    return getattr(value, "nbytes", 0)
+
+
+def register_cache(name: str, cache: Dict[str, Any]) -> None:
+    """Expose size and approximate memory of an analysis cache as gauges."""
+    CACHE_ENTRIES.set_function(lambda: len(cache), cache=name)
+    CACHE_BYTES.set_function(lambda: approximate_size(cache), cache=name)
+
+
+def _observe_span(finished: Span) -> None:
+    STAGE_LATENCY.observe(finished.duration, stage=finished.name)
+    if finished.error:
+        STAGE_ERRORS.inc(stage=finished.name, error=finished.error)
+    for kind in ("prompt", "completion"):
+        tokens = finished.attributes.get(f"{kind}_tokens")
+        if tokens:
+            LLM_TOKENS.inc(tokens, stage=finished.name, kind=kind)
+
+
+PROCESS_RSS.set_function(current_rss_bytes)
+instrumentation.add_listener(_observe_span)
@@ -0,0 +1,216 @@
+"""
+Opt-in profiling of a single analysis.
+
+``AnalysisProfiler`` wraps one analysis and captures three artifacts:
+
+- ``profile.pstats``: deterministic cProfile data of the event loop thread
+  (open with ``python -m pstats`` or snakeviz)
+- ``profile.speedscope.json``: wall-clock stack samples of the event loop
+  thread taken by a background thread, py-spy style (open in speedscope.app)
+- ``timeline.json``: every instrumentation span finished during the
+  analysis with its asyncio task, start offset and duration
+
+Sampling sees everything that runs on the loop thread, including blocking
+calls (BeautifulSoup, base64, synchronous LLM clients) and the idle time
+spent waiting on Playwright. Only one analysis is profiled at a time; a
+second request while a profile is running is analyzed without profiling.
+
+cProfile and the sampler cover the whole process while a profile is
+active, not just one analysis: anything else the loop runs meanwhile
+(other requests, analyses shared with them) shows up in the pstats and
+speedscope files. The API therefore only profiles a request when no other
+analysis is in flight; ``timeline.json`` tags each span with its task, so
+work of requests that arrive during the profile can be told apart.
+"""
+
+import asyncio
+import cProfile
+import json
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .instrumentation import instrumentation, Span
+
+logger = logging.getLogger(__name__)
+
+PSTATS_FILENAME = "profile.pstats"
+SPEEDSCOPE_FILENAME = "profile.speedscope.json"
+TIMELINE_FILENAME = "timeline.json"
+
+PROFILE_FORMATS = {
+    "pstats": (PSTATS_FILENAME, "application/octet-stream"),
+    "speedscope": (SPEEDSCOPE_FILENAME, "application/json"),
+    "timeline": (TIMELINE_FILENAME, "application/json"),
+}
+
+_profile_lock = threading.Lock()
+
+Frame = Tuple[str, str, int]
+
+
+class StackSampler:
+    """Samples the stack of one thread at a fixed interval."""
+    
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.frames: List[Frame] = []
+        self.samples: List[List[int]] = []
+        self.weights: List[float] = []
+        self._frame_index: Dict[Frame, int] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.duration = 0.0
+    
+    def _index(self, frame: Frame) -> int:
+        index = self._frame_index.get(frame)
+        if index is None:
+            index = self._frame_index[frame] = len(self.frames)
+            self.frames.append(frame)
+        return index
+    
+    def _run(self) -> None:
+        start = last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(self._index((code.co_name, code.co_filename, frame.f_lineno)))
+                frame = frame.f_back
+            if stack:
+                stack.reverse()
+                self.samples.append(stack)
+                self.weights.append(now - last)
+            last = now
+        self.duration = time.perf_counter() - start
+    
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="adlook-profile-sampler", daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+    
+    def to_speedscope(self, name: str) -> Dict[str, Any]:
+        """Return the samples in the speedscope file format."""
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "adlook-profiler",
+            "activeProfileIndex": 0,
+            "shared": {
+                "frames": [{"name": n, "file": f, "line": line} for n, f, line in self.frames],
+            },
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(sum(self.weights), 6),
+                "samples": self.samples,
+                "weights": [round(w, 6) for w in self.weights],
+            }],
+        }
+
+
+class AnalysisProfiler:
+    """Context manager that profiles one analysis and saves the artifacts."""
+    
+    def __init__(self, output_dir: Path, name: str = "analysis", sample_interval: float = 0.005):
+        """
+        Args:
+            output_dir: Directory the profile files are written to
+            name: Label shown in speedscope
+            sample_interval: Seconds between stack samples
+        """
+        self.output_dir = Path(output_dir)
+        self.name = name
+        self.sample_interval = sample_interval
+        self.active = False
+        self.files: Dict[str, str] = {}
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[StackSampler] = None
+        self._timeline: List[Dict[str, Any]] = []
+        self._start = 0.0
+    
+    def _on_span(self, finished: Span) -> None:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        self._timeline.append({
+            "name": finished.name,
+            "path": finished.path,
+            "task": task.get_name() if task else threading.current_thread().name,
+            "start_s": round(finished.start - self._start, 6),
+            "duration_s": round(finished.duration, 6),
+            "error": finished.error,
+            "attributes": {k: v for k, v in finished.attributes.items() if isinstance(v, (int, float, str, bool))},
+        })
+    
+    def __enter__(self) -> "AnalysisProfiler":
+        if not _profile_lock.acquire(blocking=False):
+            logger.warning("Another analysis is being profiled; running without profiling")
+            return self
+        
+        self.active = True
+        self._start = time.perf_counter()
+        instrumentation.add_listener(self._on_span)
+        self._sampler = StackSampler(threading.get_ident(), self.sample_interval)
+        self._sampler.start()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        return self
+    
+    def __exit__(self, *exc: Any) -> None:
+        if not self.active:
+            return
+        
+        try:
+            self._profile.disable()
+            self._sampler.stop()
+            instrumentation.remove_listener(self._on_span)
+            self.files = self.save()
+        except OSError as error:
+            logger.error(f"Failed to save profile: {error}")
+        finally:
+            _profile_lock.release()
+    
+    def save(self) -> Dict[str, str]:
+        """
+        Write the pstats, speedscope and timeline files.
+        
+        Returns:
+            Mapping of format name to file path
+        """
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        
+        pstats_path = self.output_dir / PSTATS_FILENAME
+        self._profile.dump_stats(str(pstats_path))
+        
+        speedscope_path = self.output_dir / SPEEDSCOPE_FILENAME
+        with open(speedscope_path, "w", encoding="utf-8") as f:
+            json.dump(self._sampler.to_speedscope(self.name), f)
+        
+        timeline_path = self.output_dir / TIMELINE_FILENAME
+        with open(timeline_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "name": self.name,
+                "duration_s": round(time.perf_counter() - self._start, 6),
+                "spans": sorted(self._timeline, key=lambda s: s["start_s"]),
+            }, f, indent=2, ensure_ascii=False)
+        
+        logger.info(f"Profile saved to {self.output_dir}")
+        return {
+            "pstats": str(pstats_path),
+            "speedscope": str(speedscope_path),
+            "timeline": str(timeline_path),
+        }
@@ -0,0 +1,115 @@
+"""
+Fast JSON responses and field projection for API results.
+
+Analysis results carry the base64 screenshot, which makes them megabytes
+of JSON while most clients only want the zones or the emails. Endpoints
+returning results accept ``fields`` and ``exclude`` query parameters:
+comma-separated keys, where a dotted key reaches into nested objects and
+into every object of a list (``zones.name``):
+
+    GET /api/complete/analysis/<id>?fields=zones,emails
+    GET /api/complete/analysis/<id>?exclude=screenshot,proposal
+
+Responses are serialized with orjson when it is installed and with the
+standard library otherwise. Screenshots stay PNG bytes until then and are
+written as ``data:`` URLs.
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+from fastapi.responses import JSONResponse
+
+from .services.screenshot import json_default
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+# Path tree: key -> subtree, or None for "the whole value"
+FieldTree = Dict[str, Optional[Dict[str, Any]]]
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(content, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=json_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with ``dumps``."""
+    
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def parse_fields(value: Optional[str]) -> Optional[List[str]]:
+    """Split a comma-separated ``fields``/``exclude`` parameter; None if empty."""
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(",") if field.strip()]
+    return fields or None
+
+
+def _tree(paths: Iterable[str]) -> FieldTree:
+    root: FieldTree = {}
+    for path in paths:
+        node = root
+        *parents, leaf = path.split(".")
+        for key in parents:
+            if key in node and node[key] is None:
+                # A parent is already selected as a whole
+                break
+            node = node.setdefault(key, {})
+        else:
+            node[leaf] = None
+    return root
+
+
+def _include(value: Any, tree: Optional[FieldTree]) -> Any:
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [_include(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return {key: _include(value[key], subtree) for key, subtree in tree.items() if key in value}
+
+
+def _exclude(value: Any, tree: FieldTree) -> Any:
+    if isinstance(value, list):
+        return [_exclude(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+    result = {}
+    for key, item in value.items():
+        if key not in tree:
+            result[key] = item
+        elif tree[key] is not None:
+            result[key] = _exclude(item, tree[key])
+    return result
+
+
+def project(
+    data: Dict[str, Any],
+    fields: Optional[List[str]] = None,
+    exclude: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Keep only ``fields`` of ``data``, then drop ``exclude``.
+    
+    Args:
+        data: Result to project; not modified
+        fields: Keys to keep (all if None); unknown keys are ignored
+        exclude: Keys to drop
+    
+    Returns:
+        Projected copy of the selected parts (unselected values are shared, not copied)
+    """
+    if fields:
+        data = _include(data, _tree(fields))
+    if exclude:
+        data = _exclude(data, _tree(exclude))
+    return data
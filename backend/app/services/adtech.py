@@ -0,0 +1,204 @@
+"""
+Ad-tech fingerprinting from the requests a page makes while loading.
+
+Every request URL recorded during navigation is matched against a ruleset
+of ad servers, SSPs, ad networks and header bidding libraries. All patterns
+are compiled once into a single Aho-Corasick automaton, so matching a page
+with hundreds of requests is one linear pass per URL regardless of how many
+rules there are.
+
+Patterns are matched against ``"." + host + path`` in lower case: domain
+patterns start with a dot (``.adnxs.com`` matches ``ib.adnxs.com`` but not
+``notadnxs.com``), path patterns start with a slash.
+"""
+
+import logging
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Stop recording after this many requests; infinite-scroll pages never go idle
+MAX_RECORDED_REQUESTS = 3000
+
+
+@dataclass(frozen=True)
+class AdTechRule:
+    name: str
+    category: str
+    patterns: Tuple[str, ...]
+
+
+RULES = (
+    AdTechRule("Yandex Advertising Network (RTB)", "ssp", (".an.yandex.ru", ".yandex.ru/ads/", ".yandex.ru/an/", "/partner-code-bundles/")),
+    AdTechRule("ADFOX", "ad_server", (".adfox.ru", ".adfox.yandex.ru", "/pcode/adfox/")),
+    AdTechRule("Google Ad Manager", "ad_server", (".securepubads.g.doubleclick.net", ".googletagservices.com", "/tag/js/gpt.js")),
+    AdTechRule("Google AdSense", "ad_network", (".pagead2.googlesyndication.com", "/adsbygoogle.js")),
+    AdTechRule("Google Ads / DoubleClick", "ad_network", (".googleads.g.doubleclick.net", ".ad.doubleclick.net", ".googleadservices.com")),
+    AdTechRule("Prebid.js", "header_bidding", ("/prebid.js", "/prebid.min.js", "/prebid-", ".prebid.org")),
+    AdTechRule("Amazon Publisher Services", "header_bidding", (".amazon-adsystem.com",)),
+    AdTechRule("myTarget / VK Ads", "ad_network", (".ad.mail.ru", ".ads.vk.com", ".r.mradx.net", ".privacy-cs.mail.ru/ads")),
+    AdTechRule("Between Digital", "ssp", (".betweendigital.com", ".betweenx.com")),
+    AdTechRule("AdRiver", "ad_server", (".adriver.ru",)),
+    AdTechRule("Buzzoola", "ad_network", (".buzzoola.com",)),
+    AdTechRule("OTM", "ssp", (".otm-r.com",)),
+    AdTechRule("Hybrid", "ssp", (".hybrid.ai",)),
+    AdTechRule("Soloway", "ad_network", (".soloway.ru",)),
+    AdTechRule("Criteo", "ssp", (".criteo.com", ".criteo.net")),
+    AdTechRule("Xandr (AppNexus)", "ssp", (".adnxs.com",)),
+    AdTechRule("Magnite (Rubicon)", "ssp", (".rubiconproject.com",)),
+    AdTechRule("PubMatic", "ssp", (".pubmatic.com",)),
+    AdTechRule("OpenX", "ssp", (".openx.net",)),
+    AdTechRule("Index Exchange", "ssp", (".casalemedia.com", ".indexww.com")),
+    AdTechRule("Sovrn", "ssp", (".lijit.com", ".sovrn.com")),
+    AdTechRule("RTB House", "dsp", (".rtbhouse.com", ".creativecdn.com")),
+    AdTechRule("Taboola", "native", (".taboola.com",)),
+    AdTechRule("Outbrain", "native", (".outbrain.com",)),
+    AdTechRule("MGID", "native", (".mgid.com",)),
+    AdTechRule("Directadvert", "native", (".directadvert.ru",)),
+    AdTechRule("SmartyAds", "ssp", (".smartyads.com",)),
+    AdTechRule("Adlook", "ssp", (".adlook.me", ".adlook.tech")),
+)
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher (Aho-Corasick automaton over characters)."""
+    
+    def __init__(self, patterns: Iterable[Tuple[str, Any]]):
+        """
+        Args:
+            patterns: (pattern, value) pairs; ``find`` returns the values of
+                every pattern occurring in the text
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Any]] = [[]]
+        
+        for pattern, value in patterns:
+            state = 0
+            for ch in pattern:
+                next_state = self._goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][ch] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = next_state
+            self._out[state].append(value)
+        
+        # Breadth-first: failure links point to the longest proper suffix
+        # that is also a prefix, and outputs are inherited along them
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(ch, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+    
+    @property
+    def size(self) -> int:
+        return len(self._goto)
+    
+    def find(self, text: str) -> List[Any]:
+        """Values of all patterns found in ``text`` (one entry per occurrence)."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        found: List[Any] = []
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.extend(out[state])
+        return found
+
+
+@lru_cache(maxsize=1)
+def get_matcher() -> AhoCorasick:
+    """Automaton over every rule pattern, built on first use."""
+    matcher = AhoCorasick((pattern, index) for index, rule in enumerate(RULES) for pattern in rule.patterns)
+    logger.debug(f"Ad-tech matcher compiled: {len(RULES)} rules, {matcher.size} states")
+    return matcher
+
+
+def _match_text(url: str) -> Optional[str]:
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return None
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return None
+    return f".{parts.hostname}{parts.path}".lower()
+
+
+class RequestRecorder:
+    """Records the URL of every request a Playwright page makes."""
+    
+    def __init__(self, limit: int = MAX_RECORDED_REQUESTS):
+        self.limit = limit
+        self.urls: List[str] = []
+        self.dropped = 0
+    
+    def _on_request(self, request: Any) -> None:
+        if len(self.urls) < self.limit:
+            self.urls.append(request.url)
+        else:
+            self.dropped += 1
+    
+    def attach(self, page: Any) -> "RequestRecorder":
+        """Start recording; call before ``page.goto``."""
+        page.on("request", self._on_request)
+        return self
+
+
+def fingerprint(urls: Iterable[str]) -> Dict[str, Any]:
+    """
+    Report the ad-tech found in a list of request URLs.
+    
+    Args:
+        urls: Request URLs recorded during page load
+    
+    Returns:
+        Dict with the matched ``networks`` (name, category, request count and
+        an example URL), the set of ``categories``, whether the site is
+        ``monetized`` and uses ``header_bidding``, and request totals
+        (``requests_matched`` counts each request once, however many
+        networks it matched)
+    """
+    matcher = get_matcher()
+    hits: Dict[int, Dict[str, Any]] = {}
+    total = matched = 0
+    
+    for url in urls:
+        total += 1
+        text = _match_text(url)
+        if text is None:
+            continue
+        indexes = set(matcher.find(text))
+        # A request can match several networks (e.g. a wrapper and its bidder) but counts once
+        matched += bool(indexes)
+        for index in indexes:
+            entry = hits.get(index)
+            if entry is None:
+                rule = RULES[index]
+                entry = hits[index] = {"name": rule.name, "category": rule.category, "requests": 0, "example": url[:200]}
+            entry["requests"] += 1
+    
+    networks = sorted(hits.values(), key=lambda entry: entry["requests"], reverse=True)
+    categories = sorted({entry["category"] for entry in networks})
+    return {
+        "networks": networks,
+        "categories": categories,
+        "monetized": bool(networks),
+        "header_bidding": "header_bidding" in categories,
+        "requests_total": total,
+        "requests_matched": matched,
+    }
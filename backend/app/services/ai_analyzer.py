@@ -1,12 +1,13 @@
 import logging
 import json
 from typing import List, Dict, Optional, Tuple
-from openai import OpenAI
 from ..config import settings
+from ..instrumentation import span, instrument, record_llm_usage
 
 logger = logging.getLogger(__name__)
 
 
+@instrument('stage.zones')
 def analyze_website_with_ai(url: str, html_content: str) -> Tuple[List[Dict[str, str]], bool, Optional[str]]:
     """
     Analyze website structure using OpenAI GPT-4o-mini to identify ad placement zones.
@@ -20,7 +21,9 @@ def analyze_website_with_ai(url: str, html_content: str) -> Tuple[List[Dict[str,
         zones_list format: [{"zone": "Header", "priority": "high"}, ...]
     """
     try:
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        from openai import OpenAI
+        
+        client = OpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL)
         
         html_snippet = html_content[:5000] if len(html_content) > 5000 else html_content
         
@@ -55,15 +58,17 @@ Return ONLY a JSON array with this exact format:
 Important: Only include zones that actually exist on the website. Do not include all zones by default.
 Return ONLY the JSON array, no additional text or explanation."""
 
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are an expert web advertising analyst. Always respond with valid JSON only."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=500
-        )
+        with span('llm.zones', model='gpt-4o-mini') as llm_span:
+            response = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": "You are an expert web advertising analyst. Always respond with valid JSON only."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.3,
+                max_tokens=500
+            )
+            record_llm_usage(llm_span, response)
         
         content = response.choices[0].message.content.strip()
         
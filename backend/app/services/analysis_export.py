@@ -0,0 +1,458 @@
+"""
+Columnar bulk export of analysis results.
+
+Analysts look at zone availability, priorities, languages and contact
+coverage across many sites at once, which one JSON file per analysis makes
+slow. ``flatten`` turns a result into one flat row with a fixed schema
+(``COLUMNS``): per ad zone, whether it is available, its size, priority
+and confidence; the language, emails and ad networks. Rows are written:
+
+- as a dataset directory of part files (``ExportDataset``): Parquet or
+  Arrow IPC with pyarrow installed, CSV otherwise. Each ``append`` adds new
+  parts and records what it exported in ``_export.json``, so the next
+  append (after the next batch) only writes new analyses. Query the
+  directory with pandas, DuckDB or Polars as one table;
+- as one file streamed in chunks (``iter_export``), for
+  ``GET /api/complete/export``.
+
+Rows go out ``BATCH_ROWS`` at a time (one Parquet row group or CSV chunk),
+so memory stays flat however many analyses are exported.
+"""
+
+import csv
+import io
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .analysis_store import ZONE_BITS, AnalysisStore, domain_of, zone_key
+
+logger = logging.getLogger(__name__)
+
+BATCH_ROWS = 5000
+ROWS_PER_FILE = 1_000_000
+
+MANIFEST_FILENAME = "_export.json"
+# Increased when COLUMNS change; a dataset is only appended to with the schema it was created with
+SCHEMA_VERSION = 2
+
+ZONE_COLUMNS = (("available", "bool"), ("size", "string"), ("priority", "string"), ("confidence", "float"))
+
+COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("analysis_id", "string"),
+    ("url", "string"),
+    ("domain", "string"),
+    ("analyzed_at", "timestamp"),
+    ("language", "string"),
+    ("zones_source", "string"),
+    ("zones_available_count", "int"),
+    *((f"{zone}_{name}", kind) for zone in ZONE_BITS for name, kind in ZONE_COLUMNS),
+    ("email_count", "int"),
+    ("emails", "string"),
+    ("company_name", "string"),
+    ("title", "string"),
+    ("adtech_network_count", "int"),
+    ("adtech_networks", "string"),
+)
+COLUMN_NAMES = [name for name, _ in COLUMNS]
+
+# Multi-valued fields are joined with this in one column
+LIST_SEPARATOR = ";"
+
+
+class ExportError(Exception):
+    """Raised when an export cannot be written (unknown format, missing pyarrow, incompatible dataset)."""
+
+
+def _has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def resolve_format(fmt: str) -> str:
+    """
+    Check an export format; ``auto`` is Parquet when pyarrow is installed and CSV otherwise.
+    
+    Raises:
+        ExportError: If the format is unknown or needs pyarrow and it is missing
+    """
+    if fmt == "auto":
+        return "parquet" if _has_pyarrow() else "csv"
+    if fmt not in WRITERS:
+        raise ExportError(f"Unknown export format: {fmt} (known: auto, {', '.join(WRITERS)})")
+    if fmt != "csv" and not _has_pyarrow():
+        raise ExportError(f"The {fmt} format needs pyarrow (pip install pyarrow); use csv without it")
+    return fmt
+
+
+def _timestamp(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.astimezone(timezone.utc)
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, timezone.utc)
+    if isinstance(value, str) and value:
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+        return parsed if parsed.tzinfo else parsed.astimezone(timezone.utc)
+    return None
+
+
+def _text(value: Any) -> Optional[str]:
+    # Model output is not typed; a number in a string column would fail the Parquet batch
+    return str(value) if value is not None else None
+
+
+def _confidence(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def flatten(analysis_id: str, result: Dict[str, Any], analyzed_at: Any = None) -> Dict[str, Any]:
+    """
+    One export row for an analysis result.
+    
+    Zones are matched to ``ZONE_BITS`` keys by name; when a page has
+    several zones of a kind, the row describes an available one if there is
+    any. Zones of unknown kinds are left out.
+    
+    Args:
+        analysis_id: ID of the analysis (API) or its results directory (CLI)
+        result: Analysis result as returned by the API or saved by the CLI
+        analyzed_at: Datetime, Unix time or ISO string (default: ``result["created_at"]``)
+    """
+    url = result.get("url") or ""
+    emails = [str(email) for email in result.get("emails") or []]
+    networks = [
+        str(network.get("name")) for network in (result.get("adtech") or {}).get("networks") or []
+        if isinstance(network, dict) and network.get("name")
+    ]
+    row: Dict[str, Any] = {
+        "analysis_id": analysis_id,
+        "url": url,
+        "domain": domain_of(url),
+        "analyzed_at": _timestamp(analyzed_at if analyzed_at is not None else result.get("created_at")),
+        "language": _text(result.get("language")),
+        "zones_source": _text(result.get("zones_source")),
+        "email_count": len(emails),
+        "emails": LIST_SEPARATOR.join(emails) or None,
+        "company_name": _text(result.get("company_name")),
+        "title": _text(result.get("title")),
+        "adtech_network_count": len(networks),
+        "adtech_networks": LIST_SEPARATOR.join(networks) or None,
+    }
+    
+    zones: Dict[str, Dict[str, Any]] = {}
+    for zone in result.get("zones") or []:
+        key = zone_key(zone.get("name")) if isinstance(zone, dict) else None
+        if key and (key not in zones or (zone.get("available") and not zones[key].get("available"))):
+            zones[key] = zone
+    for key in ZONE_BITS:
+        zone = zones.get(key)
+        row[f"{key}_available"] = bool(zone.get("available")) if zone else None
+        row[f"{key}_size"] = _text(zone.get("size")) if zone else None
+        row[f"{key}_priority"] = _text(zone.get("priority")) if zone else None
+        row[f"{key}_confidence"] = _confidence(zone.get("confidence")) if zone else None
+    row["zones_available_count"] = sum(1 for zone in zones.values() if zone.get("available"))
+    return row
+
+
+def batched(rows: Iterable[Dict[str, Any]], size: int = BATCH_ROWS) -> Iterator[List[Dict[str, Any]]]:
+    batch: List[Dict[str, Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class CsvWriter:
+    """Rows as UTF-8 CSV with a header; timestamps in ISO 8601, booleans as true/false."""
+    
+    suffix = ".csv"
+    media_type = "text/csv; charset=utf-8"
+    
+    def __init__(self, sink: BinaryIO):
+        self._sink = sink
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._writer.writerow(COLUMN_NAMES)
+        self._flush()
+    
+    @staticmethod
+    def _cell(value: Any) -> Any:
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        if isinstance(value, datetime):
+            return value.isoformat(timespec="seconds")
+        return value
+    
+    def _flush(self) -> None:
+        self._sink.write(self._buffer.getvalue().encode("utf-8"))
+        self._buffer.seek(0)
+        self._buffer.truncate()
+    
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        self._writer.writerows([self._cell(row.get(name)) for name in COLUMN_NAMES] for row in rows)
+        self._flush()
+    
+    def close(self) -> None:
+        self._sink.flush()
+
+
+def arrow_schema():
+    import pyarrow as pa
+    
+    types = {
+        "string": pa.string(),
+        "bool": pa.bool_(),
+        "int": pa.int32(),
+        "float": pa.float32(),
+        "timestamp": pa.timestamp("s", tz="UTC"),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in COLUMNS])
+
+
+class ParquetWriter:
+    """Rows as a zstd-compressed Parquet file, one row group per batch."""
+    
+    suffix = ".parquet"
+    media_type = "application/vnd.apache.parquet"
+    
+    def __init__(self, sink: BinaryIO):
+        import pyarrow.parquet as pq
+        
+        self._schema = arrow_schema()
+        self._writer = pq.ParquetWriter(sink, self._schema, compression="zstd")
+    
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        import pyarrow as pa
+        
+        self._writer.write_table(pa.Table.from_pylist(rows, schema=self._schema))
+    
+    def close(self) -> None:
+        self._writer.close()
+
+
+class ArrowWriter:
+    """Rows as an Arrow IPC file (Feather v2), one record batch per batch."""
+    
+    suffix = ".arrow"
+    media_type = "application/vnd.apache.arrow.file"
+    
+    def __init__(self, sink: BinaryIO):
+        import pyarrow as pa
+        
+        self._schema = arrow_schema()
+        self._writer = pa.ipc.new_file(sink, self._schema)
+    
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        import pyarrow as pa
+        
+        self._writer.write_batch(pa.RecordBatch.from_pylist(rows, schema=self._schema))
+    
+    def close(self) -> None:
+        self._writer.close()
+
+
+WRITERS = {"parquet": ParquetWriter, "arrow": ArrowWriter, "csv": CsvWriter}
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that collects what the writers write until ``take`` is called."""
+    
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def take(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def iter_export(rows: Iterable[Dict[str, Any]], fmt: str, batch_rows: int = BATCH_ROWS) -> Iterator[bytes]:
+    """
+    One export file in ``fmt`` (``parquet``, ``arrow`` or ``csv``), as chunks of bytes.
+    
+    A chunk is yielded after every batch of rows (and the Parquet or Arrow
+    footer at the end), so the file can be streamed to a client while the
+    rows are still being read.
+    
+    Raises:
+        ExportError: If the format is unknown or unavailable (before the first chunk)
+    """
+    writer_class = WRITERS[resolve_format(fmt)]
+    
+    def chunks() -> Iterator[bytes]:
+        sink = _ChunkSink()
+        writer = writer_class(sink)
+        for batch in batched(rows, batch_rows):
+            writer.write(batch)
+            yield sink.take()
+        writer.close()
+        yield sink.take()
+    
+    return chunks()
+
+
+class ExportDataset:
+    """
+    A directory of export part files that grows by ``append``.
+    
+    Part files are written under a temporary name and renamed once the
+    manifest lists them, so readers never see a partial file and a crashed
+    append leaves nothing behind but its temporary files (removed on the
+    next open).
+    """
+    
+    def __init__(self, directory: str, fmt: str = "auto", rows_per_file: int = ROWS_PER_FILE):
+        """
+        Args:
+            directory: Dataset directory, created if missing
+            fmt: ``parquet``, ``arrow``, ``csv`` or ``auto``; an existing
+                 dataset keeps the format it was created with
+            rows_per_file: Rows per part file before the next one is started
+        
+        Raises:
+            ExportError: If the format is unavailable or does not match the existing dataset
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.directory / MANIFEST_FILENAME
+        self.rows_per_file = rows_per_file
+        self.manifest = self._load_manifest()
+        
+        if self.manifest:
+            if self.manifest.get("schema_version") != SCHEMA_VERSION:
+                raise ExportError(
+                    f"{self.directory} was exported with schema version {self.manifest.get('schema_version')};"
+                    f" export to a new directory for version {SCHEMA_VERSION}"
+                )
+            existing = self.manifest["format"]
+            if fmt not in ("auto", existing):
+                raise ExportError(f"{self.directory} holds a {existing} export; cannot append {fmt}")
+            self.format = resolve_format(existing)
+        else:
+            self.format = resolve_format(fmt)
+            self.manifest = {
+                "format": self.format, "schema_version": SCHEMA_VERSION, "columns": COLUMN_NAMES,
+                "rows": 0, "parts": [], "sources": {},
+            }
+        self._recover()
+    
+    def _load_manifest(self) -> Dict[str, Any]:
+        if not self.manifest_path.exists():
+            return {}
+        with open(self.manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+    
+    def _save_manifest(self) -> None:
+        temporary = self.manifest_path.with_suffix(".tmp")
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2, ensure_ascii=False)
+        os.replace(temporary, self.manifest_path)
+    
+    def _recover(self) -> None:
+        listed = set(self.manifest["parts"])
+        for temporary in self.directory.glob("_*.partial"):
+            final = self.directory / temporary.name[1:-len(".partial")]
+            if final.name in listed:
+                # The manifest was saved but the rename did not happen
+                os.replace(temporary, final)
+            else:
+                temporary.unlink()
+    
+    @staticmethod
+    def _partial(part: Path) -> Path:
+        # Dataset readers (pyarrow, DuckDB, Spark) skip names starting with an underscore
+        return part.with_name(f"_{part.name}.partial")
+    
+    def state(self, source: str) -> Any:
+        """What ``source`` recorded as exported by the previous appends (None before the first)."""
+        return self.manifest["sources"].get(source)
+    
+    @property
+    def rows(self) -> int:
+        return self.manifest["rows"]
+    
+    def append(self, rows: Iterable[Dict[str, Any]], source: str, state: Callable[[], Any]) -> int:
+        """
+        Write ``rows`` as new part files.
+        
+        Args:
+            rows: Rows from ``flatten``; consumed lazily
+            source: Name the exported state is recorded under
+            state: Called once all rows are written; its JSON-serializable
+                   result is stored as ``state(source)`` for the next append
+        
+        Returns:
+            Number of rows written
+        """
+        writer_class = WRITERS[self.format]
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        parts: List[Path] = []
+        written = 0
+        sink, writer, in_file = None, None, 0
+        try:
+            for batch in batched(rows):
+                if writer is not None and in_file >= self.rows_per_file:
+                    writer.close()
+                    sink.close()
+                    writer = None
+                if writer is None:
+                    name = f"part-{stamp}-{uuid.uuid4().hex[:8]}{writer_class.suffix}"
+                    parts.append(self.directory / name)
+                    sink = open(self._partial(parts[-1]), "wb")
+                    writer, in_file = writer_class(sink), 0
+                writer.write(batch)
+                written += len(batch)
+                in_file += len(batch)
+            if writer is not None:
+                writer.close()
+                sink.close()
+        except BaseException:
+            if sink is not None:
+                sink.close()
+            for part in parts:
+                self._partial(part).unlink(missing_ok=True)
+            raise
+        
+        self.manifest["parts"] += [part.name for part in parts]
+        self.manifest["rows"] += written
+        self.manifest["sources"][source] = state()
+        self._save_manifest()
+        for part in parts:
+            os.replace(self._partial(part), part)
+        logger.info(f"📦 Exported {written} analyses to {self.directory} ({len(parts)} new {self.format} parts)")
+        return written
+
+
+def store_rows(store: AnalysisStore, after: int = 0, until: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Export rows of the analyses in ``store`` added after sequence number ``after`` (up to ``until``)."""
+    for _, analysis_id, result in store.iter_results(after=after, until=until):
+        yield flatten(analysis_id, result)
+
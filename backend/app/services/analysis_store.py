@@ -0,0 +1,530 @@
+"""
+Persistent, searchable store of completed analyses.
+
+Results used to live only in the API process's ``analysis_cache`` (and in
+the job queue for queued jobs), so they could be fetched by ID and were
+lost on restart. Every successful analysis is now also written to a local
+SQLite database shared by the API and worker processes on the host::
+
+    GET /api/complete/search?q=доставка цветов&language=ru&zone=sidebar&has_emails=true
+
+Searching uses an FTS5 index over the company name, title, emails,
+description and proposal text. Language, domain, date range, email
+presence and available ad zones are indexed columns of a narrow table, so
+filters never read the text. Results are newest first by default and paged
+with a keyset cursor, so a page costs the same at any depth. Facet counts
+(``facets=true``) come from a counts table kept up to date by triggers,
+unless the search has a query, domain or date filter; then every match is
+visited.
+
+On 300,000 synthetic analyses (``python -m benchmarks.search_latency``)
+filtered pages take under a millisecond and full-text pages a few
+milliseconds. Prefix terms and relevance ordering (BM25 needs each term's
+document count) read whole doclists and take 10-20 ms when the words occur
+in most analyses; facets of such queries take over 100 ms.
+
+Screenshots are not stored; results read back from here have none.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Ad zones of the vision prompt and the DOM detector, as bits of ``zones_available``
+ZONE_BITS = {"header": 1, "sidebar": 2, "content": 4, "footer": 8, "popup": 16}
+
+SORTS = ("recent", "relevance")
+MAX_LIMIT = 100
+# Relevance ranks this many of the newest matches; BM25 over every match of a common word takes seconds
+RELEVANCE_WINDOW = 1000
+
+# Searched and filtered columns live in the narrow ``analyses`` table, so filters and
+# facet counts scan little data; the text and the rest of the result are in ``analysis_documents``
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    url TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    language TEXT,
+    zones_available INTEGER NOT NULL,
+    email_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS analyses_language ON analyses (language);
+CREATE INDEX IF NOT EXISTS analyses_domain ON analyses (domain);
+CREATE INDEX IF NOT EXISTS analyses_created ON analyses (created_at);
+CREATE TABLE IF NOT EXISTS analysis_documents (
+    seq INTEGER PRIMARY KEY,
+    company_name TEXT,
+    title TEXT,
+    emails TEXT,
+    description TEXT,
+    proposal TEXT,
+    result TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS analyses_fts USING fts5(
+    company_name, title, emails, description, proposal,
+    content='analysis_documents', content_rowid='seq', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+-- Match counts per facet value combination, so facets of unfiltered searches (or searches
+-- filtered by language, zones and emails only) need no scan
+CREATE TABLE IF NOT EXISTS analysis_facets (
+    language TEXT NOT NULL,
+    zones_available INTEGER NOT NULL,
+    has_emails INTEGER NOT NULL,
+    analyses INTEGER NOT NULL,
+    PRIMARY KEY (language, zones_available, has_emails)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS analysis_facets_insert AFTER INSERT ON analyses BEGIN
+    INSERT INTO analysis_facets VALUES (COALESCE(new.language, ''), new.zones_available, new.email_count > 0, 1)
+    ON CONFLICT DO UPDATE SET analyses = analyses + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS analysis_facets_delete AFTER DELETE ON analyses BEGIN
+    UPDATE analysis_facets SET analyses = analyses - 1
+    WHERE language = COALESCE(old.language, '') AND zones_available = old.zones_available
+    AND has_emails = (old.email_count > 0);
+END;
+CREATE TRIGGER IF NOT EXISTS analyses_fts_insert AFTER INSERT ON analysis_documents BEGIN
+    INSERT INTO analyses_fts (rowid, company_name, title, emails, description, proposal)
+    VALUES (new.seq, new.company_name, new.title, new.emails, new.description, new.proposal);
+END;
+CREATE TRIGGER IF NOT EXISTS analyses_fts_delete AFTER DELETE ON analysis_documents BEGIN
+    INSERT INTO analyses_fts (analyses_fts, rowid, company_name, title, emails, description, proposal)
+    VALUES ('delete', old.seq, old.company_name, old.title, old.emails, old.description, old.proposal);
+END;
+"""
+
+# Text columns of the full-text index, in index order; kept out of the stored result JSON
+TEXT_FIELDS = ("company_name", "title", "emails", "description", "proposal")
+SNIPPET = "snippet(analyses_fts, -1, '<b>', '</b>', '…', 12)"
+# Not stored at all
+UNSTORED_FIELDS = frozenset({"screenshot", "success", "analysis_id", "profile"})
+
+RESULT_SELECT = (
+    f"SELECT a.seq, a.id, a.url, a.created_at, {', '.join('d.' + name for name in TEXT_FIELDS)}, d.result"
+    " FROM analyses a JOIN analysis_documents d ON d.seq = a.seq"
+)
+
+
+class SearchError(ValueError):
+    """Raised for search parameters the store cannot run (bad cursor, sort or query)."""
+
+
+@dataclass
+class SearchQuery:
+    """Filters and paging of one search; see ``AnalysisStore.search``."""
+    
+    q: Optional[str] = None
+    language: Optional[str] = None
+    domain: Optional[str] = None
+    zones: List[str] = field(default_factory=list)
+    has_emails: Optional[bool] = None
+    since: Optional[float] = None
+    until: Optional[float] = None
+    sort: str = "recent"
+    limit: int = 20
+    cursor: Optional[str] = None
+
+
+def zone_key(name: Any) -> Optional[str]:
+    """Key of ``ZONE_BITS`` a zone name refers to (``"Sidebar (right)"`` is ``sidebar``); None if unknown."""
+    for word in str(name or "").lower().replace("/", " ").replace("(", " ").split():
+        if word in ZONE_BITS:
+            return word
+    return None
+
+
+def zone_mask(zones: Iterable[Dict[str, Any]]) -> int:
+    """Bits of ``ZONE_BITS`` for the zones marked available."""
+    mask = 0
+    for zone in zones or []:
+        if isinstance(zone, dict) and zone.get("available"):
+            mask |= ZONE_BITS.get(zone_key(zone.get("name")), 0)
+    return mask
+
+
+def zone_names(mask: int) -> List[str]:
+    return [name for name, bit in ZONE_BITS.items() if mask & bit]
+
+
+def domain_of(url: str) -> str:
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def fts_query(text: str) -> str:
+    """
+    Free text as an FTS5 query: every word must match, ``word*`` matches a prefix.
+    
+    Words are quoted, so FTS5 operators and punctuation in user input
+    (``ООО "Ромашка"``, ``info@site.ru``) are searched for as text instead
+    of failing to parse.
+    """
+    terms = []
+    for word in text.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec="seconds")
+
+
+class AnalysisStore:
+    """Completed analyses in a local SQLite database with a full-text index."""
+    
+    def __init__(self, path: str, timeout: float = 30.0):
+        """
+        Args:
+            path: Database file, created if missing; shared by all processes
+            timeout: Seconds to wait for a lock held by another process
+        """
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+    
+    @staticmethod
+    def _rows(analysis_id: str, url: str, result: Dict[str, Any], created_at: float) -> Tuple[tuple, tuple]:
+        emails = [str(email) for email in result.get("emails") or []]
+        text = {name: result.get(name) for name in TEXT_FIELDS}
+        text["emails"] = " ".join(emails) or None
+        rest = {key: value for key, value in result.items() if key not in TEXT_FIELDS and key not in UNSTORED_FIELDS}
+        return (
+            (analysis_id, url, domain_of(url), created_at, result.get("language"), zone_mask(result.get("zones")), len(emails)),
+            tuple(text[name] for name in TEXT_FIELDS) + (json.dumps(rest, ensure_ascii=False),),
+        )
+    
+    def _delete(self, analysis_id: str) -> bool:
+        row = self._conn.execute("SELECT seq FROM analyses WHERE id = ?", (analysis_id,)).fetchone()
+        if row is None:
+            return False
+        # Through DELETE so the trigger removes the text from the index
+        self._conn.execute("DELETE FROM analysis_documents WHERE seq = ?", (row["seq"],))
+        self._conn.execute("DELETE FROM analyses WHERE seq = ?", (row["seq"],))
+        return True
+    
+    def _transaction(self, fn, *args):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                value = fn(*args)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return value
+    
+    def add_many(self, analyses: Iterable[Tuple[str, str, Dict[str, Any]]], created_at: Optional[float] = None) -> int:
+        """
+        Store ``(analysis_id, url, result)`` triples in one transaction, replacing analyses with the same ID.
+        
+        Args:
+            analyses: Successful results with their analysis IDs and URLs
+            created_at: Timestamp recorded for all of them (default: now)
+        
+        Returns:
+            Number of analyses written
+        """
+        now = time.time() if created_at is None else created_at
+        rows = [(analysis_id, self._rows(analysis_id, url, result, now)) for analysis_id, url, result in analyses]
+        
+        def insert():
+            for analysis_id, (row, document) in rows:
+                self._delete(analysis_id)
+                seq = self._conn.execute(
+                    "INSERT INTO analyses (id, url, domain, created_at, language, zones_available, email_count)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    row,
+                ).lastrowid
+                self._conn.execute(
+                    f"INSERT INTO analysis_documents (seq, {', '.join(TEXT_FIELDS)}, result) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (seq,) + document,
+                )
+        
+        self._transaction(insert)
+        return len(rows)
+    
+    def add(self, analysis_id: str, url: str, result: Dict[str, Any]) -> None:
+        """Store a successful analysis result (its screenshot is left out)."""
+        self.add_many([(analysis_id, url, result)])
+    
+    @staticmethod
+    def _result(row: sqlite3.Row) -> Dict[str, Any]:
+        result = {"success": True, "url": row["url"], "created_at": _iso(row["created_at"])}
+        result.update(json.loads(row["result"]))
+        result.update({name: row[name] for name in TEXT_FIELDS})
+        result["emails"] = row["emails"].split() if row["emails"] else []
+        return result
+    
+    def get(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """Stored result of an analysis, without the screenshot; None if unknown."""
+        with self._lock:
+            row = self._conn.execute(f"{RESULT_SELECT} WHERE a.id = ?", (analysis_id,)).fetchone()
+        return self._result(row) if row is not None else None
+    
+    def last_seq(self) -> int:
+        """Sequence number of the newest analysis; 0 if the store is empty."""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM analyses").fetchone()[0]
+    
+    def iter_results(
+        self, after: int = 0, until: Optional[int] = None, batch_size: int = 1000
+    ) -> Iterator[Tuple[int, str, Dict[str, Any]]]:
+        """
+        Stored results in the order they were added, read ``batch_size`` at a time.
+        
+        Args:
+            after: Only analyses with a higher sequence number
+            until: Only analyses up to this sequence number (e.g. ``last_seq()``
+                   when the export started)
+            batch_size: Rows per query
+        
+        Yields:
+            ``(seq, analysis_id, result)``
+        """
+        until = until if until is not None else self.last_seq()
+        while after < until:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"{RESULT_SELECT} WHERE a.seq > ? AND a.seq <= ? ORDER BY a.seq LIMIT ?",
+                    (after, until, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row["seq"], row["id"], self._result(row)
+            after = rows[-1]["seq"]
+    
+    def delete(self, analysis_id: str) -> bool:
+        return self._transaction(self._delete, analysis_id)
+    
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+    
+    def _where(self, query: SearchQuery, counts: bool = False) -> Tuple[List[str], List[Any]]:
+        conditions, params = [], []
+        if query.language:
+            conditions.append("a.language = ?")
+            params.append(query.language)
+        if query.domain:
+            conditions.append("a.domain = ?")
+            params.append(domain_of(query.domain) if "/" in query.domain else query.domain.lower())
+        if query.zones:
+            unknown = [zone for zone in query.zones if zone.lower() not in ZONE_BITS]
+            if unknown:
+                raise SearchError(f"Unknown zones: {', '.join(unknown)} (known: {', '.join(ZONE_BITS)})")
+            mask = sum(ZONE_BITS[zone] for zone in {zone.lower() for zone in query.zones})
+            conditions.append("a.zones_available & ? = ?")
+            params += [mask, mask]
+        if query.has_emails is not None:
+            has_emails = "a.has_emails" if counts else "a.email_count > 0"
+            conditions.append(has_emails if query.has_emails else f"NOT {has_emails}")
+        if query.since is not None:
+            conditions.append("a.created_at >= ?")
+            params.append(query.since)
+        if query.until is not None:
+            conditions.append("a.created_at < ?")
+            params.append(query.until)
+        if query.q:
+            match = fts_query(query.q)
+            if not match:
+                raise SearchError("Empty search query")
+            conditions.append("analyses_fts MATCH ?")
+            params.append(match)
+        return conditions, params
+    
+    def search(self, query: SearchQuery, facets: bool = False) -> Dict[str, Any]:
+        """
+        Find stored analyses.
+        
+        Args:
+            query: Filters; all given ones must match. ``zones`` lists zones
+                   that must all be available. ``sort="relevance"`` ranks the
+                   ``RELEVANCE_WINDOW`` newest full-text matches by BM25 and
+                   needs ``q``.
+            facets: Also count all matches per language and available zone
+        
+        Returns:
+            Dict with ``results`` (summaries with a ``snippet`` of the matched
+            text when searching by ``q``), ``next_cursor`` (None on the last
+            page) and, with ``facets``, ``facets``
+        
+        Raises:
+            SearchError: If the sort, cursor, zones or query are invalid
+        """
+        if query.sort not in SORTS:
+            raise SearchError(f"Unknown sort: {query.sort} (known: {', '.join(SORTS)})")
+        if query.sort == "relevance" and not query.q:
+            raise SearchError("Sorting by relevance needs a query")
+        limit = max(1, min(query.limit, MAX_LIMIT))
+        try:
+            position = int(query.cursor) if query.cursor else None
+        except ValueError:
+            raise SearchError(f"Invalid cursor: {query.cursor}")
+        
+        conditions, params = self._where(query)
+        source = "analyses_fts JOIN analyses a ON a.seq = analyses_fts.rowid" if query.q else "analyses a"
+        # Sequence numbers grow with insertion time and are the order of the FTS5 doclists and every index
+        key = "analyses_fts.rowid" if query.q else "a.seq"
+        
+        if query.sort == "relevance":
+            # BM25 order has no stable key to continue from, so the cursor is an offset
+            offset = position or 0
+            sql = (
+                f"SELECT seq FROM (SELECT {key} AS seq, bm25(analyses_fts) AS score FROM {source}"
+                f" WHERE {' AND '.join(conditions)} ORDER BY {key} DESC LIMIT {RELEVANCE_WINDOW})"
+                " ORDER BY score, seq DESC LIMIT ? OFFSET ?"
+            )
+            page_params = [*params, limit + 1, offset]
+        else:
+            page_conditions = list(conditions)
+            page_params = list(params)
+            if position is not None:
+                page_conditions.append(f"{key} < ?")
+                page_params.append(position)
+            where = f"WHERE {' AND '.join(page_conditions)}" if page_conditions else ""
+            # Snippets are made here, for the page only, while the doclists are loaded anyway
+            snippet = f", {SNIPPET} AS snippet" if query.q else ""
+            sql = f"SELECT {key} AS seq{snippet} FROM {source} {where} ORDER BY {key} DESC LIMIT ?"
+            page_params.append(limit + 1)
+        
+        try:
+            with self._lock:
+                page = self._conn.execute(sql, page_params).fetchall()
+                more = len(page) > limit
+                page = page[:limit]
+                seqs = [row["seq"] for row in page]
+                snippets = None
+                if query.q and query.sort == "relevance":
+                    snippets = self._snippets(seqs, fts_query(query.q))
+                elif query.q:
+                    snippets = {row["seq"]: row["snippet"] for row in page}
+                results = self._summaries(seqs, snippets)
+                facet_counts = self._facets(query, source, conditions, params) if facets else None
+        except sqlite3.OperationalError as error:
+            raise SearchError(f"Invalid search: {error}") from error
+        
+        next_cursor = None
+        if more:
+            next_cursor = str(offset + limit) if query.sort == "relevance" else str(seqs[-1])
+        response: Dict[str, Any] = {"results": results, "next_cursor": next_cursor}
+        if facet_counts is not None:
+            response["facets"] = facet_counts
+        return response
+    
+    def _snippets(self, seqs: List[int], match: str) -> Dict[int, str]:
+        if not seqs:
+            return {}
+        return dict(self._conn.execute(
+            f"SELECT rowid, {SNIPPET} FROM analyses_fts WHERE analyses_fts MATCH ? AND rowid IN ({', '.join('?' * len(seqs))})",
+            (match, *seqs),
+        ).fetchall())
+    
+    def _summaries(self, seqs: List[int], snippets: Optional[Dict[int, str]]) -> List[Dict[str, Any]]:
+        if not seqs:
+            return []
+        placeholders = ", ".join("?" * len(seqs))
+        rows = {
+            row["seq"]: row for row in self._conn.execute(
+                "SELECT a.seq, a.id, a.url, a.domain, a.created_at, a.language, a.zones_available,"
+                " d.company_name, d.title, d.emails"
+                f" FROM analyses a JOIN analysis_documents d ON d.seq = a.seq WHERE a.seq IN ({placeholders})",
+                seqs,
+            )
+        }
+        summaries = []
+        for seq in seqs:
+            row = rows[seq]
+            summary = {
+                "analysis_id": row["id"],
+                "url": row["url"],
+                "domain": row["domain"],
+                "created_at": _iso(row["created_at"]),
+                "language": row["language"],
+                "company_name": row["company_name"],
+                "title": row["title"],
+                "emails": row["emails"].split() if row["emails"] else [],
+                "zones_available": zone_names(row["zones_available"]),
+            }
+            if snippets is not None:
+                summary["snippet"] = snippets.get(seq)
+            summaries.append(summary)
+        return summaries
+    
+    def _facets(self, query: SearchQuery, source: str, conditions: List[str], params: List[Any]) -> Dict[str, Any]:
+        if query.q or query.domain or query.since is not None or query.until is not None:
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            zone_sums = ", ".join(f"SUM((a.zones_available & {bit}) != 0)" for bit in ZONE_BITS.values())
+            sql = f"SELECT a.language, COUNT(*), {zone_sums} FROM {source} {where} GROUP BY a.language"
+        else:
+            # Filtered by columns the counts table has too
+            counted, params = self._where(query, counts=True)
+            where = f"WHERE {' AND '.join(counted)}" if counted else ""
+            zone_sums = ", ".join(f"SUM(a.analyses * ((a.zones_available & {bit}) != 0))" for bit in ZONE_BITS.values())
+            sql = (
+                f"SELECT NULLIF(a.language, ''), SUM(a.analyses), {zone_sums} FROM analysis_facets a {where}"
+                " GROUP BY a.language HAVING SUM(a.analyses) > 0"
+            )
+        rows = self._conn.execute(sql, params).fetchall()
+        return {
+            "total": sum(row[1] for row in rows),
+            "language": {
+                language or "unknown": count
+                for language, count, *_ in sorted(rows, key=lambda row: row[1], reverse=True)
+            },
+            "zone": {name: sum(row[index + 2] for row in rows) for index, name in enumerate(ZONE_BITS)},
+        }
+    
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_analysis_store: Optional[AnalysisStore] = None
+
+
+def get_analysis_store() -> Optional[AnalysisStore]:
+    """Analysis store of this process; None if ADLOOK_ANALYSIS_STORE is empty or cannot be opened."""
+    global _analysis_store
+    if _analysis_store is None:
+        from ..config import settings
+        
+        if not settings.ADLOOK_ANALYSIS_STORE:
+            return None
+        try:
+            _analysis_store = AnalysisStore(settings.ADLOOK_ANALYSIS_STORE)
+        except sqlite3.Error as error:
+            logger.warning(f"⚠️ Analysis store {settings.ADLOOK_ANALYSIS_STORE} unavailable: {error}")
+            return None
+    return _analysis_store
+
+
+def store_analysis(analysis_id: str, url: str, result: Dict[str, Any]) -> None:
+    """Persist a successful result if the store is enabled; failures are logged, not raised."""
+    store = get_analysis_store()
+    if store is None:
+        return
+    try:
+        store.add(analysis_id, url, result)
+    except sqlite3.Error as error:
+        logger.error(f"❌ Failed to store analysis {analysis_id}: {error}")
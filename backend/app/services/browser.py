@@ -0,0 +1,59 @@
+import logging
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, AsyncIterator, List, Optional
+from ..instrumentation import span
+from ..metrics import BROWSERS_IN_FLIGHT
+
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, Page
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def browser_session(args: Optional[List[str]] = None) -> AsyncIterator["Browser"]:
+    """
+    Launch a headless Chromium instance for the duration of the block.
+    
+    The launch is timed as the ``browser.launch`` stage and the instance is
+    counted in the ``adlook_browsers_in_flight`` gauge until it is closed.
+    
+    Args:
+        args: Extra Chromium command-line arguments
+    
+    Yields:
+        Launched Browser instance
+    """
+    from playwright.async_api import async_playwright
+    
+    async with async_playwright() as p:
+        with span('browser.launch'):
+            browser = await p.chromium.launch(headless=True, args=args or [])
+        
+        BROWSERS_IN_FLIGHT.inc()
+        try:
+            yield browser
+        finally:
+            BROWSERS_IN_FLIGHT.dec()
+            if browser.is_connected():
+                await browser.close()
+
+
+async def new_page(browser: "Browser", **kwargs: Any) -> "Page":
+    """
+    Open a page whose static resources go through the shared resource cache.
+    
+    Args:
+        browser: Browser from ``browser_session``
+        **kwargs: Passed to ``Browser.new_page`` (e.g. ``viewport``)
+    
+    Returns:
+        The new page
+    """
+    from .resource_cache import get_resource_cache
+    
+    page = await browser.new_page(**kwargs)
+    cache = get_resource_cache()
+    if cache is not None:
+        await cache.attach(page)
+    return page
@@ -0,0 +1,518 @@
+"""
+Offline company registry lookup.
+
+Company research used to ask a chat model to "find information" about a
+company, which it cannot do without browsing, so the answers were invented.
+Instead, a registry dump (EGRUL open data XML, or a CSV export) is ingested
+once into a local SQLite database::
+
+    python -m backend.app.services.company_registry ingest egrul.zip --db companies.db
+
+and looked up per analysis by OGRN or INN found on the page (usually in the
+footer), or by company name: first an exact match on the normalized name,
+then a fuzzy match through an FTS5 trigram index. Lookups are indexed
+queries and take well under a millisecond; the model only summarizes the
+record that was found.
+"""
+
+import argparse
+import csv
+import io
+import logging
+import re
+import sqlite3
+import sys
+import threading
+import time
+import zipfile
+from dataclasses import asdict, dataclass, fields
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS companies (
+    id INTEGER PRIMARY KEY,
+    ogrn TEXT UNIQUE,
+    inn TEXT,
+    name TEXT NOT NULL,
+    full_name TEXT,
+    name_key TEXT NOT NULL,
+    director TEXT,
+    activity TEXT,
+    address TEXT,
+    status TEXT,
+    registered TEXT
+);
+CREATE INDEX IF NOT EXISTS companies_inn ON companies (inn);
+CREATE INDEX IF NOT EXISTS companies_name_key ON companies (name_key);
+-- Records without an OGRN (e.g. from a CSV without that column) are matched by INN and name instead
+CREATE UNIQUE INDEX IF NOT EXISTS companies_unregistered
+    ON companies (COALESCE(inn, ''), name_key) WHERE ogrn IS NULL;
+CREATE VIRTUAL TABLE IF NOT EXISTS companies_fts USING fts5(
+    name_key, content='companies', content_rowid='id', tokenize='trigram'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS companies_vocab USING fts5vocab(companies_fts, 'row');
+-- Document frequency per trigram, snapshotted after each ingest (fts5vocab counts on every query)
+CREATE TABLE IF NOT EXISTS trigram_df (term TEXT PRIMARY KEY, docs INTEGER NOT NULL) WITHOUT ROWID;
+"""
+
+# Accept a fuzzy name match only this close to the page's company name
+FUZZY_MIN_SIMILARITY = 0.85
+FUZZY_CANDIDATES = 20
+# Candidates come from the rarest trigrams of the name; common ones ("ство",
+# "мед") would pull in most of the registry without changing the best match
+FUZZY_TRIGRAMS = 6
+
+INGEST_BATCH_SIZE = 5000
+
+_INN = re.compile(r"\bИНН\b[^\d\n]{0,12}(\d{12}|\d{10})(?!\d)")
+_OGRN = re.compile(r"\bОГРН(?:ИП)?\b[^\d\n]{0,12}(\d{15}|\d{13})(?!\d)")
+
+_LEGAL_FORMS = re.compile(
+    r"\b(?:общество с ограниченной ответственностью|(?:публичное |непубличное |закрытое |открытое )?"
+    r"акционерное общество|индивидуальный предприниматель|автономная некоммерческая организация|"
+    r"ооо|оао|зао|пао|ао|ип|ано|нко|llc|ltd|inc|jsc)\b"
+)
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+@dataclass
+class CompanyRecord:
+    """One legal entity from the registry."""
+    
+    name: str
+    ogrn: Optional[str] = None
+    inn: Optional[str] = None
+    full_name: Optional[str] = None
+    director: Optional[str] = None
+    activity: Optional[str] = None
+    address: Optional[str] = None
+    status: Optional[str] = None
+    registered: Optional[str] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class RegistryMatch:
+    """A registry record and how it was matched (ogrn, inn, name or fuzzy)."""
+    
+    record: CompanyRecord
+    method: str
+    score: float = 1.0
+
+
+_COLUMNS = [f.name for f in fields(CompanyRecord)]
+
+
+def _inn_valid(inn: str) -> bool:
+    digits = [int(ch) for ch in inn]
+    
+    def check(weights: List[int]) -> int:
+        return sum(w * d for w, d in zip(weights, digits)) % 11 % 10
+    
+    if len(digits) == 10:
+        return check([2, 4, 10, 3, 5, 9, 4, 6, 8]) == digits[9]
+    if len(digits) == 12:
+        return (
+            check([7, 2, 4, 10, 3, 5, 9, 4, 6, 8]) == digits[10]
+            and check([3, 7, 2, 4, 10, 3, 5, 9, 4, 6, 8]) == digits[11]
+        )
+    return False
+
+
+def _ogrn_valid(ogrn: str) -> bool:
+    if len(ogrn) == 13:
+        return int(ogrn[:12]) % 11 % 10 == int(ogrn[12])
+    if len(ogrn) == 15:
+        return int(ogrn[:14]) % 13 % 10 == int(ogrn[14])
+    return False
+
+
+def extract_identifiers(text: str) -> Dict[str, List[str]]:
+    """
+    Find INN and OGRN numbers labelled as such in page text.
+    
+    Only numbers with a valid check digit are kept, so phone numbers and
+    order ids next to the label are not mistaken for identifiers.
+    
+    Returns:
+        Dict with ``inn`` and ``ogrn`` lists in order of appearance
+    """
+    found: Dict[str, List[str]] = {"inn": [], "ogrn": []}
+    for key, pattern, valid in (("inn", _INN, _inn_valid), ("ogrn", _OGRN, _ogrn_valid)):
+        for match in pattern.finditer(text):
+            value = match.group(1)
+            if valid(value) and value not in found[key]:
+                found[key].append(value)
+    return found
+
+
+def name_key(name: str) -> str:
+    """Company name reduced for matching: lower case, no quotes, punctuation or legal form."""
+    key = name.lower().replace("ё", "е")
+    key = _LEGAL_FORMS.sub(" ", key)
+    return _NON_WORD.sub(" ", key).strip()
+
+
+def format_record(record: CompanyRecord) -> str:
+    """Registry facts as short Russian text, used as research insights."""
+    lines = [
+        ("Полное наименование", record.full_name or record.name),
+        ("ОГРН", record.ogrn),
+        ("ИНН", record.inn),
+        ("Руководитель", record.director),
+        ("Основной вид деятельности", record.activity),
+        ("Адрес", record.address),
+        ("Статус", record.status),
+        ("Дата регистрации", record.registered),
+    ]
+    return "\n".join(f"{label}: {value}" for label, value in lines if value)
+
+
+class CompanyRegistry:
+    """Company records in a local SQLite database with a trigram name index."""
+    
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Database file, created if missing
+        """
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Shared by the event loop and ingest threads; guarded by our own lock
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._drop_unregistered_duplicates()
+            self._conn.executescript(SCHEMA)
+    
+    def _drop_unregistered_duplicates(self) -> None:
+        """Keep the latest of the records without an OGRN that repeated ingests duplicated before they had a key."""
+        exists = self._conn.execute(
+            "SELECT name FROM sqlite_master WHERE name IN ('companies', 'companies_unregistered')"
+        ).fetchall()
+        if [row["name"] for row in exists] != ["companies"]:
+            return
+        removed = self._conn.execute(
+            "DELETE FROM companies WHERE ogrn IS NULL AND id NOT IN"
+            " (SELECT MAX(id) FROM companies WHERE ogrn IS NULL GROUP BY COALESCE(inn, ''), name_key)"
+        ).rowcount
+        if removed:
+            logger.info(f"🧹 Removed {removed} duplicate registry records without an OGRN")
+    
+    def ingest(self, records: Iterable[CompanyRecord], batch_size: int = INGEST_BATCH_SIZE) -> int:
+        """
+        Insert or update records and rebuild the name index.
+        
+        Records are matched by OGRN, or by INN and normalized name when they
+        have no OGRN, so ingesting the same file again updates them in place.
+        
+        Args:
+            records: Records to store
+            batch_size: Records per transaction
+        
+        Returns:
+            Number of records written
+        """
+        update = ", ".join(f"{column} = excluded.{column}" for column in _COLUMNS + ["name_key"] if column != "ogrn")
+        sql = (
+            f"INSERT INTO companies ({', '.join(_COLUMNS)}, name_key)"
+            f" VALUES ({', '.join('?' * (len(_COLUMNS) + 1))})"
+            f" ON CONFLICT(ogrn) DO UPDATE SET {update}"
+            f" ON CONFLICT(COALESCE(inn, ''), name_key) WHERE ogrn IS NULL DO UPDATE SET {update}"
+        )
+        total = 0
+        batch: List[tuple] = []
+        
+        def flush():
+            with self._lock:
+                self._conn.execute("BEGIN")
+                try:
+                    self._conn.executemany(sql, batch)
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+                self._conn.execute("COMMIT")
+        
+        for record in records:
+            batch.append(tuple(getattr(record, column) for column in _COLUMNS) + (name_key(record.name),))
+            if len(batch) >= batch_size:
+                flush()
+                total += len(batch)
+                batch = []
+        if batch:
+            flush()
+            total += len(batch)
+        
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("INSERT INTO companies_fts(companies_fts) VALUES ('rebuild')")
+                self._conn.execute("DELETE FROM trigram_df")
+                self._conn.execute("INSERT INTO trigram_df SELECT term, doc FROM companies_vocab")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return total
+    
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM companies").fetchone()[0]
+    
+    def _select(self, where: str, params: tuple, limit: int = 2) -> List[CompanyRecord]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM companies WHERE {where} LIMIT {int(limit)}", params
+            ).fetchall()
+        return [CompanyRecord(**dict(row)) for row in rows]
+    
+    def _fuzzy(self, key: str) -> Optional[RegistryMatch]:
+        trigrams = list(dict.fromkeys(key[i:i + 3] for i in range(len(key) - 2)))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT term FROM trigram_df WHERE term IN ({', '.join('?' * len(trigrams))})"
+                " ORDER BY docs LIMIT ?",
+                (*trigrams, FUZZY_TRIGRAMS),
+            ).fetchall()
+            if not rows:
+                return None
+            query = " OR ".join('"' + row["term"].replace('"', '""') + '"' for row in rows)
+            rows = self._conn.execute(
+                "SELECT c.name_key, c.id FROM companies_fts f JOIN companies c ON c.id = f.rowid"
+                " WHERE companies_fts MATCH ? ORDER BY f.rank LIMIT ?",
+                (query, FUZZY_CANDIDATES),
+            ).fetchall()
+        
+        scored = sorted(
+            ((SequenceMatcher(None, key, row["name_key"]).ratio(), row["id"]) for row in rows),
+            reverse=True,
+        )
+        if not scored or scored[0][0] < FUZZY_MIN_SIMILARITY:
+            return None
+        if len(scored) > 1 and scored[1][0] == scored[0][0]:
+            return None
+        score, row_id = scored[0]
+        return RegistryMatch(self._select("id = ?", (row_id,))[0], "fuzzy", round(score, 3))
+    
+    def lookup(
+        self,
+        company_name: Optional[str] = None,
+        inn: Optional[str] = None,
+        ogrn: Optional[str] = None,
+    ) -> Optional[RegistryMatch]:
+        """
+        Find the company a page belongs to.
+        
+        Identifiers win over the name. A name that matches several companies
+        returns None rather than a guess.
+        
+        Args:
+            company_name: Company name from the page
+            inn: INN found on the page
+            ogrn: OGRN found on the page
+        
+        Returns:
+            RegistryMatch, or None if nothing matches unambiguously
+        """
+        if ogrn:
+            found = self._select("ogrn = ?", (ogrn,))
+            if found:
+                return RegistryMatch(found[0], "ogrn")
+        if inn:
+            found = self._select("inn = ?", (inn,))
+            if len(found) == 1:
+                return RegistryMatch(found[0], "inn")
+        
+        key = name_key(company_name or "")
+        if len(key) < 3:
+            return None
+        found = self._select("name_key = ?", (key,))
+        if len(found) == 1:
+            return RegistryMatch(found[0], "name")
+        if found:
+            logger.info(f"🔎 {len(found)}+ registry companies named '{company_name}', not guessing")
+            return None
+        return self._fuzzy(key)
+    
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# CSV header aliases: our field names and the EGRUL element/attribute names
+CSV_ALIASES = {
+    "name": ("name", "short_name", "НаимСокр", "Наименование"),
+    "ogrn": ("ogrn", "ОГРН"),
+    "inn": ("inn", "ИНН"),
+    "full_name": ("full_name", "НаимЮЛПолн", "ПолноеНаименование"),
+    "director": ("director", "Руководитель"),
+    "activity": ("activity", "okved", "НаимОКВЭД", "ОКВЭД"),
+    "address": ("address", "Адрес"),
+    "status": ("status", "Статус"),
+    "registered": ("registered", "ДатаОГРН", "ДатаРег"),
+}
+
+
+def iter_csv(stream: IO[str]) -> Iterator[CompanyRecord]:
+    """
+    Read records from a CSV export with a header row.
+    
+    The delimiter (comma, semicolon or tab) is detected from the header.
+    Columns are matched by ``CSV_ALIASES``; rows without a name are skipped.
+    """
+    header = stream.readline()
+    dialect = csv.Sniffer().sniff(header, delimiters=",;\t")
+    reader = csv.DictReader(stream, fieldnames=next(csv.reader([header], dialect)), dialect=dialect)
+    columns = {
+        field: next((alias for alias in aliases if alias in reader.fieldnames), None)
+        for field, aliases in CSV_ALIASES.items()
+    }
+    for row in reader:
+        values = {field: (row.get(column) or "").strip() or None for field, column in columns.items() if column}
+        if values.get("name") or values.get("full_name"):
+            values["name"] = values.get("name") or values["full_name"]
+            yield CompanyRecord(**values)
+
+
+def _attr(element: Any, path: str, name: str) -> Optional[str]:
+    found = element.find(path)
+    return found.get(name) if found is not None else None
+
+
+def _egrul_record(element: Any) -> Optional[CompanyRecord]:
+    full_name = _attr(element, "СвНаимЮЛ", "НаимЮЛПолн")
+    name = _attr(element, "СвНаимЮЛ/СвНаимЮЛСокр", "НаимСокр") or full_name
+    if not name:
+        return None
+    
+    director = None
+    person = element.find(".//СведДолжнФЛ")
+    if person is not None:
+        fio = " ".join(
+            part for part in (_attr(person, "СвФЛ", key) for key in ("Фамилия", "Имя", "Отчество")) if part
+        )
+        position = _attr(person, "СвДолжн", "НаимДолжн")
+        director = ", ".join(part for part in (fio.title(), (position or "").lower()) if part) or None
+    
+    activity = None
+    okved = element.find(".//СвОКВЭДОсн")
+    if okved is not None:
+        activity = f"{okved.get('НаимОКВЭД')} ({okved.get('КодОКВЭД')})"
+    
+    address = None
+    rf = element.find(".//АдресРФ")
+    if rf is not None:
+        parts = [_attr(rf, "Регион", "НаимРегион")]
+        for tag, kind in (("Город", "ТипГород"), ("Улица", "ТипУлица")):
+            name_part = _attr(rf, tag, f"Наим{tag}")
+            if name_part:
+                parts.append(f"{(_attr(rf, tag, kind) or '').lower()} {name_part}".strip())
+        if rf.get("Дом"):
+            parts.append(rf.get("Дом").lower())
+        address = ", ".join(part for part in parts if part) or None
+    
+    return CompanyRecord(
+        name=name,
+        ogrn=element.get("ОГРН"),
+        inn=element.get("ИНН"),
+        full_name=full_name,
+        director=director,
+        activity=activity,
+        address=address,
+        status="прекратило деятельность" if element.find("СвПрекрЮЛ") is not None else "действующее",
+        registered=element.get("ДатаОГРН"),
+    )
+
+
+def iter_egrul_xml(stream: IO[bytes]) -> Iterator[CompanyRecord]:
+    """Read legal entities (``СвЮЛ`` elements) from an EGRUL open data XML file."""
+    from xml.etree.ElementTree import iterparse
+    
+    for _, element in iterparse(stream, events=("end",)):
+        if element.tag == "СвЮЛ":
+            record = _egrul_record(element)
+            if record is not None:
+                yield record
+            # Keep memory flat on multi-gigabyte dumps
+            element.clear()
+
+
+def _iter_stream(name: str, stream: IO[bytes]) -> Iterator[CompanyRecord]:
+    if name.lower().endswith(".csv"):
+        yield from iter_csv(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    elif name.lower().endswith(".xml"):
+        yield from iter_egrul_xml(stream)
+
+
+def iter_dump(path: str) -> Iterator[CompanyRecord]:
+    """
+    Read records from a dump: an XML or CSV file, a directory of them, or a zip archive.
+    """
+    source = Path(path)
+    if source.is_dir():
+        for child in sorted(source.iterdir()):
+            yield from iter_dump(str(child))
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for member in archive.namelist():
+                with archive.open(member) as stream:
+                    yield from _iter_stream(member, stream)
+    else:
+        with open(source, "rb") as stream:
+            yield from _iter_stream(source.name, stream)
+
+
+def main(args=None) -> int:
+    from ..config import settings
+    
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--db", default=None, help="Database file (default: ADLOOK_COMPANY_REGISTRY)")
+    
+    parser = argparse.ArgumentParser(prog="backend.app.services.company_registry", description="Manage the company registry")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", parents=[common], help="Load EGRUL XML / CSV dumps (files, directories or zip archives)")
+    ingest.add_argument("paths", nargs="+")
+    lookup = commands.add_parser("lookup", parents=[common], help="Look up a company by name, --inn or --ogrn")
+    lookup.add_argument("name", nargs="?")
+    lookup.add_argument("--inn")
+    lookup.add_argument("--ogrn")
+    parsed = parser.parse_args(args)
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    
+    path = parsed.db or settings.ADLOOK_COMPANY_REGISTRY
+    if not path:
+        parser.error("set ADLOOK_COMPANY_REGISTRY or pass --db")
+    registry = CompanyRegistry(path)
+    
+    try:
+        if parsed.command == "ingest":
+            for source in parsed.paths:
+                start = time.perf_counter()
+                written = registry.ingest(iter_dump(source))
+                logger.info(f"✅ {source}: {written} records in {time.perf_counter() - start:.1f}s")
+            logger.info(f"📚 Registry {path} holds {registry.count()} companies")
+        else:
+            start = time.perf_counter()
+            match = registry.lookup(parsed.name, inn=parsed.inn, ogrn=parsed.ogrn)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if match is None:
+                print(f"Not found ({elapsed_ms:.2f} ms)")
+                return 1
+            print(f"Matched by {match.method} (score {match.score}, {elapsed_ms:.2f} ms)")
+            print(format_record(match.record))
+    finally:
+        registry.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
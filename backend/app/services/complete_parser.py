@@ -1,15 +1,290 @@
+import asyncio
 import logging
 import json
-import base64
 import re
-from typing import Dict, List, Optional, Tuple
-from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
-from openai import OpenAI
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
 from ..config import settings
+from ..instrumentation import span, instrument, record_llm_usage
+from .browser import browser_session, new_page
+from .zone_detector import ZoneDetection, extract_layout, detect_zones, detect_language as detect_language_from_layout
+from .language import LanguageGuess, detect_language
+from .navigation import navigate
+from .page_fingerprint import PageFingerprint
+from .screenshot import Screenshot, in_image_thread
+from .vision_regions import plan_vision_regions
+from .deadline import DeadlineExceeded, run_with_deadline, timeout_ms, with_deadline
+from .company_registry import CompanyRegistry, RegistryMatch, extract_identifiers, format_record
+from .vision_cascade import (
+    ACCEPTED, ERROR, INVALID, VisionTier, judge, parse_tiers, record_call, result_confidence, validate_result
+)
+from .adtech import RequestRecorder, fingerprint
+from .proposal_generator import build_segment_requests, render_proposal
 
 logger = logging.getLogger(__name__)
 
+VISION_MODEL = 'gpt-4o'
+RESEARCH_MODEL = 'gpt-4o-mini'
+
+
+def build_vision_request(
+    url: str,
+    screenshot: Union[Screenshot, str],
+    model: str = VISION_MODEL,
+    detail: str = 'high',
+    layout: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Chat completion request body for the vision zone analysis.
+    
+    A ``Screenshot`` is sent scaled to the size the model sees at ``detail``.
+    With the page ``layout`` and ADLOOK_VISION_REGIONS on, labelled crops of
+    the header, sidebars, first content screen and footer are sent instead
+    when they cost no more image tokens (see ``vision_regions``). A string
+    is used as the image URL as it is.
+    """
+    images: List[Tuple[Optional[str], str]] = [(None, screenshot)]
+    if isinstance(screenshot, Screenshot):
+        with span('screenshot.encode', detail=detail) as encode_span:
+            regions = plan_vision_regions(layout, screenshot.size, detail) if settings.ADLOOK_VISION_REGIONS else []
+            images = []
+            if regions:
+                try:
+                    crops = screenshot.crop([(region.box, region.output_size) for region in regions])
+                    images = [(region.label, crop.data_url()) for region, crop in zip(regions, crops)]
+                except ImportError:
+                    logger.debug('Pillow is not installed, sending the full screenshot')
+            if not images:
+                images = [(None, screenshot.for_vision(detail).data_url())]
+            encode_span.set(images=len(images))
+    
+    content = [{'type': 'text', 'text': _vision_prompt(url, regions=len(images) if images[0][0] else 0)}]
+    for label, image_url in images:
+        if label:
+            content.append({'type': 'text', 'text': f'Фрагмент: {label}'})
+        content.append({'type': 'image_url', 'image_url': {'url': image_url, 'detail': detail}})
+    
+    return {
+        'model': model,  # Must support vision
+        'messages': [{'role': 'user', 'content': content}],
+        'response_format': {'type': 'json_object'},
+        'max_tokens': 2000
+    }
+
+
+def _vision_prompt(url: str, regions: int = 0) -> str:
+    if regions:
+        subject = (
+            f'Вместо всего скриншота сайта {url} прислано {regions} фрагментов страницы, каждый с подписью; '
+            f'середина длинной страницы не показана. По этим фрагментам определи рекламные возможности.'
+        )
+    else:
+        subject = f'Проанализируй скриншот сайта {url} и определи рекламные возможности.'
+    return f'''{subject}
+
+Визуально оцени где можно разместить рекламу:
+1. Header (шапка сайта, навигация)
+2. Sidebar (боковая панель справа или слева)  
+3. Content (внутри контента, между блоками)
+4. Footer (подвал сайта)
+5. Popup (модальные окна)
+
+Для каждой зоны укажи:
+- name: название зоны
+- available: true если место свободно, false если уже занято рекламой
+- size: рекомендуемый размер баннера (например "728x90", "300x250")
+- priority: "high" для самых заметных мест, "medium" для менее заметных
+- description: подробное описание где именно находится зона и почему она подходит
+- confidence: число от 0 до 1 — насколько ты уверен в оценке этой зоны
+
+ВАЖНО: Реально оценивай - есть ли свободное место или всё уже занято.
+Если деталей на изображении не хватает для уверенной оценки - честно снизь confidence.
+
+Верни JSON:
+{{
+  "zones": [
+    {{
+      "name": "Header",
+      "available": true,
+      "size": "728x90",
+      "priority": "high",
+      "description": "...",
+      "confidence": 0.9
+    }}
+  ],
+  "language": "ru" or "en" (определи язык сайта),
+  "confidence": 0.9
+}}'''
+
+
+def build_research_request(company_name: str, website_url: str) -> Dict[str, Any]:
+    """Chat completion request body for the company owner research."""
+    prompt = f'''Найди информацию о компании "{company_name}" (сайт: {website_url}).
+
+Используя общедоступную информацию, найди:
+1. Полное название компании и юридическая форма (ООО, ИП и т.д.)
+2. Имя руководителя/директора (если доступно)
+3. Основная деятельность компании
+4. Интересные факты или достижения
+
+Если информации нет - честно напиши что не найдено.
+
+Верни короткий отчёт (3-5 предложений) на русском языке.'''
+    return {
+        'model': RESEARCH_MODEL,
+        'messages': [{'role': 'user', 'content': prompt}],
+        'max_tokens': 500
+    }
+
+
+
+def build_registry_summary_request(match: RegistryMatch, website_url: str) -> Dict[str, Any]:
+    """Chat completion request body summarizing a company registry record."""
+    prompt = f'''Сведения из ЕГРЮЛ о компании, которой принадлежит сайт {website_url}:
+
+{format_record(match.record)}
+
+Составь короткий отчёт (3-5 предложений) на русском языке: полное название и юридическая форма,
+руководитель, основная деятельность, как давно компания работает.
+Используй только эти сведения, ничего не добавляй от себя.'''
+    return {
+        'model': RESEARCH_MODEL,
+        'messages': [{'role': 'user', 'content': prompt}],
+        'max_tokens': 300
+    }
+
+
+def research_result(base: Dict[str, Any], content: Optional[str] = None, error: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Combine a planned research result with the model's answer.
+    
+    Args:
+        base: Result from ``research_request``
+        content: Model answer, if the call succeeded
+        error: Error of a failed call
+    
+    Returns:
+        Research result; registry facts are kept when the summary failed
+    """
+    if content is not None:
+        return {**base, 'insights': content}
+    if 'registry' in base:
+        return base
+    return {'insights': f'Ошибка при поиске информации: {error}'}
+
+def _detect_page_language(soup: Any) -> LanguageGuess:
+    html_tag = soup.find('html')
+    meta_languages = [
+        tag.get('content') for tag in soup.find_all('meta')
+        if (tag.get('http-equiv') or '').lower() == 'content-language'
+        or (tag.get('name') or '').lower() == 'language'
+        or tag.get('property') == 'og:locale'
+    ]
+    # Script and style text would be read as English
+    for tag in soup(['script', 'style', 'noscript', 'template']):
+        tag.decompose()
+    return detect_language(
+        html_lang=html_tag.get('lang') if html_tag else None,
+        meta_languages=meta_languages,
+        text=soup.get_text('\n'),
+        default=None,
+    )
+
+
+def parse_website_html(html: str) -> Dict[str, Any]:
+    """
+    Extract emails, company name, title, description and language from a page.
+    
+    Returns:
+        Dict with emails, company_name, inn, ogrn, title, description,
+        language (None when the page gives no evidence) and language_source
+    """
+    with span('html.parse', bytes=len(html)):
+        from bs4 import BeautifulSoup
+        
+        soup = BeautifulSoup(html, 'html.parser')
+    
+    # Extract emails
+    emails = []
+    email_regex = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
+    
+    # Search in text content
+    text = soup.get_text()
+    found_emails = re.findall(email_regex, text)
+    emails.extend(found_emails)
+    
+    # Search in mailto links
+    for link in soup.find_all('a', href=lambda x: x and x.startswith('mailto:')):
+        email = link['href'].replace('mailto:', '')
+        emails.append(email)
+    
+    # Extract company name
+    company_name = None
+    
+    # Try meta tags
+    company_name = (
+        soup.find('meta', property='og:site_name') or
+        soup.find('meta', attrs={'name': 'author'})
+    )
+    if company_name:
+        company_name = company_name.get('content')
+    else:
+        # Try title
+        title_tag = soup.find('title')
+        if title_tag:
+            company_name = title_tag.get_text().split('|')[0].strip()
+    
+    # Try footer for Russian company formats
+    if not company_name:
+        footer_text = soup.find('footer')
+        if footer_text:
+            footer_content = footer_text.get_text()
+            match = re.search(r'(ООО|ИП|АО|ЗАО|ПАО)\s+["«]?([^"»\n]+)["»]?', footer_content)
+            if match:
+                company_name = match.group(0)
+    
+    # Clean and deduplicate emails
+    unique_emails = list(set(email.strip() for email in emails if email and '@' in email))
+    
+    # INN / OGRN, usually in the footer, identify the company in the registry
+    identifiers = extract_identifiers(text)
+    
+    result = {
+        'emails': unique_emails,
+        'company_name': company_name,
+        'inn': next(iter(identifiers['inn']), None),
+        'ogrn': next(iter(identifiers['ogrn']), None),
+        'title': soup.find('title').get_text() if soup.find('title') else None,
+        'description': soup.find('meta', attrs={'name': 'description'}).get('content') if soup.find('meta', attrs={'name': 'description'}) else None
+    }
+    
+    with span('language.detect'):
+        guess = _detect_page_language(soup)
+    result['language'] = guess.language
+    result['language_source'] = guess.source
+    
+    return result
+
+
+VIEWPORT = {'width': 1920, 'height': 1080}
+
+# Monitoring re-checks wait for the load event only, not network idle
+MONITOR_NAVIGATION_TIMEOUT = 15000
+
+
+@dataclass
+class PageCapture:
+    """What one page load produces: the screenshot, the layout and HTML of the rendered DOM and the request URLs."""
+    
+    screenshot: Screenshot
+    layout: Optional[Dict[str, Any]] = None
+    requests: List[str] = field(default_factory=list)
+    html: Optional[str] = None
+    # Set when the page did not finish loading in time and was captured as far as it rendered
+    partial: bool = False
+
 
 class CompleteWebsiteParser:
     """
@@ -23,60 +298,244 @@ class CompleteWebsiteParser:
     """
     
     def __init__(self):
-        self.openai_client = OpenAI(api_key=settings.OPENAI_API_KEY) if settings.OPENAI_API_KEY else None
+        self._openai_client = None
+        self._company_registry = None
+    
+    @property
+    def openai_client(self):
+        """Async OpenAI client, created (and the SDK imported) on first use."""
+        if self._openai_client is None and settings.OPENAI_API_KEY:
+            from openai import AsyncOpenAI
+            
+            self._openai_client = AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=settings.OPENAI_BASE_URL
+            )
+        return self._openai_client
+    
+    @property
+    def company_registry(self) -> Optional[CompanyRegistry]:
+        """Company registry from ADLOOK_COMPANY_REGISTRY, opened on first use; None if not configured."""
+        if self._company_registry is None and settings.ADLOOK_COMPANY_REGISTRY:
+            path = settings.ADLOOK_COMPANY_REGISTRY
+            if Path(path).exists():
+                self._company_registry = CompanyRegistry(path)
+            else:
+                logger.warning(f'⚠️ Company registry {path} does not exist, research falls back to the model')
+        return self._company_registry
+    
+    def lookup_company(self, company_name: Optional[str], inn: Optional[str] = None, ogrn: Optional[str] = None) -> Optional[RegistryMatch]:
+        """Find the company in the registry by OGRN, INN or name."""
+        with span('registry.lookup') as lookup_span:
+            match = self.company_registry.lookup(company_name, inn=inn, ogrn=ogrn)
+            lookup_span.set(method=match.method if match else 'none')
+        return match
+    
+    def research_request(
+        self,
+        company_name: Optional[str],
+        website_url: str,
+        inn: Optional[str] = None,
+        ogrn: Optional[str] = None,
+    ) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Plan the company research.
+        
+        With a registry configured, the model is only asked to summarize the
+        matching record; without a match there is nothing to research.
+        
+        Returns:
+            Tuple of (chat completion request or None, result to use when
+            there is no request or its call fails)
+        """
+        if self.company_registry is not None:
+            match = self.lookup_company(company_name, inn=inn, ogrn=ogrn)
+            if match is None:
+                return None, {'insights': 'Компания не найдена в реестре', 'source': 'registry'}
+            
+            logger.info(f'📚 Registry match by {match.method}: {match.record.name} ({match.record.ogrn})')
+            base = {
+                'insights': format_record(match.record),
+                'source': 'registry',
+                'registry': match.record.to_dict(),
+                'match': match.method,
+            }
+            return build_registry_summary_request(match, website_url), base
+        
+        if not company_name:
+            return None, {'insights': 'Информация о компании не найдена'}
+        return build_research_request(company_name, website_url), {'insights': ''}
     
-    async def capture_screenshot(self, url: str) -> Tuple[Optional[str], bool, Optional[str]]:
+    async def capture_screenshot(self, url: str) -> Tuple[Optional[Screenshot], bool, Optional[str]]:
         """
         Capture website screenshot using Playwright.
         
         Returns:
-            Tuple of (base64_screenshot, success, error_message)
+            Tuple of (screenshot, success, error_message)
+        """
+        capture, success, error = await self.capture_page(url)
+        return (capture.screenshot if capture else None), success, error
+    
+    @instrument('stage.screenshot')
+    async def capture_page(self, url: str) -> Tuple[Optional[PageCapture], bool, Optional[str]]:
+        """
+        Load the page once and capture the screenshot plus the DOM layout
+        used by the rule-based zone detector.
+        
+        Returns:
+            Tuple of (page_capture, success, error_message)
         """
         logger.info(f'📸 Capturing screenshot for: {url}')
         
         try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(
-                    headless=True,
-                    args=['--no-sandbox', '--disable-setuid-sandbox']
-                )
+            async with browser_session(args=['--no-sandbox', '--disable-setuid-sandbox']) as browser:
+                page = await new_page(browser, viewport=VIEWPORT)
                 
-                page = await browser.new_page(
-                    viewport={'width': 1920, 'height': 1080}
-                )
+                recorder = RequestRecorder().attach(page)
                 
-                # Navigate with timeout
-                await page.goto(url, {
-                    'wait_until': 'networkidle',
-                    'timeout': 30000
-                })
+                # Wait condition and timeout learned from earlier loads of the domain
+                navigation = await navigate(page, url)
                 
-                # Take screenshot
-                screenshot = await page.screenshot(
-                    full_page=True,
-                    type='png'
-                )
+                with span('page.layout'):
+                    layout = await extract_layout(page)
                 
-                logger.info('✅ Screenshot captured')
+                # Kept for scraping, so the page does not have to be loaded twice
+                with span('page.content'):
+                    html = await page.content()
                 
-                # Convert to base64 for OpenAI
-                base64_screenshot = base64.b64encode(screenshot).decode('utf-8')
-                screenshot_data_url = f'data:image/png;base64,{base64_screenshot}'
+                # Take screenshot
+                with span('page.screenshot'):
+                    screenshot = await page.screenshot(
+                        full_page=True,
+                        type='png'
+                    )
                 
-                await browser.close()
+                logger.info(f'✅ Screenshot captured ({len(screenshot)} bytes)')
                 
-                return screenshot_data_url, True, None
+                await browser.close()
                 
+                # Kept as PNG bytes; base64 is only produced for the vision request and the response
+                return PageCapture(
+                    screenshot=Screenshot(screenshot),
+                    layout=layout,
+                    requests=recorder.urls,
+                    html=html,
+                    partial=navigation.partial,
+                ), True, None
+        
         except Exception as error:
             logger.error(f'❌ Screenshot error: {error}')
             return None, False, f'Не удалось создать скриншот: {str(error)}'
     
-    async def analyze_screenshot_for_ads(self, url: str, screenshot_data_url: str) -> Tuple[Optional[Dict], bool, Optional[str]]:
+    @instrument('stage.fingerprint')
+    async def capture_fingerprint(self, browser: Any, url: str) -> Tuple[Optional[PageFingerprint], bool, Optional[str]]:
+        """
+        Cheap re-check of a page: load it in an already running browser and
+        fingerprint the viewport screenshot and DOM layout.
+        
+        Args:
+            browser: Browser from ``browser_session``, shared between checks
+            url: Website URL
+        
+        Returns:
+            Tuple of (fingerprint, success, error_message)
+        """
+        try:
+            page = await new_page(browser, viewport=VIEWPORT)
+            try:
+                with span('page.navigation'):
+                    await page.goto(url, wait_until='load', timeout=timeout_ms(MONITOR_NAVIGATION_TIMEOUT))
+                with span('page.layout'):
+                    layout = await extract_layout(page)
+                with span('page.screenshot'):
+                    screenshot = await page.screenshot(type='png')
+            finally:
+                await page.close()
+            return PageFingerprint.from_capture(screenshot, layout), True, None
+        
+        except Exception as error:
+            logger.error(f'❌ Fingerprint error for {url}: {error}')
+            return None, False, str(error)
+    
+    def detect_zones_from_layout(self, layout: Dict[str, Any]) -> Tuple[Optional[Dict], ZoneDetection]:
+        """
+        Rule-based zone detection without the vision model.
+        
+        Returns:
+            Tuple of (zone result with ``source`` ``"dom"`` or None when the
+            detection is below ADLOOK_ZONE_CONFIDENCE_THRESHOLD and vision is
+            needed, the detection itself)
+        """
+        with span('zones.dom') as dom_span:
+            detection = detect_zones(layout)
+            dom_span.set(confidence=detection.confidence)
+        
+        if detection.confidence >= settings.ADLOOK_ZONE_CONFIDENCE_THRESHOLD:
+            logger.info(f'✅ Zones detected from DOM (confidence {detection.confidence:.2f}), skipping vision call')
+            return detection.to_result(), detection
+        
+        logger.info(f'🔍 DOM zone confidence {detection.confidence:.2f} is below threshold, using vision')
+        return None, detection
+    
+    async def analyze_zones(
+        self,
+        url: str,
+        screenshot: Union[Screenshot, str],
+        layout: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Optional[Dict], bool, Optional[str]]:
+        """
+        Find ad zones from the DOM layout, asking the vision model only when
+        the rule-based detection is not confident enough.
+        
+        Returns:
+            Tuple of (analysis_result, success, error_message); the result's
+            ``source`` is ``"dom"`` or ``"vision"``
+        """
+        detection = None
+        if layout:
+            result, detection = self.detect_zones_from_layout(layout)
+            if result is not None:
+                return result, True, None
+        
+        result, success, error = await self.analyze_screenshot_for_ads(url, screenshot, detection, layout)
+        if success:
+            result['source'] = 'vision'
+        return result, success, error
+    
+    async def _vision_tier(
+        self,
+        url: str,
+        screenshot: Union[Screenshot, str],
+        tier: VisionTier,
+        layout: Optional[Dict[str, Any]] = None
+    ) -> Dict:
+        # Scaling and encoding a full-page PNG takes a while; keep it off the event loop
+        request = await in_image_thread(build_vision_request, url, screenshot, tier.model, tier.detail, layout)
+        with span(f'llm.vision.{tier.name}', model=tier.model) as llm_span:
+            response = await self.openai_client.chat.completions.create(**with_deadline(request))
+            record_llm_usage(llm_span, response)
+        return json.loads(response.choices[0].message.content)
+    
+    @instrument('stage.vision')
+    async def analyze_screenshot_for_ads(
+        self,
+        url: str,
+        screenshot: Union[Screenshot, str],
+        dom_detection: Optional[ZoneDetection] = None,
+        layout: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Optional[Dict], bool, Optional[str]]:
         """
         Analyze screenshot using OpenAI Vision API to identify ad placement opportunities.
         
+        Runs the ADLOOK_VISION_TIERS cascade: each tier's answer is used if it
+        is valid, confident enough and agrees with ``dom_detection``;
+        otherwise the next (more expensive) tier is asked. With the page
+        ``layout``, tiers may get crops of the page regions instead of the
+        full screenshot (see ``build_vision_request``).
+        
         Returns:
-            Tuple of (analysis_result, success, error_message)
+            Tuple of (analysis_result, success, error_message); the result's
+            ``vision_tier`` names the tier that produced it
         """
         logger.info('🤖 Analyzing screenshot with OpenAI Vision...')
         
@@ -84,289 +543,235 @@ class CompleteWebsiteParser:
             return None, False, 'OpenAI API key is not configured'
         
         try:
-            # Remove data URL prefix for API call
-            base64_image = screenshot_data_url.split(',')[1]
+            tiers = parse_tiers(settings.ADLOOK_VISION_TIERS)
+        except ValueError as error:
+            return None, False, str(error)
+        
+        fallback: Optional[Dict] = None
+        last_error = None
+        for index, tier in enumerate(tiers):
+            final = index == len(tiers) - 1
+            start = time.perf_counter()
+            try:
+                result = await self._vision_tier(url, screenshot, tier, layout)
+            except Exception as error:
+                record_call(tier, ERROR, time.perf_counter() - start)
+                logger.error(f'❌ Vision analysis error ({tier.name}): {error}')
+                last_error = error
+                continue
             
-            response = self.openai_client.chat.completions.create(
-                model='gpt-4o',  # Supports vision
-                messages=[{
-                    'role': 'user',
-                    'content': [
-                        {
-                            'type': 'text',
-                            'text': f'''Проанализируй скриншот сайта {url} и определи рекламные возможности.
-
-Визуально оцени где можно разместить рекламу:
-1. Header (шапка сайта, навигация)
-2. Sidebar (боковая панель справа или слева)  
-3. Content (внутри контента, между блоками)
-4. Footer (подвал сайта)
-5. Popup (модальные окна)
-
-Для каждой зоны укажи:
-- name: название зоны
-- available: true если место свободно, false если уже занято рекламой
-- size: рекомендуемый размер баннера (например "728x90", "300x250")
-- priority: "high" для самых заметных мест, "medium" для менее заметных
-- description: подробное описание где именно находится зона и почему она подходит
-
-ВАЖНО: Реально оценивай - есть ли свободное место или всё уже занято.
-
-Верни JSON:
-{{
-  "zones": [
-    {{
-      "name": "Header",
-      "available": true,
-      "size": "728x90",
-      "priority": "high",
-      "description": "..."
-    }}
-  ],
-  "language": "ru" or "en" (определи язык сайта)
-}}'''
-                        },
-                        {
-                            'type': 'image_url',
-                            'image_url': {
-                                'url': screenshot_data_url,
-                                'detail': 'high'
-                            }
-                        }
-                    ]
-                }],
-                response_format={'type': 'json_object'},
-                max_tokens=2000
-            )
+            outcome = judge(result, dom_detection, 0.0 if final else settings.ADLOOK_VISION_ACCEPT_CONFIDENCE)
+            record_call(tier, outcome, time.perf_counter() - start)
             
-            result = json.loads(response.choices[0].message.content)
-            logger.info('✅ Vision analysis complete')
-            return result, True, None
+            if outcome == INVALID:
+                last_error = f'invalid answer: {validate_result(result)}'
+                logger.warning(f'⚠️ Vision tier {tier.name} returned an {last_error}')
+                continue
             
-        except Exception as error:
-            logger.error(f'❌ Vision analysis error: {error}')
-            return None, False, f'OpenAI Vision API error: {str(error)}'
+            result['vision_tier'] = tier.name
+            if outcome == ACCEPTED:
+                logger.info(f'✅ Vision analysis complete ({tier.name})')
+                return result, True, None
+            
+            logger.info(f'🔼 Vision tier {tier.name} escalating: {outcome} (confidence {result_confidence(result):.2f})')
+            fallback = result
+        
+        if fallback is not None:
+            logger.info(f'✅ Vision analysis complete, using the uncertain {fallback["vision_tier"]} answer')
+            return fallback, True, None
+        return None, False, f'OpenAI Vision API error: {str(last_error)}'
     
-    async def scrape_website_data(self, url: str) -> Dict:
+    @instrument('stage.scrape')
+    async def scrape_website_data(self, url: str, html: Optional[str] = None) -> Dict:
         """
         Scrape website for emails and company information.
         
+        Args:
+            url: Website URL
+            html: Rendered HTML from ``capture_page``; the page is only loaded
+                  again when it is not given
+        
         Returns:
-            Dict with emails, company_name, title, description
+            Dict with emails, company_name, title, description and the
+            locally detected language
         """
         logger.info('🔍 Scraping website data...')
         
         try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(
-                    headless=True,
-                    args=['--no-sandbox', '--disable-setuid-sandbox']
-                )
-                
-                page = await browser.new_page()
-                await page.goto(url, {
-                    'wait_until': 'networkidle',
-                    'timeout': 30000
-                })
-                
-                html_content = await page.content()
-                await browser.close()
-                
-                soup = BeautifulSoup(html_content, 'html.parser')
-                
-                # Extract emails
-                emails = []
-                email_regex = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-                
-                # Search in text content
-                text = soup.get_text()
-                found_emails = re.findall(email_regex, text)
-                emails.extend(found_emails)
-                
-                # Search in mailto links
-                for link in soup.find_all('a', href=lambda x: x and x.startswith('mailto:')):
-                    email = link['href'].replace('mailto:', '')
-                    emails.append(email)
-                
-                # Extract company name
-                company_name = None
-                
-                # Try meta tags
-                company_name = (
-                    soup.find('meta', property='og:site_name') or
-                    soup.find('meta', attrs={'name': 'author'})
-                )
-                if company_name:
-                    company_name = company_name.get('content')
-                else:
-                    # Try title
-                    title_tag = soup.find('title')
-                    if title_tag:
-                        company_name = title_tag.get_text().split('|')[0].strip()
-                
-                # Try footer for Russian company formats
-                if not company_name:
-                    footer_text = soup.find('footer')
-                    if footer_text:
-                        footer_content = footer_text.get_text()
-                        match = re.search(r'(ООО|ИП|АО|ЗАО|ПАО)\s+["«]?([^"»\n]+)["»]?', footer_content)
-                        if match:
-                            company_name = match.group(0)
-                
-                # Clean and deduplicate emails
-                unique_emails = list(set(email.strip() for email in emails if email and '@' in email))
-                
-                result = {
-                    'emails': unique_emails,
-                    'company_name': company_name,
-                    'title': soup.find('title').get_text() if soup.find('title') else None,
-                    'description': soup.find('meta', attrs={'name': 'description'}).get('content') if soup.find('meta', attrs={'name': 'description'}) else None
-                }
-                
-                logger.info(f'✅ Found {len(unique_emails)} emails, company: {company_name}')
-                return result
-                
+            if html is None:
+                async with browser_session(args=['--no-sandbox', '--disable-setuid-sandbox']) as browser:
+                    page = await new_page(browser)
+                    await navigate(page, url)
+                    
+                    html = await page.content()
+                    await browser.close()
+            
+            result = parse_website_html(html)
+            logger.info(f'✅ Found {len(result["emails"])} emails, company: {result["company_name"]}, language: {result["language"]}')
+            return result
+        
         except Exception as error:
             logger.error(f'❌ Scraping error: {error}')
-            return {'emails': [], 'company_name': None, 'title': None, 'description': None}
+            return {'emails': [], 'company_name': None, 'title': None, 'description': None, 'language': None}
     
-    async def research_company_owner(self, company_name: str, website_url: str) -> Dict:
+    @instrument('stage.research')
+    async def research_company_owner(
+        self,
+        company_name: Optional[str],
+        website_url: str,
+        inn: Optional[str] = None,
+        ogrn: Optional[str] = None,
+    ) -> Dict:
         """
-        Research company information using OpenAI.
+        Research company information.
+        
+        Uses the local company registry when ADLOOK_COMPANY_REGISTRY is set
+        (the model only summarizes the record found), otherwise asks OpenAI.
         
         Returns:
-            Dict with insights about the company
+            Dict with insights about the company, plus the registry record
+            and match method when it came from the registry
         """
         logger.info('🔎 Researching company owner...')
         
-        if not company_name:
-            return {'insights': 'Информация о компании не найдена'}
+        request, result = self.research_request(company_name, website_url, inn=inn, ogrn=ogrn)
+        if request is None:
+            return result
         
         if not self.openai_client:
-            return {'insights': 'OpenAI API key is not configured'}
+            return result if 'registry' in result else {'insights': 'OpenAI API key is not configured'}
         
         try:
-            prompt = f'''Найди информацию о компании "{company_name}" (сайт: {website_url}).
-
-Используя общедоступную информацию, найди:
-1. Полное название компании и юридическая форма (ООО, ИП и т.д.)
-2. Имя руководителя/директора (если доступно)
-3. Основная деятельность компании
-4. Интересные факты или достижения
-
-Если информации нет - честно напиши что не найдено.
-
-Верни короткий отчёт (3-5 предложений) на русском языке.'''
+            with span('llm.research', model=request['model']) as llm_span:
+                response = await self.openai_client.chat.completions.create(**with_deadline(request))
+                record_llm_usage(llm_span, response)
             
-            response = self.openai_client.chat.completions.create(
-                model='gpt-4o-mini',
-                messages=[{'role': 'user', 'content': prompt}],
-                max_tokens=500
-            )
-            
-            insights = response.choices[0].message.content
             logger.info('✅ Research complete')
-            return {'insights': insights}
-            
+            return research_result(result, content=response.choices[0].message.content)
+        
         except Exception as error:
             logger.error(f'❌ Research error: {error}')
-            return {'insights': f'Ошибка при поиске информации: {str(error)}'}
+            return research_result(result, error=str(error))
+    
+    async def _generate_segment(self, segment: str, request: Dict[str, Any]) -> Optional[str]:
+        """Run one personalized-segment completion; None on failure."""
+        try:
+            with span(f'llm.proposal.{segment}', model=request['model']) as llm_span:
+                response = await self.openai_client.chat.completions.create(**with_deadline(request))
+                record_llm_usage(llm_span, response)
+            return response.choices[0].message.content
+        except Exception as error:
+            logger.warning(f'⚠️ Proposal {segment} generation failed, using template default: {error}')
+            return None
+    
+    @instrument('stage.proposal')
+    async def generate_proposal_segments(self, data: Dict) -> Dict[str, Optional[str]]:
+        """
+        Write the personalized proposal segments (greeting and compliment) concurrently.
+        
+        The segments only need the language, company and research, not the
+        zones, so they can be generated while the zone analysis is running.
+        
+        Args:
+            data: Dict containing website_url, language, company_name, owner_info
+                  and optionally title and description
+        
+        Returns:
+            Mapping of segment name to text (None for segments that failed)
+        """
+        if not self.openai_client:
+            logger.warning('⚠️ OpenAI API key is not configured, using template defaults')
+            return {}
+        
+        requests = build_segment_requests(data)
+        texts = await asyncio.gather(*(
+            self._generate_segment(segment, request) for segment, request in requests.items()
+        ))
+        return dict(zip(requests, texts))
     
     async def generate_personalized_proposal(self, data: Dict) -> str:
         """
         Generate personalized commercial proposal.
         
+        The proposal body is rendered from precompiled templates; only the
+        greeting and the compliment are written by the LLM, concurrently.
+        Segments that cannot be generated fall back to template defaults.
+        
         Args:
             data: Dict containing website_url, zones, language, company_name, owner_info, emails
-            
+                  and optionally title, description and adtech
+        
         Returns:
             Generated proposal text
         """
         logger.info('✍️ Generating personalized proposal...')
+        segments = await self.generate_proposal_segments(data)
+        proposal = render_proposal(data, segments)
+        logger.info('✅ Proposal generated')
+        return proposal
+    
+    async def _text_pipeline(self, url: str, capture: PageCapture) -> Tuple[Dict, Dict, Dict[str, Optional[str]]]:
+        """
+        Scraping, research and proposal segments for a captured page.
         
-        if not self.openai_client:
-            return 'OpenAI API key is not configured. Please set OPENAI_API_KEY environment variable.'
+        Runs alongside the zone analysis: the language comes from the page
+        itself, so none of these steps waits for the vision model.
         
-        try:
-            website_url = data['website_url']
-            zones = data['zones']
-            language = data['language']
-            company_name = data.get('company_name')
-            owner_info = data.get('owner_info', {})
-            emails = data.get('emails', [])
-            
-            # Determine template language
-            is_english = language == 'en'
-            
-            available_zones = [z for z in zones if z.get('available')]
-            zones_description = '\n'.join([
-                f"{i+1}. {zone['name']} — {zone['description']}"
-                for i, zone in enumerate(available_zones)
-            ])
-            
-            if is_english:
-                prompt = f'''Generate a personalized commercial proposal in ENGLISH for advertising placement.
-                
-Website: {website_url}
-Company: {company_name or 'Website owner'}
-Owner info: {owner_info.get('insights', 'Not available')}
-Available ad zones: 
-{zones_description}
-
-Write a professional email following this structure:
-1. Greeting (personalized if owner name available)
-2. Compliment about their website/content
-3. Brief about Adlook company
-4. List of advertising opportunities
-5. Call to action
-
-Be professional and persuasive. Full email in English.'''
-            else:
-                prompt = f'''Сгенерируй персонализированное коммерческое предложение на РУССКОМ языке.
-
-Сайт: {website_url}
-Компания: {company_name or 'Владелец сайта'}
-Информация о владельце: {owner_info.get('insights', 'Не найдена')}
-Доступные рекламные места:
-{zones_description}
-
-Напиши профессиональное письмо по структуре:
-1. Приветствие (персонализированное если есть имя)
-2. Комплимент про их сайт/контент (конкретный, основанный на информации)
-3. Кратко про компанию Adlook
-4. Список рекламных возможностей
-5. Призыв к действию
-
-Используй шаблон из примера Adlook. Без звёздочек (*). Профессиональный тон.'''
-            
-            response = self.openai_client.chat.completions.create(
-                model='gpt-4o-mini',
-                messages=[{'role': 'user', 'content': prompt}],
-                max_tokens=1500,
-                temperature=0.7
-            )
-            
-            proposal = response.choices[0].message.content
-            logger.info('✅ Proposal generated')
-            return proposal
-            
-        except Exception as error:
-            logger.error(f'❌ Proposal generation error: {error}')
-            return f'Ошибка при генерации предложения: {str(error)}'
+        Returns:
+            Tuple of (scraped_data, owner_info, proposal segments)
+        """
+        logger.info('\nSTEP 3: Scraping')
+        scraped_data = await self.scrape_website_data(url, html=capture.html)
+        
+        language = scraped_data.get('language')
+        if language is None:
+            language = detect_language_from_layout(capture.layout) if capture.layout else 'en'
+        scraped_data['language'] = language
+        
+        logger.info('\nSTEP 4: Research')
+        owner_info = await self.research_company_owner(
+            scraped_data.get('company_name'), url, inn=scraped_data.get('inn'), ogrn=scraped_data.get('ogrn')
+        )
+        
+        logger.info('\nSTEP 5: Proposal segments')
+        segments = await self.generate_proposal_segments({
+            'website_url': url,
+            'language': language,
+            'company_name': scraped_data.get('company_name'),
+            'owner_info': owner_info,
+            'title': scraped_data.get('title'),
+            'description': scraped_data.get('description'),
+        })
+        return scraped_data, owner_info, segments
     
+    @instrument('analysis')
     async def analyze_website_complete(self, url: str) -> Dict:
         """
         Complete workflow that orchestrates all analysis steps.
         
+        Runs within the current request deadline, if one is set (see
+        ``deadline``): stage timeouts are shortened to the time left and
+        the analysis is cancelled when it runs out.
+        
         Returns:
             Dict with all analysis results
         """
+        try:
+            return await run_with_deadline(self._analyze_website(url))
+        except DeadlineExceeded as error:
+            logger.error(f'⏱️ Analysis of {url} cut off: {error}')
+            return {
+                'success': False,
+                'error': str(error)
+            }
+    
+    async def _analyze_website(self, url: str) -> Dict:
         logger.info('\n🚀 === STARTING COMPLETE ANALYSIS ===\n')
         
         try:
             # Step 1: Capture screenshot
             logger.info('STEP 1: Screenshot')
-            screenshot_data_url, screenshot_success, screenshot_error = await self.capture_screenshot(url)
+            capture, screenshot_success, screenshot_error = await self.capture_page(url)
             
             if not screenshot_success:
                 return {
@@ -374,9 +779,17 @@ Be professional and persuasive. Full email in English.'''
                     'error': f'Failed to capture screenshot: {screenshot_error}'
                 }
             
-            # Step 2: Vision analysis
-            logger.info('\nSTEP 2: Vision Analysis')
-            vision_result, vision_success, vision_error = await self.analyze_screenshot_for_ads(url, screenshot_data_url)
+            with span('adtech.match', requests=len(capture.requests)):
+                adtech = fingerprint(capture.requests)
+            logger.info(f'📡 Ad-tech on page: {", ".join(n["name"] for n in adtech["networks"]) or "none"}')
+            
+            # Step 2: Zone analysis (DOM rules, vision model as fallback), with
+            # scraping, research and the proposal segments running alongside
+            logger.info('\nSTEP 2: Zone Analysis')
+            (vision_result, vision_success, vision_error), (scraped_data, owner_info, segments) = await asyncio.gather(
+                self.analyze_zones(url, capture.screenshot, capture.layout),
+                self._text_pipeline(url, capture),
+            )
             
             if not vision_success:
                 return {
@@ -384,40 +797,37 @@ Be professional and persuasive. Full email in English.'''
                     'error': f'Failed to analyze screenshot: {vision_error}'
                 }
             
-            # Step 3: Scrape website data
-            logger.info('\nSTEP 3: Scraping')
-            scraped_data = await self.scrape_website_data(url)
-            
-            # Step 4: Research company
-            logger.info('\nSTEP 4: Research')
-            owner_info = await self.research_company_owner(scraped_data.get('company_name'), url)
-            
-            # Step 5: Generate proposal
-            logger.info('\nSTEP 5: Generate Proposal')
-            proposal = await self.generate_personalized_proposal({
+            language = scraped_data['language']
+            proposal = render_proposal({
                 'website_url': url,
                 'zones': vision_result.get('zones', []),
-                'language': vision_result.get('language', 'en'),
+                'language': language,
                 'company_name': scraped_data.get('company_name'),
                 'owner_info': owner_info,
-                'emails': scraped_data.get('emails', [])
-            })
+                'emails': scraped_data.get('emails', []),
+                'title': scraped_data.get('title'),
+                'description': scraped_data.get('description'),
+                'adtech': adtech
+            }, segments)
             
             logger.info('\n✅ === ANALYSIS COMPLETE ===\n')
             
             return {
                 'success': True,
-                'screenshot': screenshot_data_url,
+                'screenshot': capture.screenshot,
                 'zones': vision_result.get('zones', []),
-                'language': vision_result.get('language', 'en'),
+                'zones_source': vision_result.get('source'),
+                'adtech': adtech,
+                'language': language,
                 'emails': scraped_data.get('emails', []),
                 'company_name': scraped_data.get('company_name'),
                 'title': scraped_data.get('title'),
                 'description': scraped_data.get('description'),
                 'owner_info': owner_info.get('insights'),
-                'proposal': proposal
+                'proposal': proposal,
+                'partial_capture': capture.partial
             }
-            
+        
         except Exception as error:
             logger.error(f'\n❌ === ANALYSIS FAILED ===')
             logger.error(f'Error: {error}')
@@ -427,8 +837,23 @@ Be professional and persuasive. Full email in English.'''
             }
 
 
-# Global parser instance
-parser = CompleteWebsiteParser()
+_parser: Optional[CompleteWebsiteParser] = None
+
+
+def get_parser() -> CompleteWebsiteParser:
+    """Shared parser instance, created on first use."""
+    global _parser
+    if _parser is None:
+        _parser = CompleteWebsiteParser()
+    return _parser
+
+
+def __getattr__(name: str):
+    # Keeps ``from complete_parser import parser`` working without creating
+    # the instance at import time
+    if name == 'parser':
+        return get_parser()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 async def analyze_website_complete(url: str) -> Dict:
@@ -437,8 +862,8 @@ async def analyze_website_complete(url: str) -> Dict:
     
     Args:
         url: Website URL to analyze
-        
+    
     Returns:
         Dict with complete analysis results
     """
-    return await parser.analyze_website_complete(url)
\ No newline at end of file
+    return await get_parser().analyze_website_complete(url)
\ No newline at end of file
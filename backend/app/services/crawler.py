@@ -1,12 +1,14 @@
 import logging
 from io import BytesIO
 from typing import Tuple, Optional
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
-from bs4 import BeautifulSoup
+from ..instrumentation import span, instrument
+from .browser import browser_session, new_page
+from .navigation import navigate
 
 logger = logging.getLogger(__name__)
 
 
+@instrument('stage.crawl')
 async def crawl_website(url: str) -> Tuple[Optional[bytes], Optional[str], bool, Optional[str]]:
     """
     Crawl a website using Playwright and extract content.
@@ -17,21 +19,25 @@ async def crawl_website(url: str) -> Tuple[Optional[bytes], Optional[str], bool,
     Returns:
         Tuple of (screenshot_bytes, html_content, success, error_message)
     """
+    from bs4 import BeautifulSoup
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+    
     try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
+        async with browser_session() as browser:
+            page = await new_page(browser)
             
             try:
-                await page.goto(url, wait_until="networkidle", timeout=30000)
+                await navigate(page, url)
                 
-                screenshot_bytes = await page.screenshot(full_page=True, type="png")
+                with span('page.screenshot'):
+                    screenshot_bytes = await page.screenshot(full_page=True, type="png")
                 html_content = await page.content()
                 
                 await browser.close()
                 
-                soup = BeautifulSoup(html_content, 'html.parser')
-                cleaned_html = soup.prettify()
+                with span('html.parse', bytes=len(html_content)):
+                    soup = BeautifulSoup(html_content, 'html.parser')
+                    cleaned_html = soup.prettify()
                 
                 logger.info(f"Successfully crawled website: {url}")
                 return screenshot_bytes, cleaned_html, True, None
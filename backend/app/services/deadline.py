@@ -0,0 +1,163 @@
+"""
+Request-scoped deadlines.
+
+An API request gets one time budget for the whole analysis. The deadline
+lives in a context variable, so it reaches every stage, including the ones
+running concurrently in tasks created under it. Stages size their own
+timeouts from it:
+
+    await page.goto(url, timeout=timeout_ms(30000))
+    await client.chat.completions.create(**with_deadline(request))
+
+``run_with_deadline`` cuts the whole analysis off when the budget runs out,
+and ``run_until_disconnected`` cancels it when the HTTP client goes away.
+Cancellation unwinds through the stages, so browsers are closed by their
+``async with`` blocks and in-flight LLM requests are aborted.
+
+Without a deadline (CLI, workers) every helper falls back to its default.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, Iterator, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Stage timeouts never drop below this, so a nearly spent budget fails fast instead of with a zero timeout
+MIN_TIMEOUT = 0.1
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's time budget ran out."""
+
+
+class ClientDisconnected(Exception):
+    """The HTTP client went away before the response was ready."""
+
+
+class Deadline:
+    """Point in (monotonic) time by which a request must finish."""
+    
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+    
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+    
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("adlook_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[Optional[Deadline]]:
+    """Set a deadline ``seconds`` from now for the block; None leaves the current one."""
+    if seconds is None:
+        yield _current.get()
+        return
+    deadline = Deadline(seconds)
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def timeout(default: float) -> float:
+    """
+    Timeout in seconds for a stage: ``default``, shortened to the time left.
+    
+    Raises:
+        DeadlineExceeded: If the deadline has already passed
+    """
+    deadline = _current.get()
+    if deadline is None:
+        return default
+    remaining = deadline.remaining()
+    if remaining <= 0:
+        raise DeadlineExceeded(f"Deadline of {deadline.budget:g}s exceeded")
+    return max(MIN_TIMEOUT, min(default, remaining))
+
+
+def timeout_ms(default_ms: float) -> float:
+    """``timeout`` in milliseconds, for Playwright."""
+    return timeout(default_ms / 1000) * 1000
+
+
+def with_deadline(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Chat completion request with a ``timeout`` for the time left (unchanged without a deadline)."""
+    deadline = _current.get()
+    if deadline is None:
+        return request
+    return {**request, "timeout": timeout(deadline.budget)}
+
+
+async def run_with_deadline(awaitable: Awaitable[T]) -> T:
+    """
+    Await ``awaitable``, cancelling it when the current deadline passes.
+    
+    Raises:
+        DeadlineExceeded: If it was cancelled for the deadline
+    """
+    deadline = _current.get()
+    if deadline is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, timeout=max(deadline.remaining(), 0))
+    except asyncio.TimeoutError:
+        if deadline.expired:
+            raise DeadlineExceeded(f"Deadline of {deadline.budget:g}s exceeded") from None
+        raise
+
+
+async def _wait_for_disconnect(request: Any) -> None:
+    # The body has been read by now, so the next message is the disconnect
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def run_until_disconnected(request: Any, awaitable: Awaitable[T]) -> T:
+    """
+    Await ``awaitable`` while watching the HTTP client; cancel it if the client disconnects.
+    
+    Args:
+        request: Starlette request of the client
+        awaitable: Work done for the client
+    
+    Raises:
+        ClientDisconnected: If the client went away first
+    """
+    task = asyncio.ensure_future(awaitable)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        if task.done():
+            return task.result()
+        
+        logger.warning("🔌 Client disconnected, cancelling the analysis")
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        raise ClientDisconnected()
+    finally:
+        # Also reached when the caller itself is cancelled
+        for pending in (task, watcher):
+            if not pending.done():
+                pending.cancel()
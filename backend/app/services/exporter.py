@@ -3,16 +3,20 @@ import os
 import uuid
 from pathlib import Path
 from typing import Tuple, Optional
-from docx import Document
-from docx.shared import Pt
-from weasyprint import HTML
+from ..instrumentation import instrument
 
 logger = logging.getLogger(__name__)
 
+# Created on first export; python-docx and WeasyPrint are also imported then
 TEMP_DIR = Path("/tmp/adlook_exports")
-TEMP_DIR.mkdir(exist_ok=True)
 
 
+def _export_dir() -> Path:
+    TEMP_DIR.mkdir(exist_ok=True)
+    return TEMP_DIR
+
+
+@instrument('export.docx')
 def create_docx(proposal_text: str, analysis_id: str) -> Tuple[Optional[str], bool, Optional[str]]:
     """
     Create a DOCX file from proposal text.
@@ -25,6 +29,9 @@ def create_docx(proposal_text: str, analysis_id: str) -> Tuple[Optional[str], bo
         Tuple of (file_path, success, error_message)
     """
     try:
+        from docx import Document
+        from docx.shared import Pt
+        
         doc = Document()
         
         lines = proposal_text.split('\n')
@@ -37,7 +44,7 @@ def create_docx(proposal_text: str, analysis_id: str) -> Tuple[Optional[str], bo
             else:
                 doc.add_paragraph()
         
-        file_path = TEMP_DIR / f"{analysis_id}.docx"
+        file_path = _export_dir() / f"{analysis_id}.docx"
         doc.save(str(file_path))
         
         logger.info(f"Created DOCX file: {file_path}")
@@ -49,6 +56,7 @@ def create_docx(proposal_text: str, analysis_id: str) -> Tuple[Optional[str], bo
         return None, False, error_msg
 
 
+@instrument('export.pdf')
 def create_pdf(proposal_text: str, analysis_id: str) -> Tuple[Optional[str], bool, Optional[str]]:
     """
     Create a PDF file from proposal text.
@@ -98,7 +106,9 @@ def create_pdf(proposal_text: str, analysis_id: str) -> Tuple[Optional[str], boo
         </html>
         """
         
-        file_path = TEMP_DIR / f"{analysis_id}.pdf"
+        from weasyprint import HTML
+        
+        file_path = _export_dir() / f"{analysis_id}.pdf"
         HTML(string=html_content).write_pdf(str(file_path))
         
         logger.info(f"Created PDF file: {file_path}")
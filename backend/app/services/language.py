@@ -0,0 +1,179 @@
+"""
+Local language detection for analyzed websites.
+
+Combines three signals, none of which needs the network:
+
+- the ``<html lang>`` attribute;
+- ``Content-Language`` / ``og:locale`` / ``language`` meta tags;
+- a character trigram classifier over the page text.
+
+Many Russian sites ship English CMS defaults (``lang="en"``, English
+navigation), so the text classifier carries the most weight once there is
+enough text, and the tags decide for nearly empty pages. The classifier
+scores the longest prose lines (paragraphs rather than menu items) against
+rank-weighted profiles of the most frequent trigrams in Russian and English
+web copy. A page takes well under a millisecond.
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+
+SUPPORTED = ("ru", "en")
+
+# Characters of page text fed to the classifier
+MAX_TEXT_CHARS = 1200
+# Lines with at least this many words count as prose; menus are ignored
+# when the page has at least MIN_PROSE_CHARS of prose
+PROSE_MIN_WORDS = 5
+MIN_PROSE_CHARS = 80
+
+# Weights of the signals in the combined score (positive means Russian)
+TEXT_WEIGHT = 3.0
+HTML_LANG_WEIGHT = 1.0
+META_WEIGHT = 0.5
+META_CAP = 0.75
+# Trigram score at which the text signal reaches full weight
+TEXT_SATURATION = 20.0
+
+# Most frequent trigrams (``_`` marks a word boundary), most frequent first
+PROFILES = {
+    "ru": (
+        "_по|_и_|_на|_пр|ов_|_со|ть_|ие_|_до|про|ет_|на_|ост|_ко|оль|ия_|ани|ние|_вы|ест|ти_|_ра|_ка|"
+        "_от|ся_|тел|ли_|ова|ров|ки_|ств|ей_|_ре|ый_|_не|ии_|ты_|_те|ем_|дел|те_|ать|ых_|пол|_в_|ите|"
+        "ели|ред|ста|тер|ка_|ает|_са|ми_|ени|айт|_во|пер|льн|ных|кон|ате|мат|_но|оро|ере|стр|по_|лов|"
+        "бол|ски|_то|тов|ран|_вс|фор|ить|сай|под|_о_|иал|ют_|кла|ода|ков|_ма|та_|гла|лав|авн|нов|ово|"
+        "род|тор|тав|ист|аци|_ме|ные|ые_|ам_|ати|зде|етс|кие|ны_|ния|мен|ент|раб|або|_с_|чес|тво|во_|"
+        "тся|_тр|_за|еле|вет|ыва|ку_|_пе|ват|ьны|рек|екл|лам|сти|иче|тат|ель|ный|анн|ое_|вы_|_об|лит|"
+        "оло|_ис|сто|ник|общ|ой_|льз|рав|_гл|ая_|вос|_дн|оде|отк|нес|еск|кол|льк|пре|ави|тра|ции|мес|"
+        "вля|яет|_бо|ее_|ект|аро|есь|сь_|едн|оны|_дл|для|ля_|рок|вар|ма_|дос|мы_|бот|еду|вод|дит|щес|"
+        "все|рос|орм|каз|_мо|но_|йте|наш|нед|ры_|се_|рас|_чт|что|аль|_эк|ают|гра|тик|ик_|нте|ую_|пос|"
+        "_фо|точ|очн|раз|щен|вны|ное|рег|_ин|ери|риа|тур|акц|кци|ция|ове|ика|ики|соо|ооб|одн|рат|дни|"
+        "до_|сов|дан|нны|как|_да|спо|пра|ьзо|зов|нта|сле|лед|бще|рен|тре|еты|сть|дня|_го|де_|ткр|кры|"
+        "лся|_па|пар|арк|оры|дал|али|ско|ько|ко_|_ле|_це|рем|они|сту|туп|или|рац|стн|кан|ант|_сл|сло|"
+        "ито|ори|сос|авл|ляе|оле|лее|_дв|два|вад|адц|дца|цат|тар|_ес|_де|дет|_пл|пло|адк|_ве|дны|дых|"
+        "ха_"
+    ),
+    "en": (
+        "_th|the|he_|nd_|_an|and|rs_|_co|ers|_to|es_|ing|ng_|_wi|_re|ts_|to_|ed_|for|_of|re_|ty_|_fo|"
+        "ver|_we|_a_|_in|ent|of_|our|_yo|you|er_|ite|_pr|ll_|con|se_|is_|ry_|in_|oun|ur_|wit|ith|th_|"
+        "_be|tor|ter|_se|al_|ns_|at_|_pl|are|_ca|com|_ma|sin|on_|te_|ion|_ad|ont|ort|ect|_us|ay_|_ne|"
+        "_pa|res|nts|or_|eve|ear|cou|_ac|_mo|ore|an_|_fi|pla|_qu|rea|sit|_ho|_sh|unt|ess|ou_|_on|wil|"
+        "ill|be_|ews|ert|rti|_is|day|new|ity|ive|ans|inc|et_|_ar|_ou|pro|abl|ble|le_|ces|we_|_le|ead|"
+        "tur|nte|ss_|thi|ree|_da|ce_|_te|all|est|tio|let|st_|ut_|per|adv|dve|tis|nti|ow_|_de|ise|use|"
+        "ch_|ws_|ct_|nt_|top|_st|sto|ory|par|ark|rk_|ide|den|_wa|ted|ese|ati|nci|usi|_sp|ke_|_at|mon|"
+        "ny_|acc|ord|din|_or|ove|tha|des|lay|ds_|isi|can|off|ffe|fer|ran|me_|ure|ee_|ery|_it|em_|ine|"
+        "nes|wer|_al|ues|ons|_su|_ab|abo|bou|out|_di|dis|isc|_no|hat|lin|tin|eco|_ch|mat|ext|_ri|igh|"
+        "ght|ner|nal|_ke|tab|ad_|art|_so|rce|ist|lec|sho|us_|end|rin|omm|men|ate|rt_|how|_po|ata|_si|"
+        "ies|_la|egi|_ha|as_|_op|ope|pen|_ci|cit|_af|sev|era|pre|nta|tiv|il_|cia|spo|ere|cco|mor|han|"
+        "acr|cre|clu|gro|nds|ath|iet|eas|_wh|her|_vi|ito|ors|omp|mpa|_ra|nge|ge_|hom|ome|ard|rde|pri|"
+        "_wo|lea|man|act|ant|qua|ual|ali|_ev|tem|_bu|bus|ays|ys_|lac|ace|der|web|ebs|bsi|_by|by_|pho|"
+        "hon"
+    ),
+}
+
+_WORD = re.compile(r"[^\W\d_]+")
+
+
+@dataclass(frozen=True)
+class LanguageGuess:
+    language: str
+    confidence: float
+    source: str
+
+
+@lru_cache(maxsize=1)
+def _profiles() -> Dict[str, Dict[str, float]]:
+    weights = {}
+    for language, chunks in PROFILES.items():
+        grams = "".join(chunks).split("|")
+        weights[language] = {gram: 1.0 - rank / len(grams) for rank, gram in enumerate(grams)}
+    return weights
+
+
+def _sample_text(text: str) -> str:
+    lines = [line.strip() for line in text.splitlines()]
+    # Prefer prose (article paragraphs) over menu items and buttons
+    prose = [line for line in lines if line.count(" ") >= PROSE_MIN_WORDS - 1]
+    if sum(map(len, prose)) >= MIN_PROSE_CHARS:
+        lines = prose
+    sample, size = [], 0
+    for line in sorted(lines, key=len, reverse=True):
+        if not line or size >= MAX_TEXT_CHARS:
+            break
+        sample.append(line)
+        size += len(line)
+    return " ".join(sample)[:MAX_TEXT_CHARS]
+
+
+def text_scores(text: str) -> Dict[str, float]:
+    """
+    Rank-weighted trigram profile scores of a text.
+    
+    Args:
+        text: Page text; only the longest lines, up to MAX_TEXT_CHARS, are used
+    
+    Returns:
+        Mapping of language to its score (0 when no trigram matched)
+    """
+    # Words joined by the boundary marker, so every in-word and boundary
+    # trigram appears once; trigrams spanning two words match no profile
+    joined = "_" + "_".join(_WORD.findall(_sample_text(text).lower())) + "_"
+    grams = [joined[index:index + 3] for index in range(len(joined) - 2)]
+    return {
+        language: sum(filter(None, map(weights.get, grams)))
+        for language, weights in _profiles().items()
+    }
+
+
+def _tag_language(value: Optional[str]) -> Optional[str]:
+    code = (value or "").strip().lower().replace("_", "-")[:2]
+    return code if code in SUPPORTED else None
+
+
+def detect_language(
+    html_lang: Optional[str] = None,
+    meta_languages: Iterable[Optional[str]] = (),
+    text: str = "",
+    default: Optional[str] = "en",
+) -> LanguageGuess:
+    """
+    Detect whether a page is Russian or English.
+    
+    Args:
+        html_lang: Value of the ``<html lang>`` attribute
+        meta_languages: Values of language meta tags (``ru-RU``, ``en_US``, ...)
+        text: Visible page text
+        default: Language when there is no evidence at all (None to leave it
+                 to the caller)
+    
+    Returns:
+        LanguageGuess with the language, a confidence in [0.5, 1] (0 without
+        evidence) and the signal that contributed most
+    """
+    contributions = {}
+    
+    scores = text_scores(text) if text else {}
+    total = sum(scores.values())
+    if total:
+        balance = (scores["ru"] - scores["en"]) / total
+        contributions["text"] = TEXT_WEIGHT * balance * min(1.0, total / TEXT_SATURATION)
+    
+    tag = _tag_language(html_lang)
+    if tag:
+        contributions["html_lang"] = HTML_LANG_WEIGHT if tag == "ru" else -HTML_LANG_WEIGHT
+    
+    meta = sum(META_WEIGHT if lang == "ru" else -META_WEIGHT
+               for lang in map(_tag_language, meta_languages) if lang)
+    if meta:
+        contributions["meta"] = max(-META_CAP, min(META_CAP, meta))
+    
+    score = sum(contributions.values())
+    if not score:
+        return LanguageGuess(default, 0.0, "default")
+    
+    source = max(contributions, key=lambda name: abs(contributions[name]))
+    confidence = 1.0 / (1.0 + math.exp(-2.0 * abs(score)))
+    return LanguageGuess("ru" if score > 0 else "en", round(confidence, 3), source)
@@ -0,0 +1,234 @@
+"""
+Deferred LLM calls through the OpenAI Batch API.
+
+Chat completion requests are written as JSONL, one
+``{"custom_id", "method", "url", "body"}`` object per line, uploaded with
+``purpose="batch"`` and submitted with a 24h completion window. Batched
+requests are billed at half the synchronous price and count against a
+separate, much larger rate limit, so overnight sweeps are not throttled by
+the interactive quota. Results come back as JSONL too and are matched to
+the requests by ``custom_id``.
+"""
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..config import settings
+from ..instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+class BatchError(Exception):
+    """Raised when requests cannot be submitted as a batch."""
+
+
+@dataclass
+class BatchRequest:
+    """One chat completion request; ``custom_id`` must be unique within a run."""
+    
+    custom_id: str
+    body: Dict[str, Any]
+    
+    def to_line(self) -> bytes:
+        entry = {"custom_id": self.custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": self.body}
+        return (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+@dataclass
+class BatchOutcome:
+    """Result of one batched request: the message content or an error."""
+    
+    custom_id: str
+    content: Optional[str] = None
+    error: Optional[str] = None
+    usage: Dict[str, int] = field(default_factory=dict)
+    
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def build_jsonl_chunks(requests: Iterable[BatchRequest], max_requests: int, max_bytes: int) -> List[List[BatchRequest]]:
+    """
+    Split requests into groups that each fit into one batch input file.
+    
+    Args:
+        requests: Requests to submit
+        max_requests: Maximum lines per input file
+        max_bytes: Maximum size of an input file
+    
+    Returns:
+        Groups of requests in submission order
+    
+    Raises:
+        BatchError: If a single request is larger than ``max_bytes``
+    """
+    chunks: List[List[BatchRequest]] = []
+    current: List[BatchRequest] = []
+    size = 0
+    
+    for request in requests:
+        line_size = len(request.to_line())
+        if line_size > max_bytes:
+            raise BatchError(f"Request {request.custom_id} ({line_size} bytes) exceeds the batch file limit")
+        if current and (len(current) >= max_requests or size + line_size > max_bytes):
+            chunks.append(current)
+            current, size = [], 0
+        current.append(request)
+        size += line_size
+    
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def parse_output_line(entry: Dict[str, Any]) -> BatchOutcome:
+    """
+    Convert one line of a batch output or error file into an outcome.
+    
+    Args:
+        entry: Parsed JSON line with ``custom_id``, ``response`` and ``error``
+    
+    Returns:
+        BatchOutcome for the line's request
+    """
+    custom_id = entry.get("custom_id", "")
+    error = entry.get("error")
+    if error:
+        return BatchOutcome(custom_id, error=f"{error.get('code', 'error')}: {error.get('message', '')}")
+    
+    response = entry.get("response") or {}
+    body = response.get("body") or {}
+    status_code = response.get("status_code")
+    if status_code != 200:
+        message = (body.get("error") or {}).get("message") or f"HTTP {status_code}"
+        return BatchOutcome(custom_id, error=message)
+    
+    try:
+        content = body["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        return BatchOutcome(custom_id, error="Malformed completion in batch output")
+    return BatchOutcome(custom_id, content=content, usage=body.get("usage") or {})
+
+
+class BatchProcessor:
+    """Submit chat completion requests as batches and collect their results."""
+    
+    def __init__(
+        self,
+        client: Any,
+        poll_seconds: Optional[float] = None,
+        max_requests: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        """
+        Args:
+            client: AsyncOpenAI client
+            poll_seconds: Seconds between status checks (default: ADLOOK_BATCH_POLL_SECONDS)
+            max_requests: Requests per batch (default: ADLOOK_BATCH_MAX_REQUESTS)
+            max_bytes: Input file size per batch (default: ADLOOK_BATCH_MAX_BYTES)
+        """
+        self.client = client
+        self.poll_seconds = settings.ADLOOK_BATCH_POLL_SECONDS if poll_seconds is None else poll_seconds
+        self.max_requests = max_requests or settings.ADLOOK_BATCH_MAX_REQUESTS
+        self.max_bytes = max_bytes or settings.ADLOOK_BATCH_MAX_BYTES
+    
+    async def submit(self, requests: List[BatchRequest], metadata: Optional[Dict[str, str]] = None) -> List[str]:
+        """
+        Upload the requests as JSONL files and create one batch per file.
+        
+        Args:
+            requests: Requests to submit
+            metadata: Key/value labels stored on each batch
+        
+        Returns:
+            Ids of the created batches
+        """
+        batch_ids = []
+        for index, chunk in enumerate(build_jsonl_chunks(requests, self.max_requests, self.max_bytes)):
+            data = b"".join(request.to_line() for request in chunk)
+            with span("llm.batch.upload", requests=len(chunk), bytes=len(data)):
+                uploaded = await self.client.files.create(file=(f"adlook_batch_{index}.jsonl", data), purpose="batch")
+                batch = await self.client.batches.create(
+                    input_file_id=uploaded.id,
+                    endpoint=BATCH_ENDPOINT,
+                    completion_window=COMPLETION_WINDOW,
+                    metadata=metadata,
+                )
+            batch_ids.append(batch.id)
+            logger.info(f"📦 Submitted batch {batch.id}: {len(chunk)} requests, {len(data) / 1e6:.1f} MB")
+        return batch_ids
+    
+    async def _read_file(self, file_id: str) -> Dict[str, BatchOutcome]:
+        content = await self.client.files.content(file_id)
+        outcomes = {}
+        for line in content.text.splitlines():
+            if line.strip():
+                outcome = parse_output_line(json.loads(line))
+                outcomes[outcome.custom_id] = outcome
+        return outcomes
+    
+    async def wait(self, batch_ids: List[str], custom_ids: Iterable[str]) -> Dict[str, BatchOutcome]:
+        """
+        Poll the batches until they finish and download their results.
+        
+        Args:
+            batch_ids: Batches returned by ``submit``
+            custom_ids: Every request id submitted; requests without a result
+                (e.g. the whole batch failed validation) get an error outcome
+        
+        Returns:
+            Mapping of custom_id to outcome
+        """
+        pending = list(batch_ids)
+        outcomes: Dict[str, BatchOutcome] = {}
+        batch_errors: List[str] = []
+        
+        with span("llm.batch.wait", batches=len(batch_ids)) as wait_span:
+            while pending:
+                for batch_id in list(pending):
+                    batch = await self.client.batches.retrieve(batch_id)
+                    if batch.status not in TERMINAL_STATUSES:
+                        continue
+                    
+                    pending.remove(batch_id)
+                    counts = batch.request_counts
+                    logger.info(
+                        f"📦 Batch {batch_id} {batch.status}"
+                        + (f": {counts.completed}/{counts.total} requests succeeded" if counts else "")
+                    )
+                    if batch.status == "failed":
+                        errors = getattr(batch.errors, "data", None) or []
+                        batch_errors.append(
+                            f"Batch {batch_id} failed: " + ("; ".join(e.message or e.code or "" for e in errors) or "unknown error")
+                        )
+                    for file_id in (batch.output_file_id, batch.error_file_id):
+                        if file_id:
+                            outcomes.update(await self._read_file(file_id))
+                
+                if pending:
+                    await asyncio.sleep(self.poll_seconds)
+            
+            missing_error = "; ".join(batch_errors) or "No result returned for request"
+            for custom_id in custom_ids:
+                outcomes.setdefault(custom_id, BatchOutcome(custom_id, error=missing_error))
+            
+            wait_span.set(
+                failed=sum(1 for outcome in outcomes.values() if not outcome.ok),
+                prompt_tokens=sum(outcome.usage.get("prompt_tokens", 0) for outcome in outcomes.values()),
+                completion_tokens=sum(outcome.usage.get("completion_tokens", 0) for outcome in outcomes.values()),
+            )
+        return outcomes
+    
+    async def run(self, requests: List[BatchRequest], metadata: Optional[Dict[str, str]] = None) -> Dict[str, BatchOutcome]:
+        """Submit the requests and wait for all of their results."""
+        batch_ids = await self.submit(requests, metadata)
+        return await self.wait(batch_ids, [request.custom_id for request in requests])
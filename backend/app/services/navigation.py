@@ -0,0 +1,323 @@
+"""
+Page navigation with a wait condition and timeout learned per domain.
+
+Waiting for ``networkidle`` gives the most complete render, but sites with
+long polling, analytics beacons or endlessly refreshing ad slots never go
+idle: they used to burn the whole 30 second timeout and then fail the
+analysis. ``navigate`` records when each load milestone was reached
+(``domcontentloaded``, ``load``, ``networkidle``) in a history shared by
+all browsers on the host (``ADLOOK_NAVIGATION_HISTORY``), and plans the
+next load of the domain from it:
+
+- domains that went idle wait for ``networkidle``, with a timeout of a few
+  times their usual load time instead of the full ``ADLOOK_NAVIGATION_TIMEOUT``;
+- domains that reached ``load`` but not idle wait for ``load`` and then
+  settle for up to ``SETTLE_SECONDS`` of network quiet, so late content
+  still renders (and a domain that goes idle again is promoted back);
+- domains that did not even reach ``load`` in time wait for
+  ``domcontentloaded`` and settle.
+
+Domains seen for the first time wait for ``networkidle`` as before. When a
+navigation times out after the page was committed, the page is captured as
+far as it rendered (``NavigationResult.partial``) instead of failing.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+from ..instrumentation import span
+from ..metrics import registry
+from .deadline import timeout_ms
+
+logger = logging.getLogger(__name__)
+
+DOMCONTENTLOADED = "domcontentloaded"
+LOAD = "load"
+NETWORKIDLE = "networkidle"
+MILESTONES = (DOMCONTENTLOADED, LOAD, NETWORKIDLE)
+
+# Learned timeouts are this many times the domain's usual time to the milestone, plus the slack,
+# and never less than the minimum (the maximum is ADLOOK_NAVIGATION_TIMEOUT)
+TIMEOUT_FACTOR = 3.0
+TIMEOUT_SLACK = 2.0
+MIN_TIMEOUT = 5.0
+# Network quiet waited for after ``load`` / ``domcontentloaded``; reaching it promotes the domain
+# back to ``networkidle``
+SETTLE_SECONDS = 3.0
+# Weight of the latest load in the per-domain moving averages
+SMOOTHING = 0.3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS navigation_history (
+    domain TEXT PRIMARY KEY,
+    visits INTEGER NOT NULL,
+    domcontentloaded_ms REAL,
+    load_ms REAL,
+    networkidle_ms REAL,
+    load_misses INTEGER NOT NULL DEFAULT 0,
+    networkidle_misses INTEGER NOT NULL DEFAULT 0,
+    partial INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+"""
+
+TIMING_COLUMNS = (
+    "visits, domcontentloaded_ms, load_ms, networkidle_ms, load_misses, networkidle_misses, partial"
+)
+
+NAVIGATIONS = registry.counter(
+    "adlook_navigations_total", "Page navigations by wait condition and outcome (complete, partial, failed)."
+)
+
+
+def domain_of(url: str) -> str:
+    """History key of a URL: its host name without ``www.``."""
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+@dataclass
+class DomainTimings:
+    """What the history knows about loading a domain: smoothed milestone times and consecutive timeouts."""
+    
+    visits: int = 0
+    domcontentloaded_ms: Optional[float] = None
+    load_ms: Optional[float] = None
+    networkidle_ms: Optional[float] = None
+    load_misses: int = 0
+    networkidle_misses: int = 0
+    partial: int = 0
+
+
+@dataclass
+class NavigationPlan:
+    """How to load a page: the milestone ``goto`` waits for, its timeout and the network quiet waited for after it."""
+    
+    wait_until: str = NETWORKIDLE
+    timeout: float = 30.0
+    settle: float = 0.0
+
+
+@dataclass
+class NavigationResult:
+    """
+    How a navigation went.
+    
+    ``timings`` has the milliseconds from the start of the navigation to
+    each milestone reached. ``partial`` is set when the page did not reach
+    the planned milestone in time and was left as far as it rendered.
+    """
+    
+    plan: NavigationPlan
+    timings: Dict[str, float] = field(default_factory=dict)
+    partial: bool = False
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "wait_until": self.plan.wait_until,
+            "timeout": self.plan.timeout,
+            "timings": self.timings,
+            "partial": self.partial,
+        }
+
+
+def plan_navigation(history: Optional[DomainTimings], max_timeout: float) -> NavigationPlan:
+    """
+    Wait condition and timeout for the next load of a domain.
+    
+    Args:
+        history: What is known about the domain, or None for a new one
+        max_timeout: Longest timeout in seconds (also used for new domains)
+    """
+    def learned(ms: Optional[float]) -> float:
+        if ms is None:
+            return max_timeout
+        return min(max_timeout, max(MIN_TIMEOUT, ms / 1000 * TIMEOUT_FACTOR + TIMEOUT_SLACK))
+    
+    if history is None or (history.networkidle_ms is not None and not history.networkidle_misses):
+        return NavigationPlan(NETWORKIDLE, learned(history.networkidle_ms if history else None))
+    if history.load_ms is not None and not history.load_misses:
+        return NavigationPlan(LOAD, learned(history.load_ms), settle=SETTLE_SECONDS)
+    return NavigationPlan(DOMCONTENTLOADED, learned(history.domcontentloaded_ms), settle=SETTLE_SECONDS)
+
+
+class NavigationHistory:
+    """Per-domain load timings in a local SQLite database shared by every browser on the host."""
+    
+    def __init__(self, path: str, timeout: float = 10.0):
+        """
+        Args:
+            path: Database file, created if missing; shared by all processes
+            timeout: Seconds to wait for a lock held by another process
+        """
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+    
+    def get(self, domain: str) -> Optional[DomainTimings]:
+        with self._lock:
+            return self._get(domain)
+    
+    def _get(self, domain: str) -> Optional[DomainTimings]:
+        row = self._conn.execute(
+            f"SELECT {TIMING_COLUMNS} FROM navigation_history WHERE domain = ?", (domain,)
+        ).fetchone()
+        return DomainTimings(**dict(row)) if row is not None else None
+    
+    def record(self, domain: str, result: NavigationResult) -> DomainTimings:
+        """
+        Fold a navigation into the domain's history.
+        
+        A milestone reached updates its moving average and clears its
+        misses. When a navigation times out, ``load`` and ``networkidle``
+        count as missed if they had not happened by then, which moves the
+        domain to an earlier wait condition; a short settle that does not
+        reach network quiet is not counted against the domain.
+        
+        Returns:
+            The updated history
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                timings = self._get(domain) or DomainTimings()
+                timings.visits += 1
+                timings.partial += int(result.partial)
+                for milestone in MILESTONES:
+                    reached = result.timings.get(milestone)
+                    if reached is not None:
+                        previous = getattr(timings, f"{milestone}_ms")
+                        setattr(timings, f"{milestone}_ms", reached if previous is None else
+                                previous + SMOOTHING * (reached - previous))
+                if LOAD in result.timings:
+                    timings.load_misses = 0
+                if NETWORKIDLE in result.timings:
+                    timings.networkidle_misses = 0
+                if result.partial:
+                    # Whatever did not happen before the timeout is too slow for this domain
+                    if LOAD not in result.timings:
+                        timings.load_misses += 1
+                    if NETWORKIDLE not in result.timings:
+                        timings.networkidle_misses += 1
+                
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO navigation_history (domain, {TIMING_COLUMNS}, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        domain, timings.visits, timings.domcontentloaded_ms, timings.load_ms, timings.networkidle_ms,
+                        timings.load_misses, timings.networkidle_misses, timings.partial, time.time(),
+                    ),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return timings
+    
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_navigation_history: Optional[NavigationHistory] = None
+
+
+def get_navigation_history() -> Optional[NavigationHistory]:
+    """Navigation history shared by the page loads of this process; None if ADLOOK_NAVIGATION_HISTORY is empty."""
+    global _navigation_history
+    if _navigation_history is None:
+        from ..config import settings
+        
+        if not settings.ADLOOK_NAVIGATION_HISTORY:
+            return None
+        try:
+            _navigation_history = NavigationHistory(settings.ADLOOK_NAVIGATION_HISTORY)
+        except sqlite3.Error as error:
+            logger.warning(f"⚠️ Navigation history {settings.ADLOOK_NAVIGATION_HISTORY} unavailable: {error}")
+            return None
+    return _navigation_history
+
+
+async def navigate(page: Any, url: str) -> NavigationResult:
+    """
+    Load ``url`` in ``page`` with the wait condition and timeout planned for its domain.
+    
+    The timeout is also capped by the current request deadline. Runs as
+    the ``page.navigation`` stage.
+    
+    Returns:
+        The plan used, the milestones reached and whether the page is partial
+    
+    Raises:
+        playwright.async_api.Error: If the page could not be loaded at all
+            (connection errors, or a timeout before anything was committed)
+    """
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+    from ..config import settings
+    
+    domain = domain_of(url)
+    history = get_navigation_history()
+    known = None
+    if history is not None and domain:
+        try:
+            known = await asyncio.to_thread(history.get, domain)
+        except sqlite3.Error as error:
+            logger.debug(f"Navigation history lookup failed: {error}")
+    result = NavigationResult(plan_navigation(known, settings.ADLOOK_NAVIGATION_TIMEOUT))
+    plan = result.plan
+    
+    started = time.monotonic()
+    
+    def reached(milestone: str) -> None:
+        result.timings.setdefault(milestone, round((time.monotonic() - started) * 1000, 1))
+    
+    listeners = {
+        milestone: (lambda _, milestone=milestone: reached(milestone)) for milestone in (DOMCONTENTLOADED, LOAD)
+    }
+    for event, listener in listeners.items():
+        page.on(event, listener)
+    
+    with span('page.navigation', wait_until=plan.wait_until) as navigation_span:
+        try:
+            await page.goto(url, wait_until=plan.wait_until, timeout=timeout_ms(plan.timeout * 1000))
+            reached(plan.wait_until)
+            if plan.settle:
+                try:
+                    await page.wait_for_load_state(NETWORKIDLE, timeout=timeout_ms(plan.settle * 1000))
+                    reached(NETWORKIDLE)
+                except PlaywrightTimeoutError:
+                    pass
+        except PlaywrightTimeoutError:
+            if page.url in ("", "about:blank"):
+                NAVIGATIONS.inc(wait_until=plan.wait_until, outcome="failed")
+                raise
+            result.partial = True
+            logger.warning(
+                f"⚠️ {url} did not reach {plan.wait_until} within {plan.timeout:g}s; "
+                f"capturing the page as rendered (reached: {', '.join(result.timings) or 'nothing'})"
+            )
+        finally:
+            for event, listener in listeners.items():
+                page.remove_listener(event, listener)
+        navigation_span.set(partial=result.partial)
+    
+    NAVIGATIONS.inc(wait_until=plan.wait_until, outcome="partial" if result.partial else "complete")
+    if history is not None and domain:
+        try:
+            await asyncio.to_thread(history.record, domain, result)
+        except sqlite3.Error as error:
+            logger.debug(f"Navigation history update failed: {error}")
+    return result
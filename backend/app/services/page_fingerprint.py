@@ -0,0 +1,141 @@
+"""
+Cheap page fingerprints for change detection.
+
+A fingerprint is two 64-bit hashes of a page:
+
+- a difference hash (dHash) of the above-the-fold screenshot: the image is
+  reduced to 9x8 grey pixels and each bit records whether a pixel is
+  brighter than its right neighbour, so re-encoding, small text changes and
+  anti-aliasing flip few bits while a new banner or a redesign flips many;
+- a SimHash of the DOM layout: landmark and ad container boxes quantized to
+  ``DOM_QUANTUM`` pixels, so copy edits do not change it but moved, added or
+  removed regions (and new ad slots) do.
+
+Two fingerprints are compared by the Hamming distance of each hash.
+"""
+
+import hashlib
+import io
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional
+
+HASH_SIZE = 8
+HASH_BITS = 64
+# Box coordinates are rounded to this many pixels before hashing
+DOM_QUANTUM = 50
+
+
+def dhash(image_bytes: bytes, size: int = HASH_SIZE) -> int:
+    """
+    Difference hash of an image.
+    
+    Args:
+        image_bytes: PNG or JPEG data
+        size: Hash side; the hash has ``size * size`` bits
+    
+    Returns:
+        Hash as an integer
+    """
+    from PIL import Image
+    
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        small = image.convert("L").resize((size + 1, size), Image.Resampling.BOX)
+    pixels = small.tobytes()
+    
+    bits = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+
+def _layout_features(layout: Dict[str, Any]) -> Iterator[str]:
+    def box(kind: str, b: Dict[str, float]) -> str:
+        return ":".join([kind] + [str(int(b[key] // DOM_QUANTUM)) for key in ("x", "y", "width", "height")])
+    
+    page = layout.get("page") or {}
+    yield f"page:{int((page.get('height') or 0) // (DOM_QUANTUM * 10))}"
+    for kind, boxes in (layout.get("landmarks") or {}).items():
+        for b in boxes:
+            yield box(kind, b)
+    for b in layout.get("ads") or []:
+        yield box("ad", b)
+    yield f"blocks:{int(layout.get('main_blocks') or 0) // 10}"
+
+
+def dom_simhash(layout: Dict[str, Any]) -> int:
+    """
+    SimHash of the page structure from ``extract_layout``.
+    
+    Returns:
+        64-bit hash; similar layouts have hashes a small Hamming distance apart
+    """
+    weights = [0] * HASH_BITS
+    for feature in _layout_features(layout):
+        value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(HASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+@dataclass
+class FingerprintDiff:
+    """Bits that differ between two fingerprints and whether that counts as a change."""
+    
+    image_distance: int
+    dom_distance: Optional[int]
+    changed: bool
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {"image_distance": self.image_distance, "dom_distance": self.dom_distance, "changed": self.changed}
+
+
+@dataclass
+class PageFingerprint:
+    """Screenshot and DOM hashes of a page (hex strings, so they survive JSON)."""
+    
+    image_hash: str
+    dom_hash: Optional[str] = None
+    
+    @classmethod
+    def from_capture(cls, screenshot: bytes, layout: Optional[Dict[str, Any]]) -> "PageFingerprint":
+        """
+        Args:
+            screenshot: Viewport screenshot (not full page, so page length does not matter)
+            layout: Result of ``extract_layout``, if it succeeded
+        """
+        return cls(
+            image_hash=f"{dhash(screenshot):016x}",
+            dom_hash=f"{dom_simhash(layout):016x}" if layout else None,
+        )
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PageFingerprint":
+        return cls(image_hash=data["image_hash"], dom_hash=data.get("dom_hash"))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {"image_hash": self.image_hash, "dom_hash": self.dom_hash}
+    
+    def compare(self, other: "PageFingerprint", image_threshold: int, dom_threshold: int) -> FingerprintDiff:
+        """
+        Compare with a newer fingerprint.
+        
+        Args:
+            other: Fingerprint to compare with
+            image_threshold: Changed when more screenshot hash bits than this differ
+            dom_threshold: Changed when more DOM hash bits than this differ
+        
+        Returns:
+            FingerprintDiff; the DOM distance is None if either side has no layout
+        """
+        image_distance = hamming(int(self.image_hash, 16), int(other.image_hash, 16))
+        dom_distance = None
+        if self.dom_hash and other.dom_hash:
+            dom_distance = hamming(int(self.dom_hash, 16), int(other.dom_hash, 16))
+        changed = image_distance > image_threshold or (dom_distance is not None and dom_distance > dom_threshold)
+        return FingerprintDiff(image_distance, dom_distance, changed)
@@ -1,5 +1,6 @@
 import logging
-from typing import List, Dict
+from string import Template
+from typing import Any, Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -11,7 +12,7 @@ def generate_proposal(url: str, zones: List[Dict[str, str]]) -> str:
     Args:
         url: The website URL
         zones: List of ad zones with priorities
-        
+    
     Returns:
         Formatted proposal text
     """
@@ -55,3 +56,204 @@ def generate_proposal(url: str, zones: List[Dict[str, str]]) -> str:
     logger.info(f"Generated proposal for {url} with {len(priority_zones)} zones")
     
     return proposal_text
+
+
+# --- Template + LLM proposal engine ---------------------------------------
+#
+# The body of the proposal (Adlook intro, zone list, offer, call to action)
+# is rendered from precompiled per-language templates. Only the short
+# personalized segments — greeting and compliment — come from the LLM, and
+# each has a static fallback so a proposal is always produced.
+
+PROPOSAL_MODEL = 'gpt-4o-mini'
+
+PROPOSAL_TEMPLATES = {
+    'ru': Template(
+        "Subject: Предложение по монетизации сайта $site\n"
+        "\n"
+        "$greeting\n"
+        "\n"
+        "$compliment\n"
+        "\n"
+        "Немного о нас: Adlook — российская SSP-платформа (Supply-Side Platform), основанная в 2018 году "
+        "в Санкт-Петербурге. Мы помогаем владельцам сайтов монетизировать свои ресурсы.\n"
+        "\n"
+        "Мы проанализировали ваш сайт и выделили несколько эффективных зон:\n"
+        "$zones\n"
+        "$monetization"
+        "\n"
+        "Что мы предлагаем:\n"
+        "- Сроки размещения: от одного месяца\n"
+        "- Форматы: баннеры, контекстная реклама, всплывающие окна\n"
+        "- Программная настройка рекламы под ваш сайт\n"
+        "\n"
+        "Будем рады обсудить детали — ответьте на это письмо или предложите удобное время для звонка.\n"
+        "\n"
+        "С уважением,\n"
+        "Менеджер по работе с партнёрами, Adlook"
+    ),
+    'en': Template(
+        "Subject: Monetization proposal for $site\n"
+        "\n"
+        "$greeting\n"
+        "\n"
+        "$compliment\n"
+        "\n"
+        "A few words about us: Adlook is a supply-side platform (SSP) founded in 2018 in Saint Petersburg. "
+        "We help website owners monetize their audience.\n"
+        "\n"
+        "We analyzed your website and found several effective placements:\n"
+        "$zones\n"
+        "$monetization"
+        "\n"
+        "What we offer:\n"
+        "- Placement terms starting from one month\n"
+        "- Formats: banners, contextual ads, pop-ups\n"
+        "- Programmatic setup tailored to your website\n"
+        "\n"
+        "We would be glad to discuss the details — just reply to this email or suggest a convenient time for a call.\n"
+        "\n"
+        "Best regards,\n"
+        "Partnership Manager, Adlook"
+    ),
+}
+
+ZONE_LINE = {
+    'ru': Template("$index. $name — $description (рекомендуемый размер: $size)"),
+    'en': Template("$index. $name — $description (recommended size: $size)"),
+}
+
+NO_ZONES = {
+    'ru': "Детальный план размещения подготовим после короткого созвона.",
+    'en': "We will prepare a detailed placement plan after a short call.",
+}
+
+MONETIZATION_NOTE = {
+    'ru': Template("\nМы видим, что на сайте уже работают $networks — Adlook подключается рядом с ними и добавляет спрос, не заменяя текущих партнёров.\n"),
+    'en': Template("\nWe noticed $networks already running on your site — Adlook works alongside them and adds demand without replacing your current partners.\n"),
+}
+
+DEFAULT_SEGMENTS = {
+    'ru': {
+        'greeting': "Здравствуйте!",
+        'compliment': "Прежде всего хочу отметить качество вашего ресурса — он привлекает широкую и вовлечённую аудиторию.",
+    },
+    'en': {
+        'greeting': "Hello!",
+        'compliment': "First of all, congratulations on your website — it attracts a broad and engaged audience.",
+    },
+}
+
+SEGMENT_PROMPTS = {
+    'ru': {
+        'greeting': Template(
+            "Напиши одну строку приветствия для делового письма владельцу сайта $site.\n"
+            "Информация о владельце: $owner\n"
+            "Если известно имя руководителя — обратись по имени и отчеству, иначе напиши «Здравствуйте!».\n"
+            "Ответь только строкой приветствия, без кавычек и звёздочек."
+        ),
+        'compliment': Template(
+            "Напиши 1–2 предложения с конкретным комплиментом сайту $site для делового письма.\n"
+            "Компания: $company\n"
+            "Заголовок сайта: $title\n"
+            "Описание: $description\n"
+            "Информация о компании: $owner\n"
+            "Без приветствия, без звёздочек, только сами предложения."
+        ),
+    },
+    'en': {
+        'greeting': Template(
+            "Write a one-line greeting for a business email to the owner of $site.\n"
+            "Owner info: $owner\n"
+            "If the owner's name is known, address them by name, otherwise write \"Hello!\".\n"
+            "Reply with the greeting line only, no quotes or asterisks."
+        ),
+        'compliment': Template(
+            "Write 1-2 sentences with a specific compliment about the website $site for a business email.\n"
+            "Company: $company\n"
+            "Site title: $title\n"
+            "Description: $description\n"
+            "Company info: $owner\n"
+            "No greeting, no asterisks, only the sentences."
+        ),
+    },
+}
+
+SEGMENT_MAX_TOKENS = {'greeting': 40, 'compliment': 120}
+
+
+def proposal_language(language: Optional[str]) -> str:
+    """Template language for a detected site language (Russian unless English)."""
+    return 'en' if language == 'en' else 'ru'
+
+
+def build_segment_requests(data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Chat completion request bodies for the personalized proposal segments.
+    
+    Args:
+        data: Dict containing website_url, language, company_name, owner_info
+              and optionally title and description
+    
+    Returns:
+        Mapping of segment name to request body (model, messages, max_tokens)
+    """
+    lang = proposal_language(data.get('language'))
+    owner_info = data.get('owner_info') or {}
+    values = {
+        'site': data['website_url'],
+        'company': data.get('company_name') or '—',
+        'title': data.get('title') or '—',
+        'description': data.get('description') or '—',
+        'owner': owner_info.get('insights') or '—',
+    }
+    return {
+        segment: {
+            'model': PROPOSAL_MODEL,
+            'messages': [{'role': 'user', 'content': prompt.substitute(values)}],
+            'max_tokens': SEGMENT_MAX_TOKENS[segment],
+            'temperature': 0.7,
+        }
+        for segment, prompt in SEGMENT_PROMPTS[lang].items()
+    }
+
+
+def _clean_segment(text: Optional[str]) -> str:
+    return (text or '').replace('*', '').strip().strip('"«»').strip()
+
+
+def render_proposal(data: Dict[str, Any], segments: Optional[Dict[str, Optional[str]]] = None) -> str:
+    """
+    Render a proposal from the precompiled template for the site's language.
+    
+    Args:
+        data: Dict containing website_url, zones, language and optionally adtech
+        segments: LLM-written greeting/compliment; missing or empty ones fall
+                  back to the static defaults
+    
+    Returns:
+        Proposal text
+    """
+    lang = proposal_language(data.get('language'))
+    segments = segments or {}
+    
+    available_zones = [z for z in data.get('zones', []) if z.get('available')]
+    zone_lines = [
+        ZONE_LINE[lang].substitute(
+            index=index,
+            name=zone.get('name', 'Zone'),
+            description=zone.get('description', '').rstrip('.'),
+            size=zone.get('size', '300x250'),
+        )
+        for index, zone in enumerate(available_zones, 1)
+    ]
+    
+    networks = [network['name'] for network in (data.get('adtech') or {}).get('networks', [])[:3]]
+    
+    return PROPOSAL_TEMPLATES[lang].substitute(
+        site=data['website_url'],
+        greeting=_clean_segment(segments.get('greeting')) or DEFAULT_SEGMENTS[lang]['greeting'],
+        compliment=_clean_segment(segments.get('compliment')) or DEFAULT_SEGMENTS[lang]['compliment'],
+        zones='\n'.join(zone_lines) or NO_ZONES[lang],
+        monetization=MONETIZATION_NOTE[lang].substitute(networks=', '.join(networks)) if networks else '',
+    )
@@ -0,0 +1,329 @@
+"""
+Shared HTTP cache for the static resources of analyzed pages.
+
+Every page load starts with an empty Chromium profile, so the same CDN
+assets (jQuery, Google Fonts, Bitrix and Tilda bundles, ad SDKs) would be
+downloaded again for each site of a batch. ``ResourceCache`` routes the
+scripts, stylesheets, fonts and images a page requests through an on-disk
+SQLite store shared by every browser, worker and CLI process on the host:
+
+- a fresh entry is served without touching the network;
+- a stale entry with an ``ETag`` or ``Last-Modified`` is revalidated with a
+  conditional request, and a ``304`` serves the stored body;
+- everything else goes to the network, and responses that HTTP caching
+  rules allow a shared cache to keep are stored.
+
+Freshness follows RFC 9111: ``max-age``/``s-maxage`` or ``Expires``, and
+for responses with only ``Last-Modified`` a tenth of their age (at most a
+day). The store is bounded by ``ADLOOK_RESOURCE_CACHE_MB``; the least
+recently used entries are evicted first.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from ..metrics import registry
+
+logger = logging.getLogger(__name__)
+
+CACHEABLE_TYPES = frozenset({"script", "stylesheet", "font", "image"})
+CACHEABLE_STATUSES = frozenset({200, 203})
+
+# Larger responses (videos passed off as images, huge bundles) are not worth the space
+MAX_ENTRY_BYTES = 8 * 1024 * 1024
+# Upper bound of the Last-Modified heuristic freshness
+HEURISTIC_MAX_AGE = 86400.0
+
+# Describe the original transfer; bodies are passed to the page decoded
+TRANSFER_HEADERS = frozenset({"connection", "content-encoding", "content-length", "keep-alive", "transfer-encoding"})
+# Not stored: cookies belong to the client that got the response
+UNSTORED_HEADERS = TRANSFER_HEADERS | {"set-cookie"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resources (
+    url TEXT PRIMARY KEY,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    expires_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS resources_lru ON resources (last_access);
+"""
+
+RESOURCE_CACHE_REQUESTS = registry.counter(
+    "adlook_resource_cache_requests_total",
+    "Page resource requests by cache result (hit, revalidated, miss, uncacheable, error).",
+)
+RESOURCE_CACHE_SAVED = registry.counter(
+    "adlook_resource_cache_saved_bytes_total", "Response body bytes served from the resource cache."
+)
+
+
+@dataclass
+class CachedResource:
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    expires_at: float
+    
+    @property
+    def fresh(self) -> bool:
+        return self.expires_at > time.time()
+    
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers for revalidating the entry."""
+        headers = {}
+        if self.etag:
+            headers["if-none-match"] = self.etag
+        if self.last_modified:
+            headers["if-modified-since"] = self.last_modified
+        return headers
+
+
+def _directives(headers: Dict[str, str]) -> Dict[str, Optional[str]]:
+    directives: Dict[str, Optional[str]] = {}
+    for item in headers.get("cache-control", "").split(","):
+        name, _, value = item.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def freshness_lifetime(headers: Dict[str, str], now: float) -> Optional[float]:
+    """
+    Seconds a response stays fresh in a shared cache.
+    
+    Args:
+        headers: Response headers with lower-case names
+        now: Current time, used when the response has no ``Date``
+    
+    Returns:
+        Lifetime in seconds (0 means revalidate before every use), or None
+        if a shared cache must not store the response
+    """
+    directives = _directives(headers)
+    if "no-store" in directives or "private" in directives:
+        return None
+    if "*" in headers.get("vary", ""):
+        return None
+    # Allowed for one origin only; a cached copy would fail CORS checks on other sites
+    if headers.get("access-control-allow-origin", "*") != "*":
+        return None
+    if "no-cache" in directives:
+        return 0.0
+    
+    for name in ("s-maxage", "max-age"):
+        if directives.get(name):
+            try:
+                return max(0.0, float(directives[name]))
+            except ValueError:
+                return 0.0
+    
+    date = _http_date(headers.get("date")) or now
+    expires = _http_date(headers.get("expires"))
+    if "expires" in headers:
+        return max(0.0, expires - date) if expires is not None else 0.0
+    
+    last_modified = _http_date(headers.get("last-modified"))
+    if last_modified is not None:
+        return min(HEURISTIC_MAX_AGE, max(0.0, (date - last_modified) / 10))
+    return 0.0
+
+
+class ResourceCache:
+    """Size-bounded LRU store of HTTP responses, served to Playwright pages through request routing."""
+    
+    def __init__(self, path: str, max_bytes: int, timeout: float = 10.0):
+        """
+        Args:
+            path: Database file, created if missing; shared by all processes
+            max_bytes: Total body size kept before the least recently used entries are evicted
+            timeout: Seconds to wait for a lock held by another process
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+    
+    def get(self, url: str) -> Optional[CachedResource]:
+        """Stored response for ``url``, marking it as recently used."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, headers, body, etag, last_modified, expires_at FROM resources WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE resources SET last_access = ? WHERE url = ?", (time.time(), url))
+        status, headers, body, etag, last_modified, expires_at = row
+        return CachedResource(status, json.loads(headers), body, etag, last_modified, expires_at)
+    
+    def put(self, url: str, status: int, headers: Dict[str, str], body: bytes) -> bool:
+        """
+        Store a response if a shared cache may keep it.
+        
+        Responses that are neither fresh for a while nor revalidatable are
+        skipped, since storing them would never save a download.
+        
+        Returns:
+            True if the response was stored
+        """
+        now = time.time()
+        lifetime = freshness_lifetime(headers, now)
+        etag, last_modified = headers.get("etag"), headers.get("last-modified")
+        if lifetime is None or status not in CACHEABLE_STATUSES or len(body) > MAX_ENTRY_BYTES:
+            return False
+        if not lifetime and not etag and not last_modified:
+            return False
+        
+        stored_headers = {name: value for name, value in headers.items() if name not in UNSTORED_HEADERS}
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO resources"
+                " (url, status, headers, body, etag, last_modified, expires_at, size, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, status, json.dumps(stored_headers), body, etag, last_modified, now + lifetime, len(body), now),
+            )
+            self._evict()
+        return True
+    
+    def refresh(self, url: str, headers: Dict[str, str]) -> None:
+        """Extend an entry's freshness after the origin answered ``304 Not Modified`` with ``headers``."""
+        now = time.time()
+        lifetime = freshness_lifetime(headers, now)
+        with self._lock:
+            if lifetime is None:
+                self._conn.execute("DELETE FROM resources WHERE url = ?", (url,))
+            else:
+                self._conn.execute(
+                    "UPDATE resources SET expires_at = ?, last_access = ? WHERE url = ?", (now + lifetime, now, url)
+                )
+    
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM resources").fetchone()[0]
+    
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM resources").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Evict down to 90% so that the next few inserts do not evict again
+        excess = total - int(self.max_bytes * 0.9)
+        freed = 0
+        victims = []
+        for url, size in self._conn.execute("SELECT url, size FROM resources ORDER BY last_access"):
+            victims.append((url,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM resources WHERE url = ?", victims)
+        logger.info(f"🧹 Resource cache evicted {len(victims)} entries ({freed} bytes)")
+    
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+    
+    async def attach(self, page: Any) -> "ResourceCache":
+        """Serve ``page``'s cacheable requests from the cache; call before ``page.goto``."""
+        await page.route("**/*", self._route)
+        return self
+    
+    async def _route(self, route: Any, request: Any) -> None:
+        if (
+            request.method != "GET"
+            or request.resource_type not in CACHEABLE_TYPES
+            or not request.url.startswith(("http://", "https://"))
+        ):
+            await route.continue_()
+            return
+        
+        try:
+            await self._serve(route, request)
+        except Exception as error:
+            logger.debug(f"Resource cache bypassed for {request.url}: {error}")
+            RESOURCE_CACHE_REQUESTS.inc(result="error")
+            try:
+                await route.continue_()
+            except Exception:
+                # Already handled, or the page is gone
+                pass
+    
+    async def _serve(self, route: Any, request: Any) -> None:
+        url = request.url
+        entry = await asyncio.to_thread(self.get, url)
+        if entry is not None and entry.fresh:
+            RESOURCE_CACHE_REQUESTS.inc(result="hit")
+            RESOURCE_CACHE_SAVED.inc(len(entry.body))
+            await route.fulfill(status=entry.status, headers=entry.headers, body=entry.body)
+            return
+        
+        headers = dict(request.headers)
+        if entry is not None:
+            headers.update(entry.validators())
+        response = await route.fetch(headers=headers)
+        
+        if response.status == 304 and entry is not None:
+            RESOURCE_CACHE_REQUESTS.inc(result="revalidated")
+            RESOURCE_CACHE_SAVED.inc(len(entry.body))
+            await asyncio.to_thread(self.refresh, url, {**entry.headers, **response.headers})
+            await route.fulfill(status=entry.status, headers=entry.headers, body=entry.body)
+            return
+        
+        body = await response.body()
+        response_headers = {name.lower(): value for name, value in response.headers.items()}
+        # Followed redirects are not stored under the original URL
+        stored = response.url == url and await asyncio.to_thread(self.put, url, response.status, response_headers, body)
+        RESOURCE_CACHE_REQUESTS.inc(result="miss" if stored else "uncacheable")
+        await route.fulfill(
+            status=response.status,
+            headers={name: value for name, value in response_headers.items() if name not in TRANSFER_HEADERS},
+            body=body,
+        )
+
+
+_resource_cache: Optional[ResourceCache] = None
+
+
+def get_resource_cache() -> Optional[ResourceCache]:
+    """Resource cache shared by the page loads of this process; None if ADLOOK_RESOURCE_CACHE is empty."""
+    global _resource_cache
+    if _resource_cache is None:
+        from ..config import settings
+        
+        if not settings.ADLOOK_RESOURCE_CACHE:
+            return None
+        try:
+            _resource_cache = ResourceCache(
+                settings.ADLOOK_RESOURCE_CACHE, max_bytes=settings.ADLOOK_RESOURCE_CACHE_MB * 1024 * 1024
+            )
+        except sqlite3.Error as error:
+            logger.warning(f"⚠️ Resource cache {settings.ADLOOK_RESOURCE_CACHE} unavailable: {error}")
+            return None
+    return _resource_cache
@@ -0,0 +1,181 @@
+"""
+Screenshots held as PNG bytes.
+
+A full-page screenshot is several megabytes, and every base64 or ``data:``
+URL copy of it adds a third more. ``Screenshot`` keeps the one ``bytes``
+object Playwright returns and encodes only where base64 is required:
+
+- the vision request gets a ``data:`` URL of the image at the resolution
+  the model actually looks at (``for_vision``), built in one buffer;
+- API responses and stored job results encode it while serializing
+  (``json_default``);
+- the CLI writes the bytes to ``screenshot.png`` as they are.
+"""
+
+import asyncio
+import binascii
+import contextvars
+import functools
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple, TypeVar, Union
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Bytes encoded per step; a multiple of 3 so the base64 chunks concatenate without padding
+ENCODE_CHUNK = 3 * 64 * 1024
+
+# OpenAI vision preprocessing: "low" looks at the image within 512x512; "high" fits it in
+# 2048x2048 and then scales it down until the shorter side is at most 768 pixels
+LOW_DETAIL_SIDE = 512
+HIGH_DETAIL_SIDE = 2048
+HIGH_DETAIL_SHORT_SIDE = 768
+
+# Images are scaled on one dedicated thread: a decoded full-page screenshot takes ~30 MB,
+# and a single thread (with a single malloc arena) keeps that from multiplying with the
+# number of concurrent analyses
+_image_executor: Optional[ThreadPoolExecutor] = None
+
+
+def vision_size(width: int, height: int, detail: str) -> Tuple[int, int]:
+    """Size the vision model scales an image of ``width`` x ``height`` to for ``detail``."""
+    if detail == "low":
+        scale = min(1.0, LOW_DETAIL_SIDE / max(width, height))
+    else:
+        scale = min(1.0, HIGH_DETAIL_SIDE / max(width, height))
+        scale *= min(1.0, HIGH_DETAIL_SHORT_SIDE / (min(width, height) * scale))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+class Screenshot:
+    """Encoded image bytes; converted to base64 only on demand."""
+    
+    __slots__ = ("data", "media_type")
+    
+    def __init__(self, data: bytes, media_type: str = "image/png"):
+        self.data = data
+        self.media_type = media_type
+    
+    @classmethod
+    def from_data_url(cls, data_url: str) -> "Screenshot":
+        header, _, encoded = data_url.partition(",")
+        media_type = header[len("data:"):].split(";", 1)[0] or "image/png"
+        return cls(binascii.a2b_base64(encoded), media_type)
+    
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> "Screenshot":
+        return cls(Path(path).read_bytes())
+    
+    def __len__(self) -> int:
+        return len(self.data)
+    
+    def __repr__(self) -> str:
+        return f"Screenshot({self.media_type}, {len(self.data)} bytes)"
+    
+    @property
+    def nbytes(self) -> int:
+        return len(self.data)
+    
+    @property
+    def size(self) -> Tuple[int, int]:
+        """Width and height read from the PNG header; (0, 0) for other formats."""
+        if not self.data.startswith(PNG_SIGNATURE) or len(self.data) < 24:
+            return 0, 0
+        return int.from_bytes(self.data[16:20], "big"), int.from_bytes(self.data[20:24], "big")
+    
+    def save(self, path: Union[str, Path]) -> None:
+        Path(path).write_bytes(self.data)
+    
+    def iter_base64(self) -> Iterator[bytes]:
+        """Base64 of the image in ``ENCODE_CHUNK``-sized pieces."""
+        view = memoryview(self.data)
+        for start in range(0, len(view), ENCODE_CHUNK):
+            yield binascii.b2a_base64(view[start:start + ENCODE_CHUNK], newline=False)
+    
+    def data_url(self) -> str:
+        """
+        The image as a ``data:`` URL.
+        
+        Encoded chunk by chunk into a buffer of the final size, so the only
+        full-size copies are that buffer and the returned string.
+        """
+        prefix = f"data:{self.media_type};base64,".encode("ascii")
+        buffer = bytearray(len(prefix) + 4 * ((len(self.data) + 2) // 3))
+        buffer[:len(prefix)] = prefix
+        position = len(prefix)
+        for chunk in self.iter_base64():
+            buffer[position:position + len(chunk)] = chunk
+            position += len(chunk)
+        return buffer.decode("ascii")
+    
+    def for_vision(self, detail: str) -> "Screenshot":
+        """
+        The image scaled down to what the vision model sees at ``detail``.
+        
+        The API downscales larger images before the model looks at them, so
+        sending them at full size only costs memory and upload time.
+        Returns the screenshot itself when it is small enough already or
+        Pillow is not installed.
+        """
+        width, height = self.size
+        if not width or not height:
+            return self
+        target = vision_size(width, height, detail)
+        if target == (width, height):
+            return self
+        
+        try:
+            return self.crop([((0, 0, width, height), target)])[0]
+        except ImportError:
+            logger.debug("Pillow is not installed, sending the screenshot at full size")
+            return self
+    
+    def crop(self, regions: Sequence[Tuple[Tuple[int, int, int, int], Tuple[int, int]]]) -> List["Screenshot"]:
+        """
+        Cut regions out of the image, decoding it once.
+        
+        Args:
+            regions: ``((left, top, right, bottom), (width, height))`` pairs:
+                     the box in image pixels and the size to scale it to
+        
+        Returns:
+            One PNG screenshot per region
+        
+        Raises:
+            ImportError: If Pillow is not installed
+        """
+        from PIL import Image
+        
+        crops = []
+        with Image.open(io.BytesIO(self.data)) as image:
+            image.load()
+            for box, size in regions:
+                resized = image.resize(size, Image.Resampling.BILINEAR, box=box, reducing_gap=2.0)
+                buffer = io.BytesIO()
+                resized.save(buffer, format="PNG")
+                crops.append(Screenshot(buffer.getvalue()))
+        return crops
+
+
+async def in_image_thread(func: Callable[..., T], *args: Any) -> T:
+    """Run ``func(*args)`` on the image thread, in the caller's context (deadline, spans)."""
+    global _image_executor
+    if _image_executor is None:
+        _image_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="adlook-image")
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        _image_executor, functools.partial(context.run, func, *args)
+    )
+
+
+def json_default(value: Any) -> Any:
+    """``default`` hook for JSON serializers: screenshots become ``data:`` URLs."""
+    if isinstance(value, Screenshot):
+        return value.data_url()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,266 @@
+"""
+URL canonicalization, redirect resolution and deduplication.
+
+Prospect lists name the same site many ways: ``http://site.ru``,
+``https://www.site.ru/``, links with ``utm_*`` parameters, old domains that
+redirect to the new one. Before any browser work is scheduled, URLs are
+
+1. normalized (scheme, case, IDNA host, default port, fragment and tracking
+   parameters, sorted query);
+2. resolved to the end of their HTTP redirect chain with a cheap ``HEAD``
+   request, cached for ``ADLOOK_REDIRECT_CACHE_TTL`` seconds;
+3. collapsed by ``site_key``, which also ignores the scheme, ``www.`` and a
+   trailing slash.
+
+``SingleFlight`` lets concurrent requests for the same key share one
+in-flight analysis instead of running it twice.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import unquote_plus, urlsplit, urlunsplit
+
+from ..metrics import CACHE_LOOKUPS, INFLIGHT_SHARED
+from .deadline import timeout
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Query parameters that only identify the campaign or click, never the page
+TRACKING_PARAMS = frozenset({
+    "gclid", "dclid", "gbraid", "wbraid", "fbclid", "msclkid", "yclid", "ysclid", "igshid",
+    "_openstat", "_ga", "_gl", "mc_cid", "mc_eid", "roistat", "etext",
+})
+TRACKING_PREFIXES = ("utm_",)
+
+MAX_REDIRECTS = 10
+# Failed resolutions are retried sooner than successful ones expire
+FAILURE_TTL = 300.0
+RESOLVE_CONCURRENCY = 20
+USER_AGENT = "Mozilla/5.0 (compatible; AdLookBot/1.0)"
+
+
+def _is_tracking(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL without any network access.
+    
+    Adds ``https://`` when the scheme is missing, lower-cases the scheme and
+    host, encodes international domains as IDNA, drops the default port,
+    credentials, fragment and tracking parameters, and sorts the query.
+    
+    Raises:
+        ValueError: If the URL has no host or an invalid port
+    """
+    url = url.strip()
+    if "://" not in url:
+        url = f"https://{url}"
+    
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    if not host:
+        raise ValueError(f"URL has no host: {url}")
+    if ":" in host:
+        # IPv6 literal; ``hostname`` strips the brackets the netloc needs
+        host = f"[{host}]"
+    else:
+        try:
+            host = host.encode("idna").decode("ascii")
+        except UnicodeError:
+            pass
+    
+    port = parts.port
+    netloc = host if port is None or DEFAULT_PORTS.get(scheme) == port else f"{host}:{port}"
+    # Raw ``name=value`` segments, so the fetched URL keeps its encoding and valueless flags (``?a``)
+    query = "&".join(sorted(
+        segment for segment in parts.query.split("&")
+        if segment and not _is_tracking(unquote_plus(segment.split("=", 1)[0]))
+    ))
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+
+def site_key(url: str) -> str:
+    """Deduplication key: the normalized URL without scheme, ``www.`` and trailing slash."""
+    parts = urlsplit(normalize_url(url))
+    netloc = parts.netloc[4:] if parts.netloc.startswith("www.") else parts.netloc
+    path = parts.path.rstrip("/") or "/"
+    return f"{netloc}{path}" + (f"?{parts.query}" if parts.query else "")
+
+
+class SingleFlight:
+    """Share one in-flight call per key between concurrent callers."""
+    
+    def __init__(self, name: str):
+        """
+        Args:
+            name: Label of the shared-call metric
+        """
+        self.name = name
+        self._tasks: Dict[str, asyncio.Future] = {}
+        self._waiters: Dict[asyncio.Future, int] = {}
+    
+    def __len__(self) -> int:
+        return len(self._tasks)
+    
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await ``factory()``, or the call already running for ``key``.
+        
+        The call runs as its own task, so a caller that is cancelled does
+        not cancel it for the others; it is only cancelled once every
+        caller has gone. Every caller gets the same result object; copy it
+        before mutating.
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._tasks.pop(key, None) if self._tasks.get(key) is done else None)
+        else:
+            INFLIGHT_SHARED.inc(call=self.name)
+            logger.info(f"🔗 Joining in-flight {self.name} for {key}")
+        
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                if not task.done():
+                    logger.info(f"🛑 No callers left for {self.name} of {key}, cancelling it")
+                    task.cancel()
+
+
+class RedirectResolver:
+    """Follow HTTP redirects to the final URL, with a TTL cache."""
+    
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        timeout: Optional[float] = None,
+        max_entries: int = 10000,
+    ):
+        """
+        Args:
+            ttl: Seconds a resolved URL is cached (default: ADLOOK_REDIRECT_CACHE_TTL)
+            timeout: Seconds per resolution (default: ADLOOK_REDIRECT_TIMEOUT)
+            max_entries: Cache size; least recently used entries are evicted
+        """
+        from ..config import settings
+        
+        self.ttl = settings.ADLOOK_REDIRECT_CACHE_TTL if ttl is None else ttl
+        self.timeout = settings.ADLOOK_REDIRECT_TIMEOUT if timeout is None else timeout
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._inflight = SingleFlight("redirect")
+    
+    def _cached(self, url: str) -> Optional[str]:
+        entry = self._cache.get(url)
+        if entry is None or entry[1] < time.monotonic():
+            CACHE_LOOKUPS.inc(cache="redirects", result="miss")
+            return None
+        self._cache.move_to_end(url)
+        CACHE_LOOKUPS.inc(cache="redirects", result="hit")
+        return entry[0]
+    
+    def _store(self, url: str, final: str, ttl: float) -> None:
+        self._cache[url] = (final, time.monotonic() + ttl)
+        self._cache.move_to_end(url)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+    
+    async def _follow(self, url: str) -> str:
+        import httpx
+        
+        async with httpx.AsyncClient(
+            follow_redirects=True,
+            max_redirects=MAX_REDIRECTS,
+            timeout=timeout(self.timeout),
+            headers={"User-Agent": USER_AGENT},
+        ) as client:
+            response = await client.head(url)
+            if response.status_code >= 400:
+                # Some servers reject HEAD; read only the headers of a GET
+                async with client.stream("GET", url) as response:
+                    pass
+        return normalize_url(str(response.url))
+    
+    async def resolve(self, url: str) -> str:
+        """
+        Normalize a URL and follow its redirect chain.
+        
+        Returns:
+            Normalized final URL; the normalized input URL if it could not
+            be fetched (the browser will report the real error)
+        """
+        url = normalize_url(url)
+        cached = self._cached(url)
+        if cached is not None:
+            return cached
+        
+        async def fetch() -> str:
+            try:
+                final = await self._follow(url)
+            except Exception as error:
+                logger.warning(f"⚠️ Could not resolve redirects for {url}: {error}")
+                self._store(url, url, min(self.ttl, FAILURE_TTL))
+                return url
+            if final != url:
+                logger.info(f"↪️ {url} redirects to {final}")
+            self._store(url, final, self.ttl)
+            return final
+        
+        return await self._inflight.run(url, fetch)
+    
+    async def resolve_many(self, urls: Iterable[str]) -> Dict[str, str]:
+        """Resolve URLs concurrently; returns a mapping of each URL to its final URL."""
+        semaphore = asyncio.Semaphore(RESOLVE_CONCURRENCY)
+        
+        async def one(url: str) -> str:
+            async with semaphore:
+                return await self.resolve(url)
+        
+        urls = list(dict.fromkeys(urls))
+        return dict(zip(urls, await asyncio.gather(*(one(url) for url in urls))))
+
+
+_resolver: Optional[RedirectResolver] = None
+
+
+def get_resolver() -> RedirectResolver:
+    """Shared resolver, so the redirect cache outlives a single request."""
+    global _resolver
+    if _resolver is None:
+        _resolver = RedirectResolver()
+    return _resolver
+
+
+def dedupe(urls: Iterable[str], resolved: Optional[Dict[str, str]] = None) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Collapse URLs that point to the same page.
+    
+    Args:
+        urls: URLs in input order
+        resolved: Final URL per input URL (from ``resolve_many``); URLs not
+                  in it are only normalized
+    
+    Returns:
+        Tuple of (unique canonical URLs in input order, mapping of each
+        input URL to its canonical URL)
+    """
+    canonical: Dict[str, str] = {}
+    by_key: Dict[str, str] = {}
+    for url in urls:
+        final = (resolved or {}).get(url) or normalize_url(url)
+        canonical[url] = by_key.setdefault(site_key(final), final)
+    return list(by_key.values()), canonical
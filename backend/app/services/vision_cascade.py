@@ -0,0 +1,148 @@
+"""
+Model cascade for the vision zone analysis.
+
+The screenshot is first sent to a cheap tier (e.g. ``gpt-4o-mini`` with
+``detail: low``). Its answer is accepted when it is schema-valid, its
+self-reported confidence is at least ``ADLOOK_VISION_ACCEPT_CONFIDENCE`` and
+it does not contradict zones the DOM detector found from clear landmarks.
+Otherwise the next tier (by default ``gpt-4o`` with ``detail: high``) is
+asked. Calls and outcomes per tier are exported as metrics so the tiers and
+threshold can be tuned from production hit rates.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from ..metrics import VISION_TIER_CALLS, VISION_TIER_LATENCY
+from .zone_detector import SEMANTIC, ZoneDetection
+
+# Why a tier's answer was not used (or "accepted")
+ACCEPTED = "accepted"
+ERROR = "error"
+INVALID = "invalid"
+LOW_CONFIDENCE = "low_confidence"
+DISAGREEMENT = "disagreement"
+
+_SIZE = re.compile(r"^\d{2,4}x\d{2,4}$")
+
+
+@dataclass(frozen=True)
+class VisionTier:
+    model: str
+    detail: str = "high"
+    
+    @property
+    def name(self) -> str:
+        return f"{self.model}:{self.detail}"
+
+
+def parse_tiers(spec: str) -> List[VisionTier]:
+    """
+    Parse a tier list such as ``"gpt-4o-mini:low,gpt-4o:high"``.
+    
+    Raises:
+        ValueError: If the list is empty or a detail level is unknown
+    """
+    tiers = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        model, _, detail = item.partition(":")
+        detail = detail or "high"
+        if detail not in ("low", "high", "auto"):
+            raise ValueError(f"Unknown vision detail level '{detail}' in '{item}'")
+        tiers.append(VisionTier(model.strip(), detail))
+    if not tiers:
+        raise ValueError("ADLOOK_VISION_TIERS must list at least one model")
+    return tiers
+
+
+def validate_result(result: Any) -> Optional[str]:
+    """
+    Check a vision answer against the zone schema.
+    
+    Returns:
+        Description of the first problem, or None if the answer is valid
+    """
+    if not isinstance(result, dict):
+        return "answer is not a JSON object"
+    zones = result.get("zones")
+    if not isinstance(zones, list) or not zones:
+        return "no zones"
+    for zone in zones:
+        if not isinstance(zone, dict) or not isinstance(zone.get("name"), str):
+            return "zone without a name"
+        if not isinstance(zone.get("available"), bool):
+            return f"zone {zone['name']}: 'available' is not a boolean"
+        if zone.get("available") and not _SIZE.match(str(zone.get("size", ""))):
+            return f"zone {zone['name']}: bad size {zone.get('size')!r}"
+    if result.get("language") not in ("ru", "en"):
+        return f"unknown language {result.get('language')!r}"
+    return None
+
+
+def result_confidence(result: Dict[str, Any]) -> float:
+    """Lowest self-reported confidence (overall or per zone); 0 when missing."""
+    values = [result.get("confidence")] + [zone.get("confidence") for zone in result.get("zones", [])]
+    reported = [float(value) for value in values if isinstance(value, (int, float)) and not isinstance(value, bool)]
+    return min(reported) if reported else 0.0
+
+
+def disagreements(result: Dict[str, Any], detection: Optional[ZoneDetection]) -> List[str]:
+    """Zones the DOM detector found from semantic landmarks whose availability the model contradicts."""
+    if detection is None:
+        return []
+    model_zones = {zone.get("name", "").lower(): zone for zone in result.get("zones", [])}
+    conflicts = []
+    for zone in detection.zones:
+        other = model_zones.get(zone["name"].lower())
+        if other is not None and zone["confidence"] >= SEMANTIC and other.get("available") != zone["available"]:
+            conflicts.append(zone["name"])
+    return conflicts
+
+
+def judge(result: Any, detection: Optional[ZoneDetection], accept_confidence: float) -> str:
+    """
+    Decide whether a tier's answer can be used.
+    
+    Returns:
+        ACCEPTED, or the reason to escalate (INVALID, LOW_CONFIDENCE, DISAGREEMENT)
+    """
+    if validate_result(result) is not None:
+        return INVALID
+    if result_confidence(result) < accept_confidence:
+        return LOW_CONFIDENCE
+    if disagreements(result, detection):
+        return DISAGREEMENT
+    return ACCEPTED
+
+
+def record_call(tier: VisionTier, outcome: str, duration: float) -> None:
+    VISION_TIER_CALLS.inc(tier=tier.name, outcome=outcome)
+    VISION_TIER_LATENCY.observe(duration, tier=tier.name)
+
+
+def tier_summary() -> Dict[str, Dict[str, Any]]:
+    """
+    Calls, outcomes, hit rate and mean latency per tier in this process.
+    
+    Returns:
+        Mapping of tier name to its statistics
+    """
+    summary: Dict[str, Dict[str, Any]] = {}
+    for key, count in VISION_TIER_CALLS.samples().items():
+        labels = dict(key)
+        entry = summary.setdefault(labels["tier"], {"calls": 0, "outcomes": {}})
+        entry["calls"] += int(count)
+        entry["outcomes"][labels["outcome"]] = int(count)
+    
+    for key, state in VISION_TIER_LATENCY.samples().items():
+        entry = summary.get(dict(key)["tier"])
+        if entry is not None and state["count"]:
+            entry["mean_s"] = round(state["sum"] / state["count"], 4)
+    
+    for entry in summary.values():
+        entry["hit_rate"] = round(entry["outcomes"].get(ACCEPTED, 0) / entry["calls"], 4) if entry["calls"] else 0.0
+    return summary
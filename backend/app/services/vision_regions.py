@@ -0,0 +1,234 @@
+"""
+Region-of-interest crops of full-page screenshots for the vision model.
+
+The vision prompt asks about the header, sidebars, content, footer and
+popups, but on a long page most of a full-page screenshot is the middle of
+an article list or feed, and at ``high`` detail the API shrinks the whole
+page to 768 pixels wide. ``plan_regions`` uses the DOM landmark boxes from
+``extract_layout`` to cut out the parts the prompt is about:
+
+- ``header``: the header band at the top of the page
+- ``sidebar_left`` / ``sidebar_right``: the first screen of each sidebar
+- ``content``: the first screen of the main content
+- ``footer``: the top of the footer
+
+Regions that overlap vertically (the header, sidebars and first content
+screen usually do) are merged into one band, since the API bills images
+in 512px tiles and thin strips waste most of theirs. The bands go to the
+model as separate labelled images in one request. ``fit_to_budget`` scales
+them so that together they cost no more image tokens than the full page
+would, and they are only used if that leaves them at least as sharp as
+the full page. Otherwise (always at ``low`` detail, where every image
+costs the same), on short pages and without landmarks the full page is
+sent as before.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .screenshot import vision_size
+
+# Image token costs of the OpenAI vision models: a flat cost at low detail, and a
+# base cost plus one per 512px tile of the scaled image at high detail
+LOW_DETAIL_TOKENS = 85
+BASE_TOKENS = 85
+TILE_TOKENS = 170
+TILE_SIDE = 512
+
+# Pages shorter than this many screens have no middle worth cutting out
+MIN_PAGE_SCREENS = 2.0
+# Crop height limits in page pixels
+HEADER_MAX_HEIGHT = 400
+HEADER_BAND = 300
+FOOTER_MAX_HEIGHT = 600
+FOOTER_BAND = 400
+# Crops smaller than this (in either direction) are dropped
+MIN_CROP_SIDE = 32
+# Regions closer than this vertically are sent as one band
+MERGE_GAP = 200
+
+LABELS = {
+    "header": "Шапка сайта (верх страницы)",
+    "sidebar_left": "Боковая колонка слева (первый экран)",
+    "sidebar_right": "Боковая колонка справа (первый экран)",
+    "content": "Основной контент (первый экран)",
+    "footer": "Подвал сайта (низ страницы)",
+}
+
+Box = Dict[str, float]
+
+
+@dataclass
+class Region:
+    """A labelled crop of the screenshot: ``box`` in image pixels and the scale it is sent at."""
+    
+    names: Tuple[str, ...]
+    box: Tuple[int, int, int, int]
+    scale: float = 1.0
+    
+    @property
+    def label(self) -> str:
+        return "; ".join(LABELS.get(name, name) for name in self.names)
+    
+    @property
+    def output_size(self) -> Tuple[int, int]:
+        left, top, right, bottom = self.box
+        return max(1, round((right - left) * self.scale)), max(1, round((bottom - top) * self.scale))
+
+
+def _tiles(width: int, height: int) -> int:
+    width, height = vision_size(width, height, "high")
+    return math.ceil(width / TILE_SIDE) * math.ceil(height / TILE_SIDE)
+
+
+def image_tokens(width: int, height: int, detail: str) -> int:
+    """Prompt tokens the vision model charges for an image of ``width`` x ``height`` at ``detail``."""
+    if detail == "low":
+        return LOW_DETAIL_TOKENS
+    return BASE_TOKENS + TILE_TOKENS * _tiles(width, height)
+
+
+def _largest(boxes: List[Box]) -> Optional[Box]:
+    return max(boxes, key=lambda b: b["width"] * b["height"], default=None)
+
+
+def plan_regions(layout: Dict[str, Any], image_size: Tuple[int, int]) -> List[Region]:
+    """
+    Regions of interest of a full-page screenshot.
+    
+    Args:
+        layout: Result of ``extract_layout`` for the page in the screenshot
+        image_size: Width and height of the screenshot in pixels
+    
+    Returns:
+        Bands of merged regions in page order, or an empty list if the page
+        is too short or has no landmarks to go by
+    """
+    image_width, image_height = image_size
+    landmarks = layout.get("landmarks") or {}
+    viewport_width = layout.get("viewport", {}).get("width") or image_width
+    viewport_height = layout.get("viewport", {}).get("height") or 1080
+    page_width = layout.get("page", {}).get("width") or viewport_width
+    # Layout boxes are in CSS pixels; the screenshot may be taken at another device scale factor
+    ratio = image_width / page_width if page_width else 1.0
+    page_height = image_height / ratio
+    
+    if not image_width or page_height < MIN_PAGE_SCREENS * viewport_height:
+        return []
+    if not any(landmarks.get(kind) for kind in ("header", "nav", "main", "footer")):
+        return []
+    
+    def region(name: str, x: float, y: float, width: float, height: float) -> Optional[Region]:
+        left, top = max(0, round(x * ratio)), max(0, round(y * ratio))
+        right = min(image_width, round((x + width) * ratio))
+        bottom = min(image_height, round((y + height) * ratio))
+        if right - left < MIN_CROP_SIDE or bottom - top < MIN_CROP_SIDE:
+            return None
+        return Region((name,), (left, top, right, bottom))
+    
+    wide = 0.6 * viewport_width
+    header = _largest([b for b in landmarks.get("header", []) if b["y"] < 300 and b["width"] >= wide])
+    header = header or _largest([b for b in landmarks.get("nav", []) if b["y"] < 200 and b["width"] >= wide])
+    header_bottom = header["y"] + header["height"] if header else HEADER_BAND
+    header_region = region("header", 0, 0, page_width, min(header_bottom, HEADER_MAX_HEIGHT))
+    
+    sidebars: Dict[str, Box] = {}
+    for aside in landmarks.get("aside", []):
+        if not (120 <= aside["width"] <= 0.45 * viewport_width and aside["height"] >= 250):
+            continue
+        side = "sidebar_right" if aside["x"] + aside["width"] / 2 > viewport_width / 2 else "sidebar_left"
+        sidebars[side] = _largest([aside, sidebars[side]]) if side in sidebars else aside
+    
+    main = _largest([b for b in landmarks.get("main", []) if b["height"] >= 300])
+    if main is not None:
+        content_region = region("content", main["x"], main["y"], main["width"], min(main["height"], viewport_height))
+    else:
+        content_region = region("content", 0, header_bottom, page_width, viewport_height)
+    
+    footer = _largest([
+        b for b in landmarks.get("footer", [])
+        if b["y"] + b["height"] >= 0.7 * page_height and b["width"] >= wide
+    ])
+    if footer is not None:
+        footer_region = region("footer", 0, footer["y"], page_width, min(footer["height"], FOOTER_MAX_HEIGHT))
+    else:
+        footer_region = region("footer", 0, page_height - FOOTER_BAND, page_width, FOOTER_BAND)
+    
+    regions = [header_region, content_region, footer_region] + [
+        region(side, box["x"], box["y"], box["width"], min(box["height"], viewport_height))
+        for side, box in sorted(sidebars.items())
+    ]
+    return merge_bands([r for r in regions if r is not None])
+
+
+def merge_bands(regions: List[Region]) -> List[Region]:
+    """Merge regions less than ``MERGE_GAP`` apart vertically into bands, top to bottom."""
+    bands: List[Region] = []
+    for region in sorted(regions, key=lambda r: (r.box[1], r.box[0])):
+        if bands and region.box[1] <= bands[-1].box[3] + MERGE_GAP:
+            band = bands[-1]
+            left, top, right, bottom = band.box
+            band.box = (
+                min(left, region.box[0]), top, max(right, region.box[2]), max(bottom, region.box[3])
+            )
+            band.names += region.names
+        else:
+            bands.append(Region(region.names, region.box))
+    return bands
+
+
+def effective_scale(width: int, height: int, source_width: int, detail: str) -> float:
+    """Scale of an image the model sees, relative to a source ``source_width`` pixels wide."""
+    return vision_size(width, height, detail)[0] / source_width
+
+
+def fit_to_budget(regions: List[Region], detail: str, budget: int, min_scale: float = 0.0) -> bool:
+    """
+    Scale ``regions`` down (in place, all by the same factor) until their images cost at most ``budget`` tokens.
+    
+    Args:
+        regions: Crops to send
+        detail: Image detail of the request
+        budget: Image tokens allowed in total
+        min_scale: Lowest scale, as seen by the model, the crops may end up at
+    
+    Returns:
+        False if the crops cannot fit the budget at ``min_scale`` or above
+    """
+    def cost() -> int:
+        return sum(image_tokens(*region.output_size, detail) for region in regions)
+    
+    def seen_scale() -> float:
+        return min(
+            effective_scale(*region.output_size, region.box[2] - region.box[0], detail) for region in regions
+        )
+    
+    scale = 1.0
+    while cost() > budget:
+        scale *= 0.95
+        for region in regions:
+            region.scale = scale
+        if seen_scale() < min_scale:
+            return False
+    return seen_scale() >= min_scale
+
+
+def plan_vision_regions(layout: Optional[Dict[str, Any]], image_size: Tuple[int, int], detail: str) -> List[Region]:
+    """
+    Regions to send instead of the full page, or an empty list to send the full page.
+    
+    Args:
+        layout: Result of ``extract_layout``, or None
+        image_size: Width and height of the screenshot in pixels
+        detail: Image detail of the vision request (``low`` or ``high``)
+    """
+    if not layout or not all(image_size):
+        return []
+    regions = plan_regions(layout, image_size)
+    budget = image_tokens(*image_size, detail)
+    # No point in crops the model would see in less detail than the whole page
+    full_page_scale = effective_scale(*image_size, image_size[0], detail)
+    if not regions or not fit_to_budget(regions, detail, budget, min_scale=full_page_scale):
+        return []
+    return regions
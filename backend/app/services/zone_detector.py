@@ -0,0 +1,328 @@
+"""
+Rule-based ad zone detection from the rendered DOM.
+
+``extract_layout`` runs in the page while it is open for the screenshot and
+collects bounding boxes of semantic landmarks (header, nav, main/article,
+aside, footer), of known ad containers (AdSense, Yandex RTB, Google
+Publisher Tag, ad network iframes) and of overlays (modal dialogs and fixed
+blocks over the page). ``detect_zones`` turns that layout into
+the same ``zones`` schema the vision model returns, with a confidence score
+per zone. When every zone is backed by clear landmarks the vision call can
+be skipped; otherwise the caller falls back to the model.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .language import detect_language as guess_language
+
+logger = logging.getLogger(__name__)
+
+# Containers of ad units that are already placed on the page
+AD_SELECTORS = ", ".join([
+    "ins.adsbygoogle",
+    "[id^='yandex_rtb']",
+    "[id^='adfox_']",
+    "[id^='div-gpt-ad']",
+    "[data-google-query-id]",
+    "iframe[id^='google_ads_iframe']",
+    "iframe[src*='doubleclick.net']",
+    "iframe[src*='googlesyndication.com']",
+    "iframe[src*='an.yandex.ru']",
+    "iframe[src*='yandex.ru/ads']",
+    "[class*='advert']",
+    "[class~='ad']",
+    "[class~='ads']",
+    "[class*='ad-slot']",
+    "[class*='banner-ad']",
+])
+
+LAYOUT_SCRIPT = """
+(adSelectors) => {
+    const doc = document.documentElement;
+    const box = (el) => {
+        const r = el.getBoundingClientRect();
+        return {x: r.left + window.scrollX, y: r.top + window.scrollY, width: r.width, height: r.height};
+    };
+    const visible = (el) => {
+        const r = el.getBoundingClientRect();
+        if (r.width < 2 || r.height < 2) return false;
+        const style = getComputedStyle(el);
+        return style.display !== 'none' && style.visibility !== 'hidden' && parseFloat(style.opacity || '1') > 0;
+    };
+    const collect = (selector, limit) => Array.from(document.querySelectorAll(selector))
+        .filter(visible)
+        .slice(0, limit)
+        .map((el) => ({tag: el.tagName.toLowerCase(), id: el.id || null, ...box(el)}));
+    // Modal dialogs, and fixed blocks covering a quarter of the viewport or holding ads below its top
+    // (sticky anchors); fixed headers, chat buttons and the like are left out
+    const viewportArea = window.innerWidth * window.innerHeight;
+    const overlays = [];
+    for (const el of Array.from(document.querySelectorAll('body *')).slice(0, 5000)) {
+        if (overlays.length >= 10) break;
+        const dialog = el.matches('dialog[open], [role=dialog], [aria-modal=true]');
+        if (!dialog && getComputedStyle(el).position !== 'fixed') continue;
+        if (!visible(el) || overlays.some((overlay) => overlay.el.contains(el))) continue;
+        const r = el.getBoundingClientRect();
+        const ads = el.querySelectorAll(adSelectors).length + (el.matches(adSelectors) ? 1 : 0);
+        const modal = dialog || r.width * r.height >= 0.25 * viewportArea;
+        if (modal || (ads && r.top >= 100)) overlays.push({el, modal, ads});
+    }
+    const mains = Array.from(document.querySelectorAll('main, [role=main], article')).filter(visible);
+    const main = mains.sort((a, b) => box(b).height * box(b).width - box(a).height * box(a).width)[0];
+    return {
+        viewport: {width: window.innerWidth, height: window.innerHeight},
+        page: {width: doc.scrollWidth, height: Math.max(doc.scrollHeight, document.body ? document.body.scrollHeight : 0)},
+        lang: doc.lang || null,
+        landmarks: {
+            header: collect('header, [role=banner]', 10),
+            nav: collect('nav, [role=navigation]', 10),
+            main: collect('main, [role=main], article', 20),
+            aside: collect('aside, [role=complementary]', 10),
+            footer: collect('footer, [role=contentinfo]', 10),
+        },
+        main_blocks: main ? main.querySelectorAll('p, h2, h3, img, figure, li').length : 0,
+        ads: collect(adSelectors, 50),
+        overlays: overlays.map(({el, modal, ads}) => ({tag: el.tagName.toLowerCase(), id: el.id || null, modal, ads, ...box(el)})),
+        text_sample: (document.body ? document.body.innerText : '').slice(0, 2000),
+    };
+}
+"""
+
+# Confidence of a zone depending on how it was found
+SEMANTIC = 0.9
+INFERRED = 0.7
+ABSENT_CLEAR = 0.8
+ABSENT_UNCLEAR = 0.4
+
+
+async def extract_layout(page: Any) -> Optional[Dict[str, Any]]:
+    """
+    Collect landmark and ad container boxes from an open Playwright page.
+    
+    Returns:
+        Layout dict, or None if the script failed (e.g. the page navigated away)
+    """
+    try:
+        return await page.evaluate(LAYOUT_SCRIPT, AD_SELECTORS)
+    except Exception as error:
+        logger.warning(f'⚠️ Layout extraction failed: {error}')
+        return None
+
+
+@dataclass
+class ZoneDetection:
+    """Zones found in a layout and the confidence of the weakest one."""
+    
+    zones: List[Dict[str, Any]] = field(default_factory=list)
+    language: str = "en"
+    
+    @property
+    def confidence(self) -> float:
+        return min((zone["confidence"] for zone in self.zones), default=0.0)
+    
+    def to_result(self) -> Dict[str, Any]:
+        """Result in the shape returned by the vision analysis."""
+        return {
+            "zones": self.zones,
+            "language": self.language,
+            "source": "dom",
+            "confidence": round(self.confidence, 2),
+        }
+
+
+def _overlaps(a: Dict[str, float], b: Dict[str, float]) -> bool:
+    return (
+        a["x"] < b["x"] + b["width"] and b["x"] < a["x"] + a["width"]
+        and a["y"] < b["y"] + b["height"] and b["y"] < a["y"] + a["height"]
+    )
+
+
+def _ads_in(region: Dict[str, float], ads: List[Dict[str, float]]) -> List[Dict[str, float]]:
+    return [ad for ad in ads if _overlaps(region, ad)]
+
+
+def _largest(boxes: List[Dict[str, float]]) -> Optional[Dict[str, float]]:
+    return max(boxes, key=lambda b: b["width"] * b["height"], default=None)
+
+
+def _banner_size(width: float) -> str:
+    return "728x90" if width >= 728 else "320x50"
+
+
+def _ads_phrase(count: int) -> str:
+    return f"уже размещено рекламных блоков: {count}" if count else "рекламных блоков не обнаружено"
+
+
+def detect_language(layout: Dict[str, Any]) -> str:
+    """Language from the ``lang`` attribute and the visible text sample."""
+    return guess_language(html_lang=layout.get("lang"), text=layout.get("text_sample") or "").language
+
+
+def _header_zone(layout, viewport_width, ads) -> Dict[str, Any]:
+    landmarks = layout["landmarks"]
+    candidates = [
+        b for b in landmarks.get("header", [])
+        if b["y"] < 300 and b["width"] >= 0.6 * viewport_width
+    ]
+    header, confidence = _largest(candidates), SEMANTIC
+    
+    if header is None:
+        # A full-width nav at the top usually is the header
+        navs = [b for b in landmarks.get("nav", []) if b["y"] < 200 and b["width"] >= 0.6 * viewport_width]
+        header, confidence = _largest(navs), INFERRED
+    
+    if header is None:
+        return {
+            "name": "Header", "available": False, "size": _banner_size(viewport_width), "priority": "high",
+            "description": "Шапка сайта не распознана по разметке", "confidence": ABSENT_UNCLEAR,
+        }
+    
+    placed = _ads_in(header, ads)
+    return {
+        "name": "Header",
+        "available": not placed,
+        "size": _banner_size(header["width"]),
+        "priority": "high",
+        "description": f"Шапка сайта ({int(header['width'])}x{int(header['height'])}px) в верхней части страницы; {_ads_phrase(len(placed))}",
+        "confidence": confidence,
+    }
+
+
+def _sidebar_zone(layout, viewport_width, main, ads) -> Dict[str, Any]:
+    asides = [
+        b for b in layout["landmarks"].get("aside", [])
+        if 120 <= b["width"] <= 0.45 * viewport_width and b["height"] >= 250
+    ]
+    sidebar = _largest(asides)
+    
+    if sidebar is None:
+        full_width = main is not None and main["width"] >= 0.7 * viewport_width
+        return {
+            "name": "Sidebar", "available": False, "size": "300x250", "priority": "medium",
+            "description": "Боковая колонка отсутствует, контент занимает всю ширину" if full_width
+            else "Боковая колонка не распознана по разметке",
+            "confidence": ABSENT_CLEAR if full_width else ABSENT_UNCLEAR,
+        }
+    
+    placed = _ads_in(sidebar, ads)
+    free_height = sidebar["height"] - sum(ad["height"] for ad in placed)
+    side = "справа" if sidebar["x"] + sidebar["width"] / 2 > viewport_width / 2 else "слева"
+    if sidebar["width"] < 250:
+        size = "160x600"
+    else:
+        size = "300x600" if free_height >= 600 else "300x250"
+    return {
+        "name": "Sidebar",
+        "available": free_height >= 250 and len(placed) < 2,
+        "size": size,
+        "priority": "medium",
+        "description": f"Боковая колонка {side} шириной {int(sidebar['width'])}px, свободно около {max(int(free_height), 0)}px по высоте; {_ads_phrase(len(placed))}",
+        "confidence": SEMANTIC,
+    }
+
+
+def _content_zone(layout, main, ads) -> Dict[str, Any]:
+    if main is None:
+        return {
+            "name": "Content", "available": False, "size": "300x250", "priority": "high",
+            "description": "Основной контент не распознан по разметке", "confidence": ABSENT_UNCLEAR,
+        }
+    
+    placed = _ads_in(main, ads)
+    blocks = layout.get("main_blocks", 0)
+    # Roughly one in-content unit per 1500px of content
+    capacity = max(1, int(main["height"] // 1500))
+    available = main["height"] >= 800 and blocks >= 4 and len(placed) < capacity
+    return {
+        "name": "Content",
+        "available": available,
+        "size": "300x250",
+        "priority": "high",
+        "description": f"Основной контент высотой {int(main['height'])}px ({blocks} блоков), место между абзацами; {_ads_phrase(len(placed))}",
+        "confidence": SEMANTIC if blocks >= 4 else INFERRED,
+    }
+
+
+def _footer_zone(layout, viewport_width, page_height, ads) -> Dict[str, Any]:
+    candidates = [
+        b for b in layout["landmarks"].get("footer", [])
+        if b["y"] + b["height"] >= 0.7 * page_height and b["width"] >= 0.6 * viewport_width
+    ]
+    footer = _largest(candidates)
+    
+    if footer is None:
+        return {
+            "name": "Footer", "available": False, "size": _banner_size(viewport_width), "priority": "medium",
+            "description": "Подвал сайта не распознан по разметке", "confidence": ABSENT_UNCLEAR,
+        }
+    
+    placed = _ads_in(footer, ads)
+    return {
+        "name": "Footer",
+        "available": not placed,
+        "size": _banner_size(footer["width"]),
+        "priority": "medium",
+        "description": f"Подвал сайта над копирайтом; {_ads_phrase(len(placed))}",
+        "confidence": SEMANTIC,
+    }
+
+
+def _popup_zone(layout) -> Dict[str, Any]:
+    overlays = layout.get("overlays")
+    if overlays is None:
+        # Not collected: only the screenshot can tell
+        return {
+            "name": "Popup", "available": False, "size": "300x250", "priority": "medium",
+            "description": "Всплывающие окна не проверены по разметке", "confidence": ABSENT_UNCLEAR,
+        }
+    
+    with_ads = [overlay for overlay in overlays if overlay.get("ads")]
+    if with_ads:
+        return {
+            "name": "Popup",
+            "available": False,
+            "size": "300x250",
+            "priority": "medium",
+            "description": f"Поверх страницы уже показывается реклама (всплывающие или закреплённые блоки: {len(with_ads)})",
+            "confidence": SEMANTIC,
+        }
+    
+    modals = [overlay for overlay in overlays if overlay.get("modal")]
+    return {
+        "name": "Popup",
+        "available": True,
+        "size": "300x250",
+        "priority": "medium",
+        "description": f"Всплывающие окна без рекламы ({len(modals)}, например согласие на cookies или подписка); рекламу можно показать в модальном окне"
+        if modals else "Всплывающих окон и закреплённой рекламы при загрузке нет; можно показать рекламу в модальном окне",
+        "confidence": ABSENT_CLEAR,
+    }
+
+
+def detect_zones(layout: Dict[str, Any]) -> ZoneDetection:
+    """
+    Find Header, Sidebar, Content, Footer and Popup zones in a page layout.
+    
+    Args:
+        layout: Result of ``extract_layout``
+    
+    Returns:
+        ZoneDetection with zones in the vision schema plus a ``confidence``
+        per zone
+    """
+    layout = {**layout, "landmarks": layout.get("landmarks") or {}}
+    viewport_width = layout.get("viewport", {}).get("width") or 1920
+    page_height = layout.get("page", {}).get("height") or 0
+    ads = layout.get("ads", [])
+    main = _largest([b for b in layout["landmarks"].get("main", []) if b["height"] >= 300])
+    
+    zones = [
+        _header_zone(layout, viewport_width, ads),
+        _sidebar_zone(layout, viewport_width, main, ads),
+        _content_zone(layout, main, ads),
+        _footer_zone(layout, viewport_width, page_height, ads),
+        _popup_zone(layout),
+    ]
+    return ZoneDetection(zones=zones, language=detect_language(layout))
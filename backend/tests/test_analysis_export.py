@@ -0,0 +1,64 @@
+"""Tests for flattening analyses into export rows and writing them."""
+
+import io
+
+import pytest
+
+from backend.app.services.analysis_export import COLUMN_NAMES, flatten, iter_export
+
+RESULT = {
+    "url": "https://www.site.ru/",
+    "created_at": 1700000000,
+    "language": "ru",
+    "zones": [
+        {"name": "Header", "available": True, "size": "728x90", "priority": "high", "confidence": 0.9},
+        {"name": "Sidebar (right)", "available": False, "size": 300, "priority": 1, "confidence": "0.7"},
+        {"name": "Sidebar (left)", "available": True, "size": "160x600", "priority": "medium"},
+        {"name": "Unknown", "available": True},
+    ],
+    "emails": ["info@site.ru", "sales@site.ru"],
+    "adtech": {"networks": [{"name": "Google AdSense"}]},
+}
+
+
+def test_flatten_one_row_per_analysis():
+    row = flatten("a1", RESULT)
+    
+    assert set(row) == set(COLUMN_NAMES)
+    assert row["domain"] == "site.ru"
+    assert row["header_available"] is True
+    # The available one of several sidebars describes the page
+    assert row["sidebar_size"] == "160x600"
+    assert row["footer_available"] is None
+    assert row["zones_available_count"] == 2
+    assert row["emails"] == "info@site.ru;sales@site.ru"
+    assert row["adtech_network_count"] == 1
+
+
+def test_flatten_coerces_untyped_model_output():
+    row = flatten("a1", {**RESULT, "zones": [RESULT["zones"][1]]})
+    
+    assert row["sidebar_size"] == "300"
+    assert row["sidebar_priority"] == "1"
+    assert row["sidebar_confidence"] == 0.7
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet", "arrow"])
+def test_export_writes_untyped_model_output(fmt):
+    if fmt != "csv":
+        pytest.importorskip("pyarrow")
+    rows = [flatten("a1", RESULT), flatten("a2", {**RESULT, "zones": [RESULT["zones"][1]]})]
+    
+    data = b"".join(iter_export(rows, fmt))
+    
+    if fmt == "csv":
+        assert data.decode("utf-8").splitlines()[0].split(",") == COLUMN_NAMES
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+        
+        table = pq.read_table(io.BytesIO(data))
+        assert table.column("sidebar_size").to_pylist() == ["160x600", "300"]
+    else:
+        import pyarrow as pa
+        
+        assert pa.ipc.open_file(io.BytesIO(data)).read_all().num_rows == 2
@@ -0,0 +1,108 @@
+"""Tests for searching the analysis store: paging, relevance and facets."""
+
+import pytest
+
+from backend.app.services.analysis_store import AnalysisStore, SearchError, SearchQuery
+
+
+def analysis(title, language="ru", zones=("Header",), emails=()):
+    return {
+        "title": title,
+        "language": language,
+        "zones": [{"name": name, "available": True} for name in zones],
+        "emails": list(emails),
+        "company_name": None,
+        "description": None,
+        "proposal": None,
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = AnalysisStore(str(tmp_path / "analyses.db"))
+    yield store
+    store.close()
+
+
+def ids(page):
+    return [result["analysis_id"] for result in page["results"]]
+
+
+def test_recent_pages_continue_from_the_cursor(store):
+    for n in range(5):
+        store.add(f"a{n}", f"https://site{n}.example/", analysis(f"Page {n}"))
+    
+    first = store.search(SearchQuery(limit=2))
+    assert ids(first) == ["a4", "a3"]
+    
+    # Analyses added while paging do not shift the following pages
+    store.add("a5", "https://site5.example/", analysis("Page 5"))
+    second = store.search(SearchQuery(limit=2, cursor=first["next_cursor"]))
+    assert ids(second) == ["a2", "a1"]
+    
+    last = store.search(SearchQuery(limit=2, cursor=second["next_cursor"]))
+    assert ids(last) == ["a0"]
+    assert last["next_cursor"] is None
+
+
+def test_text_search_pages_with_snippets(store):
+    for n in range(3):
+        store.add(f"f{n}", f"https://flowers{n}.example/", analysis(f"Доставка цветов {n}"))
+    store.add("other", "https://cars.example/", analysis("Продажа автомобилей"))
+    
+    first = store.search(SearchQuery(q="цветов", limit=2))
+    assert ids(first) == ["f2", "f1"]
+    assert "<b>цветов</b>" in first["results"][0]["snippet"]
+    second = store.search(SearchQuery(q="цветов", limit=2, cursor=first["next_cursor"]))
+    assert ids(second) == ["f0"]
+    assert second["next_cursor"] is None
+
+
+def test_relevance_pages_by_offset(store):
+    store.add("once", "https://a.example/", analysis("Цветы и подарки, открытки, шары"))
+    store.add("twice", "https://b.example/", analysis("Цветы цветы"))
+    store.add("none", "https://c.example/", analysis("Автомобили"))
+    
+    first = store.search(SearchQuery(q="цветы", sort="relevance", limit=1))
+    assert ids(first) == ["twice"]
+    assert first["next_cursor"] == "1"
+    second = store.search(SearchQuery(q="цветы", sort="relevance", limit=1, cursor=first["next_cursor"]))
+    assert ids(second) == ["once"]
+    assert second["next_cursor"] is None
+
+
+def test_relevance_needs_a_query(store):
+    with pytest.raises(SearchError):
+        store.search(SearchQuery(sort="relevance"))
+    with pytest.raises(SearchError):
+        store.search(SearchQuery(cursor="not-a-number"))
+
+
+def test_facet_counts_follow_deletes(store):
+    store.add("ru1", "https://a.example/", analysis("Цветы", zones=("Header", "Sidebar"), emails=["a@a.example"]))
+    store.add("ru2", "https://b.example/", analysis("Цветы", zones=("Header",)))
+    store.add("en1", "https://c.example/", analysis("Flowers", language="en", zones=("Footer",)))
+    
+    facets = store.search(SearchQuery(), facets=True)["facets"]
+    assert facets["total"] == 3
+    assert facets["language"] == {"ru": 2, "en": 1}
+    assert facets["zone"]["header"] == 2
+    
+    assert store.delete("ru1")
+    assert not store.delete("ru1")
+    
+    # From the counts table (column filters only) and from the matching rows (text query)
+    facets = store.search(SearchQuery(), facets=True)["facets"]
+    assert facets["total"] == 2
+    assert facets["language"] == {"ru": 1, "en": 1}
+    assert facets["zone"]["header"] == 1
+    assert facets["zone"]["sidebar"] == 0
+    assert store.search(SearchQuery(has_emails=True), facets=True)["facets"]["total"] == 0
+    
+    facets = store.search(SearchQuery(q="цветы"), facets=True)["facets"]
+    assert facets["total"] == 1
+    assert facets["language"] == {"ru": 1}
+    
+    store.delete("en1")
+    facets = store.search(SearchQuery(), facets=True)["facets"]
+    assert facets["language"] == {"ru": 1}
@@ -0,0 +1,70 @@
+"""Tests for ingesting into the company registry and looking companies up."""
+
+import io
+import sqlite3
+
+import pytest
+
+from backend.app.services.company_registry import CompanyRecord, CompanyRegistry, iter_csv
+
+CSV = "name,inn\nООО Ромашка,7707083893\n"
+
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = CompanyRegistry(str(tmp_path / "companies.db"))
+    yield registry
+    registry.close()
+
+
+def test_reingesting_records_without_ogrn_updates_them(registry):
+    registry.ingest(iter_csv(io.StringIO(CSV)))
+    registry.ingest(iter_csv(io.StringIO(CSV)))
+    
+    assert registry.count() == 1
+    assert registry.lookup("ООО Ромашка").method == "name"
+    assert registry.lookup(inn="7707083893").record.name == "ООО Ромашка"
+
+
+def test_reingesting_updates_records_by_ogrn(registry):
+    registry.ingest([CompanyRecord(name="Ромашка", ogrn="1027700132195", director="Иванов")])
+    registry.ingest([CompanyRecord(name="Ромашка", ogrn="1027700132195", director="Петров")])
+    
+    assert registry.count() == 1
+    assert registry.lookup(ogrn="1027700132195").record.director == "Петров"
+
+
+def test_same_name_with_different_inns_stays_ambiguous(registry):
+    registry.ingest([CompanyRecord(name="Ромашка", inn="7707083893"), CompanyRecord(name="Ромашка", inn="500100732259")])
+    
+    assert registry.count() == 2
+    assert registry.lookup("Ромашка") is None
+    assert registry.lookup("Ромашка", inn="500100732259").record.inn == "500100732259"
+
+
+def test_failed_batch_is_rolled_back(registry):
+    with pytest.raises(sqlite3.Error):
+        registry.ingest([CompanyRecord(name="Ромашка"), CompanyRecord(name="Лютик", director=object())])
+    
+    assert registry.count() == 0
+    registry.ingest([CompanyRecord(name="Ромашка")])
+    assert registry.lookup("Ромашка").method == "name"
+
+
+def test_duplicates_from_older_ingests_are_removed_on_open(tmp_path):
+    path = str(tmp_path / "companies.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE companies (id INTEGER PRIMARY KEY, ogrn TEXT UNIQUE, inn TEXT, name TEXT NOT NULL,"
+                 " full_name TEXT, name_key TEXT NOT NULL, director TEXT, activity TEXT, address TEXT,"
+                 " status TEXT, registered TEXT)")
+    conn.executemany("INSERT INTO companies (inn, name, name_key) VALUES ('7707083893', 'ООО Ромашка', 'ромашка')",
+                     [(), ()])
+    conn.commit()
+    conn.close()
+    
+    registry = CompanyRegistry(path)
+    assert registry.count() == 1
+    registry.ingest(iter_csv(io.StringIO(CSV)))
+    assert registry.count() == 1
+    assert registry.lookup("ООО Ромашка") is not None
+    registry.close()
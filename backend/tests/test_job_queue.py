@@ -0,0 +1,93 @@
+"""Tests for the SQLite job queue: claims, leases and attempts."""
+
+import time
+
+import pytest
+
+from backend.app.jobs.queue import DONE, FAILED, QUEUED, RUNNING, JobQueueError, open_job_queue
+from backend.app.jobs.sqlite_backend import SQLiteJobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / "jobs.db"), max_attempts=2)
+    yield queue
+    queue.close()
+
+
+def expire_lease(queue, job_id):
+    queue._conn.execute("UPDATE jobs SET lease_expires = ? WHERE id = ?", (time.time() - 1, job_id))
+
+
+def test_claim_takes_jobs_in_order_once(queue):
+    first, second = queue.enqueue(["https://a.example/", "https://b.example/"])
+    
+    claimed = queue.claim("worker-1", lease_seconds=60)
+    assert claimed.id == first.id
+    assert claimed.status == RUNNING
+    assert claimed.worker_id == "worker-1"
+    assert claimed.attempts == 1
+    
+    assert queue.claim("worker-2", lease_seconds=60).id == second.id
+    assert queue.claim("worker-3", lease_seconds=60) is None
+
+
+def test_heartbeat_extends_only_the_owners_lease(queue):
+    job, = queue.enqueue(["https://a.example/"])
+    claimed = queue.claim("worker-1", lease_seconds=1)
+    
+    assert queue.heartbeat(job.id, "worker-1", lease_seconds=60)
+    assert queue.get(job.id).lease_expires > claimed.lease_expires
+    assert not queue.heartbeat(job.id, "worker-2", lease_seconds=60)
+    
+    queue.complete(job.id, "worker-1", {"success": True})
+    assert queue.get(job.id).status == DONE
+    assert not queue.heartbeat(job.id, "worker-1", lease_seconds=60)
+
+
+def test_expired_lease_is_requeued_for_another_worker(queue):
+    job, = queue.enqueue(["https://a.example/"])
+    queue.claim("worker-1", lease_seconds=60)
+    expire_lease(queue, job.id)
+    
+    reclaimed = queue.claim("worker-2", lease_seconds=60)
+    assert reclaimed.id == job.id
+    assert reclaimed.worker_id == "worker-2"
+    assert reclaimed.attempts == 2
+    # The first worker lost the job and cannot renew or fail it any more
+    assert not queue.heartbeat(job.id, "worker-1", lease_seconds=60)
+    assert not queue.fail(job.id, "worker-1", "too late")
+
+
+def test_expired_lease_fails_the_job_after_max_attempts(queue):
+    job, = queue.enqueue(["https://a.example/"])
+    for worker_id in ("worker-1", "worker-2"):
+        queue.claim(worker_id, lease_seconds=60)
+        expire_lease(queue, job.id)
+    
+    assert queue.requeue_expired() == 1
+    failed = queue.get(job.id)
+    assert failed.status == FAILED
+    assert failed.error == "Lease expired"
+    assert queue.claim("worker-3", lease_seconds=60) is None
+
+
+def test_fail_requeues_until_max_attempts(queue):
+    job, = queue.enqueue(["https://a.example/"])
+    
+    queue.claim("worker-1", lease_seconds=60)
+    assert queue.fail(job.id, "worker-1", "timeout")
+    assert queue.get(job.id).status == QUEUED
+    
+    queue.claim("worker-1", lease_seconds=60)
+    assert queue.fail(job.id, "worker-1", "timeout again")
+    failed = queue.get(job.id)
+    assert failed.status == FAILED
+    assert failed.error == "timeout again"
+    assert queue.counts() == {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 1}
+
+
+@pytest.mark.parametrize("url", ["postgres://localhost/jobs", "redis://localhost:6379/not-a-db", "redis://localhost:port/0"])
+def test_open_job_queue_rejects_bad_urls_with_job_queue_error(url):
+    with pytest.raises(JobQueueError):
+        open_job_queue(url)
@@ -0,0 +1,114 @@
+"""Tests for per-domain navigation planning and its history."""
+
+import pytest
+
+from backend.app.services.navigation import (
+    DOMCONTENTLOADED, LOAD, MIN_TIMEOUT, NETWORKIDLE, SETTLE_SECONDS, DomainTimings,
+    NavigationHistory, NavigationPlan, NavigationResult, domain_of, plan_navigation,
+)
+
+MAX_TIMEOUT = 30.0
+
+
+@pytest.fixture
+def history():
+    history = NavigationHistory(":memory:")
+    yield history
+    history.close()
+
+
+def navigation(history, plan, partial=False, **timings):
+    """Record a navigation of example.com that reached the given milestones (in ms)."""
+    return history.record("example.com", NavigationResult(plan, dict(timings), partial))
+
+
+def test_new_domain_waits_for_networkidle_with_the_full_timeout():
+    assert plan_navigation(None, MAX_TIMEOUT) == NavigationPlan(NETWORKIDLE, MAX_TIMEOUT, settle=0.0)
+
+
+def test_idle_domain_gets_a_learned_timeout():
+    plan = plan_navigation(DomainTimings(visits=1, networkidle_ms=4000), MAX_TIMEOUT)
+    
+    assert plan == NavigationPlan(NETWORKIDLE, 4 * 3 + 2, settle=0.0)
+
+
+@pytest.mark.parametrize("networkidle_ms, timeout", [(100, MIN_TIMEOUT), (60000, MAX_TIMEOUT)])
+def test_learned_timeout_is_clamped(networkidle_ms, timeout):
+    plan = plan_navigation(DomainTimings(visits=1, networkidle_ms=networkidle_ms), MAX_TIMEOUT)
+    
+    assert plan.timeout == timeout
+
+
+def test_domain_that_missed_idle_waits_for_load_and_settles():
+    timings = DomainTimings(visits=2, load_ms=2000, networkidle_ms=3000, networkidle_misses=1)
+    
+    assert plan_navigation(timings, MAX_TIMEOUT) == NavigationPlan(LOAD, 8.0, settle=SETTLE_SECONDS)
+
+
+def test_domain_that_missed_load_waits_for_domcontentloaded():
+    timings = DomainTimings(visits=2, domcontentloaded_ms=1000, load_ms=2000, load_misses=1, networkidle_misses=2)
+    
+    assert plan_navigation(timings, MAX_TIMEOUT) == NavigationPlan(DOMCONTENTLOADED, MIN_TIMEOUT, settle=SETTLE_SECONDS)
+
+
+def test_record_smooths_milestone_times(history):
+    plan = plan_navigation(None, MAX_TIMEOUT)
+    navigation(history, plan, domcontentloaded=1000, load=2000, networkidle=3000)
+    timings = navigation(history, plan, domcontentloaded=2000, load=2000, networkidle=4000)
+    
+    assert timings.visits == 2
+    assert timings.domcontentloaded_ms == pytest.approx(1300)
+    assert timings.load_ms == pytest.approx(2000)
+    assert timings.networkidle_ms == pytest.approx(3300)
+    assert history.get("example.com") == timings
+    assert history.get("other.com") is None
+
+
+def test_timeouts_demote_the_domain_and_settling_promotes_it_back(history):
+    plan = plan_navigation(history.get("example.com"), MAX_TIMEOUT)
+    navigation(history, plan, domcontentloaded=800, load=1500, networkidle=2500)
+    
+    # Stopped going idle: timed out waiting for networkidle after load
+    plan = plan_navigation(history.get("example.com"), MAX_TIMEOUT)
+    assert plan.wait_until == NETWORKIDLE
+    timings = navigation(history, plan, partial=True, domcontentloaded=800, load=1500)
+    assert (timings.load_misses, timings.networkidle_misses, timings.partial) == (0, 1, 1)
+    
+    # Then did not even reach load in time
+    plan = plan_navigation(timings, MAX_TIMEOUT)
+    assert plan.wait_until == LOAD
+    timings = navigation(history, plan, partial=True, domcontentloaded=900)
+    assert (timings.load_misses, timings.networkidle_misses, timings.partial) == (1, 2, 2)
+    
+    # A settle that does not reach network quiet is not a miss
+    plan = plan_navigation(timings, MAX_TIMEOUT)
+    assert plan.wait_until == DOMCONTENTLOADED
+    timings = navigation(history, plan, domcontentloaded=900, load=1600)
+    assert (timings.load_misses, timings.networkidle_misses) == (0, 2)
+    
+    plan = plan_navigation(timings, MAX_TIMEOUT)
+    assert plan.wait_until == LOAD
+    timings = navigation(history, plan, domcontentloaded=900, load=1600, networkidle=2600)
+    assert (timings.load_misses, timings.networkidle_misses) == (0, 0)
+    assert plan_navigation(timings, MAX_TIMEOUT).wait_until == NETWORKIDLE
+    assert timings.visits == 5
+
+
+def test_history_is_shared_through_the_database_file(tmp_path):
+    path = str(tmp_path / "navigation.db")
+    first, second = NavigationHistory(path), NavigationHistory(path)
+    try:
+        first.record("example.com", NavigationResult(NavigationPlan(), {LOAD: 1000.0}))
+        assert second.get("example.com").load_ms == 1000.0
+    finally:
+        first.close()
+        second.close()
+
+
+@pytest.mark.parametrize("url, domain", [
+    ("https://www.Example.com/page", "example.com"),
+    ("http://shop.example.com:8080/", "shop.example.com"),
+    ("not a url", ""),
+])
+def test_domain_of(url, domain):
+    assert domain_of(url) == domain
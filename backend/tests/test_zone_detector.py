@@ -0,0 +1,145 @@
+"""Tests for rule-based zone detection from page layouts."""
+
+import pytest
+
+from backend.app.services.zone_detector import (
+    ABSENT_CLEAR, ABSENT_UNCLEAR, INFERRED, SEMANTIC, detect_zones,
+)
+
+# ADLOOK_ZONE_CONFIDENCE_THRESHOLD default: below it the vision model decides
+VISION_THRESHOLD = 0.75
+
+
+def box(x, y, width, height):
+    return {"x": x, "y": y, "width": width, "height": height}
+
+
+def layout(**overrides):
+    """A desktop page with every landmark: header, main with a right sidebar, footer."""
+    base = {
+        "viewport": {"width": 1920, "height": 1080},
+        "page": {"width": 1920, "height": 4000},
+        "lang": "ru",
+        "landmarks": {
+            "header": [box(0, 0, 1920, 120)],
+            "nav": [],
+            "main": [box(200, 150, 1100, 3500)],
+            "aside": [box(1350, 150, 300, 1400)],
+            "footer": [box(0, 3700, 1920, 300)],
+        },
+        "main_blocks": 40,
+        "ads": [],
+        "overlays": [],
+        "text_sample": "Доставка цветов по Москве, свежие букеты каждый день",
+    }
+    base.update(overrides)
+    return base
+
+
+def zones_by_name(detection):
+    return {zone["name"]: zone for zone in detection.zones}
+
+
+def test_semantic_layout_is_confident_enough_to_skip_vision():
+    detection = detect_zones(layout())
+    zones = zones_by_name(detection)
+    
+    assert list(zones) == ["Header", "Sidebar", "Content", "Footer", "Popup"]
+    assert all(zone["available"] for zone in zones.values())
+    assert zones["Header"]["size"] == "728x90"
+    assert zones["Sidebar"]["size"] == "300x600"
+    assert "справа" in zones["Sidebar"]["description"]
+    assert detection.confidence >= VISION_THRESHOLD
+    assert detection.language == "ru"
+    assert detection.to_result()["source"] == "dom"
+
+
+def test_ads_already_placed_make_zones_unavailable():
+    ads = [box(600, 20, 728, 90), box(1350, 200, 300, 600), box(1350, 850, 300, 600), box(600, 3750, 728, 90)]
+    zones = zones_by_name(detect_zones(layout(ads=ads)))
+    
+    assert not zones["Header"]["available"]
+    assert not zones["Sidebar"]["available"]
+    assert not zones["Footer"]["available"]
+    assert "уже размещено рекламных блоков: 1" in zones["Header"]["description"]
+
+
+def test_missing_header_sends_the_page_to_vision():
+    landmarks = {**layout()["landmarks"], "header": []}
+    detection = detect_zones(layout(landmarks=landmarks))
+    
+    assert zones_by_name(detection)["Header"]["confidence"] == ABSENT_UNCLEAR
+    assert detection.confidence < VISION_THRESHOLD
+
+
+def test_full_width_nav_is_taken_as_the_header():
+    landmarks = {**layout()["landmarks"], "header": [], "nav": [box(0, 0, 1920, 60)]}
+    header = zones_by_name(detect_zones(layout(landmarks=landmarks)))["Header"]
+    
+    assert header["available"]
+    assert header["confidence"] == INFERRED
+
+
+def test_full_width_content_without_aside_clearly_has_no_sidebar():
+    landmarks = {**layout()["landmarks"], "aside": [], "main": [box(0, 150, 1800, 3500)]}
+    detection = detect_zones(layout(landmarks=landmarks))
+    sidebar = zones_by_name(detection)["Sidebar"]
+    
+    assert not sidebar["available"]
+    assert sidebar["confidence"] == ABSENT_CLEAR
+    assert detection.confidence >= VISION_THRESHOLD
+
+
+def test_narrow_content_without_aside_is_unclear():
+    landmarks = {**layout()["landmarks"], "aside": []}
+    sidebar = zones_by_name(detect_zones(layout(landmarks=landmarks)))["Sidebar"]
+    
+    assert sidebar["confidence"] == ABSENT_UNCLEAR
+
+
+def test_short_content_is_not_offered():
+    landmarks = {**layout()["landmarks"], "main": [box(200, 150, 1100, 250)]}
+    content = zones_by_name(detect_zones(layout(landmarks=landmarks, main_blocks=2)))["Content"]
+    
+    # Too short to be the main landmark at all
+    assert content["confidence"] == ABSENT_UNCLEAR
+    
+    landmarks = {**layout()["landmarks"], "main": [box(200, 150, 1100, 600)]}
+    content = zones_by_name(detect_zones(layout(landmarks=landmarks, main_blocks=2)))["Content"]
+    assert not content["available"]
+    assert content["confidence"] == INFERRED
+
+
+def test_footer_must_be_at_the_bottom_of_the_page():
+    landmarks = {**layout()["landmarks"], "footer": [box(0, 1000, 1920, 300)]}
+    footer = zones_by_name(detect_zones(layout(landmarks=landmarks)))["Footer"]
+    
+    assert not footer["available"]
+    assert footer["confidence"] == ABSENT_UNCLEAR
+
+
+@pytest.mark.parametrize("overlays, available, confidence", [
+    ([], True, ABSENT_CLEAR),
+    ([{"modal": True, "ads": 0}], True, ABSENT_CLEAR),
+    ([{"modal": False, "ads": 1}], False, SEMANTIC),
+    (None, False, ABSENT_UNCLEAR),
+])
+def test_popup_zone_from_overlays(overlays, available, confidence):
+    page = layout(overlays=overlays)
+    if overlays is None:
+        del page["overlays"]
+    detection = detect_zones(page)
+    popup = zones_by_name(detection)["Popup"]
+    
+    assert popup["available"] is available
+    assert popup["confidence"] == confidence
+    # Without overlay data the popup zone alone keeps vision in charge
+    assert (detection.confidence >= VISION_THRESHOLD) is (overlays is not None)
+
+
+def test_empty_layout_falls_back_to_vision():
+    detection = detect_zones({"landmarks": None, "text_sample": "hello world, this is an english page"})
+    
+    assert len(detection.zones) == 5
+    assert detection.confidence == ABSENT_UNCLEAR
+    assert detection.language == "en"
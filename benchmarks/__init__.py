@@ -0,0 +1,5 @@
+"""
+Offline benchmark suite for the AdLook analysis pipeline.
+
+Run with ``python -m benchmarks``; see benchmarks/README.md.
+"""
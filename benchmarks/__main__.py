@@ -0,0 +1,86 @@
+"""Command-line entrypoint: python -m benchmarks"""
+
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from .harness import SCENARIOS, run_benchmarks, format_report
+
+
+def parse_args(args=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="benchmarks",
+        description="Offline pipeline benchmarks against recorded pages and a stubbed LLM",
+    )
+    parser.add_argument(
+        "--scenarios",
+        default=",".join(SCENARIOS),
+        help=f"Comma-separated scenarios to run (default: all of {', '.join(SCENARIOS)})",
+    )
+    parser.add_argument(
+        "--concurrency",
+        default="1,4,8",
+        help="Comma-separated concurrency levels (default: 1,4,8)",
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        default=16,
+        help="Calls per scenario and concurrency level (default: 16)",
+    )
+    parser.add_argument(
+        "--llm-latency",
+        type=float,
+        default=0.2,
+        help="Seconds the stub LLM waits before answering (default: 0.2)",
+    )
+    parser.add_argument(
+        "--output",
+        default=str(Path(__file__).parent / "results"),
+        help="Directory for the JSON report (default: benchmarks/results)",
+    )
+    parser.add_argument(
+        "--compare",
+        default=None,
+        help="Previous JSON report to compare p50 latency and throughput against",
+    )
+    return parser.parse_args(args)
+
+
+def main() -> int:
+    import logging
+    
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    
+    args = parse_args()
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    
+    report = asyncio.run(run_benchmarks(scenarios, levels, args.requests, args.llm_latency))
+    
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    
+    print(format_report(report, baseline))
+    
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_path = output_dir / f"bench_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json"
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report.to_dict(), f, indent=2, ensure_ascii=False)
+    print(f"\nReport written to {output_path}")
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""
+Local HTTP server for the recorded page corpus.
+
+Serves the saved HTML pages in ``benchmarks/corpus`` so the crawler and
+parser stages can be benchmarked without touching real websites.
+"""
+
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, List
+
+CORPUS_DIR = Path(__file__).parent / "corpus"
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class CorpusServer(ThreadingHTTPServer):
+    """Threaded static file server for the page corpus."""
+    
+    daemon_threads = True
+    
+    def __init__(self, directory: Path = CORPUS_DIR, host: str = "127.0.0.1", port: int = 0):
+        self.directory = Path(directory)
+        super().__init__((host, port), partial(_QuietHandler, directory=str(self.directory)))
+        self._thread = None
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def page_urls(self) -> List[str]:
+        """URLs of every HTML page in the corpus, sorted by name."""
+        return [f"{self.base_url}/{path.name}" for path in sorted(self.directory.glob("*.html"))]
+    
+    def start(self) -> "CorpusServer":
+        """Serve in a background daemon thread."""
+        self._thread = threading.Thread(target=self.serve_forever, name="corpus-server", daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,432 @@
+"""
+Offline benchmark harness for the analysis pipeline.
+
+Serves the recorded page corpus and an OpenAI-compatible stub locally, then
+runs ``crawl_website``, the ``CompleteWebsiteParser`` stages and the
+exporters at several concurrency levels. For every scenario it reports
+throughput, latency percentiles and the peak RSS of this process plus its
+child processes (Playwright driver and Chromium).
+"""
+
+import asyncio
+import io
+import logging
+import os
+import platform
+import subprocess
+import threading
+import time
+import uuid
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from backend.app.instrumentation import current_rss_bytes, percentile
+from backend.app.services.screenshot import Screenshot
+
+from .corpus_server import CorpusServer
+from .stub_llm import StubLLMServer
+
+logger = logging.getLogger(__name__)
+
+SCENARIOS = (
+    "crawl",
+    "screenshot",
+    "scrape",
+    "vision",
+    "adtech",
+    "research",
+    "proposal",
+    "analysis",
+    "export.docx",
+    "export.pdf",
+)
+
+ScenarioFunc = Callable[[int], Awaitable[bool]]
+
+
+@dataclass
+class ScenarioResult:
+    """Measurements for one scenario at one concurrency level."""
+    
+    scenario: str
+    concurrency: int
+    requests: int = 0
+    errors: int = 0
+    wall_s: float = 0.0
+    throughput_rps: float = 0.0
+    p50_s: float = 0.0
+    p95_s: float = 0.0
+    p99_s: float = 0.0
+    max_s: float = 0.0
+    peak_rss_bytes: int = 0
+    skipped: Optional[str] = None
+
+
+def _children(pid: int) -> List[int]:
+    children = []
+    task_dir = Path(f"/proc/{pid}/task")
+    try:
+        for task in task_dir.iterdir():
+            try:
+                children.extend(int(c) for c in (task / "children").read_text().split())
+            except OSError:
+                continue
+    except OSError:
+        pass
+    return children
+
+
+def process_tree_rss_bytes(pid: Optional[int] = None) -> int:
+    """
+    RSS of a process and all of its descendants.
+    
+    Uses /proc on Linux; elsewhere only this process is measured.
+    """
+    root = pid or os.getpid()
+    if not Path("/proc").is_dir():
+        return current_rss_bytes()
+    
+    total, pending, seen = 0, [root], set()
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    while pending:
+        current = pending.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        try:
+            with open(f"/proc/{current}/statm", "rb") as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            continue
+        pending.extend(_children(current))
+    return total
+
+
+class RssSampler:
+    """Background thread recording the peak process-tree RSS."""
+    
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def __enter__(self) -> "RssSampler":
+        self.peak = process_tree_rss_bytes()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+    
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, process_tree_rss_bytes())
+    
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, process_tree_rss_bytes())
+
+
+async def run_scenario(name: str, func: ScenarioFunc, concurrency: int, requests: int) -> ScenarioResult:
+    """
+    Run ``requests`` calls of a scenario with at most ``concurrency`` in flight.
+    
+    Args:
+        name: Scenario name
+        func: Coroutine factory taking the request index and returning success
+        concurrency: Maximum concurrent calls
+        requests: Total calls to make
+    
+    Returns:
+        Aggregated ScenarioResult
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+    
+    async def one(index: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                ok = await func(index)
+            except Exception as error:
+                logger.debug(f"{name}[{index}] raised: {error}")
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors += 1
+    
+    with RssSampler() as sampler:
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        wall = time.perf_counter() - wall_start
+    
+    ordered = sorted(latencies)
+    return ScenarioResult(
+        scenario=name,
+        concurrency=concurrency,
+        requests=requests,
+        errors=errors,
+        wall_s=round(wall, 4),
+        throughput_rps=round(requests / wall, 3) if wall else 0.0,
+        p50_s=round(percentile(ordered, 50), 4),
+        p95_s=round(percentile(ordered, 95), 4),
+        p99_s=round(percentile(ordered, 99), 4),
+        max_s=round(ordered[-1], 4) if ordered else 0.0,
+        peak_rss_bytes=sampler.peak,
+    )
+
+
+def sample_screenshot(noise_rows: int = 0) -> Screenshot:
+    """
+    Synthetic full-page PNG (1920x4000) for the vision scenario.
+    
+    Args:
+        noise_rows: Height of a band of random pixels, which PNG cannot
+                    compress (about 5.8 KB per row); makes the image as big
+                    as screenshots of photo-heavy pages
+    """
+    import base64
+    
+    try:
+        from PIL import Image, ImageDraw
+    except ImportError:
+        # 1x1 transparent PNG
+        return Screenshot(base64.b64decode(
+            "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+        ))
+    
+    image = Image.new("RGB", (1920, 4000), "white")
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, 1920, 120), fill=(29, 53, 87))
+    for top in range(200, 3600, 400):
+        draw.rectangle((80, top, 1500, top + 320), outline=(120, 120, 120), width=3)
+        draw.rectangle((1560, top, 1860, top + 250), fill=(230, 230, 230))
+    draw.rectangle((0, 3700, 1920, 4000), fill=(34, 34, 34))
+    if noise_rows:
+        rows = min(noise_rows, 3500)
+        image.paste(Image.frombytes("RGB", (1920, rows), os.urandom(1920 * rows * 3)), (0, 150))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return Screenshot(buffer.getvalue())
+
+
+def sample_request_urls(count: int = 400) -> List[str]:
+    """Request log of a heavily monetized news page for the adtech scenario."""
+    ad_requests = [
+        "https://an.yandex.ru/system/context.js",
+        "https://yandex.ru/ads/system/header-bidding.js",
+        "https://securepubads.g.doubleclick.net/tag/js/gpt.js",
+        "https://pagead2.googlesyndication.com/pagead/js/adsbygoogle.js",
+        "https://cdn.example-news.ru/js/prebid.min.js",
+        "https://ib.adnxs.com/ut/v3/prebid",
+        "https://ads.betweendigital.com/adjson",
+    ]
+    first_party = [f"https://cdn.example-news.ru/static/{kind}/{n}.{kind}" for n in range(40) for kind in ("js", "css", "png")]
+    pool = ad_requests + first_party
+    return [pool[(n * 7) % len(pool)] + f"?r={n}" for n in range(count)]
+
+
+def build_scenarios(urls: List[str]) -> Dict[str, Any]:
+    """
+    Build scenario callables against the local servers.
+    
+    Scenarios whose dependencies cannot be imported map to the reason string
+    instead of a callable and are reported as skipped.
+    """
+    from backend.app.services.complete_parser import CompleteWebsiteParser
+    from backend.app.services.crawler import crawl_website
+    from backend.app.services.adtech import fingerprint
+    
+    parser = CompleteWebsiteParser()
+    screenshot = sample_screenshot()
+    request_log = sample_request_urls()
+    
+    def url_for(index: int) -> str:
+        return urls[index % len(urls)]
+    
+    async def crawl(index: int) -> bool:
+        return (await crawl_website(url_for(index)))[2]
+    
+    async def capture(index: int) -> bool:
+        return (await parser.capture_screenshot(url_for(index)))[1]
+    
+    async def scrape(index: int) -> bool:
+        return bool((await parser.scrape_website_data(url_for(index))).get("title"))
+    
+    async def vision(index: int) -> bool:
+        return (await parser.analyze_screenshot_for_ads(url_for(index), screenshot))[1]
+    
+    async def adtech(index: int) -> bool:
+        return fingerprint(request_log)["monetized"]
+    
+    async def research(index: int) -> bool:
+        await parser.research_company_owner("ООО «Городские Медиа»", url_for(index))
+        return True
+    
+    async def proposal(index: int) -> bool:
+        await parser.generate_personalized_proposal({
+            "website_url": url_for(index),
+            "zones": [{"name": "Header", "available": True, "description": "Top banner"}],
+            "language": "ru",
+            "company_name": "Городские новости",
+            "owner_info": {"insights": "Региональное онлайн-медиа"},
+            "emails": [],
+        })
+        return True
+    
+    async def analysis(index: int) -> bool:
+        return (await parser.analyze_website_complete(url_for(index))).get("success", False)
+    
+    scenarios: Dict[str, Any] = {
+        "crawl": crawl,
+        "screenshot": capture,
+        "scrape": scrape,
+        "vision": vision,
+        "adtech": adtech,
+        "research": research,
+        "proposal": proposal,
+        "analysis": analysis,
+    }
+    
+    try:
+        # The exporter imports these lazily, so probe them here to report a skip
+        import docx  # noqa: F401
+        import weasyprint  # noqa: F401
+        from backend.app.services.exporter import create_docx, create_pdf
+    except (ImportError, OSError) as error:
+        reason = f"exporter unavailable: {error}"
+        scenarios["export.docx"] = reason
+        scenarios["export.pdf"] = reason
+    else:
+        text = "Здравствуйте!\n\n" + "Adlook — SSP-платформа.\n" * 40
+        
+        async def export_docx(index: int) -> bool:
+            return (await asyncio.to_thread(create_docx, text, f"bench-{uuid.uuid4().hex}"))[1]
+        
+        async def export_pdf(index: int) -> bool:
+            return (await asyncio.to_thread(create_pdf, text, f"bench-{uuid.uuid4().hex}"))[1]
+        
+        scenarios["export.docx"] = export_docx
+        scenarios["export.pdf"] = export_pdf
+    
+    return scenarios
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, timeout=10,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+@dataclass
+class BenchmarkReport:
+    """Full benchmark run, serializable for regression tracking."""
+    
+    started_at: str
+    revision: Optional[str]
+    python: str
+    llm_latency_s: float
+    corpus_pages: int
+    results: List[ScenarioResult] = field(default_factory=list)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+async def run_benchmarks(
+    scenarios: List[str],
+    concurrency_levels: List[int],
+    requests: int,
+    llm_latency: float,
+) -> BenchmarkReport:
+    """
+    Start the local servers and run every scenario at every concurrency level.
+    
+    Args:
+        scenarios: Scenario names from SCENARIOS
+        concurrency_levels: Concurrency levels to test
+        requests: Calls per scenario and level
+        llm_latency: Seconds the stub LLM sleeps per request
+    
+    Returns:
+        BenchmarkReport with one result per scenario and level
+    """
+    corpus = CorpusServer().start()
+    stub = StubLLMServer(latency=llm_latency).start()
+    
+    os.environ["OPENAI_API_KEY"] = os.environ.get("ADLOOK_BENCH_API_KEY", "sk-benchmark-stub")
+    os.environ["OPENAI_BASE_URL"] = stub.base_url
+    
+    urls = corpus.page_urls()
+    report = BenchmarkReport(
+        started_at=datetime.now().isoformat(timespec="seconds"),
+        revision=_git_revision(),
+        python=platform.python_version(),
+        llm_latency_s=llm_latency,
+        corpus_pages=len(urls),
+    )
+    
+    try:
+        available = build_scenarios(urls)
+        
+        for name in scenarios:
+            func = available.get(name)
+            for concurrency in concurrency_levels:
+                if not callable(func):
+                    reason = func or "unknown scenario"
+                    logger.warning(f"Skipping {name}: {reason}")
+                    report.results.append(ScenarioResult(name, concurrency, skipped=reason))
+                    continue
+                
+                logger.info(f"Running {name} x{requests} at concurrency {concurrency}")
+                result = await run_scenario(name, func, concurrency, requests)
+                report.results.append(result)
+    finally:
+        stub.stop()
+        corpus.stop()
+    
+    return report
+
+
+def format_report(report: BenchmarkReport, baseline: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Render results as a text table, optionally with deltas against a baseline.
+    
+    Args:
+        report: Benchmark report to render
+        baseline: Previously saved report (as a dict) to compare against
+    """
+    previous = {}
+    if baseline:
+        previous = {(r["scenario"], r["concurrency"]): r for r in baseline.get("results", [])}
+    
+    header = f"{'scenario':<12} {'conc':>4} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>4} {'peak MB':>8}"
+    if previous:
+        header += f" {'Δp50':>8} {'Δrps':>8}"
+    lines = [header, "-" * len(header)]
+    
+    for r in report.results:
+        if r.skipped:
+            lines.append(f"{r.scenario:<12} {r.concurrency:>4} skipped: {r.skipped}")
+            continue
+        line = (
+            f"{r.scenario:<12} {r.concurrency:>4} {r.throughput_rps:>8.2f} {r.p50_s:>8.3f} "
+            f"{r.p95_s:>8.3f} {r.p99_s:>8.3f} {r.errors:>4} {r.peak_rss_bytes / 1e6:>8.1f}"
+        )
+        old = previous.get((r.scenario, r.concurrency))
+        if old and not old.get("skipped") and old.get("p50_s") and old.get("throughput_rps"):
+            line += (
+                f" {(r.p50_s / old['p50_s'] - 1) * 100:>+7.1f}%"
+                f" {(r.throughput_rps / old['throughput_rps'] - 1) * 100:>+7.1f}%"
+            )
+        lines.append(line)
+    
+    return "\n".join(lines)
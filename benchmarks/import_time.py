@@ -0,0 +1,136 @@
+"""
+Import-time regression check.
+
+Imports each entry point in a fresh interpreter with ``python -X importtime``
+and fails if it takes longer than its budget or pulls in a module that must
+stay lazy (WeasyPrint, python-docx, Playwright, OpenAI, BeautifulSoup,
+tldextract, pyarrow). Run it before merging changes that touch module-level
+imports::
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --repeat 5 --json
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Modules that are only needed once work starts, never at import
+LAZY_MODULES = ("weasyprint", "docx", "playwright", "openai", "bs4", "tldextract", "pyarrow")
+
+# Entry point -> budget in milliseconds for the cumulative import time
+TARGETS = {
+    "backend.app.main": 800,
+    "backend.app.jobs.worker": 300,
+    "adlook_cli.__main__": 300,
+}
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+\d+\s+\|\s*(\S+)$")
+
+
+@dataclass
+class ImportResult:
+    target: str
+    budget_ms: float
+    total_ms: float
+    slowest: List[Dict[str, float]] = field(default_factory=list)
+    lazy_violations: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.lazy_violations and self.total_ms <= self.budget_ms
+
+
+def measure(target: str, budget_ms: float, repeat: int = 3) -> ImportResult:
+    """
+    Import ``target`` in fresh interpreters and keep the fastest run.
+    
+    Args:
+        target: Dotted module name
+        budget_ms: Allowed cumulative import time
+        repeat: Number of runs; the minimum filters out disk cache noise
+    
+    Returns:
+        ImportResult for the target
+    """
+    env = dict(os.environ)
+    # Settings must not be needed to import anything
+    env.pop("OPENAI_API_KEY", None)
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    
+    best: Optional[ImportResult] = None
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+            cwd=str(REPO_ROOT), env=env, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            return ImportResult(target, budget_ms, 0.0, error=proc.stderr.strip().splitlines()[-1])
+        
+        modules = []
+        for line in proc.stderr.splitlines():
+            match = _LINE.match(line)
+            if match:
+                modules.append((match.group(2), int(match.group(1))))
+        
+        total_us = sum(self_us for _, self_us in modules)
+        result = ImportResult(
+            target=target,
+            budget_ms=budget_ms,
+            total_ms=round(total_us / 1000, 1),
+            slowest=[
+                {"module": name, "self_ms": round(self_us / 1000, 1)}
+                for name, self_us in sorted(modules, key=lambda m: m[1], reverse=True)[:8]
+            ],
+            lazy_violations=sorted({
+                name.split(".")[0] for name, _ in modules if name.split(".")[0] in LAZY_MODULES
+            }),
+        )
+        if best is None or result.total_ms < best.total_ms:
+            best = result
+    return best
+
+
+def format_results(results: List[ImportResult]) -> str:
+    lines = []
+    for result in results:
+        status = "OK" if result.ok else "FAIL"
+        if result.error:
+            lines.append(f"{status:4}  {result.target}: {result.error}")
+            continue
+        lines.append(f"{status:4}  {result.target}: {result.total_ms:.0f} ms (budget {result.budget_ms:.0f} ms)")
+        if result.lazy_violations:
+            lines.append(f"      imported eagerly: {', '.join(result.lazy_violations)}")
+        for entry in result.slowest[:5]:
+            lines.append(f"      {entry['self_ms']:8.1f} ms  {entry['module']}")
+    return "\n".join(lines)
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(prog="benchmarks.import_time", description="Check cold-start import time")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per target; the fastest is kept (default: 3)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every budget, e.g. 2 on slow CI machines")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    parsed = parser.parse_args(args)
+    
+    results = [measure(target, budget * parsed.scale, parsed.repeat) for target, budget in TARGETS.items()]
+    
+    if parsed.json:
+        print(json.dumps([{**asdict(result), "ok": result.ok} for result in results], indent=2))
+    else:
+        print(format_results(results))
+    
+    return 0 if all(result.ok for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
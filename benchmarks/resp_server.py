@@ -0,0 +1,281 @@
+"""
+In-memory stand-in for a Redis server.
+
+Speaks enough of the Redis protocol for the ``redis://`` job queue backend
+(strings, hashes, lists, sets and sorted sets used by
+``backend/app/jobs/redis_backend.py``), so the multi-worker setup can be
+run and benchmarked on a machine without Redis. State is lost on exit.
+"""
+
+import socketserver
+import threading
+from typing import Any, Callable, Dict, List
+
+
+class RESPError(Exception):
+    pass
+
+
+def _float(value: str) -> float:
+    if value in ("-inf", "+inf", "inf"):
+        return float(value if value != "+inf" else "inf")
+    try:
+        return float(value)
+    except ValueError:
+        raise RESPError("ERR value is not a valid float")
+
+
+class Store:
+    """Keyspace with the commands the job queue uses."""
+    
+    def __init__(self):
+        self.data: Dict[str, Any] = {}
+        self.lock = threading.Lock()
+        self.commands: Dict[str, Callable[..., Any]] = {
+            name[4:].upper(): getattr(self, name) for name in dir(self) if name.startswith("cmd_")
+        }
+    
+    def execute(self, args: List[str]) -> Any:
+        handler = self.commands.get(args[0].upper())
+        if handler is None:
+            raise RESPError(f"ERR unknown command '{args[0]}'")
+        with self.lock:
+            return handler(*args[1:])
+    
+    def _get(self, key: str, kind: type) -> Any:
+        value = self.data.get(key)
+        if value is not None and not isinstance(value, kind):
+            raise RESPError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+    
+    def _cleanup(self, key: str) -> None:
+        if key in self.data and not self.data[key]:
+            del self.data[key]
+    
+    def cmd_ping(self, *args):
+        return args[0] if args else "PONG"
+    
+    def cmd_auth(self, *args):
+        return "OK"
+    
+    def cmd_select(self, index):
+        return "OK"
+    
+    def cmd_flushdb(self):
+        self.data.clear()
+        return "OK"
+    
+    def cmd_del(self, *keys):
+        return sum(1 for key in keys if self.data.pop(key, None) is not None)
+    
+    def cmd_hset(self, key, *pairs):
+        hash_ = self._get(key, dict)
+        if hash_ is None:
+            hash_ = self.data[key] = {}
+        added = 0
+        for field, value in zip(pairs[::2], pairs[1::2]):
+            added += field not in hash_
+            hash_[field] = value
+        return added
+    
+    def cmd_hget(self, key, field):
+        return (self._get(key, dict) or {}).get(field)
+    
+    def cmd_hgetall(self, key):
+        return [item for pair in (self._get(key, dict) or {}).items() for item in pair]
+    
+    def cmd_hincrby(self, key, field, amount):
+        hash_ = self._get(key, dict)
+        if hash_ is None:
+            hash_ = self.data[key] = {}
+        hash_[field] = str(int(hash_.get(field, 0)) + int(amount))
+        return int(hash_[field])
+    
+    def _list(self, key):
+        items = self._get(key, list)
+        if items is None:
+            items = self.data[key] = []
+        return items
+    
+    def cmd_lpush(self, key, *values):
+        items = self._list(key)
+        for value in values:
+            items.insert(0, value)
+        return len(items)
+    
+    def cmd_rpush(self, key, *values):
+        items = self._list(key)
+        items.extend(values)
+        return len(items)
+    
+    def cmd_rpoplpush(self, source, destination):
+        items = self._get(source, list)
+        if not items:
+            return None
+        value = items.pop()
+        self._cleanup(source)
+        self._list(destination).insert(0, value)
+        return value
+    
+    def cmd_lrem(self, key, count, value):
+        items = self._get(key, list) or []
+        count = int(count)
+        limit = abs(count) or len(items)
+        indexes = [i for i, item in enumerate(items) if item == value]
+        if count < 0:
+            indexes.reverse()
+        removed = indexes[:limit]
+        for i in sorted(removed, reverse=True):
+            del items[i]
+        self._cleanup(key)
+        return len(removed)
+    
+    def cmd_llen(self, key):
+        return len(self._get(key, list) or [])
+    
+    def cmd_lrange(self, key, start, stop):
+        items = self._get(key, list) or []
+        start, stop = int(start), int(stop)
+        stop = len(items) if stop == -1 else stop + 1
+        return items[start:stop]
+    
+    def cmd_sadd(self, key, *members):
+        members_set = self._get(key, set)
+        if members_set is None:
+            members_set = self.data[key] = set()
+        before = len(members_set)
+        members_set.update(members)
+        return len(members_set) - before
+    
+    def cmd_srem(self, key, *members):
+        members_set = self._get(key, set) or set()
+        removed = sum(1 for member in members if member in members_set)
+        members_set.difference_update(members)
+        self._cleanup(key)
+        return removed
+    
+    def cmd_scard(self, key):
+        return len(self._get(key, set) or set())
+    
+    def cmd_zadd(self, key, *args):
+        flags = set()
+        args = list(args)
+        while args and args[0].upper() in ("NX", "XX"):
+            flags.add(args.pop(0).upper())
+        zset = self._get(key, dict)
+        if zset is None:
+            zset = self.data[key] = {}
+        added = 0
+        for score, member in zip(args[::2], args[1::2]):
+            exists = member in zset
+            if ("NX" in flags and exists) or ("XX" in flags and not exists):
+                continue
+            added += not exists
+            zset[member] = _float(score)
+        self._cleanup(key)
+        return added
+    
+    def cmd_zrem(self, key, *members):
+        zset = self._get(key, dict) or {}
+        removed = sum(1 for member in members if zset.pop(member, None) is not None)
+        self._cleanup(key)
+        return removed
+    
+    def cmd_zscore(self, key, member):
+        score = (self._get(key, dict) or {}).get(member)
+        return None if score is None else repr(score)
+    
+    def cmd_zrangebyscore(self, key, low, high):
+        low, high = _float(low), _float(high)
+        zset = self._get(key, dict) or {}
+        return [member for member, score in sorted(zset.items(), key=lambda kv: (kv[1], kv[0])) if low <= score <= high]
+
+
+def _encode(value: Any) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, RESPError):
+        return f"-{value}\r\n".encode("utf-8")
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(_encode(item) for item in value)
+    if value == "OK" or value == "PONG":
+        return f"+{value}\r\n".encode()
+    data = str(value).encode("utf-8")
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+class RESPHandler(socketserver.StreamRequestHandler):
+    server: "RESPServer"
+    
+    def _read_command(self) -> List[str]:
+        line = self.rfile.readline()
+        if not line:
+            return []
+        if not line.startswith(b"*"):
+            return line.decode("utf-8").split()
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2].decode("utf-8"))
+        return args
+    
+    def handle(self) -> None:
+        while True:
+            try:
+                args = self._read_command()
+            except (OSError, ValueError):
+                return
+            if not args:
+                return
+            try:
+                reply = self.server.store.execute(args)
+            except RESPError as error:
+                reply = error
+            except (TypeError, ValueError):
+                reply = RESPError(f"ERR wrong arguments for '{args[0]}' command")
+            self.wfile.write(_encode(reply))
+
+
+class RESPServer(socketserver.ThreadingTCPServer):
+    """Threaded server sharing one in-memory store between connections."""
+    
+    daemon_threads = True
+    allow_reuse_address = True
+    
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), RESPHandler)
+        self.store = Store()
+        self._thread = None
+    
+    @property
+    def url(self) -> str:
+        """Queue URL to pass as ADLOOK_QUEUE_URL."""
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+    
+    def start(self) -> "RESPServer":
+        """Serve in a background daemon thread."""
+        self._thread = threading.Thread(target=self.serve_forever, name="resp-server", daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    arg_parser = argparse.ArgumentParser(description="Run the in-memory Redis-protocol stand-in")
+    arg_parser.add_argument("--port", type=int, default=6379)
+    cli_args = arg_parser.parse_args()
+    
+    resp_server = RESPServer(port=cli_args.port)
+    print(f"Redis-protocol stand-in listening on {resp_server.url}")
+    resp_server.serve_forever()
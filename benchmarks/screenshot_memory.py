@@ -0,0 +1,200 @@
+"""
+Screenshot memory benchmark.
+
+Runs N analyses at once and reports how much the peak RSS grows per
+concurrent analysis, for two screenshot representations:
+
+- ``buffer``: the pipeline as it is, with ``Screenshot`` holding the PNG
+  bytes and the vision request built from the scaled-down image;
+- ``data-url``: the previous representation, a base64 ``data:`` URL string
+  created at capture and passed, cached and serialized as it is.
+
+Each analysis reads a synthetic full-page PNG (as the browser would hand it
+over), asks the stub LLM's vision endpoint, caches the result and
+serializes the response. The stub answers after ``--llm-latency`` seconds,
+so all N analyses hold their screenshots at the same time. Every
+measurement runs in a fresh interpreter::
+
+    python -m benchmarks.screenshot_memory
+    python -m benchmarks.screenshot_memory --concurrency 1,8,32 --screenshot-mb 5 --json
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+BUFFER = "buffer"
+DATA_URL = "data-url"
+MODES = (DATA_URL, BUFFER)
+
+# PNG bytes per row of random pixels in the synthetic screenshot
+NOISE_ROW_BYTES = 1920 * 3
+
+# Tiny image for the warm-up call that opens the connection pool before the baseline is taken
+WARMUP_DATA_URL = (
+    "data:image/png;base64,"
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+
+
+@dataclass
+class MemoryResult:
+    mode: str
+    concurrency: int
+    screenshot_bytes: int
+    peak_rss_delta_bytes: int
+    rss_per_analysis_bytes: int
+    traced_peak_bytes: int
+    traced_per_analysis_bytes: int
+    response_bytes: int
+
+
+async def _analyses(mode: str, concurrency: int, png_path: Path) -> Dict[str, int]:
+    from backend.app.instrumentation import current_rss_bytes, peak_rss_bytes
+    from backend.app.responses import dumps
+    from backend.app.services.complete_parser import CompleteWebsiteParser
+    from backend.app.services.screenshot import Screenshot
+    
+    parser = CompleteWebsiteParser()
+    cache: List[Dict[str, Any]] = []
+    
+    async def analysis(index: int) -> int:
+        url = f"https://site-{index}.example/"
+        png = png_path.read_bytes()
+        if mode == BUFFER:
+            screenshot = Screenshot(png)
+        else:
+            encoded = base64.b64encode(png).decode("utf-8")
+            screenshot = f"data:image/png;base64,{encoded}"
+            del encoded
+        del png
+        
+        result, success, error = await parser.analyze_screenshot_for_ads(url, screenshot)
+        if not success:
+            raise RuntimeError(error)
+        record = {"success": True, "screenshot": screenshot, "zones": result.get("zones", [])}
+        cache.append(record)
+        return len(dumps(record))
+    
+    success = (await parser.analyze_screenshot_for_ads("https://warmup.example/", WARMUP_DATA_URL))[1]
+    if not success:
+        raise RuntimeError("Warm-up vision call failed")
+    
+    baseline = current_rss_bytes()
+    tracemalloc.start()
+    sizes = await asyncio.gather(*(analysis(index) for index in range(concurrency)))
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    return {
+        "peak_rss_delta_bytes": max(0, peak_rss_bytes() - baseline),
+        "traced_peak_bytes": traced_peak,
+        "response_bytes": sizes[0],
+    }
+
+
+def _child(mode: str, concurrency: int, png_path: str) -> int:
+    measured = asyncio.run(_analyses(mode, concurrency, Path(png_path)))
+    print(json.dumps(measured))
+    return 0
+
+
+def measure(mode: str, concurrency: int, png_path: Path, env: Dict[str, str]) -> MemoryResult:
+    """Run ``concurrency`` analyses in ``mode`` in a fresh interpreter."""
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.screenshot_memory", "--child", mode, str(concurrency), str(png_path)],
+        cwd=str(REPO_ROOT), env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{mode} x{concurrency} failed: {proc.stderr.strip().splitlines()[-1]}")
+    measured = json.loads(proc.stdout.strip().splitlines()[-1])
+    return MemoryResult(
+        mode=mode,
+        concurrency=concurrency,
+        screenshot_bytes=png_path.stat().st_size,
+        peak_rss_delta_bytes=measured["peak_rss_delta_bytes"],
+        rss_per_analysis_bytes=measured["peak_rss_delta_bytes"] // concurrency,
+        traced_peak_bytes=measured["traced_peak_bytes"],
+        traced_per_analysis_bytes=measured["traced_peak_bytes"] // concurrency,
+        response_bytes=measured["response_bytes"],
+    )
+
+
+def format_results(results: List[MemoryResult]) -> str:
+    mb = 1024 * 1024
+    lines = [
+        f"screenshot: {results[0].screenshot_bytes / mb:.1f} MB PNG" if results else "no results",
+        f"{'mode':9} {'conc':>4} {'peak RSS':>10} {'per analysis':>13} {'traced/analysis':>16}",
+    ]
+    for result in results:
+        lines.append(
+            f"{result.mode:9} {result.concurrency:>4} {result.peak_rss_delta_bytes / mb:>8.1f}MB"
+            f" {result.rss_per_analysis_bytes / mb:>11.1f}MB {result.traced_per_analysis_bytes / mb:>14.1f}MB"
+        )
+    return "\n".join(lines)
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="benchmarks.screenshot_memory", description="Peak memory per concurrent analysis by screenshot representation"
+    )
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels (default: 1,4,16)")
+    parser.add_argument("--screenshot-mb", type=float, default=3.0, help="Approximate PNG size (default: 3)")
+    parser.add_argument("--llm-latency", type=float, default=2.0, help="Seconds the stub LLM waits (default: 2)")
+    parser.add_argument("--modes", default=",".join(MODES), help=f"Comma-separated modes (default: {','.join(MODES)})")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "CONCURRENCY", "PNG"), help=argparse.SUPPRESS)
+    parsed = parser.parse_args(args)
+    
+    if parsed.child:
+        mode, concurrency, png_path = parsed.child
+        return _child(mode, int(concurrency), png_path)
+    
+    from .harness import sample_screenshot
+    from .stub_llm import StubLLMServer
+    
+    concurrency_levels = [int(level) for level in parsed.concurrency.split(",") if level.strip()]
+    modes = [mode.strip() for mode in parsed.modes.split(",") if mode.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(sorted(unknown))}")
+    
+    server = StubLLMServer(latency=parsed.llm_latency).start()
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            png_path = Path(tmp) / "screenshot.png"
+            sample_screenshot(noise_rows=int(parsed.screenshot_mb * 1024 * 1024 / NOISE_ROW_BYTES)).save(png_path)
+            
+            env = dict(os.environ)
+            env["OPENAI_API_KEY"] = env.get("OPENAI_API_KEY") or "benchmark"
+            env["OPENAI_BASE_URL"] = server.base_url
+            # One high-detail tier: the largest image the buffer mode sends
+            env["ADLOOK_VISION_TIERS"] = "gpt-4o:high"
+            
+            for concurrency in concurrency_levels:
+                for mode in modes:
+                    results.append(measure(mode, concurrency, png_path, env))
+    finally:
+        server.stop()
+    
+    if parsed.json:
+        print(json.dumps([asdict(result) for result in results], indent=2))
+    else:
+        print(format_results(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
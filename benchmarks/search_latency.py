@@ -0,0 +1,185 @@
+"""
+Analysis search latency benchmark.
+
+Fills an ``AnalysisStore`` with synthetic analyses (Russian and English
+companies, titles, descriptions, emails, zones and proposal text drawn from
+small vocabularies, so common and rare words both occur) and times typical
+``/api/complete/search`` queries: first pages, deep pages through the
+cursor, filters with and without full-text terms, and facet counts::
+
+    python -m benchmarks.search_latency
+    python -m benchmarks.search_latency --records 300000 --db /tmp/analyses.db --json
+
+An existing database with at least ``--records`` analyses is reused, so
+repeated runs skip the fill.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from backend.app.services.analysis_store import AnalysisStore, SearchQuery
+
+FILL_BATCH = 5000
+SEED = 48
+
+RU_WORDS = (
+    "доставка цветов ремонт квартир стоматология клиника автосервис шиномонтаж юридические услуги бухгалтерия "
+    "строительство домов недвижимость аренда офисов ресторан кафе пиццерия суши фитнес клуб салон красоты "
+    "туристическое агентство интернет магазин одежды обуви мебели детские товары зоомагазин ветеринарная "
+    "гостиница отель курсы английского школа программирования новости города блог рецепты"
+).split()
+EN_WORDS = (
+    "flower delivery home repair dental clinic car service legal accounting construction real estate office "
+    "rental restaurant cafe pizza sushi fitness club beauty salon travel agency online store clothing shoes "
+    "furniture kids pet shop veterinary hotel english courses coding school city news blog recipes"
+).split()
+ZONES = ("Header", "Sidebar", "Content", "Footer", "Popup")
+LEGAL_FORMS = ("ООО", "ИП", "АО", "LLC", "Ltd")
+
+
+@dataclass
+class QueryTiming:
+    name: str
+    runs: int
+    p50_ms: float
+    p95_ms: float
+    max_ms: float
+    results: int
+
+
+def _phrase(rng: random.Random, words: Tuple[str, ...], count: int) -> str:
+    return " ".join(rng.choice(words) for _ in range(count))
+
+
+def synthetic_analysis(rng: random.Random, index: int) -> Tuple[str, str, Dict[str, Any]]:
+    language = "ru" if rng.random() < 0.75 else "en"
+    words = RU_WORDS if language == "ru" else EN_WORDS
+    name = f"{rng.choice(LEGAL_FORMS)} {_phrase(rng, words, 2).title()} {index % 997}"
+    domain = f"site{index}.{'ru' if language == 'ru' else 'com'}"
+    zones = [
+        {"name": zone, "available": rng.random() < 0.4, "size": "300x250", "priority": "medium"}
+        for zone in ZONES[:rng.randint(3, 5)]
+    ]
+    result = {
+        "success": True,
+        "zones": zones,
+        "zones_source": rng.choice(("dom", "vision")),
+        "adtech": {"networks": []},
+        "language": language,
+        "emails": [f"info@{domain}"] if rng.random() < 0.6 else [],
+        "company_name": name,
+        "title": _phrase(rng, words, 6),
+        "description": _phrase(rng, words, 20),
+        "owner_info": None,
+        "proposal": _phrase(rng, words, 120),
+    }
+    return str(uuid.UUID(int=rng.getrandbits(128))), f"https://www.{domain}/", result
+
+
+def fill(store: AnalysisStore, records: int) -> float:
+    """Add analyses until the store holds ``records``; returns seconds spent."""
+    rng = random.Random(SEED)
+    start = time.perf_counter()
+    existing = store.count()
+    # Spread over the last 90 days, oldest first like real inserts
+    now = time.time()
+    for offset in range(existing, records, FILL_BATCH):
+        size = min(FILL_BATCH, records - offset)
+        batch = [synthetic_analysis(rng, offset + index) for index in range(size)]
+        store.add_many(batch, created_at=now - 90 * 86400 * (1 - offset / records))
+    return time.perf_counter() - start
+
+
+def queries(store: AnalysisStore) -> Dict[str, Tuple[SearchQuery, bool]]:
+    """Named queries with whether they count facets; one is a page far down the results."""
+    deep = SearchQuery()
+    for _ in range(50):
+        deep.cursor = store.search(deep)["next_cursor"]
+    week_ago = time.time() - 7 * 86400
+    return {
+        "latest": (SearchQuery(), False),
+        "latest, page 51": (deep, False),
+        "language+zone+emails": (SearchQuery(language="en", zones=["sidebar", "footer"], has_emails=True), False),
+        "domain": (SearchQuery(domain="site4242.ru"), False),
+        "last week": (SearchQuery(since=week_ago), False),
+        "q common word": (SearchQuery(q="доставка"), False),
+        "q two words": (SearchQuery(q="ремонт квартир"), False),
+        "q company name": (SearchQuery(q="ООО стоматология 512"), False),
+        "q email": (SearchQuery(q="info@site1234.ru"), False),
+        "q prefix": (SearchQuery(q="стомат*"), False),
+        "q + filters": (SearchQuery(q="клиника", language="ru", zones=["header"], has_emails=True), False),
+        "q by relevance": (SearchQuery(q="суши пиццерия", sort="relevance"), False),
+        "facets, all": (SearchQuery(), True),
+        "facets, zone+emails": (SearchQuery(zones=["content"], has_emails=True), True),
+        "facets, q narrow": (SearchQuery(q="стоматология 512"), True),
+        "facets, q broad": (SearchQuery(q="доставка"), True),
+    }
+
+
+def time_query(store: AnalysisStore, name: str, query: SearchQuery, facets: bool, runs: int) -> QueryTiming:
+    store.search(query, facets=facets)
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        found = store.search(query, facets=facets)
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    return QueryTiming(
+        name=name,
+        runs=runs,
+        p50_ms=round(statistics.median(durations), 3),
+        p95_ms=round(durations[min(len(durations) - 1, int(len(durations) * 0.95))], 3),
+        max_ms=round(durations[-1], 3),
+        results=len(found["results"]),
+    )
+
+
+def format_results(records: int, timings: List[QueryTiming]) -> str:
+    lines = [f"{records} analyses", f"{'query':24} {'p50':>9} {'p95':>9} {'max':>9} {'hits':>5}"]
+    for timing in timings:
+        lines.append(
+            f"{timing.name:24} {timing.p50_ms:>7.2f}ms {timing.p95_ms:>7.2f}ms {timing.max_ms:>7.2f}ms {timing.results:>5}"
+        )
+    return "\n".join(lines)
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(prog="benchmarks.search_latency", description="Latency of analysis searches")
+    parser.add_argument("--records", type=int, default=200_000, help="Analyses in the store (default: 200000)")
+    parser.add_argument("--runs", type=int, default=50, help="Timed runs per query (default: 50)")
+    parser.add_argument("--db", default=None, help="Database file to fill or reuse (default: a temporary file)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    parsed = parser.parse_args(args)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = AnalysisStore(parsed.db or str(Path(tmp) / "analyses.db"))
+        try:
+            if store.count() < parsed.records:
+                seconds = fill(store, parsed.records)
+                print(f"Filled {parsed.records} analyses in {seconds:.1f}s", file=sys.stderr)
+            timings = [
+                time_query(store, name, query, facets, parsed.runs)
+                for name, (query, facets) in queries(store).items()
+            ]
+            records = store.count()
+        finally:
+            store.close()
+    
+    if parsed.json:
+        print(json.dumps({"records": records, "queries": [asdict(timing) for timing in timings]}, indent=2))
+    else:
+        print(format_results(records, timings))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,366 @@
+"""
+Local OpenAI-compatible stub server for offline benchmarks.
+
+Implements ``POST /v1/chat/completions`` with canned but schema-valid
+responses for every prompt the pipeline sends (vision zones, company
+research, proposal segments, legacy zone list). Each response is delayed by a
+configurable latency to emulate the real API.
+
+The Batch API subset used by the deferred CLI mode is implemented too:
+``POST /v1/files``, ``GET /v1/files/{id}/content``, ``POST /v1/batches``
+and ``GET /v1/batches/{id}``. A batch completes ``latency`` seconds after it
+is created, whatever its size.
+"""
+
+import json
+import threading
+import time
+import uuid
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+VISION_RESPONSE = {
+    "zones": [
+        {"name": "Header", "available": True, "size": "728x90", "priority": "high",
+         "description": "Wide band under the site logo above the navigation.", "confidence": 0.9},
+        {"name": "Sidebar", "available": False, "size": "300x250", "priority": "medium",
+         "description": "Right column already holds an ad unit.", "confidence": 0.85},
+        {"name": "Content", "available": True, "size": "300x250", "priority": "high",
+         "description": "Between the second and third article blocks.", "confidence": 0.8},
+        {"name": "Footer", "available": True, "size": "728x90", "priority": "medium",
+         "description": "Above the copyright line.", "confidence": 0.85},
+    ],
+    "language": "ru",
+    "confidence": 0.8,
+}
+
+LEGACY_ZONES_RESPONSE = [
+    {"zone": "Header", "priority": "high"},
+    {"zone": "Content", "priority": "medium"},
+]
+
+RESEARCH_RESPONSE = (
+    "Компания управляет региональным новостным порталом. Руководитель не указан "
+    "в открытых источниках. Основная деятельность — онлайн-медиа и реклама."
+)
+
+REGISTRY_SUMMARY_RESPONSE = (
+    "ООО «Вести» зарегистрировано в 2012 году в Москве. Генеральный директор — "
+    "Иванов Иван Иванович. Основная деятельность — деятельность сетевых изданий."
+)
+
+PROPOSAL_RESPONSE = (
+    "Здравствуйте!\n\nВаш сайт выделяется качественным контентом и живой аудиторией.\n\n"
+    "Adlook — российская SSP-платформа, основанная в 2018 году в Санкт-Петербурге.\n\n"
+    "Предлагаем разместить рекламу в шапке сайта и между материалами.\n\n"
+    "Будем рады обсудить детали.\n\nС уважением,\nКоманда Adlook"
+)
+
+GREETING_RESPONSE = "Здравствуйте!"
+
+COMPLIMENT_RESPONSE = (
+    "Ваш сайт выделяется качественным контентом и живой аудиторией, "
+    "которая регулярно возвращается за свежими материалами."
+)
+
+
+def _message_text(messages: List[Dict[str, Any]]) -> Tuple[str, bool]:
+    """Return the concatenated text of all messages and whether an image is attached."""
+    texts, has_image = [], False
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            texts.append(content)
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "text":
+                    texts.append(part.get("text", ""))
+                elif part.get("type") == "image_url":
+                    has_image = True
+    return "\n".join(texts), has_image
+
+
+def canned_completion(body: Dict[str, Any]) -> str:
+    """
+    Pick a canned completion for a chat request.
+    
+    Args:
+        body: Parsed chat completion request body
+    
+    Returns:
+        Assistant message content
+    """
+    text, has_image = _message_text(body.get("messages", []))
+    
+    if has_image:
+        return json.dumps(VISION_RESPONSE, ensure_ascii=False)
+    if body.get("response_format", {}).get("type") == "json_object":
+        return json.dumps(VISION_RESPONSE, ensure_ascii=False)
+    if "valid JSON only" in text:
+        return json.dumps(LEGACY_ZONES_RESPONSE)
+    if "Найди информацию о компании" in text:
+        return RESEARCH_RESPONSE
+    if "Сведения из ЕГРЮЛ" in text:
+        return REGISTRY_SUMMARY_RESPONSE
+    if "строку приветствия" in text or "one-line greeting" in text:
+        return GREETING_RESPONSE
+    if "комплиментом" in text or "specific compliment" in text:
+        return COMPLIMENT_RESPONSE
+    return PROPOSAL_RESPONSE
+
+
+def build_completion(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a chat.completion response object for a request body."""
+    content = canned_completion(body)
+    prompt_text, has_image = _message_text(body.get("messages", []))
+    prompt_tokens = len(prompt_text) // 4 + (765 if has_image else 0)
+    completion_tokens = len(content) // 4
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    """Request handler emulating the OpenAI REST API."""
+    
+    server: "StubLLMServer"
+    
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+    
+    def _send_json(self, status: int, payload: Any) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length", "0"))
+        return self.rfile.read(length) if length else b""
+    
+    def _send_bytes(self, status: int, data: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def _upload_file(self) -> None:
+        raw = self._read_body()
+        # Reuse the MIME parser for the multipart/form-data upload
+        message = BytesParser(policy=policy.HTTP).parsebytes(
+            f"Content-Type: {self.headers.get('Content-Type', '')}\r\n\r\n".encode("latin-1") + raw
+        )
+        for part in message.iter_parts():
+            if part.get_param("name", header="content-disposition") == "file":
+                file_object = self.server.add_file(part.get_filename() or "upload.jsonl", part.get_payload(decode=True))
+                self._send_json(200, file_object)
+                return
+        self._send_json(400, {"error": {"message": "Missing file field"}})
+    
+    def do_POST(self) -> None:
+        path = self.path.split("?", 1)[0].rstrip("/")
+        
+        if path.endswith("/chat/completions"):
+            body = json.loads(self._read_body() or b"{}")
+            self.server.record_request()
+            if self.server.latency:
+                time.sleep(self.server.latency)
+            self._send_json(200, build_completion(body))
+            return
+        
+        if path.endswith("/files"):
+            self._upload_file()
+            return
+        
+        if path.endswith("/batches"):
+            body = json.loads(self._read_body() or b"{}")
+            batch = self.server.create_batch(body)
+            if batch is None:
+                self._send_json(404, {"error": {"message": f"No such file: {body.get('input_file_id')}"}})
+                return
+            self._send_json(200, batch)
+            return
+        
+        self._send_json(404, {"error": {"message": f"Unknown endpoint {self.path}"}})
+    
+    def do_GET(self) -> None:
+        parts = self.path.split("?", 1)[0].strip("/").split("/")
+        
+        if len(parts) >= 3 and parts[-3] == "files" and parts[-1] == "content":
+            data = self.server.files.get(parts[-2], {}).get("data")
+            if data is None:
+                self._send_json(404, {"error": {"message": f"No such file: {parts[-2]}"}})
+                return
+            self._send_bytes(200, data)
+            return
+        
+        if len(parts) >= 2 and parts[-2] == "batches":
+            batch = self.server.get_batch(parts[-1])
+            if batch is None:
+                self._send_json(404, {"error": {"message": f"No such batch: {parts[-1]}"}})
+                return
+            self._send_json(200, batch)
+            return
+        
+        self._send_json(404, {"error": {"message": f"Unknown endpoint {self.path}"}})
+
+
+def run_batch_lines(data: bytes) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Execute a Batch API input file against the canned completions.
+    
+    Args:
+        data: JSONL input file
+    
+    Returns:
+        Tuple of (output lines, error lines)
+    """
+    output, errors = [], []
+    for line in data.decode("utf-8").splitlines():
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+            body = entry["body"]
+            custom_id = entry["custom_id"]
+        except (ValueError, KeyError) as error:
+            errors.append({
+                "id": f"batch_req_{uuid.uuid4().hex}", "custom_id": None, "response": None,
+                "error": {"code": "invalid_request", "message": f"Malformed line: {error}"},
+            })
+            continue
+        output.append({
+            "id": f"batch_req_{uuid.uuid4().hex}",
+            "custom_id": custom_id,
+            "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": build_completion(body)},
+            "error": None,
+        })
+    return output, errors
+
+
+class StubLLMServer(ThreadingHTTPServer):
+    """Threaded stub server; each request sleeps ``latency`` seconds."""
+    
+    daemon_threads = True
+    
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        super().__init__((host, port), StubLLMHandler)
+        self.latency = latency
+        self.request_count = 0
+        self.batch_request_count = 0
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self._count_lock = threading.RLock()
+        self._thread = None
+    
+    def record_request(self) -> None:
+        with self._count_lock:
+            self.request_count += 1
+    
+    def add_file(self, filename: str, data: bytes, purpose: str = "batch") -> Dict[str, Any]:
+        """Store an uploaded (or generated) file and return its file object."""
+        file_object = {
+            "id": f"file-{uuid.uuid4().hex}",
+            "object": "file",
+            "bytes": len(data),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+        with self._count_lock:
+            self.files[file_object["id"]] = {**file_object, "data": data}
+        return file_object
+    
+    def create_batch(self, body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Register a batch; it completes once ``latency`` seconds have passed."""
+        input_file = self.files.get(body.get("input_file_id", ""))
+        if input_file is None:
+            return None
+        now = int(time.time())
+        batch = {
+            "id": f"batch_{uuid.uuid4().hex}",
+            "object": "batch",
+            "endpoint": body.get("endpoint", "/v1/chat/completions"),
+            "input_file_id": input_file["id"],
+            "completion_window": body.get("completion_window", "24h"),
+            "status": "in_progress",
+            "created_at": now,
+            "in_progress_at": now,
+            "metadata": body.get("metadata"),
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            "_ready_at": time.monotonic() + self.latency,
+        }
+        with self._count_lock:
+            self.batches[batch["id"]] = batch
+        return self._public(batch)
+    
+    def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Current batch object, running the batch once it is due."""
+        with self._count_lock:
+            batch = self.batches.get(batch_id)
+            if batch is None:
+                return None
+            if batch["status"] == "in_progress" and time.monotonic() >= batch["_ready_at"]:
+                output, errors = run_batch_lines(self.files[batch["input_file_id"]]["data"])
+                self.batch_request_count += len(output)
+                batch["status"] = "completed"
+                batch["completed_at"] = int(time.time())
+                batch["request_counts"] = {"total": len(output) + len(errors), "completed": len(output), "failed": len(errors)}
+                for key, lines in (("output_file_id", output), ("error_file_id", errors)):
+                    if lines:
+                        data = "".join(json.dumps(line, ensure_ascii=False) + "\n" for line in lines).encode("utf-8")
+                        batch[key] = self.add_file(f"{batch_id}_{key}.jsonl", data, purpose="batch_output")["id"]
+            return self._public(batch)
+    
+    @staticmethod
+    def _public(batch: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in batch.items() if not key.startswith("_")}
+    
+    @property
+    def base_url(self) -> str:
+        """Base URL to pass as OPENAI_BASE_URL."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+    
+    def start(self) -> "StubLLMServer":
+        """Serve in a background daemon thread."""
+        self._thread = threading.Thread(target=self.serve_forever, name="stub-llm", daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    arg_parser = argparse.ArgumentParser(description="Run the OpenAI-compatible stub server")
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument("--latency", type=float, default=0.5, help="Seconds to sleep per request")
+    cli_args = arg_parser.parse_args()
+    
+    stub = StubLLMServer(port=cli_args.port, latency=cli_args.latency)
+    print(f"Stub OpenAI server listening on {stub.base_url}")
+    stub.serve_forever()
@@ -39,20 +39,36 @@ else
 fi
 echo ""
 
-# Test 4: With API key shows placeholder
-echo "Test 4: With API key shows placeholder confirmation"
+# Test 4: Checkpoint journal records stages and replays them on resume (no analysis, no network)
+echo "Test 4: Checkpoint journal replays completed stages on resume"
 export OPENAI_API_KEY=test-key
-if python -m adlook_cli https://example.com 2>&1 | grep -q "Downstream implementation pending"; then
-    echo "✓ PASS: Placeholder confirmation shown"
+if python -c "
+import tempfile
+from pathlib import Path
+from adlook_cli.journal import CheckpointJournal
+output = Path(tempfile.mkdtemp())
+journal = CheckpointJournal(output)
+journal.record_canonical({'http://old-example.com': 'https://example.com'})
+journal.start_run(['https://example.com'], resume=False)
+journal.start_url('https://example.com', output / 'example.com')
+journal.complete_stage('https://example.com', 'screenshot', 'screenshot.png')
+journal.fail_stage('https://example.com', 'vision', 'timeout')
+resumed = CheckpointJournal(output)
+resumed.start_run(['https://example.com'], resume=True)
+state = resumed.get_state('https://example.com')
+assert state.is_stage_complete('screenshot') and not state.is_stage_complete('vision') and not state.done
+assert resumed.canonical_urls() == {'http://old-example.com': 'https://example.com'}
+" 2>&1; then
+    echo "✓ PASS: Checkpoint journal replayed"
 else
-    echo "✗ FAIL: Placeholder not shown"
+    echo "✗ FAIL: Checkpoint journal not replayed"
     exit 1
 fi
 echo ""
 
 # Test 5: Verbose logging works
 echo "Test 5: Verbose logging includes DEBUG info"
-if python -m adlook_cli https://example.com --verbose 2>&1 | grep -q "DEBUG"; then
+if python -m adlook_cli https://example.com --verbose --dry-run 2>&1 | grep -q "DEBUG"; then
     echo "✓ PASS: Verbose logging works"
 else
     echo "✗ FAIL: Verbose logging failed"
@@ -82,6 +98,16 @@ else
 fi
 echo ""
 
+# Test 8: An invalid URL does not stop the rest of the batch
+echo "Test 8: Invalid URLs fail on their own"
+if python -m adlook_cli https://example.com "http://site.ru:99999/" --dry-run 2>&1 | grep -q "Would analyze: https://example.com/"; then
+    echo "✓ PASS: Valid URLs kept next to an invalid one"
+else
+    echo "✗ FAIL: Invalid URL aborted the batch"
+    exit 1
+fi
+echo ""
+
 # Cleanup
 rm -rf output/ test-output/
 